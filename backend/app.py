@@ -4,10 +4,10 @@ Aplicação de saúde mental e bem-estar
 """
 import logging
 import os
-from datetime import timedelta
+from datetime import date, timedelta
 from logging.handlers import RotatingFileHandler
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_file, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager, create_access_token, create_refresh_token,
@@ -18,8 +18,14 @@ from flask_limiter.util import get_remote_address
 from marshmallow import ValidationError
 
 # Imports locais
+import conexao
+import exportacao
+from cache import etag_forte
 from config import get_config
 from controller import controller_usuario
+from imagens import criar_imagens, largura_pedida
+from middleware.compressao import etag_correspondente, registrar_compressao
+from serializacao import ProvedorJson
 from model.usuario import Usuario
 from model.classificacao_humor import ClassificacaoHumor
 from model.resultado_avaliacao import ResultadoAvaliacao
@@ -37,6 +43,9 @@ config = get_config()
 app = Flask(__name__)
 app.config.from_object(config)
 
+# JSON das respostas pelo orjson: datas e models sem conversão no controller
+app.json = ProvedorJson(app)
+
 # ==================== LOGGING ESTRUTURADO ====================
 
 # Cria diretório de logs se não existir
@@ -80,6 +89,21 @@ CORS(app, resources={
 # JWT
 jwt = JWTManager(app)
 
+# Unidade de trabalho: uma conexão/transação por requisição
+conexao.registrar_unidade_de_trabalho(app)
+
+# Consultas, tempo de banco e comando mais lento por requisição (Server-Timing e log)
+conexao.registrar_medicao_sql(app)
+
+# Compressão br/gzip negociada; registrada depois da medição, roda antes dela
+# (o tempo de compressão entra no `total` do Server-Timing)
+compressao = registrar_compressao(app)
+
+# Imagens estáticas: variantes redimensionadas em AVIF/WebP/JPEG, geradas em
+# segundo plano se faltarem (ou antes, por `python cli.py imagens`)
+IMAGENS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+imagens = criar_imagens(config, IMAGENS_DIR)
+
 # Rate Limiting
 limiter = Limiter(
     app=app,
@@ -164,10 +188,10 @@ def index():
         'endpoints': {
             'auth': '/login, /register, /refresh',
             'users': '/usuarios, /perfil',
-            'mood': '/humor',
+            'mood': '/humor, /humor/relatorio',
             'meditations': '/meditacoes',
             'meditation_history': '/meditacoes/historico, /meditacoes/estatisticas',
-            'assessments': '/avaliacoes',
+            'assessments': '/avaliacoes, /avaliacoes/historico, /avaliacoes/ultimas',
             'stats': '/stats'
         }
     })
@@ -175,8 +199,18 @@ def index():
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check para monitoramento"""
-    return jsonify({'status': 'healthy'}), 200
+    """Health check para monitoramento (contadores do pool, da réplica e dos caches)"""
+    return jsonify({
+        'status': 'healthy',
+        'pool': conexao.estatisticas_pool(),
+        'replica': conexao.estatisticas_replica(),
+        'catalogo': controller_usuario.catalogo.estatisticas(),
+        'usuarios': controller_usuario.usuarios_cache.estatisticas(),
+        'cache_compartilhado': controller_usuario.cache_compartilhado.estatisticas(),
+        'stats': controller_usuario.estatisticas_sistema.estatisticas(),
+        'compressao': compressao.estatisticas() if compressao else None,
+        'imagens': imagens.estatisticas()
+    }), 200
 
 
 # ==================== AUTENTICAÇÃO ====================
@@ -263,14 +297,12 @@ def register():
             config=dados.get('config')
         )
 
-        controller_usuario.inserir_usuario(new_user)
-
-        # Busca usuário criado para pegar o ID
-        created_user = controller_usuario.buscar_usuario_por_email(dados['email'])
+        # O INSERT retorna o ID, dispensando uma nova busca pelo email
+        novo_id = controller_usuario.inserir_usuario(new_user)
 
         # Cria tokens
-        access_token = create_access_token(identity=str(created_user.id))
-        refresh_token = create_refresh_token(identity=str(created_user.id))
+        access_token = create_access_token(identity=str(novo_id))
+        refresh_token = create_refresh_token(identity=str(novo_id))
 
         app.logger.info(f"Novo usuário registrado: {dados['email']}")
 
@@ -279,9 +311,9 @@ def register():
             "access_token": access_token,
             "refresh_token": refresh_token,
             "usuario": {
-                "id": created_user.id,
-                "nome": created_user.nome,
-                "email": created_user.email
+                "id": novo_id,
+                "nome": new_user.nome,
+                "email": new_user.email
             }
         }), 201
 
@@ -320,23 +352,34 @@ def refresh():
 @jwt_required()
 def listar_usuarios():
     """
-    Lista todos os usuários (protegido)
-    Apenas usuários autenticados
+    Lista os usuários (protegido): [{id, nome, data_cadastro}]
+    Query params (qualquer um deles devolve uma página, {"itens": [...], "next_cursor": ...}):
+    - page_size: itens por página (padrão USUARIOS_PAGINA_PADRAO, máximo USUARIOS_PAGINA_MAX)
+    - cursor: next_cursor da página anterior
+    - nome: prefixo do nome, sem diferenciar maiúsculas (ordena por nome)
+    Sem nenhum deles, a lista inteira como antes.
     """
     try:
         current_user_id = get_jwt_identity()
         app.logger.info(f"Usuário {current_user_id} listando usuários")
 
-        usuarios = controller_usuario.listar_usuarios()
-        usuarios_json = [
-            {
-                'id': u.id,
-                'nome': u.nome,
-                'data_cadastro': u.data_cadastro.isoformat() if u.data_cadastro else None
-            } for u in usuarios
-        ] if usuarios else []
+        if not any(parametro in request.args for parametro in controller_usuario.PARAMETROS_USUARIOS):
+            usuarios = controller_usuario.listar_usuarios()
+            if usuarios is None:
+                return jsonify({"mensagem": "Erro ao listar usuários"}), 500
+            return jsonify(usuarios), 200
+
+        try:
+            tamanho, prefixo = controller_usuario.parametros_pagina_usuarios(
+                request.args.get('page_size'), request.args.get('nome'))
+            pagina = controller_usuario.listar_usuarios_pagina(
+                tamanho, request.args.get('cursor') or None, prefixo)
+        except ValueError as err:
+            return jsonify({"mensagem": str(err)}), 400
 
-        return jsonify(usuarios_json), 200
+        if pagina is None:
+            return jsonify({"mensagem": "Erro ao listar usuários"}), 500
+        return jsonify(pagina), 200
 
     except Exception as e:
         app.logger.error(f"Erro ao listar usuários: {str(e)}")
@@ -368,10 +411,10 @@ def buscar_usuario(id):
             'nome': usuario.nome or '',
             'email': usuario.email or '',
             'cpf': usuario.cpf or '',
-            'data_nascimento': usuario.data_nascimento.isoformat() if usuario.data_nascimento else None,
+            'data_nascimento': usuario.data_nascimento,
             'tipo_sanguineo': usuario.tipo_sanguineo or '',
             'alergias': usuario.alergias or '',
-            'data_cadastro': usuario.data_cadastro.isoformat() if usuario.data_cadastro else None,
+            'data_cadastro': usuario.data_cadastro,
             'foto_perfil': usuario.foto_perfil or None
         }), 200
 
@@ -472,8 +515,8 @@ def excluir_conta_completa(id):
 
         password = dados['password']
 
-        # Busca o usuário para validar a senha
-        usuario = controller_usuario.buscar_usuario_por_id(id)
+        # Busca o usuário para validar a senha (a foto não interessa aqui)
+        usuario = controller_usuario.buscar_usuario_por_id(id, com_foto=False)
         if not usuario:
             return jsonify({"mensagem": "Usuário não encontrado"}), 404
 
@@ -499,6 +542,49 @@ def excluir_conta_completa(id):
         return jsonify({"mensagem": f"Erro ao excluir conta: {str(e)}"}), 500
 
 
+@app.route('/usuarios/<int:id>/exportar', methods=['GET'])
+@jwt_required()
+@limiter.limit("3 per minute")  # Lê todas as tabelas do usuário
+def exportar_dados(id):
+    """
+    Exporta todos os dados do usuário (portabilidade, LGPD), em fluxo (protegido)
+
+    Query params opcionais:
+    - formato: ndjson (padrão) ou csv (um .zip com um CSV por tabela)
+
+    Usuário só pode exportar os próprios dados
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+
+        if current_user_id != id:
+            app.logger.warning(f"Usuário {current_user_id} tentou exportar dados do usuário {id}")
+            return jsonify({"mensagem": "Acesso negado"}), 403
+
+        formato = request.args.get('formato', 'ndjson')
+        try:
+            tipo, _ = exportacao.tipo_e_extensao(formato)
+        except ValueError as err:
+            return jsonify({"mensagem": str(err)}), 400
+
+        if not controller_usuario.buscar_usuario_por_id(id, com_foto=False):
+            return jsonify({"mensagem": "Usuário não encontrado"}), 404
+
+        app.logger.info(f"📦 Usuário {id} exportando os próprios dados ({formato})")
+        # O gerador roda depois da view, fora da unidade de trabalho da
+        # requisição: lê em conexão própria, lote a lote, enquanto envia
+        response = Response(exportacao.gerar(formato, controller_usuario.exportar_dados_usuario(id)),
+                            mimetype=tipo)
+        response.headers['Content-Disposition'] = \
+            f'attachment; filename="{exportacao.nome_arquivo(id, formato, date.today())}"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    except Exception as e:
+        app.logger.error(f"Erro ao exportar dados: {str(e)}")
+        return jsonify({"mensagem": "Erro ao exportar dados"}), 500
+
+
 # ==================== PERFIL ====================
 
 @app.route('/perfil', methods=['PUT'])
@@ -539,6 +625,43 @@ def atualizar_perfil():
         return jsonify({"mensagem": f"Erro ao atualizar perfil: {str(e)}"}), 500
 
 
+# ==================== GET CONDICIONAL POR USUÁRIO ====================
+
+def _etag_dados_usuario(usuario_id, dominio, *variantes, por_dia=False):
+    """
+    ETag de uma leitura do usuário montada só com a versão dos dados de `dominio`
+    (uma consulta por chave primária, sem rodar a leitura em si).
+    `por_dia` para respostas que dependem da data (janelas de "últimos 7 dias").
+    None se o usuário ainda não tem versão: a resposta sai sem ETag.
+    """
+    versao = controller_usuario.obter_versao_dados(usuario_id, dominio)
+    if versao is None:
+        return None
+    numero, hoje = versao
+    partes = [config.APP_VERSION, usuario_id, dominio, numero, *variantes]
+    if por_dia:
+        partes.append(hoje.isoformat())
+    return etag_forte(':'.join(str(parte) for parte in partes).encode())
+
+
+def _cache_privado(response, etag):
+    """Só o próprio usuário guarda a resposta, e sempre revalida."""
+    if etag:
+        response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Authorization')
+    return response
+
+
+def _nao_modificado(etag):
+    """304 se o If-None-Match do cliente já tem essa versão; None para seguir com a leitura."""
+    correspondente = etag_correspondente(request.if_none_match, etag) if etag else None
+    if correspondente:
+        return _cache_privado(app.response_class(status=304), correspondente)
+    return None
+
+
 # ==================== HUMOR ====================
 
 @app.route('/humor', methods=['POST'])
@@ -587,10 +710,59 @@ def relatorio_humor_semanal():
     try:
         current_user_id = int(get_jwt_identity())
 
+        etag = _etag_dados_usuario(current_user_id, 'humor', por_dia=True)
+        nao_modificado = _nao_modificado(etag)
+        if nao_modificado:
+            return nao_modificado
+
         dados_relatorio = controller_usuario.relatorio_humor_semanal(current_user_id)
 
         if dados_relatorio is not None:
-            return jsonify(dados_relatorio), 200
+            return _cache_privado(jsonify(dados_relatorio), etag), 200
+        else:
+            return jsonify({"mensagem": "Erro ao gerar relatório"}), 500
+
+    except Exception as e:
+        app.logger.error(f"Erro ao gerar relatório de humor: {str(e)}")
+        return jsonify({"mensagem": "Erro ao gerar relatório"}), 500
+
+
+@app.route('/humor/relatorio', methods=['GET'])
+@jwt_required()
+def relatorio_humor():
+    """
+    Relatório de humor do usuário autenticado num intervalo, lido do resumo diário
+
+    Query params:
+        de, ate: datas AAAA-MM-DD (inclusive); padrão: os últimos 30 dias até hoje
+        granularidade: 'dia' (padrão), 'semana' (ISO, começando na segunda) ou 'mes'
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+
+        hoje = None
+        if not request.args.get('ate'):
+            # "Hoje" do banco: o mesmo dia do resumo diário e da ETag (mesma transação da requisição)
+            hoje = controller_usuario.hoje_no_banco()
+            if hoje is None:
+                return jsonify({"mensagem": "Erro ao gerar relatório"}), 500
+        try:
+            de, ate, granularidade = controller_usuario.periodo_relatorio_humor(
+                request.args.get('de'), request.args.get('ate'), request.args.get('granularidade'), hoje)
+        except ValueError as err:
+            return jsonify({"mensagem": str(err)}), 400
+
+        # Sem `ate` explícito a janela anda com o dia
+        etag = _etag_dados_usuario(current_user_id, 'humor', de, ate, granularidade,
+                                   por_dia='ate' not in request.args)
+        nao_modificado = _nao_modificado(etag)
+        if nao_modificado:
+            return nao_modificado
+
+        dados_relatorio = controller_usuario.relatorio_humor(current_user_id, de, ate, granularidade)
+
+        if dados_relatorio is not None:
+            return _cache_privado(jsonify(dados_relatorio), etag), 200
         else:
             return jsonify({"mensagem": "Erro ao gerar relatório"}), 500
 
@@ -601,23 +773,30 @@ def relatorio_humor_semanal():
 
 # ==================== MEDITAÇÕES ====================
 
+def _resposta_json_com_etag(corpo, etag):
+    """Resposta com JSON já serializado e ETag forte; If-None-Match igual vira 304."""
+    correspondente = etag_correspondente(request.if_none_match, etag)
+    if correspondente:
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(corpo, mimetype='application/json')
+    response.set_etag(correspondente or etag)
+    response.cache_control.no_cache = True  # o cliente sempre revalida (e recebe 304 se nada mudou)
+    return response
+
+
 @app.route('/meditacoes', methods=['GET'])
 def listar_meditacoes():
     """
     Lista todas as meditações (público)
+    Servida do cache do catálogo, com ETag
     """
     try:
-        meditacoes = controller_usuario.listar_meditacoes()
-        meditacoes_json = [
-            {
-                'id': m.id,
-                'titulo': m.titulo,
-                'categoria': m.categoria,
-                'imagem_capa': m.imagem_capa
-            } for m in meditacoes
-        ] if meditacoes else []
-
-        return jsonify(meditacoes_json), 200
+        lista = controller_usuario.catalogo.lista()
+        if lista is None:
+            return jsonify([]), 200
+
+        return _resposta_json_com_etag(*lista)
 
     except Exception as e:
         app.logger.error(f"Erro ao listar meditações: {str(e)}")
@@ -628,23 +807,15 @@ def listar_meditacoes():
 def buscar_meditacao(id):
     """
     Busca detalhes de uma meditação específica (público)
+    Servida do cache do catálogo, com ETag
     """
     try:
-        meditacao = controller_usuario.buscar_meditacao_por_id(id)
+        detalhe = controller_usuario.catalogo.detalhe(id)
 
-        if not meditacao:
+        if not detalhe:
             return jsonify({"mensagem": "Meditação não encontrada"}), 404
 
-        return jsonify({
-            'id': meditacao.id,
-            'titulo': meditacao.titulo,
-            'descricao': meditacao.descricao,
-            'duracao_minutos': meditacao.duracao_minutos,
-            'url_audio': meditacao.url_audio,
-            'tipo': meditacao.tipo,
-            'categoria': meditacao.categoria,
-            'imagem_capa': meditacao.imagem_capa
-        }), 200
+        return _resposta_json_com_etag(*detalhe)
 
     except Exception as e:
         app.logger.error(f"Erro ao buscar meditação: {str(e)}")
@@ -670,7 +841,7 @@ def registrar_meditacao():
             return jsonify({"mensagem": "Você só pode registrar suas próprias meditações"}), 403
 
         # Verifica se a meditação existe
-        meditacao = controller_usuario.buscar_meditacao_por_id(dados['meditacao_id'])
+        meditacao = controller_usuario.catalogo.buscar(dados['meditacao_id'])
         if not meditacao:
             return jsonify({"mensagem": "Meditação não encontrada"}), 404
 
@@ -701,16 +872,26 @@ def listar_historico():
     """
     Lista o histórico de meditações do usuário autenticado
     Query params:
-    - limit: Número máximo de registros (opcional)
+    - limit: Número máximo de registros (opcional; sem paginação)
+    - page_size / cursor: página por cursor, {"itens": [...], "next_cursor": ...};
+      o next_cursor vai como ?cursor= na página seguinte (null na última)
+    - incluir_meditacao: false tira o objeto `meditacao` dos itens da página
     """
     try:
         current_user_id = int(get_jwt_identity())
+        if 'page_size' in request.args or 'cursor' in request.args:
+            return _pagina_historico(current_user_id)
         limit = request.args.get('limit', type=int)
 
+        etag = _etag_dados_usuario(current_user_id, 'historico', limit)
+        nao_modificado = _nao_modificado(etag)
+        if nao_modificado:
+            return nao_modificado
+
         historico = controller_usuario.listar_historico_meditacoes(current_user_id, limit)
 
         if historico is not None:
-            return jsonify(historico), 200
+            return _cache_privado(jsonify(historico), etag), 200
         else:
             return jsonify({"mensagem": "Erro ao buscar histórico"}), 500
 
@@ -719,6 +900,28 @@ def listar_historico():
         return jsonify({"mensagem": "Erro ao listar histórico"}), 500
 
 
+def _pagina_historico(usuario_id):
+    """Resposta de GET /meditacoes/historico com page_size/cursor."""
+    cursor = request.args.get('cursor') or None
+    try:
+        tamanho, incluir_meditacao = controller_usuario.parametros_pagina_historico(
+            request.args.get('page_size'), request.args.get('incluir_meditacao'))
+        if cursor:
+            controller_usuario.decodificar_cursor_historico(cursor)
+    except ValueError as err:
+        return jsonify({"mensagem": str(err)}), 400
+
+    etag = _etag_dados_usuario(usuario_id, 'historico', 'pagina', tamanho, cursor, incluir_meditacao)
+    nao_modificado = _nao_modificado(etag)
+    if nao_modificado:
+        return nao_modificado
+
+    pagina = controller_usuario.listar_historico_pagina(usuario_id, tamanho, cursor, incluir_meditacao)
+    if pagina is None:
+        return jsonify({"mensagem": "Erro ao buscar histórico"}), 500
+    return _cache_privado(jsonify(pagina), etag), 200
+
+
 @app.route('/meditacoes/estatisticas', methods=['GET'])
 @jwt_required()
 def estatisticas_meditacoes():
@@ -728,10 +931,15 @@ def estatisticas_meditacoes():
     try:
         current_user_id = int(get_jwt_identity())
 
+        etag = _etag_dados_usuario(current_user_id, 'historico', 'estatisticas', por_dia=True)
+        nao_modificado = _nao_modificado(etag)
+        if nao_modificado:
+            return nao_modificado
+
         estatisticas = controller_usuario.obter_estatisticas_meditacoes(current_user_id)
 
         if estatisticas is not None:
-            return jsonify(estatisticas), 200
+            return _cache_privado(jsonify(estatisticas), etag), 200
         else:
             return jsonify({"mensagem": "Erro ao buscar estatísticas"}), 500
 
@@ -804,14 +1012,27 @@ def salvar_avaliacao():
 def historico_avaliacoes():
     """
     Retorna histórico de avaliações do usuário autenticado
+    Query params (qualquer um deles devolve uma página, {"itens": [...], "next_cursor": ...}):
+    - tipo: só avaliações deste tipo
+    - de / ate: intervalo de datas AAAA-MM-DD (inclusivos)
+    - page_size / cursor: tamanho da página e next_cursor da página anterior
+    - incluir_respostas: true para trazer o JSONB `respostas` (fora por padrão)
+    Sem nenhum deles, a lista inteira como antes.
     """
     try:
         current_user_id = int(get_jwt_identity())
+        if any(parametro in request.args for parametro in controller_usuario.PARAMETROS_AVALIACOES):
+            return _pagina_avaliacoes(current_user_id)
+
+        etag = _etag_dados_usuario(current_user_id, 'avaliacoes')
+        nao_modificado = _nao_modificado(etag)
+        if nao_modificado:
+            return nao_modificado
 
         historico = controller_usuario.listar_avaliacoes_por_usuario(current_user_id)
 
         if historico is not None:
-            return jsonify(historico), 200
+            return _cache_privado(jsonify(historico), etag), 200
         else:
             return jsonify({"mensagem": "Erro ao buscar histórico"}), 500
 
@@ -820,18 +1041,81 @@ def historico_avaliacoes():
         return jsonify({"mensagem": "Erro ao buscar histórico"}), 500
 
 
+def _pagina_avaliacoes(usuario_id):
+    """Resposta de GET /avaliacoes/historico com filtros ou page_size/cursor."""
+    cursor = request.args.get('cursor') or None
+    try:
+        tamanho, tipo, de, ate, incluir_respostas = controller_usuario.parametros_avaliacoes(
+            request.args.get('page_size'), request.args.get('tipo'), request.args.get('de'),
+            request.args.get('ate'), request.args.get('incluir_respostas'), cursor)
+    except ValueError as err:
+        return jsonify({"mensagem": str(err)}), 400
+
+    etag = _etag_dados_usuario(usuario_id, 'avaliacoes', 'pagina', tamanho, cursor, tipo, de, ate, incluir_respostas)
+    nao_modificado = _nao_modificado(etag)
+    if nao_modificado:
+        return nao_modificado
+
+    pagina = controller_usuario.buscar_avaliacoes_usuario(usuario_id, tipo, de, ate, tamanho, cursor,
+                                                          incluir_respostas)
+    if pagina is None:
+        return jsonify({"mensagem": "Erro ao buscar histórico"}), 500
+    return _cache_privado(jsonify(pagina), etag), 200
+
+
+@app.route('/avaliacoes/ultimas', methods=['GET'])
+@jwt_required()
+def ultimas_avaliacoes():
+    """
+    Último resultado de cada tipo de avaliação do usuário autenticado
+    Query params:
+    - incluir_respostas: true para trazer o JSONB `respostas` (fora por padrão)
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        incluir_respostas = request.args.get('incluir_respostas', 'false').lower() not in \
+            controller_usuario.VALORES_FALSOS
+
+        etag = _etag_dados_usuario(current_user_id, 'avaliacoes', 'ultimas', incluir_respostas)
+        nao_modificado = _nao_modificado(etag)
+        if nao_modificado:
+            return nao_modificado
+
+        ultimas = controller_usuario.ultimas_avaliacoes_usuario(current_user_id, incluir_respostas)
+
+        if ultimas is not None:
+            return _cache_privado(jsonify(ultimas), etag), 200
+        else:
+            return jsonify({"mensagem": "Erro ao buscar avaliações"}), 500
+
+    except Exception as e:
+        app.logger.error(f"Erro ao buscar últimas avaliações: {str(e)}")
+        return jsonify({"mensagem": "Erro ao buscar avaliações"}), 500
+
+
 # ==================== ESTATÍSTICAS ====================
 
 @app.route('/stats', methods=['GET'])
 def obter_estatisticas():
     """
     Retorna estatísticas gerais do sistema (público)
+
+    Query params:
+        modo: 'exato' (contadores) ou 'estimado' (catálogo do PostgreSQL);
+              padrão STATS_MODO. Os dois vêm da memória do processo.
     """
     try:
-        stats = controller_usuario.get_database_stats()
+        modo = request.args.get('modo', config.STATS_MODO)
+        if modo not in controller_usuario.MODOS_ESTATISTICAS:
+            modos = ', '.join(controller_usuario.MODOS_ESTATISTICAS)
+            return jsonify({"mensagem": f"modo deve ser um de: {modos}"}), 400
+
+        stats = controller_usuario.get_database_stats(modo)
 
         if stats is not None:
-            return jsonify(stats), 200
+            response = jsonify(stats)
+            response.headers['Cache-Control'] = f"public, max-age={int(config.STATS_CACHE_TTL)}"
+            return response, 200
         else:
             return jsonify({"mensagem": "Erro ao buscar estatísticas"}), 500
 
@@ -845,11 +1129,24 @@ def obter_estatisticas():
 @app.route('/static/images/<path:filename>')
 def serve_static_image(filename):
     """
-    Serve arquivos de imagem estáticos
+    Serve arquivos de imagem estáticos: pelo nome original, a variante do
+    formato aceito (Accept) e da largura pedida (?w=); pelo nome com hash, a
+    própria variante, imutável. Sem variante, o arquivo original.
     """
     try:
-        static_dir = os.path.join(os.path.dirname(__file__), 'static', 'images')
-        return send_from_directory(static_dir, filename)
+        largura = largura_pedida(request.args.get('w'))
+    except ValueError:
+        return jsonify({"mensagem": "Parâmetro w inválido"}), 400
+
+    try:
+        resolvida = imagens.resolver(filename, request.headers.get('Accept'), largura)
+        if resolvida is None:
+            return send_from_directory(IMAGENS_DIR, filename)
+        caminho, cabecalhos = resolvida
+        # ETag, Last-Modified e 304 do send_file; o corpo sai por wsgi.file_wrapper (sendfile)
+        response = send_file(caminho, conditional=True, etag=True)
+        response.headers.update(cabecalhos)
+        return response
     except Exception as e:
         app.logger.error(f"Erro ao servir imagem {filename}: {str(e)}")
         return jsonify({"mensagem": "Imagem não encontrada"}), 404
@@ -0,0 +1,1020 @@
+"""
+API Calmou - Backend ASGI
+Mesmas rotas, JWT e formatos de resposta do app.py, sobre asyncpg.
+
+O app Flask (WSGI) continua sendo o padrão; este roda lado a lado quando o
+número de clientes simultâneos por processo é o gargalo:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5002 --workers 4
+"""
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+
+from marshmallow import ValidationError
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+from werkzeug.http import parse_etags
+
+import conexao_async
+import exportacao
+from cache import etag_forte
+from config import get_config
+from imagens import criar_imagens, largura_pedida
+from controller import controller_usuario_async as controller
+from middleware.auth_asgi import (
+    create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+)
+from middleware.compressao import etag_codificada, etag_correspondente
+from model.usuario import Usuario
+from serializacao import para_json
+from model.classificacao_humor import ClassificacaoHumor
+from model.resultado_avaliacao import ResultadoAvaliacao
+from model.historico_meditacao import HistoricoMeditacao
+from schemas import (
+    LoginSchema, UsuarioCreateSchema, UsuarioUpdateSchema,
+    ClassificacaoHumorSchema, ResultadoAvaliacaoSchema, HistoricoMeditacaoSchema
+)
+
+config = get_config()
+logger = logging.getLogger('calmou.asgi')
+
+
+class RespostaJson(JSONResponse):
+    """JSONResponse serializada pelo mesmo orjson do app Flask (serializacao.py)."""
+
+    def render(self, content):
+        return para_json(content)
+
+
+def jsonify(dados, status=200):
+    return RespostaJson(dados, status_code=status)
+
+
+def _etag_pedida(request, etag):
+    """A forma de `etag` no If-None-Match (como `request.if_none_match` no app Flask); None se nenhuma."""
+    return etag_correspondente(parse_etags(request.headers.get('if-none-match')), etag)
+
+
+async def _json(request):
+    """Corpo JSON da requisição, ou None se ausente/inválido (como request.get_json(silent=True))."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+# ==================== RATE LIMITING ====================
+
+_PERIODOS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+_janelas = {}  # (rota, período, ip) -> [início da janela, contagem]
+_proxima_limpeza = 0.0
+
+
+def _ler_limites(texto):
+    """'5 per minute', '100/hour' ou vários separados por ';' -> [(vezes, segundos)], como no Flask-Limiter."""
+    limites = []
+    for parte in re.split(r'[;,]', texto):
+        achado = re.fullmatch(r'\s*(\d+)\s*(?:per|/)\s*(\d+)?\s*(second|minute|hour|day)s?\s*', parte, re.I)
+        if not achado:
+            raise ValueError(f"limite inválido: {parte!r}")
+        limites.append((int(achado[1]), int(achado[2] or 1) * _PERIODOS[achado[3].lower()]))
+    return limites
+
+
+def _limpar_janelas(agora):
+    """Tira as janelas vencidas (no máximo uma vez por minuto); sem isso, cada IP novo ficaria para sempre."""
+    global _proxima_limpeza
+    if agora < _proxima_limpeza:
+        return
+    _proxima_limpeza = agora + 60
+    for chave in [chave for chave, (inicio, _) in _janelas.items() if agora - inicio >= chave[1]]:
+        del _janelas[chave]
+
+
+def limit(limites):
+    """
+    Limite por IP em janela fixa, por processo, no formato do @limiter.limit
+    do app Flask ("5 per minute"). Rotas sem ele recebem RATELIMIT_DEFAULT.
+    """
+    limites = _ler_limites(limites)
+
+    def decorator(fn):
+        async def wrapper(request):
+            if config.RATELIMIT_ENABLED:
+                ip = request.client.host if request.client else '-'
+                agora = time.monotonic()
+                _limpar_janelas(agora)
+                for vezes, periodo in limites:
+                    janela = _janelas.setdefault((fn.__name__, periodo, ip), [agora, 0])
+                    if agora - janela[0] >= periodo:
+                        janela[0], janela[1] = agora, 0
+                    janela[1] += 1
+                    if janela[1] > vezes:
+                        logger.warning(f"Rate limit atingido: {ip}")
+                        return jsonify({'mensagem': 'Muitas requisições. Tente novamente mais tarde.'}, 429)
+            return await fn(request)
+        wrapper.__name__ = fn.__name__
+        wrapper.limitado = True
+        return wrapper
+    return decorator
+
+
+def _rota(caminho, endpoint, methods):
+    """Route com RATELIMIT_DEFAULT se a rota não tem @limit, como o default_limits do app Flask."""
+    if not getattr(endpoint, 'limitado', False):
+        endpoint = limit(config.RATELIMIT_DEFAULT)(endpoint)
+    return Route(caminho, endpoint, methods=methods)
+
+
+# ==================== ROTAS PÚBLICAS ====================
+
+async def index(request):
+    """Rota raiz - Informações da API"""
+    return jsonify({
+        'app': config.APP_NAME,
+        'version': config.APP_VERSION,
+        'status': 'online',
+        'endpoints': {
+            'auth': '/login, /register, /refresh',
+            'users': '/usuarios, /perfil',
+            'mood': '/humor, /humor/relatorio',
+            'meditations': '/meditacoes',
+            'meditation_history': '/meditacoes/historico, /meditacoes/estatisticas',
+            'assessments': '/avaliacoes, /avaliacoes/historico, /avaliacoes/ultimas',
+            'stats': '/stats'
+        }
+    })
+
+
+async def health_check(request):
+    """Health check para monitoramento (inclui o pool assíncrono)"""
+    return jsonify({
+        'status': 'healthy',
+        'pool': conexao_async.estatisticas_pool(),
+        'catalogo': controller.catalogo.estatisticas(),
+        'stats': controller.estatisticas_sistema.estatisticas()
+    })
+
+
+# ==================== AUTENTICAÇÃO ====================
+
+@limit("5 per minute")
+async def login(request):
+    """Valida credenciais e retorna access_token e refresh_token"""
+    try:
+        dados = LoginSchema().load(await _json(request))
+
+        email = dados['email']
+        user_found = await controller.buscar_usuario_por_email(email)
+
+        if not user_found:
+            logger.warning(f"Tentativa de login com email inexistente: {email}")
+            return jsonify({"mensagem": "Credenciais inválidas"}, 401)
+
+        if not await controller.verificar_senha(dados['password'], user_found.password_hash):
+            logger.warning(f"Tentativa de login com senha incorreta: {email}")
+            return jsonify({"mensagem": "Credenciais inválidas"}, 401)
+
+        logger.info(f"Login bem-sucedido: {email}")
+
+        return jsonify({
+            "mensagem": "Login bem-sucedido!",
+            "access_token": create_access_token(str(user_found.id)),
+            "refresh_token": create_refresh_token(str(user_found.id)),
+            "usuario": {
+                "id": user_found.id,
+                "nome": user_found.nome,
+                "email": user_found.email
+            }
+        })
+
+    except ValidationError as err:
+        return jsonify({'mensagem': 'Erro de validação', 'erros': err.messages}, 400)
+    except Exception as e:
+        logger.error(f"Erro no login: {str(e)}")
+        return jsonify({"mensagem": "Erro ao realizar login"}, 500)
+
+
+@limit("3 per minute")
+async def register(request):
+    """Cria conta e retorna tokens JWT"""
+    try:
+        dados = UsuarioCreateSchema().load(await _json(request))
+
+        if await controller.buscar_usuario_por_email(dados['email']):
+            return jsonify({"mensagem": "Email já cadastrado"}, 409)
+
+        new_user = Usuario(
+            id=None,
+            nome=dados['nome'],
+            email=dados['email'],
+            password=dados['password'],
+            config=dados.get('config')
+        )
+        novo_id = await controller.inserir_usuario(new_user)
+
+        logger.info(f"Novo usuário registrado: {dados['email']}")
+
+        return jsonify({
+            "mensagem": "Usuário criado com sucesso!",
+            "access_token": create_access_token(str(novo_id)),
+            "refresh_token": create_refresh_token(str(novo_id)),
+            "usuario": {
+                "id": novo_id,
+                "nome": new_user.nome,
+                "email": new_user.email
+            }
+        }, 201)
+
+    except ValidationError as err:
+        return jsonify({'mensagem': 'Erro de validação', 'erros': err.messages}, 400)
+    except Exception as e:
+        logger.error(f"Erro ao criar usuário: {str(e)}")
+        return jsonify({"mensagem": f"Erro ao criar usuário: {str(e)}"}, 500)
+
+
+@jwt_required(refresh=True)
+async def refresh(request):
+    """Renova o access token usando o refresh token"""
+    try:
+        return jsonify({'access_token': create_access_token(get_jwt_identity(request))})
+    except Exception as e:
+        logger.error(f"Erro ao renovar token: {str(e)}")
+        return jsonify({'mensagem': 'Erro ao renovar token'}, 500)
+
+
+# ==================== USUÁRIOS (PROTEGIDO) ====================
+
+@jwt_required()
+async def listar_usuarios(request):
+    """Lista os usuários (protegido); com page_size, cursor ou nome, uma página por vez"""
+    try:
+        logger.info(f"Usuário {get_jwt_identity(request)} listando usuários")
+
+        if not any(parametro in request.query_params for parametro in controller.PARAMETROS_USUARIOS):
+            usuarios = await controller.listar_usuarios()
+            if usuarios is None:
+                return jsonify({"mensagem": "Erro ao listar usuários"}, 500)
+            return jsonify(usuarios)
+
+        try:
+            tamanho, prefixo = controller.parametros_pagina_usuarios(
+                request.query_params.get('page_size'), request.query_params.get('nome'))
+            pagina = await controller.listar_usuarios_pagina(
+                tamanho, request.query_params.get('cursor') or None, prefixo)
+        except ValueError as err:
+            return jsonify({"mensagem": str(err)}, 400)
+
+        if pagina is None:
+            return jsonify({"mensagem": "Erro ao listar usuários"}, 500)
+        return jsonify(pagina)
+
+    except Exception as e:
+        logger.error(f"Erro ao listar usuários: {str(e)}")
+        return jsonify({"mensagem": "Erro ao listar usuários"}, 500)
+
+
+@jwt_required()
+async def buscar_usuario(request):
+    """Busca usuário por ID (apenas o próprio)"""
+    try:
+        id = request.path_params['id']
+        current_user_id = int(get_jwt_identity(request))
+
+        if current_user_id != id:
+            logger.warning(f"Usuário {current_user_id} tentou acessar dados do usuário {id}")
+            return jsonify({"mensagem": "Acesso negado"}, 403)
+
+        usuario = await controller.buscar_usuario_por_id(id)
+        if not usuario:
+            return jsonify({"mensagem": "Usuário não encontrado"}, 404)
+
+        return jsonify({
+            'id': usuario.id,
+            'nome': usuario.nome or '',
+            'email': usuario.email or '',
+            'cpf': usuario.cpf or '',
+            'data_nascimento': usuario.data_nascimento.isoformat() if usuario.data_nascimento else None,
+            'tipo_sanguineo': usuario.tipo_sanguineo or '',
+            'alergias': usuario.alergias or '',
+            'data_cadastro': usuario.data_cadastro.isoformat() if usuario.data_cadastro else None,
+            'foto_perfil': usuario.foto_perfil or None
+        })
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar usuário: {str(e)}")
+        return jsonify({"mensagem": "Erro ao buscar usuário"}, 500)
+
+
+@jwt_required()
+async def atualizar_usuario(request):
+    """Atualiza usuário (apenas o próprio)"""
+    try:
+        id = request.path_params['id']
+        if int(get_jwt_identity(request)) != id:
+            return jsonify({"mensagem": "Acesso negado"}, 403)
+
+        dados = UsuarioUpdateSchema().load(await _json(request))
+
+        await controller.atualizar_usuario(Usuario(
+            id=id,
+            nome=dados.get('nome'),
+            email=dados.get('email'),
+            password=dados.get('password'),
+            config=dados.get('config')
+        ))
+        logger.info(f"Usuário {id} atualizado")
+
+        return jsonify({"mensagem": "Usuário atualizado com sucesso!"})
+
+    except ValidationError as err:
+        return jsonify({'mensagem': 'Erro de validação', 'erros': err.messages}, 400)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar usuário: {str(e)}")
+        return jsonify({"mensagem": "Erro ao atualizar usuário"}, 500)
+
+
+@jwt_required()
+async def deletar_usuario(request):
+    """Remove usuário (apenas a própria conta)"""
+    try:
+        id = request.path_params['id']
+        if int(get_jwt_identity(request)) != id:
+            return jsonify({"mensagem": "Acesso negado"}, 403)
+
+        await controller.remover_usuario(id)
+        logger.info(f"Usuário {id} removido")
+
+        return jsonify({"mensagem": "Usuário removido com sucesso!"})
+
+    except Exception as e:
+        logger.error(f"Erro ao remover usuário: {str(e)}")
+        return jsonify({"mensagem": "Erro ao remover usuário"}, 500)
+
+
+@jwt_required()
+@limit("3 per minute")
+async def excluir_conta_completa(request):
+    """Exclui a conta e todos os dados do usuário (irreversível, exige a senha)"""
+    try:
+        id = request.path_params['id']
+        current_user_id = int(get_jwt_identity(request))
+
+        if current_user_id != id:
+            logger.warning(f"Usuário {current_user_id} tentou excluir conta do usuário {id}")
+            return jsonify({"mensagem": "Acesso negado. Você só pode excluir sua própria conta"}, 403)
+
+        dados = await _json(request)
+        if not dados or 'password' not in dados:
+            return jsonify({"mensagem": "Senha é obrigatória para confirmar a exclusão da conta"}, 400)
+
+        usuario = await controller.buscar_usuario_por_id(id)
+        if not usuario:
+            return jsonify({"mensagem": "Usuário não encontrado"}, 404)
+
+        if not await controller.verificar_senha(dados['password'], usuario.password_hash):
+            logger.warning(f"Tentativa de exclusão de conta com senha incorreta: usuário {id}")
+            return jsonify({"mensagem": "Senha incorreta. Exclusão cancelada"}, 401)
+
+        resultado = await controller.excluir_conta_completa(id)
+        logger.info(f"🗑️  Conta do usuário {id} ({resultado['email']}) excluída completamente")
+
+        return jsonify({
+            "mensagem": "Conta excluída com sucesso. Todos os seus dados foram removidos permanentemente.",
+            "email": resultado['email'],
+            "dados_removidos": resultado['registros_removidos']
+        })
+
+    except Exception as e:
+        logger.error(f"Erro ao excluir conta completa: {str(e)}")
+        return jsonify({"mensagem": f"Erro ao excluir conta: {str(e)}"}, 500)
+
+
+@jwt_required()
+@limit("3 per minute")
+async def exportar_dados(request):
+    """Exporta todos os dados do usuário (NDJSON ou CSV em zip), em fluxo"""
+    try:
+        id = request.path_params['id']
+        current_user_id = int(get_jwt_identity(request))
+
+        if current_user_id != id:
+            logger.warning(f"Usuário {current_user_id} tentou exportar dados do usuário {id}")
+            return jsonify({"mensagem": "Acesso negado"}, 403)
+
+        formato = request.query_params.get('formato', 'ndjson')
+        try:
+            tipo, _ = exportacao.tipo_e_extensao(formato)
+        except ValueError as err:
+            return jsonify({"mensagem": str(err)}, 400)
+
+        if not await controller.buscar_usuario_por_id(id):
+            return jsonify({"mensagem": "Usuário não encontrado"}, 404)
+
+        logger.info(f"📦 Usuário {id} exportando os próprios dados ({formato})")
+        return StreamingResponse(
+            exportacao.gerar_async(formato, controller.exportar_dados_usuario(id)),
+            media_type=tipo,
+            headers={
+                'Content-Disposition': f'attachment; filename="{exportacao.nome_arquivo(id, formato, date.today())}"',
+                'Cache-Control': 'no-store',
+            },
+        )
+
+    except Exception as e:
+        logger.error(f"Erro ao exportar dados: {str(e)}")
+        return jsonify({"mensagem": "Erro ao exportar dados"}, 500)
+
+
+# ==================== PERFIL ====================
+
+@jwt_required()
+async def atualizar_perfil(request):
+    """Atualiza perfil do usuário autenticado"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+        dados = await _json(request)
+
+        if not dados:
+            return jsonify({"mensagem": "Payload JSON inválido"}, 400)
+
+        resultado = await controller.atualizar_perfil(Usuario(
+            id=current_user_id,
+            nome=dados.get('nome'),
+            cpf=dados.get('cpf'),
+            data_nascimento=dados.get('data_nascimento'),
+            tipo_sanguineo=dados.get('tipo_sanguineo'),
+            alergias=dados.get('alergias'),
+            foto_perfil=dados.get('foto_perfil'),
+            email=None,
+            password_hash=None
+        ))
+
+        if resultado:
+            logger.info(f"Perfil do usuário {current_user_id} atualizado")
+            return jsonify({"mensagem": "Perfil atualizado com sucesso!"})
+        return jsonify({"mensagem": "Erro ao atualizar perfil"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao atualizar perfil: {str(e)}")
+        return jsonify({"mensagem": f"Erro ao atualizar perfil: {str(e)}"}, 500)
+
+
+# ==================== GET CONDICIONAL POR USUÁRIO ====================
+
+async def _etag_dados_usuario(usuario_id, dominio, *variantes, por_dia=False):
+    """
+    ETag de uma leitura do usuário montada só com a versão dos dados de `dominio`,
+    a mesma do app Flask; None se o usuário ainda não tem versão.
+    """
+    versao = await controller.obter_versao_dados(usuario_id, dominio)
+    if versao is None:
+        return None
+    numero, hoje = versao
+    partes = [config.APP_VERSION, usuario_id, dominio, numero, *variantes]
+    if por_dia:
+        partes.append(hoje.isoformat())
+    return etag_forte(':'.join(str(parte) for parte in partes).encode())
+
+
+def _cache_privado(response, etag):
+    """Só o próprio usuário guarda a resposta, e sempre revalida."""
+    if etag:
+        response.headers['ETag'] = f'"{etag}"'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers.add_vary_header('Authorization')
+    return response
+
+
+def _nao_modificado(request, etag):
+    """304 se o If-None-Match do cliente já tem essa versão; None para seguir com a leitura."""
+    correspondente = _etag_pedida(request, etag) if etag else None
+    if correspondente:
+        return _cache_privado(Response(status_code=304), correspondente)
+    return None
+
+
+# ==================== HUMOR ====================
+
+@jwt_required()
+async def registrar_humor(request):
+    """Registra classificação de humor do usuário autenticado"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+        dados = ClassificacaoHumorSchema().load(await _json(request))
+
+        if dados['usuario_id'] != current_user_id:
+            return jsonify({"mensagem": "Você só pode registrar seu próprio humor"}, 403)
+
+        await controller.inserir_classificacao_humor(ClassificacaoHumor(
+            id=None,
+            usuario_id=current_user_id,
+            nivel_humor=dados['nivel_humor'],
+            sentimento_principal=dados.get('sentimento_principal'),
+            notas=dados.get('notas'),
+            data_classificacao=None
+        ))
+        logger.info(f"Humor registrado para usuário {current_user_id}")
+
+        return jsonify({"mensagem": "Registro de humor salvo com sucesso!"}, 201)
+
+    except ValidationError as err:
+        return jsonify({'mensagem': 'Erro de validação', 'erros': err.messages}, 400)
+    except Exception as e:
+        logger.error(f"Erro ao salvar humor: {str(e)}")
+        return jsonify({"mensagem": "Erro ao salvar humor"}, 500)
+
+
+@jwt_required()
+async def relatorio_humor_semanal(request):
+    """Relatório semanal de humor do usuário autenticado"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+
+        etag = await _etag_dados_usuario(current_user_id, 'humor', por_dia=True)
+        nao_modificado = _nao_modificado(request, etag)
+        if nao_modificado:
+            return nao_modificado
+
+        dados_relatorio = await controller.relatorio_humor_semanal(current_user_id)
+
+        if dados_relatorio is not None:
+            return _cache_privado(jsonify(dados_relatorio), etag)
+        return jsonify({"mensagem": "Erro ao gerar relatório"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao gerar relatório de humor: {str(e)}")
+        return jsonify({"mensagem": "Erro ao gerar relatório"}, 500)
+
+
+@jwt_required()
+async def relatorio_humor(request):
+    """Relatório de humor do usuário autenticado num intervalo (?de=&ate=&granularidade=)"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+
+        hoje = None
+        if not request.query_params.get('ate'):
+            # "Hoje" do banco: o mesmo dia do resumo diário
+            hoje = await controller.hoje_no_banco()
+            if hoje is None:
+                return jsonify({"mensagem": "Erro ao gerar relatório"}, 500)
+        try:
+            de, ate, granularidade = controller.periodo_relatorio_humor(
+                request.query_params.get('de'), request.query_params.get('ate'),
+                request.query_params.get('granularidade'), hoje)
+        except ValueError as err:
+            return jsonify({"mensagem": str(err)}, 400)
+
+        # Sem `ate` explícito a janela anda com o dia
+        etag = await _etag_dados_usuario(current_user_id, 'humor', de, ate, granularidade,
+                                         por_dia='ate' not in request.query_params)
+        nao_modificado = _nao_modificado(request, etag)
+        if nao_modificado:
+            return nao_modificado
+
+        dados_relatorio = await controller.relatorio_humor(current_user_id, de, ate, granularidade)
+
+        if dados_relatorio is not None:
+            return _cache_privado(jsonify(dados_relatorio), etag)
+        return jsonify({"mensagem": "Erro ao gerar relatório"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao gerar relatório de humor: {str(e)}")
+        return jsonify({"mensagem": "Erro ao gerar relatório"}, 500)
+
+
+# ==================== MEDITAÇÕES ====================
+
+def _resposta_json_com_etag(request, corpo, etag):
+    """Resposta com JSON já serializado e ETag forte; If-None-Match igual vira 304."""
+    correspondente = _etag_pedida(request, etag)
+    if correspondente:
+        response = Response(status_code=304)
+    else:
+        response = Response(corpo, media_type='application/json')
+    response.headers['ETag'] = f'"{correspondente or etag}"'
+    response.headers['Cache-Control'] = 'no-cache'  # o cliente sempre revalida (e recebe 304 se nada mudou)
+    return response
+
+
+async def listar_meditacoes(request):
+    """Lista todas as meditações (público), do cache do catálogo, com ETag"""
+    try:
+        lista = await controller.catalogo.lista_async()
+        if lista is None:
+            return jsonify([])
+
+        return _resposta_json_com_etag(request, *lista)
+
+    except Exception as e:
+        logger.error(f"Erro ao listar meditações: {str(e)}")
+        return jsonify({"mensagem": "Erro ao listar meditações"}, 500)
+
+
+async def buscar_meditacao(request):
+    """Detalhes de uma meditação específica (público), do cache do catálogo, com ETag"""
+    try:
+        detalhe = await controller.catalogo.detalhe_async(request.path_params['id'])
+
+        if not detalhe:
+            return jsonify({"mensagem": "Meditação não encontrada"}, 404)
+
+        return _resposta_json_com_etag(request, *detalhe)
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar meditação: {str(e)}")
+        return jsonify({"mensagem": "Erro ao buscar meditação"}, 500)
+
+
+# ==================== HISTÓRICO DE MEDITAÇÕES ====================
+
+@jwt_required()
+async def registrar_meditacao(request):
+    """Registra uma meditação concluída pelo usuário autenticado"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+        dados = HistoricoMeditacaoSchema().load(await _json(request))
+
+        if dados['usuario_id'] != current_user_id:
+            return jsonify({"mensagem": "Você só pode registrar suas próprias meditações"}, 403)
+
+        if not await controller.catalogo.buscar_async(dados['meditacao_id']):
+            return jsonify({"mensagem": "Meditação não encontrada"}, 404)
+
+        resultado = await controller.registrar_meditacao_concluida(HistoricoMeditacao(
+            usuario_id=current_user_id,
+            meditacao_id=dados['meditacao_id'],
+            duracao_real_minutos=dados['duracao_real_minutos']
+        ))
+        logger.info(f"Meditação registrada no histórico para usuário {current_user_id}")
+
+        return jsonify({
+            "mensagem": "Meditação registrada com sucesso!",
+            "historico": resultado
+        }, 201)
+
+    except ValidationError as err:
+        return jsonify({'mensagem': 'Erro de validação', 'erros': err.messages}, 400)
+    except Exception as e:
+        logger.error(f"Erro ao registrar meditação: {str(e)}")
+        return jsonify({"mensagem": "Erro ao registrar meditação"}, 500)
+
+
+@jwt_required()
+async def listar_historico(request):
+    """Histórico de meditações do usuário autenticado (?limit= opcional, ou ?page_size=/?cursor=)"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+        if 'page_size' in request.query_params or 'cursor' in request.query_params:
+            return await _pagina_historico(request, current_user_id)
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = None  # mesmo comportamento de request.args.get('limit', type=int)
+
+        etag = await _etag_dados_usuario(current_user_id, 'historico', limit)
+        nao_modificado = _nao_modificado(request, etag)
+        if nao_modificado:
+            return nao_modificado
+
+        historico = await controller.listar_historico_meditacoes(current_user_id, limit)
+
+        if historico is not None:
+            return _cache_privado(jsonify(historico), etag)
+        return jsonify({"mensagem": "Erro ao buscar histórico"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao listar histórico: {str(e)}")
+        return jsonify({"mensagem": "Erro ao listar histórico"}, 500)
+
+
+async def _pagina_historico(request, usuario_id):
+    """Resposta de GET /meditacoes/historico com page_size/cursor."""
+    cursor = request.query_params.get('cursor') or None
+    try:
+        tamanho, incluir_meditacao = controller.parametros_pagina_historico(
+            request.query_params.get('page_size'), request.query_params.get('incluir_meditacao'))
+        if cursor:
+            controller.decodificar_cursor_historico(cursor)
+    except ValueError as err:
+        return jsonify({"mensagem": str(err)}, 400)
+
+    etag = await _etag_dados_usuario(usuario_id, 'historico', 'pagina', tamanho, cursor, incluir_meditacao)
+    nao_modificado = _nao_modificado(request, etag)
+    if nao_modificado:
+        return nao_modificado
+
+    pagina = await controller.listar_historico_pagina(usuario_id, tamanho, cursor, incluir_meditacao)
+    if pagina is None:
+        return jsonify({"mensagem": "Erro ao buscar histórico"}, 500)
+    return _cache_privado(jsonify(pagina), etag)
+
+
+@jwt_required()
+async def estatisticas_meditacoes(request):
+    """Estatísticas de meditações do usuário autenticado"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+
+        etag = await _etag_dados_usuario(current_user_id, 'historico', 'estatisticas', por_dia=True)
+        nao_modificado = _nao_modificado(request, etag)
+        if nao_modificado:
+            return nao_modificado
+
+        estatisticas = await controller.obter_estatisticas_meditacoes(current_user_id)
+
+        if estatisticas is not None:
+            return _cache_privado(jsonify(estatisticas), etag)
+        return jsonify({"mensagem": "Erro ao buscar estatísticas"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar estatísticas: {str(e)}")
+        return jsonify({"mensagem": "Erro ao buscar estatísticas"}, 500)
+
+
+@jwt_required()
+async def remover_historico(request):
+    """Remove um registro do histórico (apenas do próprio usuário)"""
+    try:
+        historico_id = request.path_params['historico_id']
+        current_user_id = int(get_jwt_identity(request))
+
+        await controller.remover_historico_meditacao(historico_id, current_user_id)
+        logger.info(f"Histórico {historico_id} removido pelo usuário {current_user_id}")
+
+        return jsonify({"mensagem": "Registro removido com sucesso!"})
+
+    except Exception as e:
+        logger.error(f"Erro ao remover histórico: {str(e)}")
+        return jsonify({"mensagem": str(e)}, 500)
+
+
+# ==================== AVALIAÇÕES ====================
+
+@jwt_required()
+async def salvar_avaliacao(request):
+    """Salva resultado de avaliação do usuário autenticado"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+        dados = ResultadoAvaliacaoSchema().load(await _json(request))
+
+        if dados['usuario_id'] != current_user_id:
+            return jsonify({"mensagem": "Você só pode salvar suas próprias avaliações"}, 403)
+
+        await controller.inserir_resultado_avaliacao(ResultadoAvaliacao(
+            id=None,
+            usuario_id=current_user_id,
+            tipo=dados['tipo'],
+            respostas=dados['respostas'],
+            resultado_score=dados['resultado_score'],
+            resultado_texto=dados.get('resultado_texto')
+        ))
+        logger.info(f"Avaliação salva para usuário {current_user_id}")
+
+        return jsonify({"mensagem": "Avaliação salva com sucesso!"}, 201)
+
+    except ValidationError as err:
+        return jsonify({'mensagem': 'Erro de validação', 'erros': err.messages}, 400)
+    except Exception as e:
+        logger.error(f"Erro ao salvar avaliação: {str(e)}")
+        return jsonify({"mensagem": "Erro ao salvar avaliação"}, 500)
+
+
+@jwt_required()
+async def historico_avaliacoes(request):
+    """Histórico de avaliações do usuário autenticado (lista inteira, ou uma página com filtros)"""
+    try:
+        current_user_id = int(get_jwt_identity(request))
+        if any(parametro in request.query_params for parametro in controller.PARAMETROS_AVALIACOES):
+            return await _pagina_avaliacoes(request, current_user_id)
+
+        etag = await _etag_dados_usuario(current_user_id, 'avaliacoes')
+        nao_modificado = _nao_modificado(request, etag)
+        if nao_modificado:
+            return nao_modificado
+
+        historico = await controller.listar_avaliacoes_por_usuario(current_user_id)
+
+        if historico is not None:
+            return _cache_privado(jsonify(historico), etag)
+        return jsonify({"mensagem": "Erro ao buscar histórico"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar histórico de avaliações: {str(e)}")
+        return jsonify({"mensagem": "Erro ao buscar histórico"}, 500)
+
+
+async def _pagina_avaliacoes(request, usuario_id):
+    """Resposta de GET /avaliacoes/historico com filtros ou page_size/cursor."""
+    parametros = request.query_params
+    cursor = parametros.get('cursor') or None
+    try:
+        tamanho, tipo, de, ate, incluir_respostas = controller.parametros_avaliacoes(
+            parametros.get('page_size'), parametros.get('tipo'), parametros.get('de'),
+            parametros.get('ate'), parametros.get('incluir_respostas'), cursor)
+    except ValueError as err:
+        return jsonify({"mensagem": str(err)}, 400)
+
+    etag = await _etag_dados_usuario(usuario_id, 'avaliacoes', 'pagina', tamanho, cursor, tipo, de, ate,
+                                     incluir_respostas)
+    nao_modificado = _nao_modificado(request, etag)
+    if nao_modificado:
+        return nao_modificado
+
+    pagina = await controller.buscar_avaliacoes_usuario(usuario_id, tipo, de, ate, tamanho, cursor,
+                                                        incluir_respostas)
+    if pagina is None:
+        return jsonify({"mensagem": "Erro ao buscar histórico"}, 500)
+    return _cache_privado(jsonify(pagina), etag)
+
+
+@jwt_required()
+async def ultimas_avaliacoes(request):
+    """Último resultado de cada tipo de avaliação do usuário autenticado"""
+    try:
+        incluir_respostas = request.query_params.get('incluir_respostas', 'false').lower() not in \
+            controller.VALORES_FALSOS
+        current_user_id = int(get_jwt_identity(request))
+
+        etag = await _etag_dados_usuario(current_user_id, 'avaliacoes', 'ultimas', incluir_respostas)
+        nao_modificado = _nao_modificado(request, etag)
+        if nao_modificado:
+            return nao_modificado
+
+        ultimas = await controller.ultimas_avaliacoes_usuario(current_user_id, incluir_respostas)
+
+        if ultimas is not None:
+            return _cache_privado(jsonify(ultimas), etag)
+        return jsonify({"mensagem": "Erro ao buscar avaliações"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar últimas avaliações: {str(e)}")
+        return jsonify({"mensagem": "Erro ao buscar avaliações"}, 500)
+
+
+# ==================== ESTATÍSTICAS ====================
+
+async def obter_estatisticas(request):
+    """Estatísticas gerais do sistema (público)"""
+    try:
+        modo = request.query_params.get('modo', config.STATS_MODO)
+        if modo not in controller.MODOS_ESTATISTICAS:
+            modos = ', '.join(controller.MODOS_ESTATISTICAS)
+            return jsonify({"mensagem": f"modo deve ser um de: {modos}"}, 400)
+
+        stats = await controller.get_database_stats(modo)
+
+        if stats is not None:
+            response = jsonify(stats)
+            response.headers['Cache-Control'] = f"public, max-age={int(config.STATS_CACHE_TTL)}"
+            return response
+        return jsonify({"mensagem": "Erro ao buscar estatísticas"}, 500)
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar estatísticas: {str(e)}")
+        return jsonify({"mensagem": "Erro ao buscar estatísticas"}, 500)
+
+
+# ==================== ARQUIVOS ESTÁTICOS ====================
+
+IMAGENS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+imagens = criar_imagens(config, IMAGENS_DIR)
+
+
+class ImagensEstaticasAsgi(StaticFiles):
+    """StaticFiles de static/images com as variantes de imagens.py, como a rota do app Flask."""
+
+    async def get_response(self, path, scope):
+        request = Request(scope)
+        try:
+            largura = largura_pedida(request.query_params.get('w'))
+        except ValueError:
+            return jsonify({"mensagem": "Parâmetro w inválido"}, 400)
+
+        resolvida = imagens.resolver(path, request.headers.get('accept'), largura)
+        if resolvida is None:
+            return await super().get_response(path, scope)
+        caminho, cabecalhos = resolvida
+        # ETag, Last-Modified e 304 do StaticFiles
+        response = self.file_response(caminho, os.stat(caminho), scope)
+        response.headers.update(cabecalhos)
+        return response
+
+
+# ==================== ERROR HANDLERS ====================
+
+async def http_error(request, exc):
+    if exc.status_code == 404:
+        mensagem = 'Imagem não encontrada' if request.url.path.startswith('/static/images/') \
+            else 'Recurso não encontrado'
+        return jsonify({'mensagem': mensagem}, 404)
+    return jsonify({'mensagem': exc.detail}, exc.status_code)
+
+
+async def internal_error(request, exc):
+    logger.error(f"Erro interno: {exc}")
+    return jsonify({'mensagem': 'Erro interno do servidor'}, 500)
+
+
+# ==================== APLICAÇÃO ====================
+
+routes = [
+    _rota('/', index, methods=['GET']),
+    _rota('/health', health_check, methods=['GET']),
+    _rota('/login', login, methods=['POST']),
+    _rota('/register', register, methods=['POST']),
+    _rota('/refresh', refresh, methods=['POST']),
+    _rota('/usuarios', listar_usuarios, methods=['GET']),
+    _rota('/usuarios/{id:int}', buscar_usuario, methods=['GET']),
+    _rota('/usuarios/{id:int}', atualizar_usuario, methods=['PUT']),
+    _rota('/usuarios/{id:int}', deletar_usuario, methods=['DELETE']),
+    _rota('/usuarios/{id:int}/excluir-conta', excluir_conta_completa, methods=['DELETE']),
+    _rota('/usuarios/{id:int}/exportar', exportar_dados, methods=['GET']),
+    _rota('/perfil', atualizar_perfil, methods=['PUT']),
+    _rota('/humor', registrar_humor, methods=['POST']),
+    _rota('/humor/relatorio-semanal', relatorio_humor_semanal, methods=['GET']),
+    _rota('/humor/relatorio', relatorio_humor, methods=['GET']),
+    _rota('/meditacoes', listar_meditacoes, methods=['GET']),
+    _rota('/meditacoes/historico', registrar_meditacao, methods=['POST']),
+    _rota('/meditacoes/historico', listar_historico, methods=['GET']),
+    _rota('/meditacoes/historico/{historico_id:int}', remover_historico, methods=['DELETE']),
+    _rota('/meditacoes/estatisticas', estatisticas_meditacoes, methods=['GET']),
+    _rota('/meditacoes/{id:int}', buscar_meditacao, methods=['GET']),
+    _rota('/avaliacoes', salvar_avaliacao, methods=['POST']),
+    _rota('/avaliacoes/historico', historico_avaliacoes, methods=['GET']),
+    _rota('/avaliacoes/ultimas', ultimas_avaliacoes, methods=['GET']),
+    _rota('/stats', obter_estatisticas, methods=['GET']),
+    Mount('/static/images', ImagensEstaticasAsgi(directory=IMAGENS_DIR, check_dir=False)),
+]
+
+
+def _regex_origens(origens):
+    """'http://localhost:*' -> regex, como o Flask-CORS interpreta as origens."""
+    return '|'.join(re.escape(o.strip()).replace(r'\*', '.*') for o in origens if o.strip()) or None
+
+
+class EtagDaCodificacao:
+    """
+    O GZipMiddleware do Starlette comprime sem tocar na ETag; como no app Flask
+    (middleware/compressao.py), a ETag forte da resposta comprimida ganha o
+    sufixo da codificação, e `_etag_pedida` aceita as duas formas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(message):
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                codificacao, etag = headers.get('content-encoding'), headers.get('etag')
+                if codificacao and etag and etag.startswith('"'):
+                    headers['etag'] = f'"{etag_codificada(etag[1:-1], codificacao)}"'
+            await send(message)
+
+        await self.app(scope, receive, enviar)
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    await conexao_async.inicializar_pool()
+    logger.info(f"🚀 Iniciando {config.APP_NAME} v{config.APP_VERSION} (ASGI)")
+    yield
+    await conexao_async.fechar_pool()
+
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origin_regex=_regex_origens(config.CORS_ORIGINS),
+            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            allow_headers=["Content-Type", "Authorization"],
+        ),
+        # Só gzip aqui; o brotli e o cache de respostas públicas são do app Flask
+        *([Middleware(EtagDaCodificacao),
+           Middleware(GZipMiddleware, minimum_size=config.COMPRESSAO_MINIMO,
+                      compresslevel=config.COMPRESSAO_NIVEL_GZIP)] if config.COMPRESSAO_ATIVA else []),
+    ],
+    exception_handlers={HTTPException: http_error, 500: internal_error},
+    lifespan=_lifespan,
+)
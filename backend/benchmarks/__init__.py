@@ -0,0 +1 @@
+"""Benchmarks da API Calmou (rodar a partir de backend/ com `python -m benchmarks.<nome>`)"""
@@ -0,0 +1,169 @@
+"""
+Benchmark: app Flask (gunicorn gthread + psycopg2) x app ASGI (uvicorn + asyncpg).
+
+Sobe os dois servidores apontando para o mesmo banco do .env, cria um usuário
+com alguns registros e dispara o mesmo roteiro de rotas com N conexões
+simultâneas (padrão 1000) contra cada um. Reporta throughput, p50/p95/p99 e
+erros (5xx, conexões recusadas/derrubadas).
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_asgi_wsgi --concorrencia 1000 --duracao 30
+    python -m benchmarks.bench_asgi_wsgi --url-wsgi http://host:5001   # servidor já rodando
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+
+from benchmarks.carga_http import Requisicao, executar_carga
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _chamar(url, metodo='GET', corpo=None, token=None):
+    dados = json.dumps(corpo).encode() if corpo is not None else None
+    requisicao = urllib.request.Request(url, data=dados, method=metodo)
+    requisicao.add_header('Content-Type', 'application/json')
+    if token:
+        requisicao.add_header('Authorization', f'Bearer {token}')
+    with urllib.request.urlopen(requisicao, timeout=30) as resposta:
+        return json.loads(resposta.read() or b'null')
+
+
+def _aguardar(url, processo, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo is not None and processo.poll() is not None:
+            raise SystemExit(f"❌ Servidor encerrou ao subir ({url})")
+        try:
+            _chamar(url + '/health')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"❌ Servidor não respondeu em {timeout}s ({url})")
+
+
+def _subir(tipo, porta, args):
+    ambiente = dict(os.environ, RATELIMIT_ENABLED='False')
+    if tipo == 'wsgi':
+        comando = [
+            'gunicorn', 'app:app', '-b', f'127.0.0.1:{porta}',
+            '-k', 'gthread', '-w', str(args.workers), '--threads', str(args.threads),
+            '--worker-connections', str(args.concorrencia + 100), '--keep-alive', '30',
+            '--log-level', 'warning',
+        ]
+        ambiente.update(WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads))
+    else:
+        comando = [
+            sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+            '--port', str(porta), '--workers', str(args.workers),
+            '--backlog', str(args.concorrencia * 2), '--timeout-keep-alive', '30',
+            '--log-level', 'warning', '--no-access-log',
+        ]
+    # stdout tem os prints do controller; erros continuam no stderr
+    return subprocess.Popen(comando, cwd=BACKEND, env=ambiente, stdout=subprocess.DEVNULL)
+
+
+def _preparar_dados(url):
+    """Usuário próprio do benchmark, com humor e histórico para as leituras terem o que devolver."""
+    email = f"bench-{uuid.uuid4().hex[:8]}@calmou.app"
+    registro = _chamar(url + '/register', 'POST', {
+        'nome': 'Benchmark', 'email': email, 'password': 'benchmark123'
+    })
+    token, usuario_id = registro['access_token'], registro['usuario']['id']
+
+    for nivel in range(1, 6):
+        _chamar(url + '/humor', 'POST', {'usuario_id': usuario_id, 'nivel_humor': nivel}, token)
+
+    meditacoes = _chamar(url + '/meditacoes')
+    if meditacoes:
+        for _ in range(10):
+            _chamar(url + '/meditacoes/historico', 'POST', {
+                'usuario_id': usuario_id,
+                'meditacao_id': meditacoes[0]['id'],
+                'duracao_real_minutos': 10
+            }, token)
+    return token, usuario_id
+
+
+def _roteiro(token, usuario_id):
+    return [
+        Requisicao('GET', '/meditacoes'),
+        Requisicao('GET', '/meditacoes/historico?limit=20', token=token, nome='GET /meditacoes/historico'),
+        Requisicao('GET', '/humor/relatorio-semanal', token=token),
+        Requisicao('GET', '/meditacoes/estatisticas', token=token),
+        Requisicao('GET', f'/usuarios/{usuario_id}', token=token, nome='GET /usuarios/<id>'),
+        Requisicao('POST', '/humor', {'usuario_id': usuario_id, 'nivel_humor': 3}, token=token),
+    ]
+
+
+def executar_benchmark(args):
+    resultados = {}
+    alvos = [('wsgi', args.url_wsgi, args.porta_wsgi), ('asgi', args.url_asgi, args.porta_asgi)]
+
+    for tipo, url, porta in alvos:
+        if args.somente and tipo != args.somente:
+            continue
+        processo = None
+        if not url:
+            url = f'http://127.0.0.1:{porta}'
+            processo = _subir(tipo, porta, args)
+        try:
+            _aguardar(url, processo)
+            token, usuario_id = _preparar_dados(url)
+            roteiro = _roteiro(token, usuario_id)
+
+            # Aquecimento curto (pools, caches de planos) antes de medir
+            asyncio.run(executar_carga(url, roteiro, min(50, args.concorrencia), 2))
+            print(f"⏱️  {tipo}: {args.concorrencia} conexões por {args.duracao}s...")
+            resultados[tipo] = asyncio.run(
+                executar_carga(url, roteiro, args.concorrencia, args.duracao)
+            )
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait(timeout=30)
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concorrencia', type=int, default=1000, help='conexões simultâneas')
+    parser.add_argument('--duracao', type=float, default=30, help='segundos de carga por servidor')
+    parser.add_argument('--workers', type=int, default=1, help='processos por servidor')
+    parser.add_argument('--threads', type=int, default=19, help='threads por worker gunicorn')
+    parser.add_argument('--porta-wsgi', type=int, default=5101)
+    parser.add_argument('--porta-asgi', type=int, default=5102)
+    parser.add_argument('--url-wsgi', help='usa um servidor WSGI já rodando')
+    parser.add_argument('--url-asgi', help='usa um servidor ASGI já rodando')
+    parser.add_argument('--somente', choices=['wsgi', 'asgi'])
+    parser.add_argument('--json', metavar='ARQUIVO', help='salva o resultado em JSON')
+    args = parser.parse_args()
+
+    resultados = executar_benchmark(args)
+
+    if args.json:
+        with open(args.json, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+    for tipo, resultado in resultados.items():
+        total = resultado['total']
+        print(f"\n=== {tipo.upper()} ({resultado['concorrencia']} conexões) ===")
+        print(f"{'rota':<32} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for nome, linha in list(resultado['por_rota'].items()) + [('TOTAL', total)]:
+            if not linha['requisicoes']:
+                print(f"{nome:<32} {'-':>8}")
+                continue
+            print(f"{nome:<32} {linha['rps']:>8} {linha['p50_ms']:>7}ms "
+                  f"{linha['p95_ms']:>7}ms {linha['p99_ms']:>7}ms")
+        print(f"erros: {sum(resultado['erros'].values())} {resultado['erros'] or ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: SQL ad-hoc x comandos preparados nas consultas quentes do controller.
+
+Para cada consulta mede:
+- a latência média vista pelo cliente (parse + planejamento + execução + ida e volta);
+- o tempo de planejamento reportado pelo PostgreSQL (EXPLAIN (ANALYZE, SUMMARY)).
+
+Roda em uma única transação, desfeita no final, com um usuário e uma
+meditação temporários.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_comandos_preparados --iteracoes 2000
+"""
+import argparse
+import json
+import statistics
+import time
+
+import conexao
+from conexao import executar_preparado, _sql_para_psycopg
+from controller.controller_usuario import COLUNAS_USUARIO
+
+
+def _consultas(usuario_id, email, meditacao_id):
+    """(nome, sql com $n, parâmetros) espelhando o controller."""
+    historico = """
+        SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
+               hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
+               m.categoria, m.tipo, m.imagem_capa
+        FROM historico_meditacoes hm
+        JOIN meditacoes m ON hm.meditacao_id = m.id
+        WHERE hm.usuario_id = $1
+        ORDER BY hm.data_conclusao DESC
+    """
+    return [
+        ('calmou_usuario_por_email',
+         f"SELECT {COLUNAS_USUARIO} FROM usuarios WHERE email = $1", (email,)),
+        ('calmou_usuario_por_id',
+         f"SELECT {COLUNAS_USUARIO} FROM usuarios WHERE id = $1", (usuario_id,)),
+        ('calmou_inserir_humor',
+         "INSERT INTO classificacoes_humor (usuario_id, nivel_humor, sentimento_principal, notas) "
+         "VALUES ($1, $2, $3, $4)", (usuario_id, 3, 'Calmo', 'benchmark')),
+        ('calmou_inserir_historico',
+         "INSERT INTO historico_meditacoes (usuario_id, meditacao_id, duracao_real_minutos) "
+         "VALUES ($1, $2, $3) RETURNING id, data_conclusao", (usuario_id, meditacao_id, 10)),
+        ('calmou_historico_limitado', historico + " LIMIT $2", (usuario_id, 20)),
+    ]
+
+
+def _cronometrar(executar, iteracoes):
+    amostras = []
+    for _ in range(iteracoes):
+        inicio = time.perf_counter()
+        executar()
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return statistics.mean(amostras)
+
+
+def _tempo_planejamento(cursor, comando, params, repeticoes=20):
+    tempos = []
+    for _ in range(repeticoes):
+        cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {comando}", params)
+        tempos.append(cursor.fetchone()[0][0]['Planning Time'])
+    return statistics.mean(tempos)
+
+
+def executar_benchmark(iteracoes):
+    conn = conexao.conectar()
+    if not conn:
+        raise SystemExit("❌ Falha ao conectar ao banco de dados")
+
+    resultados = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO usuarios (nome, email, password_hash) "
+            "VALUES ('Benchmark', 'bench-preparados@calmou.app', 'x') RETURNING id"
+        )
+        usuario_id = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO meditacoes (titulo) VALUES ('Benchmark') RETURNING id")
+        meditacao_id = cursor.fetchone()[0]
+
+        for nome, sql, params in _consultas(usuario_id, 'bench-preparados@calmou.app', meditacao_id):
+            sql_adhoc, params_adhoc = _sql_para_psycopg(sql, params)
+
+            def adhoc():
+                cursor.execute(sql_adhoc, params_adhoc)
+                if cursor.description:
+                    cursor.fetchall()
+
+            def preparado():
+                executar_preparado(cursor, nome, sql, params)
+                if cursor.description:
+                    cursor.fetchall()
+
+            # Aquecimento: o PostgreSQL só troca para o plano genérico após 5 EXECUTEs
+            for _ in range(10):
+                adhoc()
+                preparado()
+
+            marcadores = ', '.join(['%s'] * len(params))
+            resultados.append({
+                'consulta': nome,
+                'adhoc_ms': round(_cronometrar(adhoc, iteracoes), 4),
+                'preparado_ms': round(_cronometrar(preparado, iteracoes), 4),
+                'planejamento_adhoc_ms': round(
+                    _tempo_planejamento(cursor, sql_adhoc, params_adhoc), 4),
+                'planejamento_preparado_ms': round(
+                    _tempo_planejamento(cursor, f"EXECUTE {nome} ({marcadores})", params), 4),
+            })
+    finally:
+        conn.rollback()
+        conexao.liberar_conexao(conn)
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iteracoes', type=int, default=2000)
+    parser.add_argument('--json', action='store_true', help='imprime o resultado em JSON')
+    args = parser.parse_args()
+
+    resultados = executar_benchmark(args.iteracoes)
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+
+    print(f"{'consulta':<28} {'ad-hoc':>10} {'preparado':>10} {'plan ad-hoc':>12} {'plan prep.':>11}")
+    for r in resultados:
+        print(f"{r['consulta']:<28} {r['adhoc_ms']:>8.3f}ms {r['preparado_ms']:>8.3f}ms "
+              f"{r['planejamento_adhoc_ms']:>10.3f}ms {r['planejamento_preparado_ms']:>9.3f}ms")
+    print(f"\nContadores: {conexao.estatisticas_preparados()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Benchmark da compressão das respostas: bytes na rede e CPU por rota.
+
+Para cada rota GET do bench_rotas (menos as imagens estáticas), busca
+`--amostras` respostas reais sem compressão pelo cliente de teste do Flask e
+comprime cada corpo com as funções do middleware (middleware/compressao.py):
+gzip e brotli nos níveis da configuração e no nível do cache de respostas
+públicas. Por rota mostra o tamanho médio sem compressão, o tamanho médio e a
+redução de cada codificação e a CPU média por resposta (time.thread_time).
+Rotas com corpo menor que COMPRESSAO_MINIMO aparecem marcadas: o app as envia
+sem compressão.
+
+Como o bench_rotas, sobe um PostgreSQL descartável com dados sintéticos, ou
+usa o banco do .env com `--banco-env`:
+    python -m benchmarks.bench_compressao --usuarios 20000 --json compressao.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+import conexao
+import dados_sinteticos
+from benchmarks import bench_rotas
+from benchmarks.postgres_descartavel import postgres_descartavel
+from config import Config
+from middleware.compressao import NIVEL_CACHE, codificacoes_disponiveis, comprimir
+
+
+def _variantes():
+    """(nome, codificação, nível) medidos: os da configuração e os do cache."""
+    niveis = {'gzip': Config.COMPRESSAO_NIVEL_GZIP, 'br': Config.COMPRESSAO_QUALIDADE_BROTLI}
+    variantes = []
+    for codificacao in codificacoes_disponiveis():
+        variantes.append((f"{codificacao}-{niveis[codificacao]}", codificacao, niveis[codificacao]))
+        variantes.append((f"{codificacao}-{NIVEL_CACHE[codificacao]}", codificacao, NIVEL_CACHE[codificacao]))
+    return variantes
+
+
+def _amostras(contexto, rota, quantidade, semente):
+    """Corpos de `quantidade` respostas da rota, sem compressão (sem Accept-Encoding)."""
+    rng = random.Random(f"{semente}:{rota.nome}")
+    cliente = contexto.app.test_client()
+    corpos = []
+    for _ in range(quantidade):
+        pedido = rota.montar(contexto, rng, contexto.usuario(rng))
+        resposta = cliente.open(pedido.caminho, method=rota.metodo, json=pedido.corpo,
+                                headers=contexto.cabecalhos(pedido))
+        if resposta.status_code == rota.status:
+            corpos.append(resposta.get_data())
+        resposta.close()
+    return corpos
+
+
+def medir(corpos, variantes):
+    """Tamanho médio sem compressão e, por variante, bytes médios, redução e CPU por resposta."""
+    originais = statistics.mean(len(corpo) for corpo in corpos)
+    linha = {'amostras': len(corpos), 'bytes': round(originais), 'variantes': {}}
+    for nome, codificacao, nivel in variantes:
+        tamanhos, cpu = [], []
+        for corpo in corpos:
+            inicio = time.thread_time()
+            tamanhos.append(len(comprimir(corpo, codificacao, nivel)))
+            cpu.append((time.thread_time() - inicio) * 1000)
+        media = statistics.mean(tamanhos)
+        linha['variantes'][nome] = {
+            'bytes': round(media),
+            'reducao': round(1 - media / originais, 3) if originais else 0,
+            'cpu_ms': round(statistics.mean(cpu), 3),
+        }
+    return linha
+
+
+def executar(parametros, args, rotas, variantes):
+    """Mede cada rota no banco de `parametros`."""
+    Config.POSTGRES_DSN = extensions.make_dsn(**{
+        ('dbname' if chave == 'database' else chave): valor for chave, valor in parametros.items()
+    })
+    Config.POSTGRES_REPLICA_DSN = None
+    app = bench_rotas._carregar_app()
+
+    conn = psycopg2.connect(**parametros)
+    try:
+        contexto = bench_rotas._preparar(conn, app, args.amostra, 0, args.semente)
+        resultado = {}
+        with open(os.devnull, 'w') as nulo:
+            for rota in rotas:
+                with contextlib.redirect_stdout(nulo):
+                    corpos = _amostras(contexto, rota, args.amostras, args.semente)
+                if not corpos:
+                    print(f"{rota.nome:<46} sem respostas {rota.status}")
+                    continue
+                linha = resultado[rota.nome] = medir(corpos, variantes)
+                print(_formatar(rota.nome, linha, variantes, app.config['COMPRESSAO_MINIMO']), flush=True)
+    finally:
+        bench_rotas._limpar(conn)
+        conn.close()
+        conexao.fechar_pool()
+    return resultado
+
+
+def _cabecalho(variantes):
+    colunas = ''.join(f" {nome:>10} {'%':>6} {'CPU ms':>7}" for nome, _, _ in variantes)
+    return f"{'rota':<46} {'bytes':>9}{colunas}"
+
+
+def _formatar(nome, linha, variantes, minimo):
+    colunas = ''.join(
+        f" {linha['variantes'][v]['bytes']:>10} {linha['variantes'][v]['reducao'] * 100:5.1f}%"
+        f" {linha['variantes'][v]['cpu_ms']:7.3f}"
+        for v, _, _ in variantes
+    )
+    marca = '  (abaixo do mínimo)' if linha['bytes'] < minimo else ''
+    return f"{nome:<46} {linha['bytes']:>9}{colunas}{marca}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes na rede e CPU da compressão por rota")
+    parser.add_argument('--amostras', type=int, default=50, help='respostas comprimidas por rota')
+    parser.add_argument('--rotas', help='só as rotas cujo nome contém algum destes trechos (vírgulas)')
+    parser.add_argument('--banco-env', action='store_true',
+                        help='usa o banco do .env (já populado) em vez de um descartável')
+    parser.add_argument('--usuarios', type=int, default=20000,
+                        help='escala do gerador de dados sintéticos no banco descartável')
+    parser.add_argument('--semente', type=int, default=dados_sinteticos.PADROES['semente'])
+    parser.add_argument('--amostra', type=int, default=500, help='usuários sorteados para as requisições')
+    parser.add_argument('--json', help='salva o resultado neste arquivo')
+    args = parser.parse_args()
+
+    # Só leituras: as escritas mudariam o banco e os arquivos estáticos não são comprimidos
+    rotas = [rota for rota in bench_rotas.ROTAS
+             if rota.metodo == 'GET' and not rota.regra.startswith('/static/')]
+    if args.rotas:
+        trechos = args.rotas.split(',')
+        rotas = [rota for rota in rotas if any(trecho in rota.nome for trecho in trechos)]
+    variantes = _variantes()
+
+    print(f"🚀 {len(rotas)} rotas, {args.amostras} respostas cada\n")
+    if args.banco_env:
+        parametros = dict(host=Config.POSTGRES_HOST, port=Config.POSTGRES_PORT, user=Config.POSTGRES_USER,
+                          password=Config.POSTGRES_PASSWORD, database=Config.POSTGRES_DB)
+        print(_cabecalho(variantes))
+        resultado = executar(parametros, args, rotas, variantes)
+    else:
+        with postgres_descartavel() as parametros:
+            conn = psycopg2.connect(**parametros)
+            try:
+                print(f"🧪 Gerando dados sintéticos ({args.usuarios:,} usuários)...")
+                dados_sinteticos.gerar(conn, progresso=lambda *_: None, substituir=True,
+                                       usuarios=args.usuarios, semente=args.semente)
+            finally:
+                conn.close()
+            print(_cabecalho(variantes))
+            resultado = executar(parametros, args, rotas, variantes)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'gerado_em': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                'commit': bench_rotas._commit_atual(),
+                'python': platform.python_version(),
+                'banco': 'env' if args.banco_env else {'descartavel': True, 'usuarios': args.usuarios},
+                'minimo': Config.COMPRESSAO_MINIMO,
+                'rotas': resultado,
+            }, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultado salvo em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Memória e tempo da exportação de dados de um usuário: tudo em memória x fluxo.
+
+Sobe um PostgreSQL descartável (benchmarks/postgres_descartavel.py) com um
+usuário que tem `--linhas` registros em cada tabela (humor, histórico,
+avaliações, notificações) e exporta os dados dele de dois jeitos:
+
+- em memória (antes): fetchall de cada seção e o arquivo montado inteiro,
+  como uma rota que devolve um único JSON;
+- em fluxo: exportacao.gerar sobre controller_usuario.exportar_dados_usuario
+  (cursor nomeado, EXPORTACAO_LOTE linhas por ida ao banco), lendo os blocos
+  como o servidor os enviaria.
+
+Mostra bytes gerados, tempo e o pico de memória alocada pelo Python
+(tracemalloc). O pico em fluxo não cresce com --linhas:
+    PG_BIN=/usr/lib/postgresql/16/bin python -m benchmarks.bench_exportacao --linhas 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+import psycopg2
+from psycopg2 import extensions
+
+import conexao
+import exportacao
+from benchmarks.postgres_descartavel import postgres_descartavel
+from config import Config
+from serializacao import para_json
+
+
+def _popular(conn, linhas):
+    """Devolve o id do usuário."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO usuarios (nome, email, password_hash, config)
+            VALUES ('Exporta', 'exporta@bench.dev', 'x', '{"tema": "escuro"}') RETURNING id
+        """)
+        uid = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO meditacoes (titulo, categoria) VALUES ('Bench', 'foco') RETURNING id")
+        meditacao_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO classificacoes_humor (usuario_id, nivel_humor, sentimento_principal, notas, data_classificacao)
+            SELECT %s, 1 + g %% 5, 'Calmo', 'Dia tranquilo, com uma caminhada no fim da tarde.',
+                   now() - g * interval '1 hour'
+            FROM generate_series(1, %s) g
+        """, (uid, linhas))
+        cursor.execute("""
+            INSERT INTO historico_meditacoes (usuario_id, meditacao_id, data_conclusao, duracao_real_minutos)
+            SELECT %s, %s, now() - g * interval '1 hour', 5 + g %% 30 FROM generate_series(1, %s) g
+        """, (uid, meditacao_id, linhas))
+        cursor.execute("""
+            INSERT INTO resultados_avaliacoes (usuario_id, tipo, respostas, resultado_score, resultado_texto)
+            SELECT %s, (enum_range(NULL::tipo_avaliacao))[1],
+                   jsonb_build_object('q1', g %% 4, 'q2', g %% 3, 'q3', g %% 2), g %% 27, 'Leve'
+            FROM generate_series(1, %s) g
+        """, (uid, linhas))
+        cursor.execute("""
+            INSERT INTO notificacoes (usuario_id, titulo, mensagem, lida)
+            SELECT %s, 'Lembrete ' || g, 'Que tal uma pausa de cinco minutos?', g %% 2 = 0
+            FROM generate_series(1, %s) g
+        """, (uid, linhas))
+    conn.commit()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE")
+    return uid
+
+
+def _em_memoria(controller, uid):
+    """Antes: cada seção com fetchall e o arquivo inteiro em memória."""
+    secoes = {}
+    for secao, colunas, linhas in controller.exportar_dados_usuario(uid):
+        secoes[secao] = [dict(zip(colunas, linha)) for linha in linhas.fetchall()]
+    return [para_json(secoes)]
+
+
+def _medir(nome, funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    total = sum(len(bloco) for bloco in funcao())
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nome:<26} {total / 2**20:10.1f} MiB {duracao:8.2f} s {pico / 2**20:12.1f} MiB")
+
+
+def executar(parametros, args):
+    Config.POSTGRES_DSN = extensions.make_dsn(**{
+        ('dbname' if chave == 'database' else chave): valor for chave, valor in parametros.items()
+    })
+    Config.POSTGRES_REPLICA_DSN = None
+    from controller import controller_usuario as c
+
+    conn = psycopg2.connect(**parametros)
+    try:
+        print(f"🧪 1 usuário com {args.linhas:,} registros em cada uma de 4 tabelas...")
+        uid = _popular(conn, args.linhas)
+    finally:
+        conn.close()
+
+    try:
+        print(f"\n{'exportação':<26} {'gerado':>14} {'tempo':>10} {'pico de memória':>16}")
+        _medir('em memória (JSON único)', lambda: _em_memoria(c, uid))
+        for formato in exportacao.FORMATOS:
+            _medir(f'fluxo ({formato})', lambda: exportacao.gerar(formato, c.exportar_dados_usuario(uid)))
+    finally:
+        conexao.fechar_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação de dados: tudo em memória x fluxo")
+    parser.add_argument('--linhas', type=int, default=100000, help='registros do usuário em cada tabela')
+    args = parser.parse_args()
+
+    with postgres_descartavel() as parametros:
+        executar(parametros, args)
+
+
+if __name__ == '__main__':
+    main()
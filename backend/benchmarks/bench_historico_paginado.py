@@ -0,0 +1,134 @@
+"""
+Latência do histórico paginado por cursor x histórico inteiro, por tamanho.
+
+Sobe um PostgreSQL descartável (benchmarks/postgres_descartavel.py) com
+`--usuarios` usuários de fundo e um usuário com `--sessoes` sessões, e chama o
+controller como as rotas chamam (pool e comandos preparados):
+
+- inteiro: listar_historico_meditacoes(uid), o GET sem limit;
+- paginado: percorre todas as páginas de `--page-size` com o next_cursor e
+  mostra a mediana das 10 primeiras, das 10 do meio e das 10 últimas, com e
+  sem os campos do catálogo (incluir_meditacao).
+
+Com o keyset as três medianas ficam iguais; com OFFSET a última cresceria
+com o tamanho do histórico:
+    PG_BIN=/usr/lib/postgresql/16/bin python -m benchmarks.bench_historico_paginado --sessoes 20000
+"""
+import argparse
+import statistics
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+import conexao
+from benchmarks.postgres_descartavel import postgres_descartavel
+from config import Config
+
+
+def _popular(conn, usuarios, por_usuario, sessoes):
+    """Devolve o id do usuário pesado."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO meditacoes (titulo, descricao, duracao_minutos, tipo, categoria, imagem_capa)
+            SELECT 'Meditação ' || g, repeat('Uma prática guiada para acalmar a mente. ', 8), 10,
+                   'guiada', 'Categoria ' || (g % 8), '/static/images/' || g || '.png'
+            FROM generate_series(1, 40) g
+        """)
+        cursor.execute("""
+            INSERT INTO usuarios (nome, email, password_hash)
+            SELECT 'Usuário ' || g, 'usuario' || g || '@bench.dev', 'x' FROM generate_series(1, %s) g
+        """, (usuarios + 1,))
+        cursor.execute("SELECT MAX(id) FROM usuarios")
+        pesado = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO historico_meditacoes (usuario_id, meditacao_id, data_conclusao, duracao_real_minutos)
+            SELECT u.id, (SELECT MIN(id) FROM meditacoes) + g %% 40,
+                   now() - random() * interval '3 years', 5 + g %% 30
+            FROM usuarios u CROSS JOIN generate_series(1, %s) g
+            WHERE u.id <> %s
+        """, (por_usuario, pesado))
+        cursor.execute("""
+            INSERT INTO historico_meditacoes (usuario_id, meditacao_id, data_conclusao, duracao_real_minutos)
+            SELECT %s, (SELECT MIN(id) FROM meditacoes) + g %% 40,
+                   now() - random() * interval '3 years', 5 + g %% 30
+            FROM generate_series(1, %s) g
+        """, (pesado, sessoes))
+    conn.commit()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE historico_meditacoes")
+    return pesado
+
+
+def _mediana_ms(funcao, repeticoes):
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def _percorrer(uid, tamanho, incluir_meditacao):
+    """ms de cada página, da primeira à última."""
+    from controller import controller_usuario as c
+
+    tempos, cursor = [], None
+    while True:
+        inicio = time.perf_counter()
+        pagina = c.listar_historico_pagina(uid, tamanho, cursor, incluir_meditacao)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        cursor = pagina['next_cursor']
+        if cursor is None:
+            return tempos
+
+
+def executar(parametros, args):
+    Config.POSTGRES_DSN = extensions.make_dsn(**{
+        ('dbname' if chave == 'database' else chave): valor for chave, valor in parametros.items()
+    })
+    Config.POSTGRES_REPLICA_DSN = None
+    Config.HISTORICO_PAGINA_MAX = max(Config.HISTORICO_PAGINA_MAX, args.page_size)
+    from controller import controller_usuario as c
+
+    conn = psycopg2.connect(**parametros)
+    try:
+        print(f"🧪 {args.usuarios:,} usuários x {args.por_usuario} sessões + 1 usuário com {args.sessoes:,}...")
+        uid = _popular(conn, args.usuarios, args.por_usuario, args.sessoes)
+    finally:
+        conn.close()
+
+    try:
+        inteiro = _mediana_ms(lambda: c.listar_historico_meditacoes(uid), args.repeticoes)
+        print(f"\n{'histórico inteiro (sem limit)':<44} {inteiro:9.2f} ms  ({args.sessoes:,} itens)")
+        for incluir in (True, False):
+            # Primeira volta aquece o cache do PostgreSQL; mede a segunda
+            _percorrer(uid, args.page_size, incluir)
+            tempos = _percorrer(uid, args.page_size, incluir)
+            meio = len(tempos) // 2
+            trechos = {'primeiras': tempos[:10], 'meio': tempos[meio - 5:meio + 5], 'últimas': tempos[-10:]}
+            rotulo = f"páginas de {args.page_size}" + ('' if incluir else ', sem meditação')
+            print(f"{rotulo:<44} " + '  '.join(
+                f"{nome} {statistics.median(valores):6.3f} ms" for nome, valores in trechos.items()
+            ) + f"  ({len(tempos)} páginas)")
+    finally:
+        conexao.fechar_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico paginado por cursor x histórico inteiro")
+    parser.add_argument('--sessoes', type=int, default=20000, help='sessões do usuário medido')
+    parser.add_argument('--usuarios', type=int, default=2000, help='usuários de fundo')
+    parser.add_argument('--por-usuario', type=int, default=50, help='sessões de cada usuário de fundo')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeticoes', type=int, default=10, help='execuções do histórico inteiro')
+    args = parser.parse_args()
+
+    with postgres_descartavel() as parametros:
+        executar(parametros, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Bytes e tempo das imagens da tela do catálogo: originais x variantes.
+
+Pede cada imagem de static/images pelo cliente de teste do Flask (pilha WSGI
+completa, sem rede nem banco), como a tela do catálogo pede as capas:
+
+- original: o PNG de static/images, como era servido antes das variantes;
+- para cada cliente (`Accept`) e largura (`?w=`): a variante negociada.
+
+Mostra o total de bytes da tela (uma imagem de cada), a redução sobre os
+originais e a mediana do tempo por requisição. As variantes precisam existir:
+    python cli.py imagens
+    python -m benchmarks.bench_imagens --larguras 320,640 --repeticoes 50
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault('IMAGENS_GERAR_NA_INICIALIZACAO', 'False')
+
+from benchmarks import bench_rotas  # noqa: E402
+from imagens import ImagensEstaticas  # noqa: E402
+
+CLIENTES = {
+    'navegador (avif)': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+    'Safari antigo (webp)': 'image/webp,image/png,image/*;q=0.8,*/*;q=0.5',
+    'app (*/*)': '*/*',
+}
+
+
+def _tela(cliente, nomes, accept, largura, repeticoes):
+    """(bytes da tela, mediana em ms por requisição)"""
+    total, tempos = 0, []
+    consulta = f"?w={largura}" if largura else ''
+    for nome in nomes:
+        for i in range(repeticoes):
+            inicio = time.perf_counter()
+            response = cliente.get(f"/static/images/{nome}{consulta}", headers={'Accept': accept})
+            corpo = response.get_data()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            response.close()
+            assert response.status_code == 200, f"{nome}: {response.status_code}"
+        total += len(corpo)
+    return total, statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes da tela do catálogo: imagens originais x variantes")
+    parser.add_argument('--larguras', default='320,640', help='valores de ?w= medidos, separados por vírgula')
+    parser.add_argument('--repeticoes', type=int, default=20, help='requisições por imagem em cada cenário')
+    args = parser.parse_args()
+
+    cliente = bench_rotas._carregar_app().test_client()
+    import app as modulo_app
+
+    imagens = modulo_app.imagens
+    imagens.carregar()
+    nomes = sorted(os.listdir(modulo_app.IMAGENS_DIR))
+    if not imagens.estatisticas()['imagens']:
+        raise SystemExit("❌ Nenhuma variante gerada: rode `python cli.py imagens` antes")
+
+    print(f"🚀 {len(nomes)} imagens, {args.repeticoes} requisições cada\n")
+    print(f"{'cenário':<40} {'bytes da tela':>14} {'redução':>8} {'ms/req':>8}")
+
+    # Antes: sem manifesto, a rota serve os originais
+    with tempfile.TemporaryDirectory() as vazio:
+        modulo_app.imagens = ImagensEstaticas(imagens.origem, vazio)
+        base, ms = _tela(cliente, nomes, CLIENTES['navegador (avif)'], None, args.repeticoes)
+        modulo_app.imagens = imagens
+    print(f"{'original (antes)':<40} {base:>14,} {'':>8} {ms:8.3f}")
+
+    for largura in [int(largura) for largura in args.larguras.split(',')] + [None]:
+        for cliente_nome, accept in CLIENTES.items():
+            total, ms = _tela(cliente, nomes, accept, largura, args.repeticoes)
+            nome = f"{cliente_nome}, w={largura or '-'}"
+            print(f"{nome:<40} {total:>14,} {base / total:7.1f}x {ms:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
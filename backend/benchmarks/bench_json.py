@@ -0,0 +1,117 @@
+"""
+Microbenchmark da serialização JSON de um histórico grande (sem banco).
+
+Monta `--linhas` linhas no formato do fetchall() de listar_historico_meditacoes
+(data_conclusao com fuso, como o psycopg2 devolve) e mede, por payload:
+
+- montagem: linhas -> lista de dicionários, com `.isoformat()` por linha
+  (antes) e com o `datetime` como veio do banco (_item_historico);
+- serialização: o provedor JSON padrão do Flask (json da biblioteca padrão,
+  chaves ordenadas, ensure_ascii) e o ProvedorJson (serializacao.py);
+- total: montagem + serialização, o custo de CPU da rota fora o banco.
+
+Roda dentro de um app Flask mínimo (os provedores precisam de um app), sem
+banco nem rede:
+    python -m benchmarks.bench_json --linhas 10000 --repeticoes 20
+"""
+import argparse
+import datetime
+import gc
+import random
+import statistics
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from controller.controller_usuario import _item_historico
+from serializacao import ProvedorJson, orjson
+
+CATEGORIAS = ['Ansiedade', 'Sono', 'Foco', 'Respiração', None]
+
+
+def gerar_linhas(quantidade, semente=0):
+    """Tuplas como as do SELECT de listar_historico_meditacoes."""
+    rng = random.Random(semente)
+    fuso = datetime.timezone(datetime.timedelta(hours=-3))
+    inicio = datetime.datetime(2025, 1, 1, tzinfo=fuso)
+    linhas = []
+    for i in range(quantidade):
+        meditacao = rng.randint(1, 40)
+        linhas.append((
+            i + 1, 42, meditacao,
+            inicio + datetime.timedelta(seconds=rng.randint(0, 365 * 86400), microseconds=rng.randint(0, 999999)),
+            rng.randint(3, 30),
+            f"Meditação {meditacao}", 'Uma prática guiada para acalmar a mente e o corpo.',
+            rng.choice([5, 10, 15, 20]), rng.choice(CATEGORIAS), 'guiada', f"/static/images/{meditacao}.jpg",
+        ))
+    return linhas
+
+
+def _item_historico_antes(linha):
+    """Formato anterior do controller: data convertida em texto linha a linha."""
+    item = _item_historico(linha)
+    item['data_conclusao'] = linha[3].isoformat() if linha[3] else None
+    return item
+
+
+def _medir(funcao, repeticoes):
+    """Mediana em ms de `repeticoes` execuções (depois de uma de aquecimento)."""
+    funcao()
+    gc.collect()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def executar(linhas, repeticoes):
+    """{cenário: {'montagem_ms', 'serializacao_ms', 'total_ms', 'bytes'}}"""
+    app = Flask(__name__)
+    padrao = DefaultJSONProvider(app)
+    rapido = ProvedorJson(app)
+    rapido.compact = True  # como em produção (DEBUG desligado)
+
+    antes = [_item_historico_antes(linha) for linha in linhas]
+    depois = [_item_historico(linha) for linha in linhas]
+    cenarios = {
+        'padrão do Flask (antes)': (_item_historico_antes, padrao, antes),
+        'ProvedorJson, datas convertidas': (_item_historico_antes, rapido, antes),
+        'ProvedorJson, datas nativas (depois)': (_item_historico, rapido, depois),
+    }
+
+    resultado = {}
+    with app.app_context():
+        for nome, (montar, provedor, itens) in cenarios.items():
+            montagem = _medir(lambda: [montar(linha) for linha in linhas], repeticoes)
+            serializacao = _medir(lambda: provedor.response(itens), repeticoes)
+            resultado[nome] = {
+                'montagem_ms': round(montagem, 2),
+                'serializacao_ms': round(serializacao, 2),
+                'total_ms': round(montagem + serializacao, 2),
+                'bytes': len(provedor.response(itens).get_data()),
+            }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialização JSON de um histórico grande")
+    parser.add_argument('--linhas', type=int, default=10000, help='itens do histórico por payload')
+    parser.add_argument('--repeticoes', type=int, default=20, help='execuções medidas por cenário')
+    args = parser.parse_args()
+
+    linhas = gerar_linhas(args.linhas)
+    print(f"🚀 {args.linhas:,} linhas, mediana de {args.repeticoes} execuções "
+          f"({'orjson ' + orjson.__version__ if orjson else 'sem orjson: json da biblioteca padrão'})\n")
+    print(f"{'cenário':<40} {'montagem':>10} {'serialização':>13} {'total':>9} {'bytes':>10}")
+    resultado = executar(linhas, args.repeticoes)
+    base = resultado['padrão do Flask (antes)']['total_ms']
+    for nome, linha in resultado.items():
+        print(f"{nome:<40} {linha['montagem_ms']:8.2f}ms {linha['serializacao_ms']:11.2f}ms "
+              f"{linha['total_ms']:7.2f}ms {linha['bytes']:>10,}  ({base / linha['total_ms']:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
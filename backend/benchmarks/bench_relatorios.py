@@ -0,0 +1,111 @@
+"""
+Relatórios do back-office: fetchall + print x motor em fluxo (eports/relatorios.py).
+
+Sobe um PostgreSQL descartável (benchmarks/postgres_descartavel.py), popula
+com dados_sinteticos e gera os dois relatórios:
+
+- antes: fetchall da junção inteira e uma linha impressa por registro (para
+  /dev/null), um relatório depois do outro;
+- em fluxo: gerar_relatorios em cada formato, com cursor no servidor em lotes
+  de --lote linhas, um relatório por vez e os dois em paralelo.
+
+Mostra tempo total e pico de memória alocada pelo Python (tracemalloc):
+    PG_BIN=/usr/lib/postgresql/16/bin python -m benchmarks.bench_relatorios --usuarios 20000
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+import tracemalloc
+
+import psycopg2
+from psycopg2 import extensions
+
+import conexao
+import dados_sinteticos
+from benchmarks.postgres_descartavel import postgres_descartavel
+from config import Config
+
+_SQL_ANTES = [
+    """
+        SELECT u.nome, COUNT(h.id) as total_meditacoes
+        FROM usuarios u
+        JOIN historico_meditacoes h ON u.id = h.usuario_id
+        GROUP BY u.nome
+        ORDER BY total_meditacoes DESC;
+    """,
+    """
+        SELECT u.nome, m.titulo, h.data_conclusao
+        FROM historico_meditacoes h
+        JOIN usuarios u ON h.usuario_id = u.id
+        JOIN meditacoes m ON h.meditacao_id = m.id
+        ORDER BY h.data_conclusao DESC;
+    """,
+]
+
+
+def _antes():
+    """Como eram os relatórios: tudo em memória e uma linha impressa por registro."""
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        for sql in _SQL_ANTES:
+            with conexao.obter_cursor(somente_leitura=True) as cursor:
+                cursor.execute(sql)
+                resultados = cursor.fetchall()
+            for linha in resultados:
+                print(f"Usuário: {linha[0]}, {linha[1:]}")
+
+
+def _medir(nome, funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nome:<34} {duracao:8.2f} s {pico / 2**20:12.1f} MiB")
+
+
+def executar(parametros, args):
+    Config.POSTGRES_DSN = extensions.make_dsn(**{
+        ('dbname' if chave == 'database' else chave): valor for chave, valor in parametros.items()
+    })
+    Config.POSTGRES_REPLICA_DSN = None
+    from eports import relatorios
+
+    with conexao.obter_cursor(somente_leitura=True) as cursor:
+        cursor.execute("SELECT count(*) FROM historico_meditacoes")
+        print(f"📊 {cursor.fetchone()[0]:,} sessões no histórico")
+
+    try:
+        print(f"\n{'relatórios':<34} {'tempo':>10} {'pico de memória':>16}")
+        _medir('antes (fetchall + print)', _antes)
+        with tempfile.TemporaryDirectory() as pasta:
+            for formato in relatorios.formatos_disponiveis():
+                for paralelo in (1, 2):
+                    _medir(f'fluxo ({formato}, {paralelo} por vez)', lambda: relatorios.gerar_relatorios(
+                        formato=formato, saida=pasta, paralelo=paralelo, lote=args.lote))
+    finally:
+        conexao.fechar_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatórios: fetchall + print x motor em fluxo")
+    parser.add_argument('--usuarios', type=int, default=20000, help='escala do gerador de dados sintéticos')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--lote', type=int, default=Config.RELATORIOS_LOTE, help='linhas por ida ao banco')
+    args = parser.parse_args()
+
+    with postgres_descartavel() as parametros:
+        conn = psycopg2.connect(**parametros)
+        try:
+            print(f"🧪 Gerando dados sintéticos ({args.usuarios:,} usuários)...")
+            dados_sinteticos.gerar(conn, progresso=lambda *_: None, substituir=True,
+                                   usuarios=args.usuarios, semente=args.semente)
+        finally:
+            conn.close()
+        executar(parametros, args)
+
+
+if __name__ == '__main__':
+    main()
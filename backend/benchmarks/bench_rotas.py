@@ -0,0 +1,487 @@
+"""
+Benchmark ponta a ponta de todas as rotas do app.py (WSGI, em processo).
+
+Cada rota é chamada pelo cliente de teste do Flask, que passa pela pilha WSGI
+completa (roteamento, JWT, validação, unidade de trabalho, pool, SQL e
+serialização), por `--concorrencia` threads durante `--duracao` segundos,
+depois de `--aquecimento` segundos descartados. Por rota mede requisições por
+segundo, latência p50/p95/p99, consultas e tempo de banco por requisição (do
+cabeçalho Server-Timing) e os status devolvidos. Sem servidor HTTP nem rede no
+meio: o que aparece aqui é custo da aplicação e do banco, não do gunicorn (para
+isso há o bench_asgi_wsgi).
+
+Por padrão sobe um PostgreSQL descartável (benchmarks/postgres_descartavel.py)
+populado pelo gerador de dados sintéticos; com `--banco-env` usa o banco do
+.env, que precisa ter sido populado com `cli.py gerar-dados` (as rotas de
+escrita gravam nele de verdade). Usuários são sorteados pelo histórico, então
+os mais ativos aparecem mais, como em produção. As rotas que apagam consomem
+usuários e registros criados só para isso (`--vitimas`) e param antes se eles
+acabarem.
+
+O resultado é salvo em JSON para comparar execuções:
+    python -m benchmarks.bench_rotas --json antes.json
+    python -m benchmarks.bench_rotas --json depois.json --comparar antes.json
+"""
+import argparse
+import collections
+import contextlib
+import datetime
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import psycopg2
+from flask_jwt_extended import create_access_token, create_refresh_token
+from psycopg2 import extensions
+
+import conexao
+import dados_sinteticos
+from benchmarks.carga_http import resumir
+from benchmarks.postgres_descartavel import BACKEND, postgres_descartavel
+from config import Config
+
+PREFIXO_BENCH = 'bench-'
+
+
+# Server-Timing publicado por conexao.registrar_medicao_sql
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) consultas"')
+
+
+def medicao_da_resposta(resposta):
+    """(consultas, ms de banco) do cabeçalho Server-Timing, ou (None, None)."""
+    encontrado = _SERVER_TIMING_DB.search(resposta.headers.get('Server-Timing', ''))
+    if not encontrado:
+        return None, None
+    return int(encontrado.group(2)), float(encontrado.group(1))
+
+
+# ==================== ROTAS ====================
+
+Pedido = collections.namedtuple('Pedido', 'caminho corpo usuario_id refresh', defaults=(None, None, False))
+
+
+class Rota:
+    """Uma rota do app.py e como montar cada requisição para ela."""
+
+    def __init__(self, metodo, regra, montar, status=200, nome=None):
+        self.metodo = metodo
+        self.regra = regra
+        # montar(contexto, rng, uid) -> Pedido, ou None quando não há mais o que pedir
+        self.montar = montar
+        self.status = status
+        self.nome = nome or f"{metodo} {regra}"
+
+
+def _corpo_avaliacao(rng, uid):
+    respostas = {f"q{i}": rng.randint(0, 3) for i in range(1, 8)}
+    return {'usuario_id': uid, 'tipo': 'ansiedade', 'respostas': respostas,
+            'resultado_score': sum(respostas.values())}
+
+
+def _remover_usuario(contexto, rng, _):
+    uid = contexto.proxima('usuarios_deletar')
+    return uid and Pedido(f"/usuarios/{uid}", usuario_id=uid)
+
+
+def _excluir_conta(contexto, rng, _):
+    uid = contexto.proxima('usuarios_excluir')
+    return uid and Pedido(f"/usuarios/{uid}/excluir-conta",
+                          {'password': dados_sinteticos.SENHA_PADRAO}, uid)
+
+
+def _remover_historico(contexto, rng, _):
+    registro = contexto.proxima('historicos')
+    return registro and Pedido(f"/meditacoes/historico/{registro[0]}", usuario_id=registro[1])
+
+
+ROTAS = [
+    Rota('GET', '/', lambda c, r, uid: Pedido('/')),
+    Rota('GET', '/health', lambda c, r, uid: Pedido('/health')),
+    Rota('POST', '/login', lambda c, r, uid: Pedido('/login', {
+        'email': dados_sinteticos.email_usuario(uid), 'password': dados_sinteticos.SENHA_PADRAO})),
+    Rota('POST', '/register', lambda c, r, uid: Pedido('/register', {
+        'nome': 'Usuário Benchmark', 'email': f"{PREFIXO_BENCH}registro-{next(c.sequencia)}@calmou.dev",
+        'password': dados_sinteticos.SENHA_PADRAO}), status=201),
+    Rota('POST', '/refresh', lambda c, r, uid: Pedido('/refresh', usuario_id=uid, refresh=True)),
+    Rota('GET', '/usuarios', lambda c, r, uid: Pedido('/usuarios', usuario_id=uid)),
+    Rota('GET', '/usuarios', lambda c, r, uid: Pedido('/usuarios?nome=ana', usuario_id=uid),
+         nome='GET /usuarios?nome=ana'),
+    Rota('GET', '/usuarios/<int:id>', lambda c, r, uid: Pedido(f"/usuarios/{uid}", usuario_id=uid)),
+    # atualizar_usuario grava todas as colunas: sem o email ele viraria NULL
+    Rota('PUT', '/usuarios/<int:id>', lambda c, r, uid: Pedido(f"/usuarios/{uid}", {
+        'nome': f"Usuário {uid}", 'email': dados_sinteticos.email_usuario(uid)}, uid)),
+    Rota('DELETE', '/usuarios/<int:id>', _remover_usuario),
+    Rota('DELETE', '/usuarios/<int:id>/excluir-conta', _excluir_conta),
+    Rota('GET', '/usuarios/<int:id>/exportar', lambda c, r, uid: Pedido(
+        f"/usuarios/{uid}/exportar", usuario_id=uid)),
+    Rota('GET', '/usuarios/<int:id>/exportar', lambda c, r, uid: Pedido(
+        f"/usuarios/{uid}/exportar?formato=csv", usuario_id=uid), nome='GET /usuarios/<int:id>/exportar?formato=csv'),
+    Rota('PUT', '/perfil', lambda c, r, uid: Pedido('/perfil', {
+        'nome': f"Usuário {uid}", 'cpf': dados_sinteticos.cpf_usuario(uid), 'tipo_sanguineo': 'O+'}, uid)),
+    Rota('POST', '/humor', lambda c, r, uid: Pedido('/humor', {
+        'usuario_id': uid, 'nivel_humor': r.randint(0, 10), 'sentimento_principal': 'calmo'}, uid),
+        status=201),
+    Rota('GET', '/humor/relatorio-semanal', lambda c, r, uid: Pedido(
+        '/humor/relatorio-semanal', usuario_id=uid)),
+    Rota('GET', '/humor/relatorio', lambda c, r, uid: Pedido(
+        f"/humor/relatorio?granularidade={r.choice(('dia', 'semana', 'mes'))}", usuario_id=uid)),
+    Rota('GET', '/meditacoes', lambda c, r, uid: Pedido('/meditacoes')),
+    Rota('GET', '/meditacoes/<int:id>', lambda c, r, uid: Pedido(f"/meditacoes/{r.choice(c.meditacoes)}")),
+    Rota('POST', '/meditacoes/historico', lambda c, r, uid: Pedido('/meditacoes/historico', {
+        'usuario_id': uid, 'meditacao_id': r.choice(c.meditacoes), 'duracao_real_minutos': r.randint(5, 30),
+    }, uid), status=201),
+    Rota('GET', '/meditacoes/historico', lambda c, r, uid: Pedido('/meditacoes/historico', usuario_id=uid)),
+    Rota('GET', '/meditacoes/historico', lambda c, r, uid: Pedido(
+        '/meditacoes/historico?limit=20', usuario_id=uid), nome='GET /meditacoes/historico?limit=20'),
+    Rota('GET', '/meditacoes/historico', lambda c, r, uid: Pedido(
+        '/meditacoes/historico?page_size=50', usuario_id=uid), nome='GET /meditacoes/historico?page_size=50'),
+    Rota('GET', '/meditacoes/estatisticas', lambda c, r, uid: Pedido(
+        '/meditacoes/estatisticas', usuario_id=uid)),
+    Rota('DELETE', '/meditacoes/historico/<int:historico_id>', _remover_historico),
+    Rota('POST', '/avaliacoes', lambda c, r, uid: Pedido('/avaliacoes', _corpo_avaliacao(r, uid), uid),
+         status=201),
+    Rota('GET', '/avaliacoes/historico', lambda c, r, uid: Pedido('/avaliacoes/historico', usuario_id=uid)),
+    Rota('GET', '/avaliacoes/historico', lambda c, r, uid: Pedido(
+        f"/avaliacoes/historico?page_size=20&tipo={r.choice(('ansiedade', 'depressao', 'estresse'))}", usuario_id=uid),
+        nome='GET /avaliacoes/historico?page_size=20&tipo='),
+    Rota('GET', '/avaliacoes/ultimas', lambda c, r, uid: Pedido('/avaliacoes/ultimas', usuario_id=uid)),
+    Rota('GET', '/stats', lambda c, r, uid: Pedido('/stats', usuario_id=uid)),
+    Rota('GET', '/static/images/<path:filename>', lambda c, r, uid: Pedido(
+        f"/static/images/{r.choice(c.imagens)}")),
+]
+
+
+def rotas_sem_cobertura(app, rotas=ROTAS):
+    """(método, regra) do app que nenhuma Rota exercita."""
+    cobertas = {(rota.metodo, rota.regra) for rota in rotas}
+    faltando = []
+    for regra in app.url_map.iter_rules():
+        # A rota estática padrão do Flask não é servida pelo app (/static/images é)
+        if regra.endpoint == 'static':
+            continue
+        for metodo in sorted(regra.methods - {'HEAD', 'OPTIONS'}):
+            if (metodo, regra.rule) not in cobertas:
+                faltando.append((metodo, regra.rule))
+    return faltando
+
+
+# ==================== PREPARAÇÃO ====================
+
+class Contexto:
+    """Dados compartilhados pelas threads: usuários, tokens e registros descartáveis."""
+
+    def __init__(self, app, usuarios, meditacoes, imagens, descartaveis):
+        self.app = app
+        self.usuarios = usuarios
+        self.meditacoes = meditacoes
+        self.imagens = imagens
+        self.descartaveis = {nome: collections.deque(itens) for nome, itens in descartaveis.items()}
+        self.sequencia = itertools.count(int(time.time()))
+        self._tokens = {}
+
+    def usuario(self, rng):
+        return rng.choice(self.usuarios)
+
+    def proxima(self, nome):
+        """Próximo registro descartável da fila, ou None quando acabou."""
+        try:
+            return self.descartaveis[nome].popleft()
+        except IndexError:
+            return None
+
+    def cabecalhos(self, pedido):
+        """Authorization com um token (de acesso ou refresh) do usuário do pedido."""
+        if pedido.usuario_id is None:
+            return {}
+        chave = (pedido.usuario_id, pedido.refresh)
+        token = self._tokens.get(chave)
+        if token is None:
+            criar = create_refresh_token if pedido.refresh else create_access_token
+            with self.app.app_context():
+                token = self._tokens[chave] = criar(identity=str(pedido.usuario_id))
+        return {'Authorization': f"Bearer {token}"}
+
+
+def _preparar(conn, app, amostra, vitimas, semente):
+    """Sorteia usuários e cria os registros que as rotas de exclusão vão apagar."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT setseed(%s)", ((semente % 1000) / 1000,))
+        # Sorteio ponderado pela atividade: usuários ativos aparecem mais vezes
+        cursor.execute(
+            "SELECT usuario_id FROM historico_meditacoes ORDER BY random() LIMIT %s", (amostra,)
+        )
+        usuarios = [linha[0] for linha in cursor.fetchall()]
+        if not usuarios:
+            raise SystemExit("❌ Banco sem histórico de meditações; rode `python cli.py gerar-dados`")
+
+        cursor.execute("SELECT id FROM meditacoes ORDER BY id")
+        meditacoes = [linha[0] for linha in cursor.fetchall()]
+
+        cursor.execute(
+            "SELECT id, usuario_id FROM historico_meditacoes ORDER BY random() LIMIT %s", (vitimas,)
+        )
+        historicos = cursor.fetchall()
+
+        cursor.execute("""
+            INSERT INTO usuarios (nome, email, password_hash)
+            SELECT 'Usuário Benchmark', %s || 'vitima-' || n || '-' || %s || '@calmou.dev', %s
+            FROM generate_series(1, %s) AS n
+            RETURNING id
+        """, (PREFIXO_BENCH, int(time.time()), dados_sinteticos.HASH_SENHA_PADRAO, 2 * vitimas))
+        criados = [linha[0] for linha in cursor.fetchall()]
+    conn.commit()
+
+    imagens = sorted(os.listdir(os.path.join(BACKEND, 'static', 'images')))
+    return Contexto(app, usuarios, meditacoes, imagens, {
+        'usuarios_deletar': criados[:vitimas],
+        'usuarios_excluir': criados[vitimas:],
+        'historicos': historicos,
+    })
+
+
+def _limpar(conn):
+    """Remove os usuários criados pelo benchmark (registros e vítimas que sobraram)."""
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM usuarios WHERE email LIKE %s", (f"{PREFIXO_BENCH}%@calmou.dev",))
+        removidos = cursor.rowcount
+    conn.commit()
+    return removidos
+
+
+def _carregar_app():
+    """Importa o app com rate limiting desligado, Server-Timing ligado e sem logs de INFO."""
+    import app as modulo_app
+
+    modulo_app.limiter.enabled = False
+    modulo_app.app.config['DB_SERVER_TIMING'] = True
+    modulo_app.app.logger.setLevel(logging.WARNING)
+    return modulo_app.app
+
+
+# ==================== MEDIÇÃO ====================
+
+def medir_rota(contexto, rota, concorrencia, duracao, aquecimento, semente=0):
+    """Roda `rota` em `concorrencia` threads; devolve o resumo da janela medida."""
+    inicio_medicao = time.perf_counter() + aquecimento
+    fim = inicio_medicao + duracao
+    resultados = []
+
+    def trabalhador(indice):
+        rng = random.Random(f"{semente}:{rota.nome}:{indice}")
+        cliente = contexto.app.test_client()
+        latencias, consultas, status, erros = [], [], collections.Counter(), collections.Counter()
+        ultimo = inicio_medicao
+        while time.perf_counter() < fim:
+            pedido = rota.montar(contexto, rng, contexto.usuario(rng))
+            if not pedido:
+                break  # registros descartáveis acabaram
+            antes = time.perf_counter()
+            try:
+                resposta = cliente.open(pedido.caminho, method=rota.metodo, json=pedido.corpo,
+                                        headers=contexto.cabecalhos(pedido))
+                codigo = resposta.status_code
+                medicao = medicao_da_resposta(resposta)
+                resposta.get_data()  # respostas em fluxo só geram o corpo quando ele é lido
+                resposta.close()
+            except Exception as error:
+                codigo, medicao = None, (None, None)
+                erros[type(error).__name__] += 1
+            depois = time.perf_counter()
+            if antes < inicio_medicao:
+                continue
+            latencias.append((depois - antes) * 1000)
+            if medicao[0] is not None:
+                consultas.append(medicao)
+            status[str(codigo)] += 1
+            if codigo is not None and codigo != rota.status:
+                erros[f"HTTP {codigo}"] += 1
+            ultimo = depois
+        resultados.append((latencias, consultas, status, erros, ultimo))
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencias = [v for r in resultados for v in r[0]]
+    consultas = [v for r in resultados for v, _ in r[1]]
+    tempos_db = [v for r in resultados for _, v in r[1]]
+    status = sum((r[2] for r in resultados), collections.Counter())
+    erros = sum((r[3] for r in resultados), collections.Counter())
+    # Rotas que esgotam os registros descartáveis param antes do fim da janela
+    decorrido = max(min(fim, max(r[4] for r in resultados)) - inicio_medicao, 1e-9)
+
+    linha = resumir({rota.nome: latencias}, decorrido)['por_rota'][rota.nome]
+    linha.update({
+        'duracao_s': round(decorrido, 2),
+        'consultas_por_requisicao': round(statistics.mean(consultas), 2) if consultas else None,
+        'consultas_max': max(consultas) if consultas else None,
+        'db_media_ms': round(statistics.mean(tempos_db), 2) if tempos_db else None,
+        'status': dict(sorted(status.items())),
+        'erros': dict(sorted(erros.items())),
+    })
+    return linha
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(parametros, args, rotas):
+    """Prepara os dados no banco de `parametros` e mede cada rota em sequência."""
+    # O pool do conexao aponta para o banco medido (sem réplica)
+    Config.POSTGRES_DSN = extensions.make_dsn(**{
+        ('dbname' if chave == 'database' else chave): valor for chave, valor in parametros.items()
+    })
+    Config.POSTGRES_REPLICA_DSN = None
+    app = _carregar_app()
+
+    faltando = rotas_sem_cobertura(app)
+    if faltando:
+        raise SystemExit("❌ Rotas do app sem cenário no benchmark: "
+                         + ', '.join(f"{metodo} {regra}" for metodo, regra in faltando))
+
+    conn = psycopg2.connect(**parametros)
+    try:
+        contexto = _preparar(conn, app, args.amostra, args.vitimas, args.semente)
+        resultado = {}
+        with open(os.devnull, 'w') as nulo:
+            for rota in rotas:
+                # Os print() do controller iriam para o terminal a cada requisição
+                with contextlib.redirect_stdout(nulo):
+                    linha = medir_rota(contexto, rota, args.concorrencia, args.duracao,
+                                       args.aquecimento, args.semente)
+                resultado[rota.nome] = linha
+                print(_formatar(rota.nome, linha), flush=True)
+    finally:
+        removidos = _limpar(conn)
+        conn.close()
+        conexao.fechar_pool()
+    if removidos:
+        print(f"🧹 {removidos} usuários do benchmark removidos")
+    return resultado
+
+
+# ==================== RELATÓRIO ====================
+
+CABECALHO = f"{'rota':<50} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL/req':>8}  status"
+
+
+def _ms(valor):
+    return f"{valor:8.2f}" if valor is not None else f"{'-':>8}"
+
+
+def _formatar(nome, linha):
+    consultas = linha['consultas_por_requisicao']
+    status = ' '.join(f"{codigo}×{n}" for codigo, n in linha['status'].items())
+    return (f"{nome:<50} {linha['rps']:8.1f} {_ms(linha['p50_ms'])} {_ms(linha['p95_ms'])} "
+            f"{_ms(linha['p99_ms'])} {_ms(consultas)}  {status}")
+
+
+def _variacao(atual, anterior):
+    if not atual or not anterior:
+        return f"{'-':>8}"
+    return f"{(atual - anterior) / anterior * 100:+7.1f}%"
+
+
+def comparar(rotas, anteriores):
+    """Linhas de texto com a variação de cada rota contra uma execução anterior."""
+    linhas = [f"{'rota':<50} {'req/s':>8} {'p95':>8} {'SQL/req':>8}"]
+    for nome, linha in rotas.items():
+        anterior = anteriores.get(nome)
+        if anterior is None:
+            linhas.append(f"{nome:<50} (nova)")
+            continue
+        consultas = linha['consultas_por_requisicao'] or 0
+        diferenca = consultas - (anterior['consultas_por_requisicao'] or 0)
+        linhas.append(f"{nome:<50} {_variacao(linha['rps'], anterior['rps'])} "
+                      f"{_variacao(linha['p95_ms'], anterior['p95_ms'])} {diferenca:+8.2f}")
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta das rotas do app.py (WSGI)")
+    parser.add_argument('--concorrencia', type=int, default=8, help='threads por rota')
+    parser.add_argument('--duracao', type=float, default=10, help='segundos medidos por rota')
+    parser.add_argument('--aquecimento', type=float, default=1, help='segundos descartados por rota')
+    parser.add_argument('--rotas', help='só as rotas cujo nome contém algum destes trechos (vírgulas)')
+    parser.add_argument('--banco-env', action='store_true',
+                        help='usa o banco do .env (já populado) em vez de um descartável')
+    parser.add_argument('--usuarios', type=int, default=20000,
+                        help='escala do gerador de dados sintéticos no banco descartável')
+    parser.add_argument('--semente', type=int, default=dados_sinteticos.PADROES['semente'])
+    parser.add_argument('--amostra', type=int, default=500, help='usuários sorteados para as requisições')
+    parser.add_argument('--vitimas', type=int, default=5000,
+                        help='usuários e registros criados para cada rota de exclusão')
+    parser.add_argument('--json', help='salva o resultado neste arquivo')
+    parser.add_argument('--comparar', help='resultado JSON anterior para comparar')
+    args = parser.parse_args()
+
+    rotas = ROTAS
+    if args.rotas:
+        trechos = args.rotas.split(',')
+        rotas = [rota for rota in ROTAS if any(trecho in rota.nome for trecho in trechos)]
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            anteriores = json.load(arquivo)['rotas']
+
+    print(f"🚀 {len(rotas)} rotas, {args.concorrencia} threads, {args.duracao:g}s cada\n")
+    if args.banco_env:
+        parametros = dict(host=Config.POSTGRES_HOST, port=Config.POSTGRES_PORT, user=Config.POSTGRES_USER,
+                          password=Config.POSTGRES_PASSWORD, database=Config.POSTGRES_DB)
+        print(CABECALHO)
+        resultado = executar(parametros, args, rotas)
+    else:
+        with postgres_descartavel() as parametros:
+            conn = psycopg2.connect(**parametros)
+            try:
+                print(f"🧪 Gerando dados sintéticos ({args.usuarios:,} usuários)...")
+                dados_sinteticos.gerar(conn, progresso=lambda *_: None, substituir=True,
+                                       usuarios=args.usuarios, semente=args.semente)
+            finally:
+                conn.close()
+            print(CABECALHO)
+            resultado = executar(parametros, args, rotas)
+
+    saida = {
+        'gerado_em': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'banco': 'env' if args.banco_env else {'descartavel': True, 'usuarios': args.usuarios},
+        'parametros': {chave: getattr(args, chave) for chave in
+                       ('concorrencia', 'duracao', 'aquecimento', 'semente', 'amostra', 'vitimas')},
+        'rotas': resultado,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(saida, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultado salvo em {args.json}")
+
+    if anteriores is not None:
+        print(f"\n📊 Comparação com {args.comparar}")
+        for linha in comparar(resultado, anteriores):
+            print(linha)
+
+    if any(linha['erros'] for linha in resultado.values()):
+        print("\n⚠️  Houve respostas inesperadas; veja a coluna status")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
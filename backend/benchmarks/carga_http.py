@@ -0,0 +1,147 @@
+"""
+Gerador de carga HTTP/1.1 mínimo (asyncio puro, conexões keep-alive).
+
+Cada "cliente" é uma conexão TCP própria que repete requisições até o fim do
+tempo; com 1000 clientes são 1000 sockets abertos ao mesmo tempo, que é o que
+importa para comparar servidores síncronos e assíncronos. Sem dependências
+externas para o cliente não virar o gargalo da medição.
+"""
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+class Requisicao:
+    """Uma requisição do roteiro de carga."""
+
+    def __init__(self, metodo, caminho, corpo=None, token=None, nome=None):
+        self.metodo = metodo
+        self.caminho = caminho
+        self.nome = nome or f"{metodo} {caminho}"
+        self.corpo = json.dumps(corpo).encode() if corpo is not None else b''
+        self.token = token
+
+    def bytes(self, host):
+        linhas = [
+            f"{self.metodo} {self.caminho} HTTP/1.1",
+            f"Host: {host}",
+            "Connection: keep-alive",
+            f"Content-Length: {len(self.corpo)}",
+        ]
+        if self.corpo:
+            linhas.append("Content-Type: application/json")
+        if self.token:
+            linhas.append(f"Authorization: Bearer {self.token}")
+        return ("\r\n".join(linhas) + "\r\n\r\n").encode() + self.corpo
+
+
+async def _ler_resposta(leitor):
+    """Lê uma resposta completa; devolve (status, cabeçalhos, corpo)."""
+    linha_status = await leitor.readline()
+    if not linha_status:
+        raise ConnectionError("conexão fechada pelo servidor")
+    status = int(linha_status.split()[1])
+
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        chave, _, valor = linha.decode('latin-1').partition(':')
+        cabecalhos[chave.strip().lower()] = valor.strip()
+
+    if cabecalhos.get('transfer-encoding') == 'chunked':
+        partes = []
+        while True:
+            tamanho = int((await leitor.readline()).strip(), 16)
+            if tamanho == 0:
+                await leitor.readline()
+                break
+            partes.append(await leitor.readexactly(tamanho))
+            await leitor.readline()
+        corpo = b''.join(partes)
+    else:
+        corpo = await leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+
+    return status, cabecalhos, corpo
+
+
+async def _cliente(url, roteiro, fim, amostras, erros, deslocamento):
+    partes = urlsplit(url)
+    host = partes.netloc
+    indice = deslocamento
+    leitor = escritor = None
+
+    while time.perf_counter() < fim:
+        requisicao = roteiro[indice % len(roteiro)]
+        indice += 1
+        try:
+            if escritor is None:
+                leitor, escritor = await asyncio.open_connection(partes.hostname, partes.port)
+            inicio = time.perf_counter()
+            escritor.write(requisicao.bytes(host))
+            await escritor.drain()
+            status, cabecalhos, _ = await _ler_resposta(leitor)
+            amostras.setdefault(requisicao.nome, []).append(
+                (time.perf_counter() - inicio) * 1000
+            )
+            if status >= 500:
+                erros[requisicao.nome] = erros.get(requisicao.nome, 0) + 1
+            if cabecalhos.get('connection', '').lower() == 'close':
+                escritor.close()
+                leitor = escritor = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            erros[requisicao.nome] = erros.get(requisicao.nome, 0) + 1
+            if escritor is not None:
+                escritor.close()
+            leitor = escritor = None
+            await asyncio.sleep(0.01)
+
+    if escritor is not None:
+        escritor.close()
+
+
+def percentil(valores, p):
+    """Percentil por ordenação (valores já em ms)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def resumir(amostras, duracao):
+    """Throughput e p50/p95/p99 por requisição e no total."""
+    def linha(valores):
+        return {
+            'requisicoes': len(valores),
+            'rps': round(len(valores) / duracao, 1),
+            'media_ms': round(statistics.mean(valores), 2) if valores else None,
+            'p50_ms': round(percentil(valores, 50), 2) if valores else None,
+            'p95_ms': round(percentil(valores, 95), 2) if valores else None,
+            'p99_ms': round(percentil(valores, 99), 2) if valores else None,
+        }
+
+    todos = [v for valores in amostras.values() for v in valores]
+    return {
+        'total': linha(todos),
+        'por_rota': {nome: linha(valores) for nome, valores in sorted(amostras.items())},
+    }
+
+
+async def executar_carga(url, roteiro, concorrencia, duracao):
+    """
+    Abre `concorrencia` conexões contra `url` e repete o `roteiro` por
+    `duracao` segundos. Devolve o resumo de resumir() mais os erros.
+    """
+    amostras, erros = {}, {}
+    fim = time.perf_counter() + duracao
+    await asyncio.gather(*(
+        _cliente(url, roteiro, fim, amostras, erros, i) for i in range(concorrencia)
+    ))
+    resultado = resumir(amostras, duracao)
+    resultado['erros'] = erros
+    resultado['concorrencia'] = concorrencia
+    resultado['duracao_s'] = duracao
+    return resultado
@@ -0,0 +1,111 @@
+"""
+PostgreSQL descartável para benchmarks e harnesses.
+
+Cria um cluster novo em um diretório temporário (initdb), sobe em um socket
+Unix local sem TCP, carrega o esquema do calmousql.sql e aplica as migrações.
+Ao sair, para o servidor e apaga tudo. Nunca toca no banco do .env.
+
+Os binários vêm de PG_BIN (ou do PATH). Rodando como root, o servidor é
+iniciado com `runuser` pelo usuário de sistema em PG_USUARIO_SO (padrão: postgres).
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+import psycopg2
+
+from migrations import migrar
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Durabilidade desligada: o cluster é jogado fora ao final
+_CONFIGURACOES = {
+    'fsync': 'off',
+    'synchronous_commit': 'off',
+    'full_page_writes': 'off',
+    'shared_buffers': '256MB',
+    'max_connections': '200',
+}
+
+
+def _binario(nome):
+    pasta = os.getenv('PG_BIN')
+    caminho = os.path.join(pasta, nome) if pasta else shutil.which(nome)
+    if not caminho or not os.path.exists(caminho):
+        raise SystemExit(f"❌ '{nome}' não encontrado; defina PG_BIN com a pasta bin do PostgreSQL")
+    return caminho
+
+
+def _rodar(comando, usuario_so):
+    if usuario_so:
+        comando = ['runuser', '-u', usuario_so, '--'] + comando
+    subprocess.run(comando, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esquema_sql():
+    """Parte do calmousql.sql que roda dentro do banco, sem os comandos do psql."""
+    with open(os.path.join(BACKEND, 'calmousql.sql'), encoding='utf-8') as arquivo:
+        linhas = arquivo.read().splitlines()
+    inicio = next(i for i, linha in enumerate(linhas) if linha.startswith('\\connect'))
+    return '\n'.join(
+        linha for linha in linhas[inicio:]
+        # transaction_timeout só existe a partir do PostgreSQL 17 (versão do dump)
+        if not linha.startswith('\\') and not linha.startswith('SET transaction_timeout')
+    )
+
+
+@contextmanager
+def postgres_descartavel(banco='calmou'):
+    """Sobe o cluster e devolve os parâmetros de conexão (dict para psycopg2.connect)."""
+    usuario_so = None
+    if os.geteuid() == 0:
+        usuario_so = os.getenv('PG_USUARIO_SO', 'postgres')
+
+    diretorio = tempfile.mkdtemp(prefix='calmou-pg-')
+    dados = os.path.join(diretorio, 'dados')
+    if usuario_so:
+        shutil.chown(diretorio, usuario_so)
+    porta = _porta_livre()
+    opcoes = ' '.join(
+        [f"-k {diretorio}", f"-p {porta}", "-c listen_addresses=''"]
+        + [f"-c {chave}={valor}" for chave, valor in _CONFIGURACOES.items()]
+    )
+
+    iniciado = False
+    try:
+        _rodar([_binario('initdb'), '-D', dados, '-U', 'postgres', '--auth=trust',
+                '-E', 'UTF8', '--no-instructions'], usuario_so)
+        _rodar([_binario('pg_ctl'), '-D', dados, '-o', opcoes, '-w', '-l',
+                os.path.join(diretorio, 'postgres.log'), 'start'], usuario_so)
+        iniciado = True
+
+        parametros = {'host': diretorio, 'port': porta, 'user': 'postgres'}
+        conn = psycopg2.connect(database='postgres', **parametros)
+        conn.autocommit = True
+        conn.cursor().execute(f'CREATE DATABASE {banco}')
+        conn.close()
+
+        parametros['database'] = banco
+        conn = psycopg2.connect(**parametros)
+        with conn.cursor() as cursor:
+            cursor.execute(esquema_sql())
+            # O dump zera o search_path da sessão
+            cursor.execute("SET search_path = public")
+        conn.commit()
+        migrar.migrar(conn)
+        conn.close()
+
+        yield parametros
+    finally:
+        if iniciado:
+            _rodar([_binario('pg_ctl'), '-D', dados, '-m', 'immediate', 'stop'], usuario_so)
+        shutil.rmtree(diretorio, ignore_errors=True)
@@ -0,0 +1,463 @@
+"""
+Regressão de planos: todo SQL do controller e dos relatórios sob EXPLAIN ANALYZE.
+
+Sobe um PostgreSQL descartável (benchmarks/postgres_descartavel.py), popula
+com o gerador de dados sintéticos (dados_sinteticos.py) e chama cada função de
+controller/controller_usuario.py e eports/relatorios.py. Cada comando que elas
+enviam ao banco é capturado no cursor e roda antes com
+EXPLAIN (ANALYZE, BUFFERS), dentro de um SAVEPOINT desfeito em seguida.
+
+Para cada comando registra a forma do plano (nós, tabelas e índices), os
+buffers e a mediana do tempo de execução. Comparando com a baseline, falha se:
+- algum comando faz Seq Scan em tabela grande (fora de PERMITIR_SEQ_SCAN);
+- algum comando ficou mais lento que a baseline além do limite;
+- alguma chamada a execute/executar_preparado do código não foi exercitada.
+Mudanças na forma do plano só geram aviso.
+
+Uso (a partir de backend/; PG_BIN aponta para os binários do PostgreSQL):
+    python -m benchmarks.regressao_planos --gravar   # grava a baseline
+    python -m benchmarks.regressao_planos            # compara com a baseline
+"""
+import argparse
+import ast
+import datetime
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+
+import psycopg2
+from psycopg2 import extensions
+
+import conexao
+import dados_sinteticos
+from benchmarks.postgres_descartavel import BACKEND, postgres_descartavel
+from config import Config
+from model.classificacao_humor import ClassificacaoHumor
+from model.historico_meditacao import HistoricoMeditacao
+from model.meditacao import Meditacao
+from model.resultado_avaliacao import ResultadoAvaliacao
+from model.usuario import Usuario
+
+ARQUIVOS = {
+    os.path.join(BACKEND, 'controller', 'controller_usuario.py'): 'controller_usuario.py',
+    os.path.join(BACKEND, 'eports', 'relatorios.py'): 'relatorios.py',
+}
+BASELINE = os.path.join(BACKEND, 'benchmarks', 'planos_baseline.json')
+
+# Funções que leem tabelas inteiras de propósito: Seq Scan é o plano certo
+PERMITIR_SEQ_SCAN = {
+    ('controller_usuario.py', 'listar_usuarios'): 'GET /usuarios sem paginação: todos os usuários',
+    ('controller_usuario.py', 'iterar_usuarios'): 'percorre todos os usuários (CLI), em lotes',
+    ('controller_usuario.py', 'reconstruir_estatisticas_meditacao'): 'refaz o resumo a partir do histórico inteiro',
+    ('controller_usuario.py', 'verificar_estatisticas_meditacao'): 'confere o resumo com o histórico inteiro',
+    ('controller_usuario.py', 'reconstruir_humor_diario'): 'refaz o resumo diário a partir de todo o humor',
+    ('relatorios.py', 'relatorio_meditacoes_por_usuario'): 'agrega o histórico inteiro',
+    ('relatorios.py', 'relatorio_historico_detalhado'): 'lista o histórico inteiro',
+}
+
+
+# ==================== INVENTÁRIO ESTÁTICO ====================
+
+def _eh_chamada_sql(no):
+    if not isinstance(no, ast.Call):
+        return False
+    funcao = no.func
+    return (isinstance(funcao, ast.Attribute) and funcao.attr == 'execute') or \
+        (isinstance(funcao, ast.Name) and funcao.id == 'executar_preparado')
+
+
+def inventario():
+    """{arquivo: {funcao: [(ordinal, linha_inicial, linha_final)]}} de cada chamada que envia SQL."""
+    locais = {}
+    for caminho, arquivo in ARQUIVOS.items():
+        with open(caminho, encoding='utf-8') as fonte:
+            arvore = ast.parse(fonte.read())
+        por_funcao = locais.setdefault(arquivo, {})
+        for funcao in arvore.body:
+            if not isinstance(funcao, ast.FunctionDef):
+                continue
+            chamadas = sorted((no for no in ast.walk(funcao) if _eh_chamada_sql(no)),
+                              key=lambda no: (no.lineno, no.col_offset))
+            if chamadas:
+                por_funcao[funcao.name] = [
+                    (ordinal, no.lineno, no.end_lineno) for ordinal, no in enumerate(chamadas, 1)
+                ]
+    return locais
+
+
+def _local_da_chamada(locais):
+    """Primeiro quadro da pilha dentro dos arquivos monitorados -> 'arquivo:funcao#n'."""
+    quadro = sys._getframe(2)
+    while quadro is not None:
+        arquivo = ARQUIVOS.get(quadro.f_code.co_filename)
+        if arquivo:
+            funcao = quadro.f_code.co_name
+            for ordinal, inicio, fim in locais[arquivo].get(funcao, []):
+                if inicio <= quadro.f_lineno <= fim:
+                    return f"{arquivo}:{funcao}#{ordinal}"
+            return f"{arquivo}:{funcao}@{quadro.f_lineno}"
+        quadro = quadro.f_back
+    return None
+
+
+# ==================== CAPTURA ====================
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get('Plans', []):
+        yield from _nos(filho)
+
+
+def forma_do_plano(plano):
+    """Representação estável do plano: tipos de nó, tabelas e índices (sem custos)."""
+    rotulo = plano['Node Type']
+    if plano.get('Index Name'):
+        rotulo += f" using {plano['Index Name']}"
+    if plano.get('Relation Name'):
+        rotulo += f" on {plano['Relation Name']}"
+    filhos = [forma_do_plano(filho) for filho in plano.get('Plans', [])]
+    return f"{rotulo}({', '.join(filhos)})" if filhos else rotulo
+
+
+class _Coletor:
+    """Roda EXPLAIN ANALYZE de cada comando capturado e guarda o resultado."""
+
+    def __init__(self, repeticoes):
+        self.repeticoes = repeticoes
+        self.locais = inventario()
+        self.consultas = {}
+        self._vistos = {}
+
+    def _chave(self, local, sql):
+        """Mesmo local com SQL diferente (laço, f-string) ganha sufixo /2, /3..."""
+        textos = self._vistos.setdefault(local, [])
+        if sql not in textos:
+            textos.append(sql)
+        indice = textos.index(sql) + 1
+        return local if indice == 1 else f"{local}/{indice}"
+
+    def registrar(self, cursor, sql, params):
+        local = _local_da_chamada(self.locais)
+        if local is None:
+            return
+        texto = ' '.join(sql.split())
+        chave = self._chave(local, texto)
+        if chave in self.consultas:
+            return
+
+        executar = extensions.cursor.execute
+        if cursor.name:
+            # Cursor nomeado: o EXPLAIN vai por um cursor comum da mesma transação
+            cursor = cursor.connection.cursor()
+        planos = []
+        executar(cursor, "SAVEPOINT regressao_planos")
+        try:
+            # A primeira execução só aquece o cache; as demais entram na mediana
+            for _ in range(self.repeticoes + 1):
+                executar(cursor, f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+                planos.append(cursor.fetchone()[0][0])
+                executar(cursor, "ROLLBACK TO SAVEPOINT regressao_planos")
+        finally:
+            executar(cursor, "RELEASE SAVEPOINT regressao_planos")
+
+        medidos = planos[1:]
+        plano = medidos[-1]['Plan']
+        self.consultas[chave] = {
+            'sql': texto,
+            'plano': forma_do_plano(plano),
+            'tempo_ms': round(statistics.median(p['Execution Time'] for p in medidos), 3),
+            'planejamento_ms': round(statistics.median(p['Planning Time'] for p in medidos), 3),
+            'linhas': plano.get('Actual Rows'),
+            'buffers': {
+                'hit': plano.get('Shared Hit Blocks', 0),
+                'read': plano.get('Shared Read Blocks', 0),
+            },
+            'seq_scans': sorted({n['Relation Name'] for n in _nos(plano)
+                                 if n['Node Type'] == 'Seq Scan' and n.get('Relation Name')}),
+        }
+
+
+class _CursorRegistro(extensions.cursor):
+    def execute(self, sql, params=None):
+        self.connection.coletor.registrar(self, sql, params)
+        return super().execute(sql, params)
+
+
+class _ConexaoRegistro(extensions.connection):
+    """Conexão fora do pool: executar_preparado cai no SQL comum e é capturado."""
+    coletor = None
+
+
+# ==================== DADOS ====================
+
+def _tamanhos(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT relname, reltuples::bigint FROM pg_class
+            WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace
+        """)
+        return dict(cursor.fetchall())
+
+
+# ==================== ROTEIRO ====================
+
+def _roteiro(cursor):
+    """(descrição, chamada) cobrindo todas as funções e os dois lados de cada if."""
+    from controller import controller_usuario as c
+    from eports import relatorios
+
+    # Usuário de um registro do meio do histórico: sorteado pelo peso de atividade,
+    # como as requisições reais
+    cursor.execute("""
+        SELECT id, usuario_id, data_conclusao FROM historico_meditacoes
+        WHERE id = (SELECT MAX(id) / 2 FROM historico_meditacoes)
+    """)
+    historico_id, uid, data_conclusao = cursor.fetchone()
+    # Página do meio do histórico do usuário: começa depois deste registro
+    cursor_historico = c.codificar_cursor_historico(data_conclusao, historico_id)
+    email = dados_sinteticos.email_usuario(uid)
+    # Páginas de usuários do meio: por id e pelo primeiro nome do usuário sorteado
+    cursor.execute("SELECT split_part(nome, ' ', 1), lower(nome) FROM usuarios WHERE id = %s", (uid,))
+    prefixo, chave_nome = cursor.fetchone()
+    cursor.execute("SELECT (enum_range(NULL::tipo_avaliacao))[1]")
+    tipo = cursor.fetchone()[0]
+    # Página do meio das avaliações do usuário
+    cursor.execute("""
+        SELECT id, data_avaliacao FROM resultados_avaliacoes WHERE usuario_id = %s
+        ORDER BY id OFFSET (SELECT count(*) / 2 FROM resultados_avaliacoes WHERE usuario_id = %s) LIMIT 1
+    """, (uid, uid))
+    linha = cursor.fetchone()
+    cursor_avaliacoes = linha and c._codificar_cursor_data(linha[1], linha[0])
+    ano_passado = datetime.date.today() - datetime.timedelta(days=365)
+
+    def usuario(**extras):
+        return Usuario(id=uid, nome='Harness', email=email, config=None, **extras)
+
+    def relatorio(funcao):
+        # O arquivo gerado não interessa aqui
+        with tempfile.TemporaryDirectory() as pasta:
+            funcao('csv', os.path.join(pasta, 'relatorio.csv'))
+
+    def com_cursor(funcao):
+        with conexao.obter_cursor() as cursor_unidade:
+            funcao(cursor_unidade)
+
+    return [
+        ('inserir_usuario', lambda: c.inserir_usuario(
+            Usuario(nome='Novo', email='novo@calmou.app', password='senha-harness'))),
+        ('listar_usuarios', c.listar_usuarios),
+        ('listar_usuarios_pagina', lambda: c.listar_usuarios_pagina(50)),
+        ('listar_usuarios_pagina (cursor)', lambda: c.listar_usuarios_pagina(50, c._codificar_cursor('', uid))),
+        ('listar_usuarios_pagina (prefixo)', lambda: c.listar_usuarios_pagina(50, prefixo=prefixo)),
+        ('listar_usuarios_pagina (prefixo, cursor)', lambda: c.listar_usuarios_pagina(
+            50, c._codificar_cursor(chave_nome, uid), prefixo)),
+        ('iterar_usuarios', lambda: sum(1 for _ in c.iterar_usuarios())),
+        ('iterar_usuarios (prefixo)', lambda: sum(1 for _ in c.iterar_usuarios(prefixo))),
+        # Direto no banco: pelo cache de usuários, as repetições não consultariam nada
+        ('buscar_usuario_por_email', lambda: c._carregar_projecao('calmou_usuario_por_email', 'email', email)),
+        ('buscar_usuario_por_id', lambda: c._carregar_projecao('calmou_usuario_por_id', 'id', uid)),
+        ('buscar_usuario_por_id (foto grande)', lambda: c._buscar_foto_perfil(uid)),
+        ('atualizar_usuario (com senha)', lambda: c.atualizar_usuario(usuario(password='nova-senha'))),
+        ('atualizar_usuario (sem senha)', lambda: c.atualizar_usuario(usuario())),
+        ('atualizar_perfil', lambda: c.atualizar_perfil(usuario(cpf='000.000.000-00'))),
+        ('remover_usuario', lambda: c.remover_usuario(uid)),
+        ('obter_versao_dados', lambda: c.obter_versao_dados(uid, 'historico')),
+        ('hoje_no_banco', c.hoje_no_banco),
+        ('inserir_classificacao_humor', lambda: c.inserir_classificacao_humor(
+            ClassificacaoHumor(None, uid, 4, 'Calmo', 'harness'))),
+        ('relatorio_humor_semanal', lambda: c.relatorio_humor_semanal(uid)),
+        ('relatorio_humor', lambda: c.relatorio_humor(uid, *c.periodo_relatorio_humor(
+            None, None, 'semana', datetime.date.today())[:2], 'semana')),
+        ('listar_meditacoes', c.listar_meditacoes),
+        ('buscar_meditacao_por_id', lambda: c.buscar_meditacao_por_id(1)),
+        ('inserir_meditacao', lambda: c.inserir_meditacao(
+            Meditacao(None, 'Harness', 'desc', 10, None, 'guiada', 'Foco', None))),
+        ('registrar_meditacao_concluida', lambda: c.registrar_meditacao_concluida(
+            HistoricoMeditacao(usuario_id=uid, meditacao_id=1, duracao_real_minutos=10))),
+        ('listar_historico_meditacoes (limit)', lambda: c.listar_historico_meditacoes(uid, limit=20)),
+        ('listar_historico_meditacoes', lambda: c.listar_historico_meditacoes(uid)),
+        ('listar_historico_pagina', lambda: c.listar_historico_pagina(uid, 50)),
+        ('listar_historico_pagina (cursor)', lambda: c.listar_historico_pagina(uid, 50, cursor_historico)),
+        ('listar_historico_pagina (sem meditação)', lambda: c.listar_historico_pagina(
+            uid, 50, cursor_historico, incluir_meditacao=False)),
+        # Direto no banco: pelo cache compartilhado, as repetições não consultariam nada
+        ('obter_estatisticas_meditacoes', lambda: c._calcular_estatisticas_meditacoes(uid)),
+        ('remover_historico_meditacao', lambda: c.remover_historico_meditacao(historico_id, uid)),
+        ('inserir_resultado_avaliacao', lambda: c.inserir_resultado_avaliacao(
+            ResultadoAvaliacao(None, uid, tipo, {'q1': 1}, 7, 'Leve'))),
+        ('buscar_avaliacoes_usuario (tipo)', lambda: c.buscar_avaliacoes_usuario(uid, tipo)),
+        ('buscar_avaliacoes_usuario', lambda: c.buscar_avaliacoes_usuario(uid)),
+        ('buscar_avaliacoes_usuario (cursor)', lambda: c.buscar_avaliacoes_usuario(
+            uid, cursor=cursor_avaliacoes)),
+        ('buscar_avaliacoes_usuario (tipo, período, respostas)', lambda: c.buscar_avaliacoes_usuario(
+            uid, tipo, de=ano_passado, ate=datetime.date.today(), incluir_respostas=True)),
+        ('ultimas_avaliacoes_usuario', lambda: c.ultimas_avaliacoes_usuario(uid)),
+        ('buscar_ultima_avaliacao_usuario', lambda: c.buscar_ultima_avaliacao_usuario(uid, tipo)),
+        # Direto no banco: pelo cache do processo, as repetições não consultariam nada
+        ('contar_registros (exato)', lambda: c.contar_registros('exato')),
+        ('contar_registros (estimado)', lambda: c.contar_registros('estimado')),
+        ('verificar_estatisticas_meditacao', lambda: com_cursor(c.verificar_estatisticas_meditacao)),
+        ('reconstruir_estatisticas_meditacao', lambda: com_cursor(c.reconstruir_estatisticas_meditacao)),
+        ('reconstruir_humor_diario', lambda: com_cursor(c.reconstruir_humor_diario)),
+        ('listar_avaliacoes_por_usuario', lambda: c.listar_avaliacoes_por_usuario(uid)),
+        ('exportar_dados_usuario', lambda: [sum(1 for _ in linhas) for _, _, linhas in c.exportar_dados_usuario(uid)]),
+        ('excluir_conta_completa', lambda: c.excluir_conta_completa(uid)),
+        ('relatorio_meditacoes_por_usuario', lambda: relatorio(relatorios.relatorio_meditacoes_por_usuario)),
+        ('relatorio_historico_detalhado', lambda: relatorio(relatorios.relatorio_historico_detalhado)),
+    ]
+
+
+def capturar(parametros, repeticoes):
+    """Roda o roteiro no banco de `parametros`; devolve {chave: consulta}."""
+    # O pool do conexao também aponta para o banco descartável (sem réplica)
+    Config.POSTGRES_DSN = extensions.make_dsn(**{
+        ('dbname' if chave == 'database' else chave): valor for chave, valor in parametros.items()
+    })
+    Config.POSTGRES_REPLICA_DSN = None
+
+    coletor = _Coletor(repeticoes)
+    conn = psycopg2.connect(connection_factory=_ConexaoRegistro, **parametros)
+    conn.coletor = coletor
+    try:
+        with conn.cursor() as cursor:
+            roteiro = _roteiro(cursor)
+        conn.rollback()
+        conn.cursor_factory = _CursorRegistro
+
+        for descricao, chamada in roteiro:
+            print(f"  ▶️  {descricao}")
+            # Cada chamada roda na conexão de captura e é desfeita no final
+            with conexao.unidade_de_trabalho() as unidade:
+                unidade.conn = conn
+                try:
+                    chamada()
+                except Exception as error:
+                    print(f"  ⚠️  {descricao}: {error}")
+                finally:
+                    conn.rollback()
+                    unidade.conn = None
+    finally:
+        conn.close()
+        conexao.fechar_pool()
+    return coletor.consultas, coletor.locais
+
+
+# ==================== COMPARAÇÃO ====================
+
+def _local_base(chave):
+    return chave.split('/')[0]
+
+
+def avaliar(consultas, locais, tamanhos, baseline, linhas_grandes, limite, piso_ms):
+    """Devolve (falhas, avisos) comparando a execução atual com as regras e a baseline."""
+    falhas, avisos = [], []
+
+    for chave, consulta in consultas.items():
+        arquivo, funcao = re.match(r'([^:]+):([^#@]+)', chave).groups()
+        grandes = [t for t in consulta['seq_scans'] if tamanhos.get(t, 0) > linhas_grandes]
+        if grandes and (arquivo, funcao) not in PERMITIR_SEQ_SCAN:
+            falhas.append(f"{chave}: Seq Scan em {', '.join(grandes)}")
+
+        anterior = (baseline or {}).get(chave)
+        if anterior is None:
+            if baseline is not None:
+                avisos.append(f"{chave}: comando novo (sem baseline)")
+            continue
+        if consulta['plano'] != anterior['plano']:
+            avisos.append(f"{chave}: plano mudou\n      antes: {anterior['plano']}\n      agora: {consulta['plano']}")
+        diferenca = consulta['tempo_ms'] - anterior['tempo_ms']
+        if consulta['tempo_ms'] > anterior['tempo_ms'] * (1 + limite) and diferenca > piso_ms:
+            falhas.append(
+                f"{chave}: {anterior['tempo_ms']:.3f} ms -> {consulta['tempo_ms']:.3f} ms (+{diferenca:.3f} ms)"
+            )
+
+    exercitados = {_local_base(chave) for chave in consultas}
+    for arquivo, funcoes in locais.items():
+        for funcao, chamadas in funcoes.items():
+            for ordinal, inicio, _ in chamadas:
+                local = f"{arquivo}:{funcao}#{ordinal}"
+                if local not in exercitados:
+                    falhas.append(f"{local} (linha {inicio}): SQL não exercitado pelo roteiro")
+
+    for chave in (baseline or {}):
+        if chave not in consultas:
+            avisos.append(f"{chave}: está na baseline mas não rodou")
+    return falhas, avisos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regressão de planos do SQL do controller")
+    parser.add_argument('--gravar', action='store_true', help='grava a execução como nova baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--usuarios', type=int, default=20000,
+                        help='escala do gerador de dados sintéticos (~85 linhas por usuário)')
+    parser.add_argument('--semente', type=int, default=dados_sinteticos.PADROES['semente'])
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções medidas por comando')
+    parser.add_argument('--linhas-grandes', type=int, default=10000,
+                        help='tabelas acima disso não podem ter Seq Scan')
+    parser.add_argument('--limite-lentidao', type=float, default=0.5,
+                        help='fração acima da baseline que conta como regressão')
+    parser.add_argument('--piso-ms', type=float, default=1.0,
+                        help='diferenças absolutas menores que isso são ignoradas')
+    parser.add_argument('--json', help='salva o resultado desta execução neste arquivo')
+    args = parser.parse_args()
+
+    escala = {'usuarios': args.usuarios, 'semente': args.semente}
+    baseline = None
+    if not args.gravar:
+        if not os.path.exists(args.baseline):
+            raise SystemExit(f"❌ Baseline {args.baseline} não existe; rode com --gravar")
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        if dados['escala'] != escala:
+            raise SystemExit(f"❌ Baseline gravada com escala {dados['escala']}; use a mesma escala")
+        baseline = dados['consultas']
+
+    with postgres_descartavel() as parametros:
+        conn = psycopg2.connect(**parametros)
+        try:
+            print(f"🧪 Gerando dados sintéticos ({args.usuarios:,} usuários)...")
+            dados_sinteticos.gerar(conn, substituir=True, **escala)
+            tamanhos = _tamanhos(conn)
+        finally:
+            conn.close()
+        print("🔎 Capturando planos...")
+        consultas, locais = capturar(parametros, args.repeticoes)
+
+    falhas, avisos = avaliar(consultas, locais, tamanhos, baseline,
+                             args.linhas_grandes, args.limite_lentidao, args.piso_ms)
+
+    print()
+    for chave, consulta in sorted(consultas.items()):
+        anterior = (baseline or {}).get(chave)
+        base = f"  (baseline {anterior['tempo_ms']:.3f})" if anterior else ''
+        print(f"{chave:<58} {consulta['tempo_ms']:>9.3f} ms{base}  {consulta['plano']}")
+
+    resultado = {
+        'gerado_em': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'escala': escala,
+        'consultas': dict(sorted(consultas.items())),
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    if args.gravar:
+        with open(args.baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+            arquivo.write('\n')
+        print(f"\n💾 Baseline gravada em {args.baseline}")
+
+    for aviso in avisos:
+        print(f"⚠️  {aviso}")
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if falhas:
+        sys.exit(1)
+    print(f"\n✅ {len(consultas)} comandos sem regressão de plano")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+"""Caches em memória do processo e compartilhados entre workers"""
+from .atualizado import CacheAtualizado
+from .catalogo import CacheCatalogo, etag_forte
+from .compartilhado import CacheCompartilhado, CacheMemoria, CacheRedis, criar_backend
+from .usuarios import CacheUsuarios
+
+__all__ = [
+    'CacheAtualizado', 'CacheCatalogo', 'etag_forte',
+    'CacheCompartilhado', 'CacheMemoria', 'CacheRedis', 'criar_backend', 'CacheUsuarios',
+]
@@ -0,0 +1,132 @@
+"""
+Valores calculados em memória do processo, atualizados em segundo plano.
+
+Para leituras baratas de servir e caras (ou simplesmente repetitivas) de
+calcular, como os contadores de GET /stats: a requisição nunca espera o banco
+enquanto houver um valor com menos de `idade_maxima` segundos. Passado o `ttl`,
+a primeira leitura devolve o valor que já tem e dispara um recálculo em
+segundo plano (uma thread, ou uma task no loop de eventos do ASGI); só sem
+valor, ou com um valor velho demais, a leitura calcula na hora.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheAtualizado:
+    """
+    `obter(chave, calcular)` / `await obter_async(chave, calcular)`: valor de
+    `chave`, com `calcular()` devolvendo None quando falha (nada é gravado e o
+    valor anterior continua valendo até `idade_maxima`).
+    """
+
+    def __init__(self, ttl=60, idade_maxima=600):
+        self.ttl = ttl
+        self.idade_maxima = idade_maxima
+        self._valores = {}          # chave -> (valor, momento do cálculo)
+        self._atualizando = set()   # chaves com recálculo em segundo plano
+        self._lock = threading.Lock()
+        self._contadores = {
+            'acertos': 0,
+            'velhos': 0,
+            'calculos': 0,
+            'atualizacoes': 0,
+            'falhas': 0,
+        }
+
+    def _situacao(self, chave):
+        """(valor, 'fresco' | 'velho' | 'ausente')"""
+        valor, momento = self._valores.get(chave, (None, None))
+        if momento is None:
+            return None, 'ausente'
+        idade = time.monotonic() - momento
+        if idade < self.ttl:
+            return valor, 'fresco'
+        if idade < self.idade_maxima:
+            return valor, 'velho'
+        return None, 'ausente'
+
+    def _gravar(self, chave, valor):
+        if valor is None:
+            self._contadores['falhas'] += 1
+            return None
+        self._valores[chave] = (valor, time.monotonic())
+        return valor
+
+    def _reservar(self, chave):
+        """True se esta leitura deve disparar o recálculo (só uma por chave)."""
+        with self._lock:
+            if chave in self._atualizando:
+                return False
+            self._atualizando.add(chave)
+            return True
+
+    def _liberar(self, chave):
+        with self._lock:
+            self._atualizando.discard(chave)
+
+    def obter(self, chave, calcular):
+        valor, situacao = self._situacao(chave)
+        if situacao == 'fresco':
+            self._contadores['acertos'] += 1
+            return valor
+        if situacao == 'velho':
+            self._contadores['velhos'] += 1
+            if self._reservar(chave):
+                threading.Thread(target=self._atualizar, args=(chave, calcular),
+                                 name='calmou-cache-atualizado', daemon=True).start()
+            return valor
+        self._contadores['calculos'] += 1
+        return self._gravar(chave, calcular())
+
+    def _atualizar(self, chave, calcular):
+        try:
+            self._contadores['atualizacoes'] += 1
+            self._gravar(chave, calcular())
+        except Exception as error:
+            self._contadores['falhas'] += 1
+            logger.warning(f"⚠️  Atualização em segundo plano de '{chave}' falhou: {error}")
+        finally:
+            self._liberar(chave)
+
+    async def obter_async(self, chave, calcular):
+        """Como `obter`, com `calcular` sendo uma função async."""
+        valor, situacao = self._situacao(chave)
+        if situacao == 'fresco':
+            self._contadores['acertos'] += 1
+            return valor
+        if situacao == 'velho':
+            self._contadores['velhos'] += 1
+            if self._reservar(chave):
+                asyncio.get_running_loop().create_task(self._atualizar_async(chave, calcular))
+            return valor
+        self._contadores['calculos'] += 1
+        return self._gravar(chave, await calcular())
+
+    async def _atualizar_async(self, chave, calcular):
+        try:
+            self._contadores['atualizacoes'] += 1
+            self._gravar(chave, await calcular())
+        except Exception as error:
+            self._contadores['falhas'] += 1
+            logger.warning(f"⚠️  Atualização em segundo plano de '{chave}' falhou: {error}")
+        finally:
+            self._liberar(chave)
+
+    def invalidar(self, chave=None):
+        """Descarta um valor (ou todos); a próxima leitura calcula na hora."""
+        if chave is None:
+            self._valores.clear()
+        else:
+            self._valores.pop(chave, None)
+
+    def estatisticas(self):
+        """Contadores e idade de cada valor guardado."""
+        agora = time.monotonic()
+        return dict(
+            self._contadores,
+            idade_s={chave: round(agora - momento, 1) for chave, (_, momento) in list(self._valores.items())},
+        )
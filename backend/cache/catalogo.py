@@ -0,0 +1,220 @@
+"""
+Cache do catálogo de meditações em memória do processo.
+
+O catálogo é pequeno, público e lido em quase toda requisição, mas só muda
+quando alguém chama inserir_meditacao. Cada processo guarda um retrato
+imutável dele: as meditações por id, as respostas JSON já serializadas (lista
+e detalhes) e uma ETag forte calculada do conteúdo, igual em todos os workers.
+
+Invalidação:
+- no próprio processo, na hora (invalidar());
+- nos demais workers, por LISTEN/NOTIFY no canal CANAL: quem escreve faz
+  `pg_notify` na mesma transação do INSERT (o aviso só sai no COMMIT) e uma
+  thread de cada processo escuta o canal (cache/escuta.py);
+- `ttl` segundos é a idade máxima de um retrato, o limite de atraso se a
+  escuta cair (ela reconecta sozinha e descarta o retrato ao voltar).
+
+O app ASGI usa os mesmos retratos (e as mesmas ETags) pelos métodos `*_async`,
+numa instância criada com `carregar`/`buscar` assíncronos.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+from .escuta import Escuta
+
+CANAL = 'calmou_catalogo'
+
+
+def etag_forte(corpo):
+    """ETag (sem aspas) derivada só do conteúdo: a mesma em qualquer worker."""
+    return hashlib.blake2b(corpo, digest_size=16).hexdigest()
+
+
+def _serializar(dados):
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return corpo, etag_forte(corpo)
+
+
+class _Retrato:
+    """Catálogo carregado de uma vez; nunca é alterado depois de criado."""
+
+    __slots__ = ('geracao', 'criado_em', 'por_id', 'lista', 'detalhes')
+
+    def __init__(self, geracao, meditacoes, resumo, detalhe):
+        self.geracao = geracao
+        self.criado_em = time.monotonic()
+        self.por_id = {m.id: m for m in meditacoes}
+        self.lista = _serializar([resumo(m) for m in meditacoes])
+        self.detalhes = {m.id: _serializar(detalhe(m)) for m in meditacoes}
+
+
+class CacheCatalogo:
+    """
+    Retrato do catálogo com invalidação entre processos por LISTEN/NOTIFY.
+
+    `carregar()` devolve a lista de meditações (ou None se o banco falhou),
+    `buscar(id)` lê uma meditação direto do banco e `resumo`/`detalhe`
+    montam os dicionários das respostas de lista e de detalhe. Com
+    `carregar`/`buscar` async, use `retrato_async`, `lista_async`,
+    `detalhe_async` e `buscar_async`.
+    """
+
+    def __init__(self, carregar, buscar, resumo, detalhe, ttl=300, escutar=True):
+        self._carregar = carregar
+        self._buscar = buscar
+        self._resumo = resumo
+        self._detalhe = detalhe
+        self.ttl = ttl
+        self.escutar = escutar
+        self._retrato = None
+        self._geracao = 0
+        self._lock = threading.Lock()   # geração e retrato
+        self._carga = threading.Lock()  # uma carga por vez (as demais threads esperam por ela)
+        self._carga_async = None        # (geração, task) da carga em andamento no loop de eventos
+        # Avisos perdidos enquanto a escuta estava fora não voltam: descarta o retrato
+        self._escuta = Escuta(CANAL, lambda payloads: self.invalidar(), self.invalidar, nome='calmou-catalogo')
+        self._contadores = {
+            'acertos': 0,
+            'carregamentos': 0,
+            'invalidacoes': 0,
+        }
+
+    # --- Leitura ---
+
+    def retrato(self):
+        """Retrato atual, carregando do banco se não houver um válido (None se o banco falhou)."""
+        self._garantir_ouvinte()
+        retrato = self._retrato
+        if self._valido(retrato):
+            self._contadores['acertos'] += 1
+            return retrato
+
+        with self._carga:
+            # Outra thread pode ter carregado enquanto esta esperava
+            retrato = self._retrato
+            if self._valido(retrato):
+                self._contadores['acertos'] += 1
+                return retrato
+            geracao = self._geracao
+            return self._guardar(geracao, self._carregar())
+
+    async def retrato_async(self):
+        """Como `retrato`, com `carregar` async; as leituras simultâneas esperam a mesma carga."""
+        self._garantir_ouvinte()
+        retrato = self._retrato
+        if self._valido(retrato):
+            self._contadores['acertos'] += 1
+            return retrato
+
+        loop = asyncio.get_running_loop()
+        geracao = self._geracao
+        carga = self._carga_async
+        if carga is None or carga[0] != geracao or carga[1].done() or carga[1].get_loop() is not loop:
+            carga = self._carga_async = (geracao, loop.create_task(self._carregar_async(geracao)))
+        # shield: uma requisição cancelada não cancela a carga das demais
+        return await asyncio.shield(carga[1])
+
+    async def _carregar_async(self, geracao):
+        return self._guardar(geracao, await self._carregar())
+
+    def _guardar(self, geracao, meditacoes):
+        """Retrato novo das `meditacoes` carregadas na `geracao` (None se o banco falhou)."""
+        if meditacoes is None:
+            return None
+        retrato = _Retrato(geracao, meditacoes, self._resumo, self._detalhe)
+        self._contadores['carregamentos'] += 1
+        with self._lock:
+            # Invalidação durante a carga: o retrato já nasce velho e não fica
+            if geracao == self._geracao:
+                self._retrato = retrato
+        return retrato
+
+    def _valido(self, retrato):
+        return (retrato is not None and retrato.geracao == self._geracao
+                and time.monotonic() - retrato.criado_em < self.ttl)
+
+    def lista(self):
+        """(corpo JSON, ETag) da lista do catálogo, ou None se o banco falhou."""
+        retrato = self.retrato()
+        return retrato.lista if retrato else None
+
+    def detalhe(self, id):
+        """(corpo JSON, ETag) de uma meditação, ou None se ela não existe."""
+        retrato = self.retrato()
+        if retrato and id in retrato.detalhes:
+            return retrato.detalhes[id]
+        meditacao = self._buscar_fora_do_retrato(id)
+        return _serializar(self._detalhe(meditacao)) if meditacao else None
+
+    def buscar(self, id):
+        """Meditação pelo id (objeto Meditacao), ou None se ela não existe."""
+        retrato = self.retrato()
+        if retrato and id in retrato.por_id:
+            return retrato.por_id[id]
+        return self._buscar_fora_do_retrato(id)
+
+    def _buscar_fora_do_retrato(self, id):
+        # Id ausente: pode ser uma meditação nova cujo aviso ainda não chegou
+        meditacao = self._buscar(id)
+        if meditacao is not None:
+            self.invalidar()
+        return meditacao
+
+    async def lista_async(self):
+        """Como `lista`, com `carregar` async."""
+        retrato = await self.retrato_async()
+        return retrato.lista if retrato else None
+
+    async def detalhe_async(self, id):
+        """Como `detalhe`, com `carregar`/`buscar` async."""
+        retrato = await self.retrato_async()
+        if retrato and id in retrato.detalhes:
+            return retrato.detalhes[id]
+        meditacao = await self._buscar_fora_do_retrato_async(id)
+        return _serializar(self._detalhe(meditacao)) if meditacao else None
+
+    async def buscar_async(self, id):
+        """Como `buscar`, com `carregar`/`buscar` async."""
+        retrato = await self.retrato_async()
+        if retrato and id in retrato.por_id:
+            return retrato.por_id[id]
+        return await self._buscar_fora_do_retrato_async(id)
+
+    async def _buscar_fora_do_retrato_async(self, id):
+        meditacao = await self._buscar(id)
+        if meditacao is not None:
+            self.invalidar()
+        return meditacao
+
+    # --- Invalidação ---
+
+    def invalidar(self):
+        """Descarta o retrato; a próxima leitura carrega de novo."""
+        with self._lock:
+            self._geracao += 1
+            self._retrato = None
+        self._contadores['invalidacoes'] += 1
+
+    def _garantir_ouvinte(self):
+        if self.escutar and self._escuta.garantir():
+            # Processo novo (ou fork do gunicorn): o retrato herdado do pai não é confiável
+            self.invalidar()
+
+    def parar(self):
+        """Encerra a thread de escuta (testes e desligamento)."""
+        self._escuta.parar()
+
+    def estatisticas(self):
+        """Contadores do cache e estado da escuta."""
+        retrato = self._retrato
+        return dict(
+            self._contadores,
+            meditacoes=len(retrato.por_id) if retrato else None,
+            idade_s=round(time.monotonic() - retrato.criado_em, 1) if retrato else None,
+            notificacoes=self._escuta.notificacoes,
+            falhas_escuta=self._escuta.falhas,
+            escuta_ativa=self._escuta.ativa,
+        )
@@ -0,0 +1,213 @@
+"""
+Cache compartilhado para valores calculados por usuário (estatísticas).
+
+Dois backends com a mesma interface mínima (bytes por chave, com TTL):
+- CacheMemoria: dicionário do próprio processo, um por worker (padrão);
+- CacheRedis: qualquer servidor que fale o protocolo do Redis (Redis,
+  Valkey, KeyDB, Dragonfly...), compartilhado entre workers e máquinas.
+`criar_backend(url)` escolhe pelo esquema: memory://, redis://, rediss:// ou unix://.
+
+CacheCompartilhado implementa o cache-aside em cima do backend:
+- o valor é gravado em JSON com TTL sorteado em ±`jitter`, para que entradas
+  criadas juntas não expirem juntas;
+- num miss, só quem pega a trava da chave calcula; os demais esperam o valor
+  aparecer por até `espera` segundos (proteção contra estouro de recálculo);
+- quem lê passa `valido(valor)` para recusar entradas de uma versão antiga
+  dos dados, o que fecha a corrida entre uma leitura lenta e uma escrita;
+- falhas do backend nunca derrubam a leitura: viram um miss e o valor é
+  calculado direto no banco.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMemoria:
+    """Backend em memória do processo, com expiração e limite de itens (LRU)."""
+
+    nome = 'memoria'
+
+    def __init__(self, max_itens=10000):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return item[1]
+
+    def gravar(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def adicionar(self, chave, valor, ttl):
+        """Grava só se a chave não existe (ou expirou); True se gravou."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > time.monotonic():
+                return False
+            self._itens[chave] = (time.monotonic() + ttl, valor)
+            return True
+
+    def remover(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def itens(self):
+        return len(self._itens)
+
+
+class CacheRedis:
+    """Backend no protocolo do Redis (redis-py); `prefixo` separa as chaves da API."""
+
+    nome = 'redis'
+
+    def __init__(self, url=None, cliente=None, prefixo='calmou:', timeout=0.5):
+        if cliente is None:
+            try:
+                import redis
+            except ImportError as error:
+                raise RuntimeError("CACHE_URL aponta para um Redis, mas o pacote 'redis' não está instalado") from error
+            # Timeout curto: um Redis lento não pode ser pior que ir ao banco
+            cliente = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.cliente = cliente
+        self.prefixo = prefixo
+
+    def obter(self, chave):
+        return self.cliente.get(self.prefixo + chave)
+
+    def gravar(self, chave, valor, ttl):
+        self.cliente.set(self.prefixo + chave, valor, px=max(int(ttl * 1000), 1))
+
+    def adicionar(self, chave, valor, ttl):
+        return bool(self.cliente.set(self.prefixo + chave, valor, px=max(int(ttl * 1000), 1), nx=True))
+
+    def remover(self, chave):
+        self.cliente.delete(self.prefixo + chave)
+
+    def itens(self):
+        return None
+
+
+def criar_backend(url):
+    """Backend a partir de CACHE_URL (memory:// ou redis://, rediss://, unix://)."""
+    if not url or url.startswith('memory://'):
+        return CacheMemoria()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return CacheRedis(url)
+    raise ValueError(f"CACHE_URL não suportada: {url}")
+
+
+class CacheCompartilhado:
+    """Cache-aside em JSON sobre um backend, com trava por chave e TTL com jitter."""
+
+    def __init__(self, backend, jitter=0.1, espera=2.0):
+        self.backend = backend
+        self.jitter = jitter
+        self.espera = espera
+        self._contadores = {
+            'acertos': 0,
+            'faltas': 0,
+            'recusados': 0,
+            'esperas': 0,
+            'invalidacoes': 0,
+            'falhas': 0,
+        }
+
+    def _ttl(self, ttl):
+        return ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _ler(self, chave, valido):
+        try:
+            bruto = self.backend.obter(chave)
+        except Exception as error:
+            self._falha('ler', chave, error)
+            return None
+        if bruto is None:
+            return None
+        valor = json.loads(bruto)
+        if valido is not None and not valido(valor):
+            self._contadores['recusados'] += 1
+            return None
+        return valor
+
+    def _falha(self, operacao, chave, error):
+        self._contadores['falhas'] += 1
+        logger.warning(f"⚠️  Cache {self.backend.nome} indisponível ao {operacao} '{chave}': {error}")
+
+    def obter_ou_calcular(self, chave, calcular, ttl, valido=None):
+        """
+        Valor de `chave`, ou o resultado de `calcular()` (gravado por `ttl` s).
+        `valido(valor)` recusa entradas velhas; `calcular()` devolvendo None não é gravado.
+        """
+        valor = self._ler(chave, valido)
+        if valor is not None:
+            self._contadores['acertos'] += 1
+            return valor
+        self._contadores['faltas'] += 1
+
+        trava = f"{chave}:trava"
+        try:
+            dono = self.backend.adicionar(trava, b'1', self.espera)
+        except Exception as error:
+            self._falha('travar', trava, error)
+            return calcular()
+
+        if not dono:
+            # Outro worker já está calculando: espera o valor dele
+            self._contadores['esperas'] += 1
+            fim = time.monotonic() + self.espera
+            while time.monotonic() < fim:
+                time.sleep(0.02)
+                valor = self._ler(chave, valido)
+                if valor is not None:
+                    return valor
+            return calcular()
+
+        try:
+            valor = calcular()
+            if valor is not None:
+                corpo = json.dumps(valor, separators=(',', ':')).encode('utf-8')
+                try:
+                    self.backend.gravar(chave, corpo, self._ttl(ttl))
+                except Exception as error:
+                    self._falha('gravar', chave, error)
+            return valor
+        finally:
+            try:
+                self.backend.remover(trava)
+            except Exception as error:
+                self._falha('liberar', trava, error)
+
+    def invalidar(self, chave):
+        """Apaga a entrada (chamar depois do commit da escrita)."""
+        self._contadores['invalidacoes'] += 1
+        try:
+            self.backend.remover(chave)
+        except Exception as error:
+            self._falha('invalidar', chave, error)
+
+    def estatisticas(self):
+        """Contadores e taxa de acerto do cache."""
+        leituras = self._contadores['acertos'] + self._contadores['faltas']
+        return dict(
+            self._contadores,
+            backend=self.backend.nome,
+            itens=self.backend.itens(),
+            taxa_acerto=round(self._contadores['acertos'] / leituras, 3) if leituras else None,
+        )
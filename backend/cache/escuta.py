@@ -0,0 +1,99 @@
+"""
+Escuta de um canal LISTEN/NOTIFY numa thread por processo.
+
+Usada pelos caches em memória do processo para saber das escritas feitas em
+outros workers: quem escreve faz `pg_notify(canal, payload)` na mesma
+transação (o aviso só sai no COMMIT) e cada processo escuta o canal numa
+conexão dedicada, fora do pool (conexao.dimensionar_pool desconta essas
+conexões da fatia de cada worker). A thread nasce na primeira chamada de
+`garantir()` em cada processo (o fork do gunicorn não leva a thread do pai) e
+reconecta sozinha, com espera crescente, se a conexão cair: fecha a anterior
+antes de abrir a próxima, então cada escuta tem no máximo uma conexão.
+"""
+import logging
+import os
+import select
+import threading
+
+import psycopg2
+
+import conexao
+
+logger = logging.getLogger(__name__)
+
+
+class Escuta:
+    """
+    `ao_notificar(payloads)` recebe a lista de payloads de cada lote de avisos;
+    `ao_reconectar()` roda a cada (re)conexão, pois os avisos perdidos enquanto
+    a escuta estava fora não voltam.
+    """
+
+    def __init__(self, canal, ao_notificar, ao_reconectar, nome='calmou-escuta'):
+        self.canal = canal
+        self._ao_notificar = ao_notificar
+        self._ao_reconectar = ao_reconectar
+        self._nome = nome
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()  # o da thread atual; cada thread tem o seu
+        self.ativa = False
+        self.notificacoes = 0
+        self.falhas = 0
+
+    def garantir(self):
+        """Inicia a thread se este processo ainda não tem uma; devolve True se acabou de iniciar."""
+        if self._pid == os.getpid():
+            return False
+        with self._lock:
+            if self._pid == os.getpid():
+                return False
+            self._pid = os.getpid()
+            # Evento novo: uma thread anterior que não terminou a tempo no parar()
+            # continua vendo o seu evento ligado e sai, sem uma segunda conexão
+            self._parar = threading.Event()
+            self._thread = threading.Thread(target=self._escutar, args=(self._parar,), name=self._nome,
+                                            daemon=True)
+            self._thread.start()
+            return True
+
+    def _escutar(self, parar):
+        espera = 1
+        while not parar.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**conexao._parametros_conexao())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.canal}")
+                self._ao_reconectar()
+                self.ativa = True
+                espera = 1
+                while not parar.is_set():
+                    if select.select([conn], [], [], 1) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        payloads = [aviso.payload for aviso in conn.notifies]
+                        conn.notifies.clear()
+                        self.notificacoes += len(payloads)
+                        self._ao_notificar(payloads)
+            except Exception as error:
+                self.falhas += 1
+                logger.warning(f"⚠️  Escuta de {self.canal} falhou, reconectando em {espera}s: {error}")
+            finally:
+                if parar is self._parar:
+                    self.ativa = False
+                if conn is not None:
+                    conn.close()
+            parar.wait(espera)
+            espera = min(espera * 2, 30)
+
+    def parar(self):
+        """Encerra a thread (testes e desligamento)."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self._pid = None
@@ -0,0 +1,171 @@
+"""
+Cache dos registros de usuário em memória do processo (LRU + TTL).
+
+Login, perfil e confirmação de exclusão de conta buscam o mesmo usuário por
+id ou por email. O cache guarda uma projeção enxuta da linha (o controller
+decide quais colunas; nada de `config` nem fotos grandes), indexada pelos
+dois, com limite de memória em bytes: passando dele, sai o item usado há mais
+tempo.
+
+Invalidação:
+- no próprio processo, na hora e de novo depois do commit (invalidar(id));
+  o que a própria transação escreveu e lê antes do commit não é guardado
+  (`pode_guardar`), então um rollback não deixa nada para trás;
+- nos demais workers, por LISTEN/NOTIFY no canal CANAL, com o id no payload
+  (cache/escuta.py); ao reconectar a escuta, o cache é esvaziado;
+- `ttl` segundos é a idade máxima de um item, o limite de atraso se a escuta
+  cair ou se alguém alterar `usuarios` por fora do controller.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from .escuta import Escuta
+
+CANAL = 'calmou_usuarios'
+
+# Custo aproximado de um item fora os próprios campos: OrderedDict, índice
+# por email e a tupla (valor, tamanho, momento)
+_SOBRECARGA_ITEM = 300
+
+
+def _tamanho(valor):
+    return sys.getsizeof(valor) + sum(sys.getsizeof(campo) for campo in valor) + _SOBRECARGA_ITEM
+
+
+class CacheUsuarios:
+    """
+    `por_id(id, carregar)` / `por_email(email, carregar)`: projeção do
+    usuário, ou o resultado de `carregar()` (None = não existe ou falhou,
+    nada é guardado). `chaves(valor)` devolve o (id, email) de uma projeção;
+    `pode_guardar(valor)`, se dado, diz se uma projeção recém-lida pode ficar
+    no cache (ex.: não, se é uma escrita ainda sem commit).
+    """
+
+    def __init__(self, chaves, ttl=60, max_bytes=8 * 1024 * 1024, escutar=True, pode_guardar=None):
+        self._chaves = chaves
+        self._pode_guardar = pode_guardar
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.escutar = escutar
+        self._itens = OrderedDict()  # id -> (valor, tamanho, momento)
+        self._por_email = {}         # email -> id
+        self._bytes = 0
+        self._geracao = 0            # muda a cada invalidação
+        self._lock = threading.Lock()
+        self._escuta = Escuta(CANAL, self._notificado, self.limpar, nome='calmou-usuarios')
+        self._contadores = {
+            'acertos_id': 0,
+            'acertos_email': 0,
+            'faltas': 0,
+            'expirados': 0,
+            'despejados': 0,
+            'invalidacoes': 0,
+        }
+
+    # --- Leitura ---
+
+    def por_id(self, id, carregar):
+        return self._obter(id, carregar, 'acertos_id')
+
+    def por_email(self, email, carregar):
+        with self._lock:
+            id = self._por_email.get(email)
+        return self._obter(id, carregar, 'acertos_email')
+
+    def _obter(self, id, carregar, contador):
+        if self.escutar and self.ttl > 0:
+            self._escuta.garantir()
+        if self.ttl > 0 and id is not None:
+            with self._lock:
+                item = self._itens.get(id)
+                if item is not None:
+                    if time.monotonic() - item[2] < self.ttl:
+                        self._itens.move_to_end(id)
+                        self._contadores[contador] += 1
+                        return item[0]
+                    self._remover(id)
+                    self._contadores['expirados'] += 1
+
+        with self._lock:
+            self._contadores['faltas'] += 1
+            geracao = self._geracao
+        valor = carregar()
+        if valor is not None and self.ttl > 0 and (self._pode_guardar is None or self._pode_guardar(valor)):
+            self._gravar(valor, geracao)
+        return valor
+
+    def _gravar(self, valor, geracao):
+        tamanho = _tamanho(valor)
+        if tamanho > self.max_bytes:
+            return
+        id, email = self._chaves(valor)
+        with self._lock:
+            # Invalidação durante a carga: o valor lido já pode ser velho
+            if geracao != self._geracao:
+                return
+            self._remover(id)
+            self._itens[id] = (valor, tamanho, time.monotonic())
+            self._por_email[email] = id
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes:
+                antigo = next(iter(self._itens))
+                self._remover(antigo)
+                self._contadores['despejados'] += 1
+
+    def _remover(self, id):
+        """Tira `id` dos dois índices (com o lock)."""
+        item = self._itens.pop(id, None)
+        if item is None:
+            return
+        self._bytes -= item[1]
+        _, email = self._chaves(item[0])
+        if self._por_email.get(email) == id:
+            del self._por_email[email]
+
+    # --- Invalidação ---
+
+    def invalidar(self, id):
+        """Descarta o usuário `id` (chamar na escrita e de novo após o commit)."""
+        with self._lock:
+            self._geracao += 1
+            self._remover(id)
+            self._contadores['invalidacoes'] += 1
+
+    def limpar(self):
+        """Esvazia o cache."""
+        with self._lock:
+            self._geracao += 1
+            self._itens.clear()
+            self._por_email.clear()
+            self._bytes = 0
+
+    def _notificado(self, payloads):
+        for payload in payloads:
+            if payload.isdigit():
+                self.invalidar(int(payload))
+            else:
+                self.limpar()
+
+    def parar(self):
+        """Encerra a thread de escuta (testes e desligamento)."""
+        self._escuta.parar()
+
+    def estatisticas(self):
+        """Contadores, taxa de acerto e memória ocupada."""
+        with self._lock:
+            contadores = dict(self._contadores)
+            itens, ocupados = len(self._itens), self._bytes
+        acertos = contadores['acertos_id'] + contadores['acertos_email']
+        leituras = acertos + contadores['faltas']
+        return dict(
+            contadores,
+            taxa_acerto=round(acertos / leituras, 3) if leituras else None,
+            itens=itens,
+            bytes=ocupados,
+            max_bytes=self.max_bytes,
+            notificacoes=self._escuta.notificacoes,
+            falhas_escuta=self._escuta.falhas,
+            escuta_ativa=self._escuta.ativa,
+        )
@@ -1,5 +1,7 @@
 
 import os
+import sys
+from config import Config
 from controller import controller_usuario
 from model.usuario import Usuario
 from model.meditacao import Meditacao
@@ -15,7 +17,7 @@ def exibir_menu_principal():
     print("1. Gerenciar Meditações")
     print("2. Gerenciar Usuários")
     print("3. Gerenciar Avaliações (em breve)")
-    print("4. Gerar Relatórios (em breve)")
+    print("4. Gerar Relatórios")
     print("5. Sair")
     return input("Escolha uma opção: ")
 
@@ -109,16 +111,53 @@ def adicionar_novo_usuario():
     input("\nPressione Enter para continuar...")
 
 def listar_usuarios_cli():
-    """Busca e exibe todos os usuários."""
+    """Exibe os usuários (todos ou por prefixo do nome), uma tela por vez."""
     limpar_tela()
     print("--- Lista de Usuários ---")
-    usuarios = controller_usuario.listar_usuarios()
-    if not usuarios:
+    prefixo = input("Filtrar por início do nome (Enter para todos): ").strip() or None
+    por_tela = Config.USUARIOS_PAGINA_PADRAO
+    total = 0
+    try:
+        # Cursor no servidor: as linhas chegam em lotes, sem carregar a tabela inteira
+        usuarios = controller_usuario.iterar_usuarios(prefixo)
+        for id, nome, email, _ in usuarios:
+            print(f"ID: {id} | Nome: {nome} | Email: {email}")
+            total += 1
+            if total % por_tela == 0 and input("-- Enter para mais, 'q' para parar -- ").strip().lower() == 'q':
+                usuarios.close()
+                break
+    except Exception as e:
+        print(f"\n❌ Erro ao listar usuários: {e}")
+    if not total:
         print("Nenhum usuário encontrado.")
-    else:
-        for u in usuarios:
-            print(f"ID: {u.id} | Nome: {u.nome} | Email: {u.email}")
-    
+
+    input("\nPressione Enter para continuar...")
+
+
+def gerar_relatorios_cli():
+    """Gera os relatórios em arquivos, no formato e diretório escolhidos."""
+    from eports import relatorios
+
+    limpar_tela()
+    print("--- Gerar Relatórios ---")
+    for i, nome in enumerate(relatorios.RELATORIOS, 1):
+        print(f"{i}. {nome}")
+    escolha = input("Relatórios (números separados por vírgula, Enter para todos): ").strip()
+    formatos = relatorios.formatos_disponiveis()
+    formato = input(f"Formato ({', '.join(formatos)}) [csv]: ").strip().lower() or 'csv'
+    saida = input(f"Diretório [{Config.RELATORIOS_DIR}]: ").strip() or Config.RELATORIOS_DIR
+    try:
+        todos = list(relatorios.RELATORIOS)
+        nomes = [todos[int(numero) - 1] for numero in escolha.split(',')] if escolha else None
+        print("\n⏳ Gerando...")
+        for nome, caminho, linhas, segundos in relatorios.gerar_relatorios(nomes, formato, saida):
+            print(f"✅ {nome}: {linhas:,} linhas em {segundos:.2f} s -> {caminho}")
+    except (ValueError, IndexError):
+        print(f"\n❌ Erro: escolha relatórios de 1 a {len(relatorios.RELATORIOS)} e um formato entre: "
+              f"{', '.join(formatos)}.")
+    except Exception as e:
+        print(f"\n❌ Erro ao gerar relatórios: {e}")
+
     input("\nPressione Enter para continuar...")
 
 
@@ -161,8 +200,7 @@ def main():
             print("Funcionalidade de avaliações em desenvolvimento.")
             input("\nPressione Enter para continuar...")
         elif escolha == '4':
-            print("Funcionalidade de relatórios em desenvolvimento.")
-            input("\nPressione Enter para continuar...")
+            gerar_relatorios_cli()
         elif escolha == '5':
             print("Saindo do programa. Até mais!")
             break
@@ -171,4 +209,18 @@ def main():
             input("\nPressione Enter para continuar...")
 
 if __name__ == '__main__':
-    main()
+    # Subcomandos não interativos: python cli.py gerar-dados --usuarios 100000
+    if len(sys.argv) > 1 and sys.argv[1] == 'gerar-dados':
+        import dados_sinteticos
+        dados_sinteticos.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'estatisticas':
+        from migrations import estatisticas_meditacao
+        estatisticas_meditacao.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'imagens':
+        import imagens
+        imagens.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'relatorios':
+        from eports import relatorios
+        relatorios.main(sys.argv[2:])
+    else:
+        main()
@@ -1,8 +1,17 @@
 import psycopg2
-from psycopg2 import Error, pool
+from psycopg2 import Error, errors, extensions
+import contextvars
 import os
+import random
+import re
+import threading
+import time
 import logging
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from flask import current_app, g, has_request_context, jsonify, request
+
+from config import Config
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -10,92 +19,1015 @@ load_dotenv()
 # Logger
 logger = logging.getLogger(__name__)
 
-# Pool de conexões global
+# Pools de conexões globais: primária (leitura e escrita) e réplica (só leitura)
 connection_pool = None
+replica_pool = None
+_pool_lock = threading.Lock()
+
+
+class PoolEsgotadoError(Error):
+    """Nenhuma conexão ficou livre dentro do tempo limite do pool."""
+
+
+class ConexaoCalmou(extensions.connection):
+    """Conexão psycopg2 com os metadados usados pelo pool (idade e ociosidade)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.criada_em = time.monotonic()
+        self.devolvida_em = self.criada_em
+        self.vida_maxima = None
+        self.pool = None             # PoolConexoes de origem
+        self.preparados = {}         # nome -> SQL preparado nesta sessão
+        self.geracao_preparados = 0  # compara com _geracao_esquema
+        self.desalocar_preparados = False  # comandos na sessão fora do registro
+        self.cursor_factory = CursorMedido
+
+
+class PoolConexoes:
+    """
+    Pool de conexões thread-safe com verificação de saúde.
+
+    - Bloqueia até `timeout` segundos quando todas as conexões estão em uso
+      (em vez de abrir conexões fora do pool).
+    - Valida conexões ociosas há mais de `intervalo_verificacao` segundos com
+      um `SELECT 1` antes de entregá-las.
+    - Descarta conexões mais velhas que `vida_maxima` ou ociosas há mais de
+      `ociosidade_maxima` (respeitando o `minimo`).
+    - Recupera vagas de conexões que foram fechadas sem voltar ao pool.
+    """
+
+    def __init__(self, minimo, maximo, timeout, vida_maxima, ociosidade_maxima,
+                 intervalo_verificacao, somente_leitura=False, **parametros):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.vida_maxima = vida_maxima
+        self.ociosidade_maxima = ociosidade_maxima
+        self.intervalo_verificacao = intervalo_verificacao
+        self.somente_leitura = somente_leitura
+        self.pid = os.getpid()
+        self._parametros = parametros
+        self._cond = threading.Condition(threading.Lock())
+        self._livres = []      # pilha LIFO: as conexões mais quentes ficam no topo
+        self._em_uso = {}      # id(conn) -> conn
+        self._total = 0        # conexões abertas + vagas reservadas em criação
+        self._fechado = False
+        self._contadores = {
+            'conexoes_criadas': 0,
+            'conexoes_descartadas': 0,
+            'falhas_verificacao': 0,
+            'vazamentos_recuperados': 0,
+            'esperas': 0,
+            'esgotamentos': 0,
+            'tempo_espera_total_ms': 0.0,
+            'tempo_espera_max_ms': 0.0,
+            'pico_em_uso': 0,
+        }
+
+        for _ in range(minimo):
+            self._livres.append(self._nova_conexao())
+            self._total += 1
+            self._contadores['conexoes_criadas'] += 1
+
+    # --- API pública ---
+
+    def obter(self):
+        """Entrega uma conexão saudável, esperando até `timeout` segundos por uma vaga."""
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        esperou = False
+
+        while True:
+            conn = None
+            criar = False
+            ociosas = []
+            try:
+                with self._cond:
+                    while True:
+                        if self._fechado:
+                            raise Error("Pool de conexões fechado")
+
+                        ociosas.extend(self._podar_ociosas())
+                        if self._livres:
+                            conn = self._livres.pop()
+                            break
+                        if self._total < self.maximo:
+                            self._total += 1
+                            criar = True
+                            break
+
+                        self._recuperar_vazamentos()
+                        if self._total < self.maximo:
+                            continue
+
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            self._contadores['esgotamentos'] += 1
+                            self._registrar_espera(inicio)
+                            raise PoolEsgotadoError(
+                                f"Pool de conexões esgotado: {self.maximo} conexões em uso "
+                                f"por mais de {self.timeout}s"
+                            )
+                        if not esperou:
+                            esperou = True
+                            self._contadores['esperas'] += 1
+                        self._cond.wait(restante)
+            finally:
+                # Fora do lock: fechar o socket não segura as outras threads
+                for ociosa in ociosas:
+                    self._fechar_silenciosamente(ociosa)
+
+            if criar:
+                try:
+                    conn = self._nova_conexao()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._saudavel(conn):
+                self._descartar(conn)
+                continue
+
+            with self._cond:
+                if criar:
+                    self._contadores['conexoes_criadas'] += 1
+                self._em_uso[id(conn)] = conn
+                em_uso = len(self._em_uso)
+                if em_uso > self._contadores['pico_em_uso']:
+                    self._contadores['pico_em_uso'] = em_uso
+                if esperou:
+                    self._registrar_espera(inicio)
+            return conn
+
+    def devolver(self, conn):
+        """Devolve a conexão ao pool, limpando transações abertas ou descartando-a."""
+        with self._cond:
+            conhecida = self._em_uso.pop(id(conn), None) is conn
+
+        if not conhecida:
+            # Conexão que não saiu deste pool: fecha em vez de adotá-la
+            logger.warning("Conexão desconhecida devolvida ao pool; fechando")
+            self._fechar_silenciosamente(conn)
+            return
+
+        reutilizavel = not conn.closed and not self._fechado
+        if reutilizavel:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                reutilizavel = False
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    reutilizavel = False
+
+        if reutilizavel and time.monotonic() - conn.criada_em >= conn.vida_maxima:
+            reutilizavel = False
+
+        if not reutilizavel:
+            self._descartar(conn)
+            return
+
+        conn.devolvida_em = time.monotonic()
+        with self._cond:
+            self._livres.append(conn)
+            self._cond.notify()
+
+    def fechar(self):
+        """Fecha as conexões livres; as que estão em uso são fechadas ao voltar."""
+        with self._cond:
+            self._fechado = True
+            livres, self._livres = self._livres, []
+            self._total -= len(livres)
+            self._cond.notify_all()
+        for conn in livres:
+            self._fechar_silenciosamente(conn)
+
+    def estatisticas(self):
+        """Retorna contadores de uso, espera e saturação do pool."""
+        with self._cond:
+            em_uso = len(self._em_uso)
+            stats = dict(self._contadores)
+            stats.update({
+                'minimo': self.minimo,
+                'maximo': self.maximo,
+                'tamanho': self._total,
+                'em_uso': em_uso,
+                'livres': len(self._livres),
+                'saturado': em_uso >= self.maximo,
+            })
+        stats['tempo_espera_total_ms'] = round(stats['tempo_espera_total_ms'], 2)
+        stats['tempo_espera_max_ms'] = round(stats['tempo_espera_max_ms'], 2)
+        return stats
+
+    # --- Internos ---
+
+    def _nova_conexao(self):
+        conn = psycopg2.connect(connection_factory=ConexaoCalmou, **self._parametros)
+        conn.pool = self
+        if self.somente_leitura:
+            conn.set_session(readonly=True)
+        # Espalha a expiração para as conexões não serem recicladas todas de uma vez
+        conn.vida_maxima = self.vida_maxima * random.uniform(0.9, 1.0)
+        return conn
+
+    def _saudavel(self, conn):
+        if conn.closed:
+            return False
+        agora = time.monotonic()
+        if agora - conn.criada_em >= conn.vida_maxima:
+            return False
+        if agora - conn.devolvida_em < self.intervalo_verificacao:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception as error:
+            with self._cond:
+                self._contadores['falhas_verificacao'] += 1
+            logger.warning(f"Conexão ociosa falhou na verificação e será descartada: {error}")
+            return False
+
+    def _descartar(self, conn):
+        self._fechar_silenciosamente(conn)
+        with self._cond:
+            self._total -= 1
+            self._contadores['conexoes_descartadas'] += 1
+            self._cond.notify()
+
+    def _podar_ociosas(self):
+        """
+        Tira do pool as conexões ociosas demais na base da pilha (chamado com o
+        lock) e as devolve para quem chamou fechá-las depois de soltar o lock.
+        """
+        agora = time.monotonic()
+        ociosas = []
+        while (self._livres and self._total > self.minimo
+               and agora - self._livres[0].devolvida_em >= self.ociosidade_maxima):
+            ociosas.append(self._livres.pop(0))
+            self._total -= 1
+            self._contadores['conexoes_descartadas'] += 1
+        return ociosas
+
+    def _recuperar_vazamentos(self):
+        """Libera vagas de conexões fechadas por fora do pool (chamado com o lock)."""
+        fechadas = [chave for chave, conn in self._em_uso.items() if conn.closed]
+        for chave in fechadas:
+            del self._em_uso[chave]
+            self._total -= 1
+            self._contadores['vazamentos_recuperados'] += 1
+        if fechadas:
+            logger.warning(f"{len(fechadas)} conexão(ões) fechada(s) fora do pool recuperada(s)")
+
+    def _registrar_espera(self, inicio):
+        espera_ms = (time.monotonic() - inicio) * 1000
+        self._contadores['tempo_espera_total_ms'] += espera_ms
+        if espera_ms > self._contadores['tempo_espera_max_ms']:
+            self._contadores['tempo_espera_max_ms'] = espera_ms
+
+    @staticmethod
+    def _fechar_silenciosamente(conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+
+
+def _parametros_conexao(dsn=None):
+    """Credenciais do PostgreSQL a partir da configuração (ou de uma DSN)."""
+    dsn = dsn or Config.POSTGRES_DSN
+    if dsn:
+        return {'dsn': dsn}
+    return {
+        'user': Config.POSTGRES_USER,
+        'password': Config.POSTGRES_PASSWORD,
+        'host': Config.POSTGRES_HOST,
+        'port': Config.POSTGRES_PORT,
+        'database': Config.POSTGRES_DB,
+    }
+
+
+def conexoes_escuta():
+    """
+    Conexões LISTEN que cada processo mantém fora do pool (cache/escuta.py):
+    uma por cache com a escuta ligada (catálogo e usuários).
+    """
+    return int(Config.CATALOGO_CACHE_LISTEN) + int(Config.USUARIO_CACHE_LISTEN)
+
+
+def dimensionar_pool():
+    """
+    Calcula o tamanho máximo do pool.
+
+    Usa DB_POOL_MAX quando definido; caso contrário, uma conexão por thread do
+    worker (GUNICORN_THREADS) mais uma de folga, limitado à fatia de
+    DB_MAX_CONNECTIONS que cabe a cada worker (WEB_CONCURRENCY), descontadas
+    as conexões LISTEN do worker (conexoes_escuta).
+    """
+    workers = max(1, Config.WEB_CONCURRENCY)
+    disponiveis = max(1, Config.DB_MAX_CONNECTIONS - Config.DB_RESERVED_CONNECTIONS)
+    fatia_por_worker = max(1, disponiveis // workers - conexoes_escuta())
+
+    if Config.DB_POOL_MAX > 0:
+        maximo = Config.DB_POOL_MAX
+        if maximo > fatia_por_worker:
+            logger.warning(
+                f"DB_POOL_MAX={maximo} x {workers} worker(s) excede DB_MAX_CONNECTIONS="
+                f"{Config.DB_MAX_CONNECTIONS}"
+            )
+    else:
+        maximo = min(Config.GUNICORN_THREADS + 1, fatia_por_worker)
+
+    minimo = min(Config.DB_POOL_MIN, maximo)
+    return minimo, maximo
+
+
+def _criar_pool(parametros, somente_leitura=False):
+    minimo, maximo = dimensionar_pool()
+    return PoolConexoes(
+        minimo,
+        maximo,
+        timeout=Config.DB_POOL_TIMEOUT,
+        vida_maxima=Config.DB_POOL_MAX_LIFETIME,
+        ociosidade_maxima=Config.DB_POOL_MAX_IDLE,
+        intervalo_verificacao=Config.DB_POOL_CHECK_INTERVAL,
+        somente_leitura=somente_leitura,
+        **parametros
+    )
 
 
 def inicializar_pool():
-    """Inicializa o pool de conexões."""
-    global connection_pool
+    """Inicializa o pool da primária e, se configurada, o da réplica de leitura."""
+    global connection_pool, replica_pool
     try:
-        if connection_pool is not None:
-            logger.info("Pool de conexões já inicializado")
-            return
+        with _pool_lock:
+            if connection_pool is not None:
+                if connection_pool.pid == os.getpid():
+                    logger.info("Pool de conexões já inicializado")
+                    return
+                # Processo filho (fork do gunicorn): os sockets pertencem ao pai
+                logger.info("Fork detectado, recriando pool de conexões")
 
-        connection_pool = pool.SimpleConnectionPool(
-            1,  # Mínimo de conexões
-            20,  # Máximo de conexões
-            user=os.getenv("POSTGRES_USER", "postgres"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_HOST", "localhost"),
-            port=os.getenv("POSTGRES_PORT", "5432"),
-            database=os.getenv("POSTGRES_DB", "meu_banco")  # ✅ Corrigido para meu_banco
-        )
+            connection_pool = _criar_pool(_parametros_conexao())
+            replica_pool = None
+            if Config.POSTGRES_REPLICA_DSN:
+                try:
+                    replica_pool = _criar_pool(
+                        _parametros_conexao(Config.POSTGRES_REPLICA_DSN), somente_leitura=True
+                    )
+                except (Exception, Error) as error:
+                    # Sem réplica o app continua funcionando, só que lendo da primária
+                    logger.error(f"❌ Erro ao criar pool da réplica: {error}")
 
-        if connection_pool:
-            logger.info("✅ Pool de conexões criado com sucesso!")
+        logger.info(
+            f"✅ Pool de conexões criado com sucesso! "
+            f"(min={connection_pool.minimo}, max={connection_pool.maximo}, "
+            f"réplica={'sim' if replica_pool else 'não'})"
+        )
 
     except (Exception, Error) as error:
         logger.error(f"❌ Erro ao criar pool de conexões: {error}")
         raise
 
 
-def conectar():
+def conectar(replica=False):
     """
     Função para conectar ao banco de dados PostgreSQL usando pool.
     Usa variáveis de ambiente para credenciais de segurança.
-    """
-    global connection_pool
 
+    Com `replica=True`, entrega uma conexão somente leitura da réplica (ou da
+    primária, se não houver réplica disponível). Retorna None se o pool
+    estiver esgotado ou o banco indisponível.
+    """
     try:
-        # Inicializa pool se ainda não foi feito
-        if connection_pool is None:
+        # Inicializa pool se ainda não foi feito (ou se o processo sofreu fork)
+        if connection_pool is None or connection_pool.pid != os.getpid():
             inicializar_pool()
 
-        # Obtém conexão do pool
-        if connection_pool:
-            conn = connection_pool.getconn()
-            if conn:
-                return conn
+        if replica and replica_pool is not None:
+            try:
+                return replica_pool.obter()
+            except (Exception, Error) as error:
+                _contar_roteamento('falhas_replica')
+                logger.warning(f"⚠️  Réplica indisponível, lendo da primária: {error}")
 
-        # Fallback para conexão direta se pool falhar
-        logger.warning("Pool não disponível, usando conexão direta")
-        conexao = psycopg2.connect(
-            user=os.getenv("POSTGRES_USER", "postgres"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_HOST", "localhost"),
-            port=os.getenv("POSTGRES_PORT", "5432"),
-            database=os.getenv("POSTGRES_DB", "meu_banco")
-        )
-        return conexao
+        return connection_pool.obter()
 
+    except PoolEsgotadoError as error:
+        logger.error(f"❌ {error}")
+        return None
     except (Exception, Error) as error:
         logger.error(f"❌ Erro ao conectar ao PostgreSQL: {error}")
         return None
 
 
 def liberar_conexao(conn):
-    """Retorna a conexão ao pool."""
-    global connection_pool
+    """Retorna a conexão ao pool de onde ela saiu."""
     try:
-        if connection_pool and conn:
-            connection_pool.putconn(conn)
+        if conn:
+            pool = getattr(conn, 'pool', None) or connection_pool
+            if pool:
+                pool.devolver(conn)
     except (Exception, Error) as error:
         logger.error(f"❌ Erro ao liberar conexão: {error}")
 
 
 def fechar_pool():
-    """Fecha todas as conexões do pool."""
-    global connection_pool
+    """Fecha todas as conexões dos pools."""
+    global connection_pool, replica_pool
     try:
+        for pool in (connection_pool, replica_pool):
+            if pool:
+                pool.fechar()
         if connection_pool:
-            connection_pool.closeall()
             logger.info("✅ Pool de conexões fechado!")
-            connection_pool = None
+        connection_pool = None
+        replica_pool = None
     except (Exception, Error) as error:
         logger.error(f"❌ Erro ao fechar pool: {error}")
 
 
+def estatisticas_pool():
+    """Contadores de uso, espera e saturação do pool (None se ainda não criado)."""
+    if connection_pool is None:
+        return None
+    return connection_pool.estatisticas()
+
+
+# ==================== ROTEAMENTO PARA RÉPLICA ====================
+
+_roteamento_lock = threading.Lock()
+_escritas_recentes = {}  # usuario_id -> instante (monotonic) da última escrita
+_atraso_replica = {'segundos': 0.0, 'verificado_em': None}
+_estatisticas_roteamento = {
+    'leituras_replica': 0,
+    'leituras_primaria_escrita_recente': 0,
+    'leituras_primaria_atraso': 0,
+    'falhas_replica': 0,
+}
+
+# Atraso de replicação em segundos (0 quando o servidor não é uma réplica
+# ou já aplicou tudo o que recebeu)
+_SQL_ATRASO_REPLICA = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def _contar_roteamento(campo):
+    with _roteamento_lock:
+        _estatisticas_roteamento[campo] += 1
+
+
+def registrar_escrita(usuario_id):
+    """Marca que o usuário acabou de escrever: suas leituras vão para a primária por um tempo."""
+    agora = time.monotonic()
+    with _roteamento_lock:
+        _escritas_recentes[usuario_id] = agora
+        if len(_escritas_recentes) > 10000:
+            janela = Config.REPLICA_READ_YOUR_WRITES
+            for chave in [k for k, t in _escritas_recentes.items() if agora - t > janela]:
+                del _escritas_recentes[chave]
+
+
+def escreveu_recentemente(usuario_id):
+    """True se o usuário escreveu há menos de REPLICA_READ_YOUR_WRITES segundos."""
+    with _roteamento_lock:
+        instante = _escritas_recentes.get(usuario_id)
+    return instante is not None and time.monotonic() - instante < Config.REPLICA_READ_YOUR_WRITES
+
+
+def atraso_replica():
+    """
+    Atraso da réplica em segundos, medido no máximo a cada
+    REPLICA_LAG_CHECK_INTERVAL segundos (infinito se a medição falhar).
+    """
+    agora = time.monotonic()
+    with _roteamento_lock:
+        verificado_em = _atraso_replica['verificado_em']
+        if verificado_em is not None and agora - verificado_em < Config.REPLICA_LAG_CHECK_INTERVAL:
+            return _atraso_replica['segundos']
+        # Só uma thread mede; as demais usam o valor anterior enquanto isso
+        _atraso_replica['verificado_em'] = agora
+
+    pool = replica_pool
+    if pool is None:
+        return float('inf')
+    try:
+        conn = pool.obter()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_ATRASO_REPLICA)
+            segundos = float(cursor.fetchone()[0])
+            cursor.close()
+            conn.rollback()
+        finally:
+            pool.devolver(conn)
+    except (Exception, Error) as error:
+        logger.warning(f"⚠️  Não foi possível medir o atraso da réplica: {error}")
+        segundos = float('inf')
+
+    with _roteamento_lock:
+        _atraso_replica['segundos'] = segundos
+    return segundos
+
+
+def _usar_replica(usuario_id=None):
+    """Decide se uma leitura pode ir para a réplica (staleness limitada + read-your-writes)."""
+    if connection_pool is None or connection_pool.pid != os.getpid():
+        inicializar_pool()
+    if replica_pool is None:
+        return False
+    if usuario_id is not None and escreveu_recentemente(usuario_id):
+        _contar_roteamento('leituras_primaria_escrita_recente')
+        return False
+    if atraso_replica() > Config.REPLICA_MAX_LAG:
+        _contar_roteamento('leituras_primaria_atraso')
+        return False
+    _contar_roteamento('leituras_replica')
+    return True
+
+
+def estatisticas_replica():
+    """Pool, atraso e decisões de roteamento da réplica (None se não configurada)."""
+    if replica_pool is None:
+        return None
+    with _roteamento_lock:
+        stats = dict(_estatisticas_roteamento)
+        stats['atraso_segundos'] = _atraso_replica['segundos']
+    stats['pool'] = replica_pool.estatisticas()
+    return stats
+
+
+# ==================== COMANDOS PREPARADOS ====================
+
+# Incrementada por invalidar_preparados(); conexões de geração antiga descartam
+# seus comandos preparados antes do próximo uso
+_geracao_esquema = 0
+_preparados_lock = threading.Lock()
+_estatisticas_preparados = {}  # nome -> {'preparos': n, 'reusos': n}
+
+# Erros que indicam comando preparado obsoleto: plano incompatível após mudança
+# de esquema (0A000) ou comando inexistente na sessão (26000)
+_ERROS_PREPARADO_OBSOLETO = (errors.FeatureNotSupported, errors.InvalidSqlStatementName)
+
+
+def executar_preparado(cursor, nome, sql, params=()):
+    """
+    Executa `sql` como comando preparado no servidor.
+
+    O PREPARE acontece uma vez por conexão do pool; as chamadas seguintes só
+    fazem EXECUTE, poupando o parse e o planejamento no PostgreSQL. O `sql`
+    usa parâmetros posicionais do PostgreSQL ($1, $2, ...).
+
+    Se o esquema mudou (ou a sessão perdeu o comando), o registro da conexão é
+    limpo e, quando nada mais estava em curso na transação, o comando é
+    preparado de novo e reexecutado automaticamente. Com a transação já em
+    curso, o erro sobe e a próxima chamada na conexão desaloca tudo antes.
+    """
+    conn = cursor.connection
+    registro = getattr(conn, 'preparados', None)
+    if registro is None:
+        # Conexão fora do pool: executa como SQL comum
+        cursor.execute(*_sql_para_psycopg(sql, params))
+        return
+
+    if conn.desalocar_preparados or (conn.geracao_preparados != _geracao_esquema and registro):
+        cursor.execute("DEALLOCATE ALL")
+        registro.clear()
+        conn.desalocar_preparados = False
+    conn.geracao_preparados = _geracao_esquema
+
+    transacao_limpa = conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+    try:
+        _preparar_e_executar(cursor, registro, nome, sql, params)
+    except _ERROS_PREPARADO_OBSOLETO as error:
+        registro.clear()
+        if not transacao_limpa:
+            # A transação abortou e não dá para desalocar agora; os comandos
+            # continuam na sessão (PREPARE não volta no ROLLBACK), então o
+            # próximo uso da conexão começa por um DEALLOCATE ALL
+            conn.desalocar_preparados = True
+            raise
+        logger.info(f"Comando preparado '{nome}' obsoleto ({error.pgcode}), preparando de novo")
+        conn.rollback()
+        cursor.execute("DEALLOCATE ALL")
+        _preparar_e_executar(cursor, registro, nome, sql, params)
+
+
+def _preparar_e_executar(cursor, registro, nome, sql, params):
+    if registro.get(nome) != sql:
+        if nome in registro:
+            cursor.execute(f"DEALLOCATE {nome}")
+        cursor.execute(f"PREPARE {nome} AS {sql}")
+        registro[nome] = sql
+        _contar_preparado(nome, 'preparos')
+    else:
+        _contar_preparado(nome, 'reusos')
+
+    if params:
+        marcadores = ', '.join(['%s'] * len(params))
+        cursor.execute(f"EXECUTE {nome} ({marcadores})", params)
+    else:
+        cursor.execute(f"EXECUTE {nome}")
+
+
+def _contar_preparado(nome, campo):
+    with _preparados_lock:
+        contadores = _estatisticas_preparados.setdefault(nome, {'preparos': 0, 'reusos': 0})
+        contadores[campo] += 1
+
+
+def _sql_para_psycopg(sql, params):
+    """Converte $1, $2... para %s, reordenando os parâmetros."""
+    indices = []
+
+    def trocar(match):
+        indices.append(int(match.group(1)) - 1)
+        return '%s'
+
+    convertido = re.sub(r'\$(\d+)', trocar, sql.replace('%', '%%'))
+    return convertido, tuple(params[i] for i in indices)
+
+
+def invalidar_preparados():
+    """Força todas as conexões a preparar seus comandos de novo (ex.: após migrações)."""
+    global _geracao_esquema
+    with _preparados_lock:
+        _geracao_esquema += 1
+
+
+def estatisticas_preparados():
+    """Preparos e reusos por comando preparado desde o início do processo."""
+    with _preparados_lock:
+        return {nome: dict(contadores) for nome, contadores in _estatisticas_preparados.items()}
+
+
+# ==================== UNIDADE DE TRABALHO ====================
+
+# Unidade de trabalho aberta explicitamente (CLI, scripts, testes)
+_unidade_ativa = contextvars.ContextVar('unidade_de_trabalho', default=None)
+
+
+class UnidadeDeTrabalho:
+    """
+    Uma conexão e uma transação compartilhadas por várias chamadas do controller.
+
+    A conexão só é retirada do pool na primeira consulta e volta a ele em
+    `finalizar`, com commit (ou rollback, se alguma chamada falhou).
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.conn_replica = None
+        self.falhou = False
+        self.apos_commit = []
+        self.alterados = set()  # chaves escritas e ainda não confirmadas (marcar_alterado)
+
+    def conexao(self, replica=False):
+        # Depois de usar a primária, a unidade continua nela (lê o que escreveu)
+        if replica and self.conn is None:
+            if self.conn_replica is None:
+                self.conn_replica = conectar(replica=True)
+                if not self.conn_replica:
+                    raise Exception("Falha ao conectar ao banco de dados")
+            return self.conn_replica
+
+        if self.conn is None:
+            self.conn = conectar()
+            if not self.conn:
+                raise Exception("Falha ao conectar ao banco de dados")
+        return self.conn
+
+    def finalizar(self, confirmar=True):
+        """Encerra a transação e devolve as conexões ao pool."""
+        conn, self.conn = self.conn, None
+        conn_replica, self.conn_replica = self.conn_replica, None
+        pendentes, self.apos_commit = self.apos_commit, []
+        self.alterados = set()
+        confirmado = False
+        try:
+            if conn is not None:
+                try:
+                    if confirmar and not self.falhou:
+                        conn.commit()
+                        confirmado = True
+                    else:
+                        conn.rollback()
+                finally:
+                    liberar_conexao(conn)
+        finally:
+            if conn_replica is not None:
+                liberar_conexao(conn_replica)
+        if confirmado:
+            _executar_apos_commit(pendentes)
+
+
+def _unidade_atual():
+    """Unidade de trabalho em curso: a explícita ou a da requisição Flask."""
+    unidade = _unidade_ativa.get()
+    if unidade is not None:
+        return unidade
+    if has_request_context() and current_app.extensions.get('unidade_de_trabalho'):
+        unidade = g.get('unidade_de_trabalho')
+        if unidade is None:
+            unidade = g.unidade_de_trabalho = UnidadeDeTrabalho()
+        return unidade
+    return None
+
+
+def _executar_apos_commit(funcoes):
+    for funcao in funcoes:
+        try:
+            funcao()
+        except Exception as error:
+            # O commit já aconteceu: a falha aqui não desfaz nem derruba a requisição
+            logger.warning(f"⚠️  Ação pós-commit falhou: {error}")
+
+
+def apos_commit(funcao):
+    """
+    Roda `funcao` depois que a escrita feita até aqui for confirmada.
+
+    Dentro de uma unidade de trabalho (ou requisição Flask) fica para depois do
+    commit dela e é descartada num rollback; fora, o `obter_cursor` da escrita
+    já confirmou e a função roda na hora. Chame depois de sair do `with`.
+    """
+    unidade = _unidade_atual()
+    if unidade is not None:
+        unidade.apos_commit.append(funcao)
+    else:
+        _executar_apos_commit([funcao])
+
+
+def marcar_alterado(chave):
+    """
+    Marca `chave` (ex.: ('usuario', id)) como escrita pela unidade de trabalho
+    em curso, até o commit ou rollback dela. Fora de uma unidade a escrita já
+    foi confirmada e nada é marcado.
+    """
+    unidade = _unidade_atual()
+    if unidade is not None:
+        unidade.alterados.add(chave)
+
+
+def alterado_sem_commit(chave):
+    """True se a unidade de trabalho em curso escreveu `chave` e ainda não confirmou."""
+    unidade = _unidade_atual()
+    return unidade is not None and chave in unidade.alterados
+
+
+@contextmanager
+def unidade_de_trabalho():
+    """
+    Agrupa várias chamadas do controller em uma única conexão e transação.
+
+    Usage:
+        with unidade_de_trabalho():
+            controller_usuario.inserir_usuario(usuario)
+            controller_usuario.buscar_usuario_por_email(usuario.email)
+
+    Dentro de uma unidade já aberta (ou de uma requisição Flask), apenas
+    reaproveita a existente.
+    """
+    atual = _unidade_atual()
+    if atual is not None:
+        yield atual
+        return
+
+    unidade = UnidadeDeTrabalho()
+    token = _unidade_ativa.set(unidade)
+    try:
+        yield unidade
+    except BaseException:
+        unidade.finalizar(confirmar=False)
+        raise
+    else:
+        unidade.finalizar()
+    finally:
+        _unidade_ativa.reset(token)
+
+
+@contextmanager
+def transacao(somente_leitura=False, usuario_id=None):
+    """
+    Conexão para uma operação do controller.
+
+    Participa da unidade de trabalho em curso, se houver (o commit fica para o
+    fim dela); senão usa uma conexão própria com commit/rollback ao sair.
+
+    Leituras (`somente_leitura=True`) podem ir para a réplica; passando o
+    `usuario_id`, escritas marcam o usuário e leituras dele logo depois de
+    escrever ficam na primária.
+    """
+    if somente_leitura:
+        replica = _usar_replica(usuario_id)
+    else:
+        replica = False
+        if usuario_id is not None:
+            registrar_escrita(usuario_id)
+
+    unidade = _unidade_atual()
+    if unidade is not None:
+        conn = unidade.conexao(replica)
+        try:
+            yield conn
+        except BaseException:
+            unidade.falhou = True
+            raise
+        return
+
+    conn = conectar(replica)
+    if not conn:
+        raise Exception("Falha ao conectar ao banco de dados")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        liberar_conexao(conn)
+
+
+@contextmanager
+def obter_cursor(somente_leitura=False, usuario_id=None, **kwargs):
+    """Cursor dentro de `transacao()`; fechado automaticamente ao sair."""
+    with transacao(somente_leitura, usuario_id) as conn:
+        cursor = conn.cursor(**kwargs)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+
+def registrar_unidade_de_trabalho(app):
+    """
+    Vincula uma unidade de trabalho a cada requisição Flask (em `g`).
+
+    A conexão é retirada do pool sob demanda e confirmada antes de a resposta
+    sair; respostas 5xx ou chamadas que falharam fazem rollback.
+    """
+    app.extensions['unidade_de_trabalho'] = True
+
+    @app.after_request
+    def _finalizar_unidade_de_trabalho(response):
+        unidade = g.pop('unidade_de_trabalho', None)
+        if unidade is not None:
+            try:
+                unidade.finalizar(confirmar=response.status_code < 500)
+            except (Exception, Error) as error:
+                logger.error(f"❌ Erro ao confirmar transação da requisição: {error}")
+                response = jsonify({'mensagem': 'Erro interno do servidor'})
+                response.status_code = 500
+        return response
+
+    @app.teardown_request
+    def _descartar_unidade_de_trabalho(exc):
+        # Só sobra unidade aqui se after_request não rodou (exceção não tratada)
+        unidade = g.pop('unidade_de_trabalho', None)
+        if unidade is not None:
+            unidade.finalizar(confirmar=False)
+
+
+# ==================== MEDIÇÃO DE SQL ====================
+
+# Medição em curso (uma por requisição Flask); None = cursores não medem nada
+_medicao_ativa = contextvars.ContextVar('medicao_sql', default=None)
+
+
+class MedicaoSql:
+    """Comandos enviados ao banco em uma requisição: quantidade, tempo total e o mais lento."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_ms = 0.0
+        self.mais_lenta_ms = 0.0
+        self.mais_lenta_sql = None
+        self.repeticoes = {}  # SQL -> vezes executado (N+1 aparece como um SQL repetido)
+
+    def registrar(self, sql, duracao_ms):
+        self.consultas += 1
+        self.tempo_ms += duracao_ms
+        if not isinstance(sql, str):
+            sql = str(sql)
+        if duracao_ms >= self.mais_lenta_ms:
+            self.mais_lenta_ms = duracao_ms
+            self.mais_lenta_sql = sql
+        self.repeticoes[sql] = self.repeticoes.get(sql, 0) + 1
+
+    def mais_repetida(self):
+        """(SQL, vezes) do comando executado mais vezes, ou (None, 0)."""
+        if not self.repeticoes:
+            return None, 0
+        return max(self.repeticoes.items(), key=lambda item: item[1])
+
+    def server_timing(self, total_ms=None):
+        """Valor do cabeçalho Server-Timing (tempos em ms)."""
+        partes = [
+            f'db;dur={self.tempo_ms:.2f};desc="{self.consultas} consultas"',
+            f'db-lenta;dur={self.mais_lenta_ms:.2f}',
+        ]
+        if total_ms is not None:
+            partes.append(f'total;dur={total_ms:.2f}')
+        return ', '.join(partes)
+
+
+def _resumir_sql(sql, limite=160):
+    texto = ' '.join(sql.split())
+    return texto if len(texto) <= limite else texto[:limite - 3] + '...'
+
+
+class CursorMedido(extensions.cursor):
+    """Cursor das conexões do pool: cronometra cada comando na medição em curso."""
+
+    def execute(self, sql, params=None):
+        medicao = _medicao_ativa.get()
+        if medicao is None:
+            return super().execute(sql, params)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            medicao.registrar(sql, (time.perf_counter() - inicio) * 1000)
+
+    def executemany(self, sql, vars_list):
+        medicao = _medicao_ativa.get()
+        if medicao is None:
+            return super().executemany(sql, vars_list)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, vars_list)
+        finally:
+            medicao.registrar(sql, (time.perf_counter() - inicio) * 1000)
+
+
+def medicao_atual():
+    """Medição de SQL da requisição em curso (ou None fora de uma)."""
+    return _medicao_ativa.get()
+
+
+def registrar_medicao_sql(app):
+    """
+    Mede o SQL de cada requisição Flask feito pelas conexões do pool.
+
+    A resposta leva um cabeçalho Server-Timing (`db`: tempo somado e número de
+    consultas; `db-lenta`: comando mais lento; `total`: requisição inteira) e
+    cada requisição gera uma linha de acesso no log. Acima de `DB_QUERY_BUDGET`
+    consultas, registra um aviso com o comando mais lento e o mais repetido.
+    """
+
+    @app.before_request
+    def _iniciar_medicao_sql():
+        g.inicio_requisicao = time.perf_counter()
+        g.token_medicao_sql = _medicao_ativa.set(MedicaoSql())
+
+    @app.after_request
+    def _publicar_medicao_sql(response):
+        medicao = _medicao_ativa.get()
+        if medicao is None:
+            return response
+        total_ms = (time.perf_counter() - g.inicio_requisicao) * 1000
+        if current_app.config.get('DB_SERVER_TIMING', True):
+            response.headers['Server-Timing'] = medicao.server_timing(total_ms)
+
+        current_app.logger.info(
+            f"{request.method} {request.path} {response.status_code} {total_ms:.1f}ms "
+            f"sql={medicao.consultas} db={medicao.tempo_ms:.1f}ms lenta={medicao.mais_lenta_ms:.1f}ms"
+        )
+
+        orcamento = current_app.config.get('DB_QUERY_BUDGET')
+        if orcamento and medicao.consultas > orcamento:
+            mensagem = (
+                f"⚠️  {request.method} {request.path}: {medicao.consultas} consultas "
+                f"(orçamento {orcamento}); mais lenta {medicao.mais_lenta_ms:.1f}ms: "
+                f"{_resumir_sql(medicao.mais_lenta_sql)}"
+            )
+            repetida, vezes = medicao.mais_repetida()
+            if vezes > 1:
+                mensagem += f"; repetida {vezes}x (N+1?): {_resumir_sql(repetida)}"
+            current_app.logger.warning(mensagem)
+        return response
+
+    @app.teardown_request
+    def _encerrar_medicao_sql(exc):
+        token = g.pop('token_medicao_sql', None)
+        if token is not None:
+            _medicao_ativa.reset(token)
+
+
 # ===== IMPLEMENTAÇÃO ANTIGA (Mantida como comentário) =====
 """
 def conectar_antigo():
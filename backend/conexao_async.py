@@ -0,0 +1,171 @@
+"""
+Acesso assíncrono ao PostgreSQL (asyncpg) para a aplicação ASGI.
+
+Espelha o `conexao.py` usado pelo app Flask: mesmas credenciais, mesma
+réplica de leitura opcional e a mesma regra de "ler as próprias escritas".
+Os dois módulos convivem; cada processo usa o que corresponde ao seu
+servidor (gunicorn -> conexao, uvicorn -> conexao_async).
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+import conexao
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Pools globais (um por loop de eventos/processo)
+pool_async = None
+replica_pool_async = None
+
+_atraso_replica = {'segundos': 0.0, 'verificado_em': None}
+
+
+def _codificar_json(valor):
+    # Texto já serializado passa direto, como no psycopg2
+    return valor if isinstance(valor, str) else json.dumps(valor)
+
+
+async def _configurar_conexao(conn):
+    """Decodifica json/jsonb para dict, como o psycopg2 faz."""
+    for tipo in ('json', 'jsonb'):
+        await conn.set_type_codec(
+            tipo, encoder=_codificar_json, decoder=json.loads, schema='pg_catalog'
+        )
+
+
+def _parametros_asyncpg(dsn=None):
+    """Converte os parâmetros do psycopg2 para os nomes do asyncpg."""
+    parametros = conexao._parametros_conexao(dsn)
+    if 'dsn' in parametros:
+        return parametros
+    parametros = {chave: valor for chave, valor in parametros.items() if valor is not None}
+    if 'port' in parametros:
+        parametros['port'] = int(parametros['port'])
+    return parametros
+
+
+async def _criar_pool(parametros, somente_leitura=False):
+    configuracoes = {'default_transaction_read_only': 'on'} if somente_leitura else None
+    return await asyncpg.create_pool(
+        min_size=min(Config.DB_ASYNC_POOL_MIN, Config.DB_ASYNC_POOL_MAX),
+        max_size=Config.DB_ASYNC_POOL_MAX,
+        # O asyncpg já prepara e guarda em cache cada consulta por conexão
+        statement_cache_size=Config.DB_ASYNC_STATEMENT_CACHE,
+        max_inactive_connection_lifetime=Config.DB_POOL_MAX_IDLE,
+        init=_configurar_conexao,
+        server_settings=configuracoes,
+        **parametros
+    )
+
+
+async def inicializar_pool():
+    """Cria o pool da primária e, se configurada, o da réplica."""
+    global pool_async, replica_pool_async
+    if pool_async is not None:
+        return
+
+    pool_async = await _criar_pool(_parametros_asyncpg())
+    replica_pool_async = None
+    if Config.POSTGRES_REPLICA_DSN:
+        try:
+            replica_pool_async = await _criar_pool(
+                _parametros_asyncpg(Config.POSTGRES_REPLICA_DSN), somente_leitura=True
+            )
+        except (Exception, asyncpg.PostgresError) as error:
+            logger.error(f"❌ Erro ao criar pool assíncrono da réplica: {error}")
+
+    logger.info(
+        f"✅ Pool assíncrono criado (max={Config.DB_ASYNC_POOL_MAX}, "
+        f"réplica={'sim' if replica_pool_async else 'não'})"
+    )
+
+
+async def fechar_pool():
+    """Fecha os pools assíncronos."""
+    global pool_async, replica_pool_async
+    for pool in (pool_async, replica_pool_async):
+        if pool is not None:
+            await pool.close()
+    pool_async = None
+    replica_pool_async = None
+
+
+async def atraso_replica():
+    """Atraso da réplica em segundos, medido no máximo a cada REPLICA_LAG_CHECK_INTERVAL."""
+    agora = time.monotonic()
+    verificado_em = _atraso_replica['verificado_em']
+    if verificado_em is not None and agora - verificado_em < Config.REPLICA_LAG_CHECK_INTERVAL:
+        return _atraso_replica['segundos']
+    _atraso_replica['verificado_em'] = agora
+
+    try:
+        segundos = float(await replica_pool_async.fetchval(
+            conexao._SQL_ATRASO_REPLICA, timeout=Config.DB_POOL_TIMEOUT
+        ))
+    except (Exception, asyncpg.PostgresError) as error:
+        logger.warning(f"⚠️  Não foi possível medir o atraso da réplica: {error}")
+        segundos = float('inf')
+
+    _atraso_replica['segundos'] = segundos
+    return segundos
+
+
+async def _usar_replica(usuario_id=None):
+    if replica_pool_async is None:
+        return False
+    if usuario_id is not None and conexao.escreveu_recentemente(usuario_id):
+        return False
+    return await atraso_replica() <= Config.REPLICA_MAX_LAG
+
+
+@asynccontextmanager
+async def transacao(somente_leitura=False, usuario_id=None):
+    """
+    Conexão do pool dentro de uma transação (commit ao sair, rollback em erro).
+
+    Mesmas regras de `conexao.transacao`: leituras podem ir para a réplica e
+    escritas com `usuario_id` fazem as leituras seguintes do usuário irem à
+    primária.
+    """
+    if pool_async is None:
+        await inicializar_pool()
+
+    if somente_leitura and await _usar_replica(usuario_id):
+        pool = replica_pool_async
+    else:
+        pool = pool_async
+        if not somente_leitura and usuario_id is not None:
+            conexao.registrar_escrita(usuario_id)
+
+    try:
+        conn = await pool.acquire(timeout=Config.DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise conexao.PoolEsgotadoError(
+            f"Nenhuma conexão livre após {Config.DB_POOL_TIMEOUT}s (max={Config.DB_ASYNC_POOL_MAX})"
+        )
+
+    try:
+        async with conn.transaction(readonly=somente_leitura):
+            yield conn
+    finally:
+        await pool.release(conn)
+
+
+def estatisticas_pool():
+    """Tamanho e uso do pool assíncrono (None se ainda não criado)."""
+    if pool_async is None:
+        return None
+    tamanho = pool_async.get_size()
+    return {
+        'minimo': pool_async.get_min_size(),
+        'maximo': pool_async.get_max_size(),
+        'tamanho': tamanho,
+        'livres': pool_async.get_idle_size(),
+        'em_uso': tamanho - pool_async.get_idle_size(),
+    }
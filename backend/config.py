@@ -23,6 +23,91 @@ class Config:
     POSTGRES_HOST = os.getenv('POSTGRES_HOST', 'localhost')
     POSTGRES_PORT = os.getenv('POSTGRES_PORT', '5432')
     POSTGRES_DB = os.getenv('POSTGRES_DB', 'meu_banco')
+    POSTGRES_DSN = os.getenv('POSTGRES_DSN')  # primária; se definida, substitui as variáveis acima
+
+    # --- Réplica de leitura ---
+    POSTGRES_REPLICA_DSN = os.getenv('POSTGRES_REPLICA_DSN')  # vazio = tudo na primária
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))  # s de atraso tolerado nas leituras
+    REPLICA_READ_YOUR_WRITES = float(os.getenv('REPLICA_READ_YOUR_WRITES', 10))  # s lendo da primária após escrever
+    REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 2))
+
+    # --- Pool de conexões ---
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 0))  # 0 = calcula a partir dos workers
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))  # segundos esperando vaga
+    DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))  # 30 min
+    DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300))  # 5 min
+    DB_POOL_CHECK_INTERVAL = float(os.getenv('DB_POOL_CHECK_INTERVAL', 30))  # ping se ociosa há mais que isso
+    DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 100))  # max_connections do PostgreSQL
+    DB_RESERVED_CONNECTIONS = int(os.getenv('DB_RESERVED_CONNECTIONS', 10))  # psql, CLI, migrações
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))  # workers do gunicorn
+    GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 19))  # threads por worker (gthread)
+
+    # --- Medição de SQL por requisição ---
+    DB_QUERY_BUDGET = int(os.getenv('DB_QUERY_BUDGET', 10))  # consultas por requisição antes do aviso (0 = sem aviso)
+    DB_SERVER_TIMING = os.getenv('DB_SERVER_TIMING', 'True').lower() == 'true'  # cabeçalho Server-Timing
+
+    # --- Cache do catálogo de meditações ---
+    CATALOGO_CACHE_TTL = float(os.getenv('CATALOGO_CACHE_TTL', 300))  # idade máxima do retrato (0 = sem cache)
+    CATALOGO_CACHE_LISTEN = os.getenv('CATALOGO_CACHE_LISTEN', 'True').lower() == 'true'  # LISTEN/NOTIFY entre workers
+
+    # --- Cache dos registros de usuário (por processo) ---
+    USUARIO_CACHE_TTL = float(os.getenv('USUARIO_CACHE_TTL', 60))  # idade máxima de um item (0 = sem cache)
+    USUARIO_CACHE_MAX_BYTES = int(os.getenv('USUARIO_CACHE_MAX_BYTES', 8 * 1024 * 1024))  # memória por processo
+    USUARIO_CACHE_FOTO_MAX = int(os.getenv('USUARIO_CACHE_FOTO_MAX', 2048))  # foto_perfil maior fica fora do cache
+    USUARIO_CACHE_LISTEN = os.getenv('USUARIO_CACHE_LISTEN', 'True').lower() == 'true'  # LISTEN/NOTIFY entre workers
+
+    # --- Cache compartilhado (valores calculados, entre workers) ---
+    CACHE_URL = os.getenv('CACHE_URL', 'memory://')  # ou redis://host:6379/0 para dividir entre workers
+    ESTATISTICAS_CACHE_TTL = float(os.getenv('ESTATISTICAS_CACHE_TTL', 300))  # 0 = sem cache
+    CACHE_TTL_JITTER = float(os.getenv('CACHE_TTL_JITTER', 0.1))  # ±10% no TTL de cada entrada
+    CACHE_LOCK_TIMEOUT = float(os.getenv('CACHE_LOCK_TIMEOUT', 2))  # s esperando quem já está calculando
+
+    # --- GET /stats ---
+    STATS_MODO = os.getenv('STATS_MODO', 'exato')  # exato (contadores, migração 004) ou estimado (pg_class)
+    STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 60))  # s até recalcular em segundo plano
+    STATS_CACHE_IDADE_MAXIMA = float(os.getenv('STATS_CACHE_IDADE_MAXIMA', 600))  # s servindo o valor anterior
+
+    # --- Compressão das respostas (br/gzip) ---
+    COMPRESSAO_ATIVA = os.getenv('COMPRESSAO_ATIVA', 'True').lower() == 'true'
+    COMPRESSAO_MINIMO = int(os.getenv('COMPRESSAO_MINIMO', 1024))  # bytes; corpos menores saem sem compressão
+    COMPRESSAO_NIVEL_GZIP = int(os.getenv('COMPRESSAO_NIVEL_GZIP', 6))  # 1-9
+    COMPRESSAO_QUALIDADE_BROTLI = int(os.getenv('COMPRESSAO_QUALIDADE_BROTLI', 4))  # 0-11; 4 custa como gzip 6
+    COMPRESSAO_STREAM_MIN = int(os.getenv('COMPRESSAO_STREAM_MIN', 256 * 1024))  # bytes; acima, comprime em blocos
+    COMPRESSAO_CACHE_MAX_BYTES = int(os.getenv('COMPRESSAO_CACHE_MAX_BYTES', 4 * 1024 * 1024))  # respostas públicas
+
+    # --- GET /meditacoes/historico paginado (?page_size=, ?cursor=) ---
+    HISTORICO_PAGINA_PADRAO = int(os.getenv('HISTORICO_PAGINA_PADRAO', 50))  # itens sem page_size
+    HISTORICO_PAGINA_MAX = int(os.getenv('HISTORICO_PAGINA_MAX', 200))  # page_size maior é reduzido a este
+
+    # --- GET /usuarios paginado (?page_size=, ?cursor=, ?nome=) e listagem da CLI ---
+    USUARIOS_PAGINA_PADRAO = int(os.getenv('USUARIOS_PAGINA_PADRAO', 50))
+    USUARIOS_PAGINA_MAX = int(os.getenv('USUARIOS_PAGINA_MAX', 200))
+    USUARIOS_CURSOR_LOTE = int(os.getenv('USUARIOS_CURSOR_LOTE', 1000))  # linhas por ida ao banco na CLI
+
+    # --- GET /avaliacoes/historico filtrado e paginado (?tipo=, ?de=, ?ate=, ?page_size=, ?cursor=) ---
+    AVALIACOES_PAGINA_PADRAO = int(os.getenv('AVALIACOES_PAGINA_PADRAO', 50))
+    AVALIACOES_PAGINA_MAX = int(os.getenv('AVALIACOES_PAGINA_MAX', 200))
+
+    # --- GET /usuarios/<id>/exportar (NDJSON ou CSV em zip, em fluxo) ---
+    EXPORTACAO_LOTE = int(os.getenv('EXPORTACAO_LOTE', 1000))  # linhas por ida ao banco
+
+    # --- Relatórios do back-office (python cli.py relatorios, eports/relatorios.py) ---
+    RELATORIOS_LOTE = int(os.getenv('RELATORIOS_LOTE', 10000))  # linhas por ida ao banco (e por row group no Parquet)
+    RELATORIOS_PARALELO = int(os.getenv('RELATORIOS_PARALELO', 2))  # relatórios ao mesmo tempo, uma conexão cada
+    RELATORIOS_DIR = os.getenv('RELATORIOS_DIR', 'relatorios')  # diretório padrão dos arquivos
+
+    # --- Imagens estáticas (variantes AVIF/WebP/JPEG, imagens.py) ---
+    IMAGENS_LARGURAS = [int(l) for l in os.getenv('IMAGENS_LARGURAS', '320,640,1024').split(',')]  # px, sem ampliar
+    IMAGENS_VARIANTES_DIR = os.getenv('IMAGENS_VARIANTES_DIR')  # padrão: static/variantes
+    IMAGENS_MAX_AGE = int(os.getenv('IMAGENS_MAX_AGE', 86400))  # s; URL original negociada (a com hash é imutável)
+    IMAGENS_GERAR_NA_INICIALIZACAO = os.getenv('IMAGENS_GERAR_NA_INICIALIZACAO', 'True').lower() == 'true'
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'False').lower() == 'true'  # arquivos pelo nginx/Apache (X-Sendfile)
+
+    # --- Pool assíncrono (asgi.py / uvicorn) ---
+    DB_ASYNC_POOL_MIN = int(os.getenv('DB_ASYNC_POOL_MIN', 2))
+    DB_ASYNC_POOL_MAX = int(os.getenv('DB_ASYNC_POOL_MAX', 20))  # por processo; as requisições aguardam vaga
+    DB_ASYNC_STATEMENT_CACHE = int(os.getenv('DB_ASYNC_STATEMENT_CACHE', 100))  # comandos preparados por conexão
 
     # --- JWT ---
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
@@ -1,12 +1,19 @@
+import base64
 import bcrypt
+from datetime import date, datetime, timedelta
 import psycopg2.extras
 from werkzeug.security import generate_password_hash, check_password_hash
-from conexao import conectar, liberar_conexao
+from cache import CacheAtualizado, CacheCatalogo, CacheCompartilhado, CacheUsuarios, criar_backend
+from cache.catalogo import CANAL as CANAL_CATALOGO
+from cache.usuarios import CANAL as CANAL_USUARIOS
+from config import Config
+from conexao import obter_cursor, executar_preparado, apos_commit, transacao, marcar_alterado, alterado_sem_commit
 from model.usuario import Usuario
 from model.classificacao_humor import ClassificacaoHumor
 from model.meditacao import Meditacao
 from model.resultado_avaliacao import ResultadoAvaliacao
 from model.historico_meditacao import HistoricoMeditacao
+from schemas.avaliacao_schema import TIPOS_AVALIACAO
 
 
 # --- FUNÇÕES DE HASH DE SENHA ---
@@ -19,165 +26,292 @@ def verify_password(plain_password, stored_hash):
     return check_password_hash(stored_hash, plain_password)
 
 
+# Colunas de usuarios na ordem esperada pelos construtores abaixo
+# (lista explícita: comandos preparados não aceitam SELECT * após ALTER TABLE)
+COLUNAS_USUARIO = (
+    "id, nome, email, password_hash, config, data_cadastro, "
+    "cpf, data_nascimento, tipo_sanguineo, alergias, foto_perfil"
+)
+
+
+# --- PAGINAÇÃO POR CURSOR (keyset) ---
+
+VALORES_FALSOS = ('false', '0', 'nao', 'não')
+CURSOR_INVALIDO = "cursor inválido: use o next_cursor da página anterior"
+
+
+def _codificar_cursor(chave, ultimo_id):
+    """Cursor opaco (base64 url-safe) da posição depois do item (chave, id)."""
+    return base64.urlsafe_b64encode(f"{chave}|{ultimo_id}".encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor):
+    """(chave em texto, id) de um cursor de _codificar_cursor; ValueError se inválido."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        chave, ultimo_id = texto.rsplit('|', 1)
+        return chave, int(ultimo_id)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError(CURSOR_INVALIDO) from error
+
+
+def _codificar_cursor_data(data, ultimo_id):
+    """Cursor de uma chave timestamptz que pode ser NULL (vira '-infinity', como nos índices)."""
+    return _codificar_cursor(data.isoformat() if data is not None else '-infinity', ultimo_id)
+
+
+def _decodificar_cursor_data(cursor):
+    """(chave de data em texto, id) de um cursor de _codificar_cursor_data; ValueError se inválido."""
+    chave, ultimo_id = _decodificar_cursor(cursor)
+    if chave != '-infinity':
+        try:
+            datetime.fromisoformat(chave)
+        except ValueError as error:
+            raise ValueError(CURSOR_INVALIDO) from error
+    return chave, ultimo_id
+
+
+def tamanho_pagina(valor, padrao, maximo):
+    """
+    Tamanho da página a partir de ?page_size= (texto ou None): `padrao` se
+    ausente, nunca acima de `maximo`; ValueError se não for inteiro positivo.
+    """
+    if valor in (None, ''):
+        valor = padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        valor = 0
+    if valor <= 0:
+        raise ValueError("page_size deve ser um inteiro positivo")
+    return min(valor, maximo)
+
+
 # --- FUNÇÕES DE USUÁRIO ---
 
 def inserir_usuario(usuario):
-    """Insere um novo usuário no banco de dados."""
-    conn = None
-    cursor = None
+    """Insere um novo usuário no banco de dados e retorna o ID gerado."""
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        
         # ✅ CORREÇÃO: Usar usuario.password em vez de usuario.password_hash
         if not hasattr(usuario, 'password') or not usuario.password:
             raise ValueError("Senha é obrigatória para criar usuário")
-        
+
+        # Hash calculado antes de abrir a transação (scrypt é lento)
         password_hash_str = generate_hash(usuario.password)
-        sql = "INSERT INTO usuarios (nome, email, password_hash, config) VALUES (%s, %s, %s, %s)"
-        cursor.execute(sql, (usuario.nome, usuario.email, password_hash_str, usuario.config))
-        conn.commit()
+
+        with obter_cursor() as cursor:
+            sql = "INSERT INTO usuarios (nome, email, password_hash, config) VALUES (%s, %s, %s, %s) RETURNING id"
+            cursor.execute(sql, (usuario.nome, usuario.email, password_hash_str, usuario.config))
+            usuario.id = cursor.fetchone()[0]
+        marcar_alterado(('usuario', usuario.id))
         print(f"✅ Usuário {usuario.nome} inserido com sucesso!")
-        
+        return usuario.id
+
     except Exception as error:
-        if conn: 
-            conn.rollback()
         print(f"❌ Erro ao inserir usuário: {error}")
         raise  # ✅ Re-lança a exceção para o Flask tratar
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+# Listagem de usuários: só as colunas da resposta (nunca password_hash, config
+# ou foto_perfil). Sem filtro, pagina pela chave primária; com prefixo do nome,
+# por (lower(nome), id) em COLLATE "C" (idx_usuarios_nome_prefixo, migração
+# 007), onde o prefixo é o intervalo [prefixo, prefixo || U+10FFFF). Sem cursor
+# a chave começa no próprio prefixo ($2 NULL), para o índice não varrer os
+# nomes anteriores.
+_SQL_USUARIOS_PAGINA = """
+    SELECT id, nome, data_cadastro FROM usuarios
+    WHERE id > $1
+    ORDER BY id
+    LIMIT $2
+"""
+
+_SQL_USUARIOS_PAGINA_PREFIXO = """
+    SELECT id, nome, data_cadastro, lower(nome) FROM usuarios
+    WHERE (lower(nome) COLLATE "C", id) > (COALESCE($2, lower($1)) COLLATE "C", $3)
+      AND lower(nome) COLLATE "C" < (lower($1) || chr(1114111)) COLLATE "C"
+    ORDER BY lower(nome) COLLATE "C", id
+    LIMIT $4
+"""
+
+
+# GET /usuarios sem nenhum destes parâmetros devolve a lista inteira, como antes
+PARAMETROS_USUARIOS = ('page_size', 'cursor', 'nome')
+
+_SQL_USUARIOS_TODOS = "SELECT id, nome, data_cadastro FROM usuarios ORDER BY id"
+
+
+def _item_usuario(linha):
+    return {'id': linha[0], 'nome': linha[1], 'data_cadastro': linha[2]}
+
 
 def listar_usuarios():
-    """Lista todos os usuários cadastrados."""
-    conn = None
-    cursor = None
-    usuarios_lista = []
-    try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = "SELECT * FROM usuarios"
-        cursor.execute(sql)
-        resultados = cursor.fetchall()
-        
-        for linha in resultados:
-            usuario = Usuario(
-                id=linha[0], 
-                nome=linha[1], 
-                email=linha[2], 
-                password_hash=linha[3], 
-                config=linha[4], 
-                data_cadastro=linha[5]
-            )
-            usuarios_lista.append(usuario)
-        return usuarios_lista
-        
+    """Todos os usuários (id, nome, data_cadastro), por id: GET /usuarios sem paginação. None se o banco falhou."""
+    try:
+        with obter_cursor(somente_leitura=True) as cursor:
+            cursor.execute(_SQL_USUARIOS_TODOS)
+            return [_item_usuario(linha) for linha in cursor.fetchall()]
+
     except Exception as error:
         print(f"❌ Erro ao listar usuários: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
-def buscar_usuario_por_email(email):
-    """Busca um usuário pelo email."""
-    conn = None
-    cursor = None
+
+def parametros_pagina_usuarios(tamanho, prefixo):
+    """(tamanho, prefixo) a partir de ?page_size= e ?nome=; prefixo vazio vira None."""
+    tamanho = tamanho_pagina(tamanho, Config.USUARIOS_PAGINA_PADRAO, Config.USUARIOS_PAGINA_MAX)
+    return tamanho, (prefixo or '').strip() or None
+
+
+def _pagina_usuarios(linhas, tamanho, prefixo):
+    """{'itens', 'next_cursor'} a partir de até `tamanho` + 1 linhas (a extra só indica que há mais)."""
+    itens = [_item_usuario(linha) for linha in linhas[:tamanho]]
+    proximo = None
+    if len(linhas) > tamanho:
+        ultimo = linhas[tamanho - 1]
+        proximo = _codificar_cursor(ultimo[3] if prefixo else '', ultimo[0])
+    return {'itens': itens, 'next_cursor': proximo}
+
+
+def listar_usuarios_pagina(tamanho, cursor=None, prefixo=None):
+    """
+    Uma página de usuários (id, nome, data_cadastro): {'itens', 'next_cursor'}
+    (None na última página). Por id; com `prefixo`, só os nomes que começam
+    com ele (sem diferenciar maiúsculas), por nome. `cursor` é o next_cursor
+    da página anterior; ValueError se inválido. None se o banco falhou.
+    """
+    chave, ultimo_id = _decodificar_cursor(cursor) if cursor else ('', 0)
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = "SELECT * FROM usuarios WHERE email = %s"
-        cursor.execute(sql, (email,))
-        linha = cursor.fetchone()
-        
-        if linha:
-            return Usuario(
-                id=linha[0], 
-                nome=linha[1], 
-                email=linha[2], 
-                password_hash=linha[3], 
-                config=linha[4], 
-                data_cadastro=linha[5],
-                cpf=linha[6] if len(linha) > 6 else None,
-                data_nascimento=linha[7] if len(linha) > 7 else None,
-                tipo_sanguineo=linha[8] if len(linha) > 8 else None,
-                alergias=linha[9] if len(linha) > 9 else None,
-                foto_perfil=linha[10] if len(linha) > 10 else None
-            )
+        with obter_cursor(somente_leitura=True) as cur:
+            if prefixo:
+                executar_preparado(cur, 'calmou_usuarios_pagina_prefixo', _SQL_USUARIOS_PAGINA_PREFIXO,
+                                   (prefixo, chave or None, ultimo_id, tamanho + 1))
+            else:
+                executar_preparado(cur, 'calmou_usuarios_pagina', _SQL_USUARIOS_PAGINA,
+                                   (ultimo_id, tamanho + 1))
+            linhas = cur.fetchall()
+        return _pagina_usuarios(linhas, tamanho, prefixo)
+
+    except Exception as error:
+        print(f"❌ Erro ao listar usuários: {error}")
         return None
-        
+
+
+def iterar_usuarios(prefixo=None, lote=None):
+    """
+    Gera (id, nome, email, data_cadastro) de todos os usuários, por id, ou
+    dos que têm nome começando com `prefixo`, por nome. Usa um cursor nomeado
+    no servidor: a memória fica em `lote` linhas (USUARIOS_CURSOR_LOTE) por
+    ida ao banco, com qualquer número de usuários. A transação fica aberta
+    enquanto o gerador é consumido.
+    """
+    with obter_cursor(somente_leitura=True, name='calmou_iterar_usuarios') as cursor:
+        cursor.itersize = lote or Config.USUARIOS_CURSOR_LOTE
+        if prefixo:
+            cursor.execute("""
+                SELECT id, nome, email, data_cadastro FROM usuarios
+                WHERE lower(nome) COLLATE "C" >= lower(%s) COLLATE "C"
+                  AND lower(nome) COLLATE "C" < (lower(%s) || chr(1114111)) COLLATE "C"
+                ORDER BY lower(nome) COLLATE "C", id
+            """, (prefixo, prefixo))
+        else:
+            cursor.execute("SELECT id, nome, email, data_cadastro FROM usuarios ORDER BY id")
+        yield from cursor
+
+# Projeção guardada no cache de usuários: sem `config`, e `foto_perfil` só
+# quando cabe em USUARIO_CACHE_FOTO_MAX bytes (a última coluna diz se ficou
+# de fora uma foto maior)
+COLUNAS_USUARIO_CACHE = (
+    "id, nome, email, password_hash, data_cadastro, cpf, data_nascimento, tipo_sanguineo, alergias, "
+    "CASE WHEN octet_length(foto_perfil) <= $2 THEN foto_perfil END, "
+    "COALESCE(octet_length(foto_perfil) > $2, false)"
+)
+
+usuarios_cache = CacheUsuarios(
+    lambda projecao: (projecao[0], projecao[2]),
+    ttl=Config.USUARIO_CACHE_TTL, max_bytes=Config.USUARIO_CACHE_MAX_BYTES, escutar=Config.USUARIO_CACHE_LISTEN,
+    # A unidade de trabalho lê o que ela mesma escreveu: até o commit, isso não vai para o cache
+    pode_guardar=lambda projecao: not alterado_sem_commit(('usuario', projecao[0]))
+)
+
+
+def _carregar_projecao(nome, coluna, valor):
+    """Linha da projeção do cache, buscada por `coluna` (None se não existe ou se o banco falhou)."""
+    try:
+        with obter_cursor() as cursor:
+            sql = f"SELECT {COLUNAS_USUARIO_CACHE} FROM usuarios WHERE {coluna} = $1"
+            executar_preparado(cursor, nome, sql, (valor, Config.USUARIO_CACHE_FOTO_MAX))
+            linha = cursor.fetchone()
+        return tuple(linha) if linha else None
+
     except Exception as error:
-        print(f"❌ Erro ao buscar usuário por email: {error}")
+        print(f"❌ Erro ao buscar usuário por {coluna}: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
-
-def buscar_usuario_por_id(id):
-    """Busca um usuário pelo ID."""
-    conn = None
-    cursor = None
-    try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = "SELECT * FROM usuarios WHERE id = %s"
-        cursor.execute(sql, (id,))
+
+
+def _buscar_foto_perfil(id):
+    with obter_cursor() as cursor:
+        executar_preparado(cursor, 'calmou_usuario_foto', "SELECT foto_perfil FROM usuarios WHERE id = $1", (id,))
         linha = cursor.fetchone()
-        
-        if linha:
-            return Usuario(
-                id=linha[0], 
-                nome=linha[1], 
-                email=linha[2], 
-                password_hash=linha[3], 
-                config=linha[4], 
-                data_cadastro=linha[5],
-                cpf=linha[6] if len(linha) > 6 else None,
-                data_nascimento=linha[7] if len(linha) > 7 else None,
-                tipo_sanguineo=linha[8] if len(linha) > 8 else None,
-                alergias=linha[9] if len(linha) > 9 else None,
-                foto_perfil=linha[10] if len(linha) > 10 else None  # ✅ CORREÇÃO: Adicionado foto_perfil
-            )
-        return None
-        
+    return linha[0] if linha else None
+
+
+def _usuario_da_projecao(projecao, com_foto):
+    foto_perfil = projecao[9]
+    if com_foto and projecao[10]:
+        foto_perfil = _buscar_foto_perfil(projecao[0])
+    return Usuario(
+        id=projecao[0],
+        nome=projecao[1],
+        email=projecao[2],
+        password_hash=projecao[3],
+        data_cadastro=projecao[4],
+        cpf=projecao[5],
+        data_nascimento=projecao[6],
+        tipo_sanguineo=projecao[7],
+        alergias=projecao[8],
+        foto_perfil=foto_perfil
+    )
+
+
+def buscar_usuario_por_email(email):
+    """
+    Busca um usuário pelo email, pelo cache de usuários (sem `config`; uma
+    foto_perfil acima de USUARIO_CACHE_FOTO_MAX vem como None).
+    """
+    projecao = usuarios_cache.por_email(
+        email, lambda: _carregar_projecao('calmou_usuario_por_email', 'email', email))
+    return _usuario_da_projecao(projecao, com_foto=False) if projecao else None
+
+def buscar_usuario_por_id(id, com_foto=True):
+    """
+    Busca um usuário pelo ID, pelo cache de usuários (sem `config`). Com
+    `com_foto=False`, uma foto_perfil acima de USUARIO_CACHE_FOTO_MAX vem
+    como None em vez de ser lida do banco.
+    """
+    try:
+        projecao = usuarios_cache.por_id(id, lambda: _carregar_projecao('calmou_usuario_por_id', 'id', id))
+        return _usuario_da_projecao(projecao, com_foto) if projecao else None
+
     except Exception as error:
         print(f"❌ Erro ao buscar usuário por id: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+
+def _avisar_usuario_alterado(cursor, usuario_id):
+    """
+    Tira `usuario_id` do cache de usuários: agora, de novo depois do commit
+    (uma leitura de outra requisição pode ter guardado a linha antiga) e, pelo
+    NOTIFY que sai no commit, nos demais workers. Até o commit (ou rollback),
+    as leituras da própria unidade de trabalho não guardam o usuário.
+    """
+    executar_preparado(cursor, 'calmou_avisar_usuario', "SELECT pg_notify($1, $2)",
+                       (CANAL_USUARIOS, str(usuario_id)))
+    marcar_alterado(('usuario', usuario_id))
+    usuarios_cache.invalidar(usuario_id)
+    apos_commit(lambda: usuarios_cache.invalidar(usuario_id))
 
 def atualizar_usuario(usuario):
     """Atualiza os dados de um usuário."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        
         # ✅ CORREÇÃO: Verificar usuario.password em vez de password_hash
         if hasattr(usuario, 'password') and usuario.password:
             password_hash = generate_hash(usuario.password)
@@ -186,33 +320,19 @@ def atualizar_usuario(usuario):
         else:
             sql = "UPDATE usuarios SET nome = %s, email = %s, config = %s WHERE id = %s"
             params = (usuario.nome, usuario.email, usuario.config, usuario.id)
-        
-        cursor.execute(sql, params)
-        conn.commit()
+
+        with obter_cursor(usuario_id=usuario.id) as cursor:
+            cursor.execute(sql, params)
+            _avisar_usuario_alterado(cursor, usuario.id)
         print(f"✅ Usuário ID {usuario.id} atualizado com sucesso!")
-        
+
     except Exception as error:
-        if conn: 
-            conn.rollback()
         print(f"❌ Erro ao atualizar usuário: {error}")
         raise  # ✅ Re-lança a exceção
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 def atualizar_perfil(usuario):
     """Atualiza apenas os dados do perfil do usuário (não credenciais)."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        
         # ✅ CORREÇÃO: Adicionado foto_perfil no UPDATE
         sql = """
             UPDATE usuarios 
@@ -220,113 +340,128 @@ def atualizar_perfil(usuario):
                 tipo_sanguineo = %s, alergias = %s, foto_perfil = %s
             WHERE id = %s
         """
-        
-        cursor.execute(sql, (
-            usuario.nome,
-            usuario.cpf,
-            usuario.data_nascimento,
-            usuario.tipo_sanguineo,
-            usuario.alergias,
-            usuario.foto_perfil,  # ✅ CORREÇÃO: Adicionado
-            usuario.id
-        ))
-        
-        conn.commit()
+
+        with obter_cursor(usuario_id=usuario.id) as cursor:
+            cursor.execute(sql, (
+                usuario.nome,
+                usuario.cpf,
+                usuario.data_nascimento,
+                usuario.tipo_sanguineo,
+                usuario.alergias,
+                usuario.foto_perfil,  # ✅ CORREÇÃO: Adicionado
+                usuario.id
+            ))
+            _avisar_usuario_alterado(cursor, usuario.id)
+
         print(f"✅ Perfil atualizado com sucesso para usuário ID: {usuario.id}")
         return True
-        
+
     except Exception as error:
-        if conn: 
-            conn.rollback()
         print(f"❌ Erro ao atualizar perfil: {error}")
         return False
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 def remover_usuario(id):
     """Remove um usuário do banco de dados."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = "DELETE FROM usuarios WHERE id = %s"
-        cursor.execute(sql, (id,))
-        conn.commit()
+        with obter_cursor(usuario_id=id) as cursor:
+            sql = "DELETE FROM usuarios WHERE id = %s"
+            cursor.execute(sql, (id,))
+            _avisar_usuario_alterado(cursor, id)
         print(f"✅ Usuário ID {id} removido com sucesso!")
-        
+
     except Exception as error:
-        if conn: 
-            conn.rollback()
         print(f"❌ Erro ao remover usuário: {error}")
         raise  # ✅ Re-lança a exceção
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+
+# --- VERSÕES DOS DADOS DO USUÁRIO (GET condicional) ---
+
+def _incrementar_versao(cursor, usuario_id, dominio):
+    """Nova versão dos dados de `dominio` ('historico', 'humor', 'avaliacoes'), na transação da escrita."""
+    sql = """
+        INSERT INTO versoes_dados_usuario (usuario_id, dominio, versao)
+        VALUES ($1, $2, nextval('versoes_dados_usuario_seq'))
+        ON CONFLICT (usuario_id, dominio) DO UPDATE SET versao = EXCLUDED.versao
+    """
+    executar_preparado(cursor, 'calmou_incrementar_versao', sql, (usuario_id, dominio))
+
+
+def obter_versao_dados(usuario_id, dominio):
+    """
+    (versão, data de hoje no banco) dos dados de `dominio` do usuário.
+    Retorna None se o usuário ainda não tem versão registrada (ou se o banco falhou).
+    """
+    try:
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cursor:
+            sql = "SELECT versao, current_date FROM versoes_dados_usuario WHERE usuario_id = $1 AND dominio = $2"
+            executar_preparado(cursor, 'calmou_versao_dados', sql, (usuario_id, dominio))
+            return cursor.fetchone()
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar versão dos dados do usuário: {error}")
+        return None
 
 
 # --- FUNÇÕES DE HUMOR ---
 
+# INSERT do registro e soma no resumo do dia (humor_diario) num só comando:
+# o dia vem de data_classificacao no fuso do banco; LEAST/GREATEST ignoram
+# nivel_humor NULL e sentimento NULL não entra nas contagens
+_SQL_INSERIR_HUMOR = """
+    WITH nova AS (
+        INSERT INTO classificacoes_humor (usuario_id, nivel_humor, sentimento_principal, notas)
+        VALUES ($1, $2, $3, $4)
+        RETURNING usuario_id, data_classificacao::date AS dia, nivel_humor, sentimento_principal
+    )
+    INSERT INTO humor_diario AS h (usuario_id, dia, registros, niveis, soma, minimo, maximo, sentimentos)
+    SELECT usuario_id, dia, 1, (nivel_humor IS NOT NULL)::int, COALESCE(nivel_humor, 0), nivel_humor, nivel_humor,
+           CASE WHEN sentimento_principal IS NULL THEN '{}'::jsonb
+                ELSE jsonb_build_object(sentimento_principal, 1) END
+    FROM nova
+    ON CONFLICT (usuario_id, dia) DO UPDATE SET
+        registros = h.registros + 1,
+        niveis = h.niveis + EXCLUDED.niveis,
+        soma = h.soma + EXCLUDED.soma,
+        minimo = LEAST(h.minimo, EXCLUDED.minimo),
+        maximo = GREATEST(h.maximo, EXCLUDED.maximo),
+        sentimentos = h.sentimentos || (
+            SELECT COALESCE(jsonb_object_agg(chave, COALESCE((h.sentimentos ->> chave)::int, 0) + 1), '{}')
+            FROM jsonb_object_keys(EXCLUDED.sentimentos) AS chave
+        )
+"""
+
+
 def inserir_classificacao_humor(classificacao):
-    """Insere um novo registro de humor no banco de dados."""
-    conn = None
-    cursor = None
+    """Insere um novo registro de humor no banco de dados (e o soma ao resumo do dia)."""
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = "INSERT INTO classificacoes_humor (usuario_id, nivel_humor, sentimento_principal, notas) VALUES (%s, %s, %s, %s)"
-        
-        cursor.execute(sql, (
-            classificacao.usuario_id, 
-            classificacao.nivel_humor, 
-            classificacao.sentimento_principal, 
-            classificacao.notas
-        ))
-        conn.commit()
+        with obter_cursor(usuario_id=classificacao.usuario_id) as cursor:
+            executar_preparado(cursor, 'calmou_inserir_humor', _SQL_INSERIR_HUMOR, (
+                classificacao.usuario_id, 
+                classificacao.nivel_humor, 
+                classificacao.sentimento_principal, 
+                classificacao.notas
+            ))
+            _incrementar_versao(cursor, classificacao.usuario_id, 'humor')
         print(f"✅ Classificação de humor inserida para usuário ID {classificacao.usuario_id}")
-        
+
     except Exception as error:
-        if conn: 
-            conn.rollback()
         print(f"❌ Erro ao inserir classificação de humor: {error}")
         raise  # ✅ Re-lança a exceção
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 def relatorio_humor_semanal(usuario_id):
     """Busca as classificações de humor dos últimos 7 dias para um usuário."""
-    conn = None
-    cursor = None
     registros = []
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = """
-            SELECT data_classificacao, nivel_humor 
-            FROM classificacoes_humor
-            WHERE usuario_id = %s AND data_classificacao >= current_date - interval '7 days'
-            ORDER BY data_classificacao ASC;
-        """
-        cursor.execute(sql, (usuario_id,))
-        resultados = cursor.fetchall()
-        
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cursor:
+            sql = """
+                SELECT data_classificacao, nivel_humor 
+                FROM classificacoes_humor
+                WHERE usuario_id = %s AND data_classificacao >= current_date - interval '7 days'
+                ORDER BY data_classificacao ASC;
+            """
+            cursor.execute(sql, (usuario_id,))
+            resultados = cursor.fetchall()
+
         for linha in resultados:
             registros.append({
                 'data': linha[0].strftime('%d/%m'),
@@ -337,30 +472,175 @@ def relatorio_humor_semanal(usuario_id):
     except Exception as error:
         print(f"❌ Erro ao gerar relatório de humor semanal: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+
+# --- RELATÓRIO DE HUMOR POR PERÍODO (resumo diário) ---
+
+GRANULARIDADES_HUMOR = ('dia', 'semana', 'mes')
+# Maior intervalo (em dias) aceito por granularidade: ~1 ano de dias, ~5 anos de semanas/meses
+MAX_DIAS_RELATORIO_HUMOR = {'dia': 366, 'semana': 5 * 366, 'mes': 5 * 366}
+DIAS_PADRAO_RELATORIO_HUMOR = 30
+
+COLUNAS_HUMOR_DIARIO = 'dia, registros, niveis, soma, minimo, maximo, sentimentos'
+
+_SQL_RELATORIO_HUMOR = f"""
+    SELECT {COLUNAS_HUMOR_DIARIO}
+    FROM humor_diario
+    WHERE usuario_id = $1 AND dia BETWEEN $2 AND $3
+    ORDER BY dia
+"""
+
+# Carga completa (migração 005, reconstrução e dados sintéticos)
+_SQL_HUMOR_DIARIO_TODOS = """
+    SELECT d.usuario_id, d.dia, d.registros, d.niveis, d.soma, d.minimo, d.maximo,
+           COALESCE(s.sentimentos, '{}') AS sentimentos
+    FROM (
+        SELECT usuario_id, data_classificacao::date AS dia, COUNT(*) AS registros, COUNT(nivel_humor) AS niveis,
+               COALESCE(SUM(nivel_humor), 0) AS soma, MIN(nivel_humor) AS minimo, MAX(nivel_humor) AS maximo
+        FROM classificacoes_humor
+        GROUP BY 1, 2
+    ) AS d
+    LEFT JOIN (
+        SELECT usuario_id, dia, jsonb_object_agg(sentimento_principal, total) AS sentimentos
+        FROM (
+            SELECT usuario_id, data_classificacao::date AS dia, sentimento_principal, COUNT(*) AS total
+            FROM classificacoes_humor
+            WHERE sentimento_principal IS NOT NULL
+            GROUP BY 1, 2, 3
+        ) AS c
+        GROUP BY 1, 2
+    ) AS s ON s.usuario_id = d.usuario_id AND s.dia = d.dia
+"""
+
+
+def hoje_no_banco():
+    """
+    current_date do banco: o mesmo "hoje" do resumo diário (humor_diario) e das
+    ETags por dia, qualquer que seja o fuso do servidor da API. None se falhou.
+    """
+    try:
+        with obter_cursor(somente_leitura=True) as cursor:
+            cursor.execute("SELECT current_date")
+            return cursor.fetchone()[0]
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar a data do banco: {error}")
+        return None
+
+
+def periodo_relatorio_humor(de, ate, granularidade, hoje):
+    """
+    Valida os parâmetros de GET /humor/relatorio (strings ou None) e devolve
+    (de, ate, granularidade) com as datas como `date`. Sem `ate`, vale `hoje`
+    (hoje_no_banco, não a data do servidor da API);
+    sem `de`, os DIAS_PADRAO_RELATORIO_HUMOR dias até `ate`. ValueError com a
+    mensagem para o cliente se algo não vale.
+    """
+    granularidade = granularidade or 'dia'
+    if granularidade not in GRANULARIDADES_HUMOR:
+        raise ValueError(f"granularidade deve ser uma de: {', '.join(GRANULARIDADES_HUMOR)}")
+    try:
+        ate = date.fromisoformat(ate) if ate else hoje
+        de = date.fromisoformat(de) if de else ate - timedelta(days=DIAS_PADRAO_RELATORIO_HUMOR - 1)
+    except ValueError:
+        raise ValueError("de e ate devem estar no formato AAAA-MM-DD")
+    if de > ate:
+        raise ValueError("de deve ser anterior ou igual a ate")
+    limite = MAX_DIAS_RELATORIO_HUMOR[granularidade]
+    if (ate - de).days + 1 > limite:
+        raise ValueError(f"intervalo máximo para granularidade {granularidade}: {limite} dias")
+    return de, ate, granularidade
+
+
+def _inicio_periodo(dia, granularidade):
+    if granularidade == 'semana':
+        return dia - timedelta(days=dia.weekday())  # segunda-feira (semana ISO)
+    if granularidade == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def _agregar_humor(linhas, granularidade):
+    """
+    Soma as linhas de humor_diario (na ordem de COLUNAS_HUMOR_DIARIO, por dia
+    crescente) em dias, semanas ou meses. Períodos sem registro não aparecem;
+    o sentimento dominante é o mais frequente (empate: o de nome menor).
+    """
+    periodos = {}
+    for dia, registros, niveis, soma, minimo, maximo, sentimentos in linhas:
+        inicio = _inicio_periodo(dia, granularidade)
+        periodo = periodos.get(inicio)
+        if periodo is None:
+            periodo = periodos[inicio] = {'registros': 0, 'niveis': 0, 'soma': 0,
+                                          'minimo': None, 'maximo': None, 'sentimentos': {}}
+        periodo['registros'] += registros
+        periodo['niveis'] += niveis
+        periodo['soma'] += soma
+        if minimo is not None:
+            periodo['minimo'] = minimo if periodo['minimo'] is None else min(periodo['minimo'], minimo)
+            periodo['maximo'] = maximo if periodo['maximo'] is None else max(periodo['maximo'], maximo)
+        for sentimento, total in sentimentos.items():
+            periodo['sentimentos'][sentimento] = periodo['sentimentos'].get(sentimento, 0) + total
+
+    resultado = []
+    for inicio in sorted(periodos):
+        periodo = periodos[inicio]
+        sentimentos = periodo['sentimentos']
+        resultado.append({
+            'periodo': inicio.isoformat(),
+            'registros': periodo['registros'],
+            'media': round(periodo['soma'] / periodo['niveis'], 2) if periodo['niveis'] else None,
+            'minimo': periodo['minimo'],
+            'maximo': periodo['maximo'],
+            'sentimento_dominante': min(sentimentos, key=lambda s: (-sentimentos[s], s), default=None),
+        })
+    return resultado
+
+
+def relatorio_humor(usuario_id, de, ate, granularidade):
+    """
+    Relatório de humor de `de` a `ate` (datas, inclusive) agregado por
+    `granularidade`, lido do resumo diário (uma faixa da chave primária).
+    """
+    try:
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cursor:
+            executar_preparado(cursor, 'calmou_relatorio_humor', _SQL_RELATORIO_HUMOR, (usuario_id, de, ate))
+            linhas = cursor.fetchall()
+
+        return {
+            'de': de.isoformat(),
+            'ate': ate.isoformat(),
+            'granularidade': granularidade,
+            'periodos': _agregar_humor(linhas, granularidade),
+        }
+
+    except Exception as error:
+        print(f"❌ Erro ao gerar relatório de humor: {error}")
+        return None
+
+
+def reconstruir_humor_diario(cursor):
+    """
+    Refaz humor_diario inteira a partir de classificacoes_humor, na transação
+    de `cursor`. Devolve o número de linhas (usuário, dia).
+    """
+    cursor.execute("DELETE FROM humor_diario")
+    cursor.execute("INSERT INTO humor_diario (usuario_id, dia, registros, niveis, soma, minimo, maximo, sentimentos) "
+                   + _SQL_HUMOR_DIARIO_TODOS)
+    return cursor.rowcount
 
 
 # --- FUNÇÕES DE MEDITAÇÃO ---
 
 def listar_meditacoes():
     """Busca todas as meditações do catálogo."""
-    conn = None
-    cursor = None
     meditacoes_lista = []
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = "SELECT * FROM meditacoes"
-        cursor.execute(sql)
-        resultados = cursor.fetchall()
-        
+        with obter_cursor(somente_leitura=True) as cursor:
+            sql = "SELECT * FROM meditacoes"
+            cursor.execute(sql)
+            resultados = cursor.fetchall()
+
         for linha in resultados:
             meditacao = Meditacao(
                 id=linha[0], 
@@ -378,26 +658,15 @@ def listar_meditacoes():
     except Exception as error:
         print(f"❌ Erro ao listar meditações: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 def buscar_meditacao_por_id(id):
     """Busca os detalhes de uma única meditação pelo seu ID."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = "SELECT * FROM meditacoes WHERE id = %s"
-        cursor.execute(sql, (id,))
-        linha = cursor.fetchone()
-        
+        with obter_cursor(somente_leitura=True) as cursor:
+            sql = "SELECT * FROM meditacoes WHERE id = %s"
+            cursor.execute(sql, (id,))
+            linha = cursor.fetchone()
+
         if linha:
             return Meditacao(
                 id=linha[0], 
@@ -414,81 +683,95 @@ def buscar_meditacao_por_id(id):
     except Exception as error:
         print(f"❌ Erro ao buscar meditação: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 def inserir_meditacao(meditacao):
     """Insere uma nova meditação no catálogo."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = """
-            INSERT INTO meditacoes 
-            (titulo, descricao, duracao_minutos, url_audio, tipo, categoria, imagem_capa) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        cursor.execute(sql, (
-            meditacao.titulo,
-            meditacao.descricao,
-            meditacao.duracao_minutos,
-            meditacao.url_audio,
-            meditacao.tipo,
-            meditacao.categoria,
-            meditacao.imagem_capa
-        ))
-        
-        conn.commit()
+        with obter_cursor() as cursor:
+            sql = """
+                INSERT INTO meditacoes 
+                (titulo, descricao, duracao_minutos, url_audio, tipo, categoria, imagem_capa) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """
+
+            cursor.execute(sql, (
+                meditacao.titulo,
+                meditacao.descricao,
+                meditacao.duracao_minutos,
+                meditacao.url_audio,
+                meditacao.tipo,
+                meditacao.categoria,
+                meditacao.imagem_capa
+            ))
+            # Avisa os outros processos; o aviso só sai quando a transação confirma
+            cursor.execute("SELECT pg_notify(%s, '')", (CANAL_CATALOGO,))
+
+        # Neste processo também só depois do commit: antes, uma leitura concorrente
+        # guardaria de novo o catálogo antigo; num rollback, não há o que descartar
+        apos_commit(catalogo.invalidar)
         print(f"✅ Meditação '{meditacao.titulo}' inserida com sucesso!")
         return True
 
     except Exception as error:
-        if conn:
-            conn.rollback()
         print(f"❌ Erro ao inserir meditação: {error}")
         return False
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+
+def _resumo_meditacao(meditacao):
+    """Item de GET /meditacoes."""
+    return {
+        'id': meditacao.id,
+        'titulo': meditacao.titulo,
+        'categoria': meditacao.categoria,
+        'imagem_capa': meditacao.imagem_capa
+    }
+
+
+def _detalhe_meditacao(meditacao):
+    """Corpo de GET /meditacoes/<id>."""
+    return {
+        'id': meditacao.id,
+        'titulo': meditacao.titulo,
+        'descricao': meditacao.descricao,
+        'duracao_minutos': meditacao.duracao_minutos,
+        'url_audio': meditacao.url_audio,
+        'tipo': meditacao.tipo,
+        'categoria': meditacao.categoria,
+        'imagem_capa': meditacao.imagem_capa
+    }
+
+
+# Catálogo em memória do processo; inserir_meditacao invalida aqui e, por NOTIFY, nos demais workers
+catalogo = CacheCatalogo(
+    listar_meditacoes, buscar_meditacao_por_id, _resumo_meditacao, _detalhe_meditacao,
+    ttl=Config.CATALOGO_CACHE_TTL, escutar=Config.CATALOGO_CACHE_LISTEN
+)
 
 
 # --- FUNÇÕES DE HISTÓRICO DE MEDITAÇÕES ---
 
 def registrar_meditacao_concluida(historico):
     """Registra uma meditação concluída pelo usuário."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-
-        cursor = conn.cursor()
-        sql = """
-            INSERT INTO historico_meditacoes
-            (usuario_id, meditacao_id, duracao_real_minutos)
-            VALUES (%s, %s, %s)
-            RETURNING id, data_conclusao
-        """
+        with obter_cursor(usuario_id=historico.usuario_id) as cursor:
+            sql = """
+                INSERT INTO historico_meditacoes
+                (usuario_id, meditacao_id, duracao_real_minutos)
+                VALUES ($1, $2, $3)
+                RETURNING id, data_conclusao
+            """
 
-        cursor.execute(sql, (
-            historico.usuario_id,
-            historico.meditacao_id,
-            historico.duracao_real_minutos
-        ))
+            executar_preparado(cursor, 'calmou_inserir_historico', sql, (
+                historico.usuario_id,
+                historico.meditacao_id,
+                historico.duracao_real_minutos
+            ))
 
-        resultado = cursor.fetchone()
-        conn.commit()
+            resultado = cursor.fetchone()
+            _registrar_sessao_no_resumo(cursor, historico.usuario_id, historico.meditacao_id,
+                                        historico.duracao_real_minutos, resultado[1])
+            _incrementar_versao(cursor, historico.usuario_id, 'historico')
+        apos_commit(lambda: _invalidar_estatisticas(historico.usuario_id))
 
         print(f"✅ Meditação registrada no histórico para usuário {historico.usuario_id}")
 
@@ -499,308 +782,517 @@ def registrar_meditacao_concluida(historico):
         }
 
     except Exception as error:
-        if conn:
-            conn.rollback()
         print(f"❌ Erro ao registrar histórico de meditação: {error}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+
+def _item_historico(linha):
+    """Item da resposta do histórico; data_conclusao fica `datetime` (o provedor JSON escreve em ISO 8601)."""
+    return {
+        'id': linha[0],
+        'usuario_id': linha[1],
+        'meditacao_id': linha[2],
+        'data_conclusao': linha[3],
+        'duracao_real_minutos': linha[4],
+        'meditacao': {
+            'titulo': linha[5],
+            'descricao': linha[6],
+            'duracao_minutos': linha[7],
+            'categoria': linha[8],
+            'tipo': linha[9],
+            'imagem_capa': linha[10]
+        }
+    }
 
 
 def listar_historico_meditacoes(usuario_id, limit=None):
     """Lista o histórico de meditações de um usuário."""
-    conn = None
-    cursor = None
-    historico_lista = []
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cursor:
+            if limit:
+                sql = """
+                    SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
+                           hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
+                           m.categoria, m.tipo, m.imagem_capa
+                    FROM historico_meditacoes hm
+                    JOIN meditacoes m ON hm.meditacao_id = m.id
+                    WHERE hm.usuario_id = $1
+                    ORDER BY hm.data_conclusao DESC
+                    LIMIT $2
+                """
+                executar_preparado(cursor, 'calmou_historico_limitado', sql, (usuario_id, limit))
+            else:
+                sql = """
+                    SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
+                           hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
+                           m.categoria, m.tipo, m.imagem_capa
+                    FROM historico_meditacoes hm
+                    JOIN meditacoes m ON hm.meditacao_id = m.id
+                    WHERE hm.usuario_id = $1
+                    ORDER BY hm.data_conclusao DESC
+                """
+                executar_preparado(cursor, 'calmou_historico', sql, (usuario_id,))
+
+            resultados = cursor.fetchall()
+
+        return [_item_historico(linha) for linha in resultados]
 
-        cursor = conn.cursor()
+    except Exception as error:
+        print(f"❌ Erro ao listar histórico de meditações: {error}")
+        return None
 
-        if limit:
-            sql = """
-                SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
-                       hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
-                       m.categoria, m.tipo, m.imagem_capa
-                FROM historico_meditacoes hm
-                JOIN meditacoes m ON hm.meditacao_id = m.id
-                WHERE hm.usuario_id = %s
-                ORDER BY hm.data_conclusao DESC
-                LIMIT %s
-            """
-            cursor.execute(sql, (usuario_id, limit))
-        else:
-            sql = """
-                SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
-                       hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
-                       m.categoria, m.tipo, m.imagem_capa
-                FROM historico_meditacoes hm
-                JOIN meditacoes m ON hm.meditacao_id = m.id
-                WHERE hm.usuario_id = %s
-                ORDER BY hm.data_conclusao DESC
-            """
-            cursor.execute(sql, (usuario_id,))
 
-        resultados = cursor.fetchall()
+# --- HISTÓRICO PAGINADO POR CURSOR (keyset em (data_conclusao, id), migração 006) ---
+
+HISTORICO_INICIO = 'infinity'  # chave antes de todas: primeira página
+
+# Página decrescente por (data_conclusao, id); data NULL conta como -infinity
+# (vem por último), igual à expressão de idx_historico_meditacoes_usuario_keyset.
+# A chave vai como texto ($2::text) para os dois drivers aceitarem 'infinity'.
+_SQL_HISTORICO_PAGINA = """
+    SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
+           hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
+           m.categoria, m.tipo, m.imagem_capa
+    FROM historico_meditacoes hm
+    JOIN meditacoes m ON hm.meditacao_id = m.id
+    WHERE hm.usuario_id = $1
+      AND (COALESCE(hm.data_conclusao, '-infinity'::timestamptz), hm.id) < ($2::text::timestamptz, $3)
+    ORDER BY COALESCE(hm.data_conclusao, '-infinity'::timestamptz) DESC, hm.id DESC
+    LIMIT $4
+"""
+
+# Sem os campos do catálogo (o cliente os tem do GET /meditacoes): index-only scan
+_SQL_HISTORICO_PAGINA_SEM_MEDITACAO = """
+    SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao, hm.duracao_real_minutos
+    FROM historico_meditacoes hm
+    WHERE hm.usuario_id = $1
+      AND (COALESCE(hm.data_conclusao, '-infinity'::timestamptz), hm.id) < ($2::text::timestamptz, $3)
+    ORDER BY COALESCE(hm.data_conclusao, '-infinity'::timestamptz) DESC, hm.id DESC
+    LIMIT $4
+"""
+
+
+def codificar_cursor_historico(data_conclusao, historico_id):
+    """Cursor opaco (base64 url-safe) da posição depois do item (data_conclusao, id)."""
+    return _codificar_cursor_data(data_conclusao, historico_id)
 
-        for linha in resultados:
-            historico_lista.append({
-                'id': linha[0],
-                'usuario_id': linha[1],
-                'meditacao_id': linha[2],
-                'data_conclusao': linha[3].isoformat() if linha[3] else None,
-                'duracao_real_minutos': linha[4],
-                'meditacao': {
-                    'titulo': linha[5],
-                    'descricao': linha[6],
-                    'duracao_minutos': linha[7],
-                    'categoria': linha[8],
-                    'tipo': linha[9],
-                    'imagem_capa': linha[10]
-                }
-            })
 
-        return historico_lista
+def decodificar_cursor_historico(cursor):
+    """(chave de data em texto, id) de um cursor; ValueError se não veio de codificar_cursor_historico."""
+    return _decodificar_cursor_data(cursor)
+
+
+def parametros_pagina_historico(tamanho, incluir_meditacao):
+    """
+    (tamanho, incluir_meditacao) a partir de ?page_size= e ?incluir_meditacao=
+    (texto ou None). O tamanho vale HISTORICO_PAGINA_PADRAO se ausente e
+    nunca passa de HISTORICO_PAGINA_MAX; ValueError se não for inteiro positivo.
+    """
+    tamanho = tamanho_pagina(tamanho, Config.HISTORICO_PAGINA_PADRAO, Config.HISTORICO_PAGINA_MAX)
+    incluir = incluir_meditacao is None or incluir_meditacao.lower() not in VALORES_FALSOS
+    return tamanho, incluir
+
+
+def _item_historico_sem_meditacao(linha):
+    """Item do histórico sem o objeto `meditacao` (só meditacao_id)."""
+    return {
+        'id': linha[0],
+        'usuario_id': linha[1],
+        'meditacao_id': linha[2],
+        'data_conclusao': linha[3],
+        'duracao_real_minutos': linha[4],
+    }
+
+
+def _pagina_historico(linhas, tamanho, incluir_meditacao):
+    """{'itens', 'next_cursor'} a partir de até `tamanho` + 1 linhas (a extra só indica que há mais)."""
+    montar = _item_historico if incluir_meditacao else _item_historico_sem_meditacao
+    itens = [montar(linha) for linha in linhas[:tamanho]]
+    proximo = None
+    if len(linhas) > tamanho:
+        ultimo = linhas[tamanho - 1]
+        proximo = codificar_cursor_historico(ultimo[3], ultimo[0])
+    return {'itens': itens, 'next_cursor': proximo}
+
+
+def listar_historico_pagina(usuario_id, tamanho, cursor=None, incluir_meditacao=True):
+    """
+    Uma página do histórico, mais recente primeiro: {'itens', 'next_cursor'}
+    (None na última página). `cursor` é o next_cursor da página anterior;
+    ValueError se inválido. None se o banco falhou.
+    """
+    chave, ultimo_id = decodificar_cursor_historico(cursor) if cursor else (HISTORICO_INICIO, 0)
+    try:
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cur:
+            if incluir_meditacao:
+                executar_preparado(cur, 'calmou_historico_pagina', _SQL_HISTORICO_PAGINA,
+                                   (usuario_id, chave, ultimo_id, tamanho + 1))
+            else:
+                executar_preparado(cur, 'calmou_historico_pagina_enxuta', _SQL_HISTORICO_PAGINA_SEM_MEDITACAO,
+                                   (usuario_id, chave, ultimo_id, tamanho + 1))
+            linhas = cur.fetchall()
+        return _pagina_historico(linhas, tamanho, incluir_meditacao)
 
     except Exception as error:
-        print(f"❌ Erro ao listar histórico de meditações: {error}")
+        print(f"❌ Erro ao listar página do histórico de meditações: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 
-def obter_estatisticas_meditacoes(usuario_id):
-    """Obtém estatísticas das meditações do usuário."""
-    conn = None
-    cursor = None
-    try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-
-        cursor = conn.cursor()
-
-        # Total de meditações concluídas
-        cursor.execute("""
-            SELECT COUNT(*) FROM historico_meditacoes WHERE usuario_id = %s
-        """, (usuario_id,))
-        total_meditacoes = cursor.fetchone()[0]
-
-        # Total de minutos meditados
-        cursor.execute("""
-            SELECT COALESCE(SUM(duracao_real_minutos), 0)
-            FROM historico_meditacoes
-            WHERE usuario_id = %s
-        """, (usuario_id,))
-        total_minutos = cursor.fetchone()[0]
-
-        # Categoria mais praticada
-        cursor.execute("""
-            SELECT m.categoria, COUNT(*) as total
+# Estatísticas por usuário no cache compartilhado (memória do processo ou Redis, por CACHE_URL)
+cache_compartilhado = CacheCompartilhado(criar_backend(Config.CACHE_URL), jitter=Config.CACHE_TTL_JITTER,
+                                         espera=Config.CACHE_LOCK_TIMEOUT)
+
+
+def _invalidar_estatisticas(usuario_id):
+    cache_compartilhado.invalidar(f"estatisticas:{usuario_id}")
+
+
+# --- RESUMO DAS ESTATÍSTICAS DE MEDITAÇÃO (usuario_estatisticas_meditacao) ---
+
+COLUNAS_RESUMO_MEDITACAO = (
+    "total_sessoes, total_minutos, sessoes_por_categoria, ultima_sessao, "
+    "ultimo_dia, sequencia, maior_sequencia, dias_recentes"
+)
+DIAS_RECENTES = 31  # bits de usuario_estatisticas_meditacao.dias_recentes
+
+# Resumo recalculado do histórico ({filtro} restringe a um usuário); o mesmo
+# da carga inicial na migração 003. Sequências pelas "ilhas" de dias seguidos.
+_CTE_RESUMO_MEDITACAO = """
+    WITH dias AS (
+        SELECT hm.usuario_id, hm.data_conclusao::date AS dia
+        FROM historico_meditacoes hm {filtro}
+        GROUP BY 1, 2
+    ), ilhas AS (
+        SELECT usuario_id, COUNT(*) AS tamanho, MAX(dia) AS fim
+        FROM (
+            SELECT usuario_id, dia, dia - (ROW_NUMBER() OVER (PARTITION BY usuario_id ORDER BY dia))::int AS ilha
+            FROM dias
+        ) AS d
+        GROUP BY usuario_id, ilha
+    ), sequencias AS (
+        SELECT usuario_id, MAX(fim) AS ultimo_dia, MAX(tamanho) AS maior_sequencia,
+               (ARRAY_AGG(tamanho ORDER BY fim DESC))[1] AS sequencia
+        FROM ilhas
+        GROUP BY usuario_id
+    ), recentes AS (
+        SELECT d.usuario_id, SUM(1 << (s.ultimo_dia - d.dia))::int AS dias_recentes
+        FROM dias d JOIN sequencias s ON s.usuario_id = d.usuario_id
+        WHERE s.ultimo_dia - d.dia < 31
+        GROUP BY d.usuario_id
+    ), categorias AS (
+        SELECT usuario_id, SUM(sessoes)::int AS total_sessoes, SUM(minutos)::bigint AS total_minutos,
+               jsonb_object_agg(categoria, sessoes) AS sessoes_por_categoria, MAX(ultima) AS ultima_sessao
+        FROM (
+            SELECT hm.usuario_id, COALESCE(m.categoria, '') AS categoria, COUNT(*) AS sessoes,
+                   COALESCE(SUM(hm.duracao_real_minutos), 0) AS minutos, MAX(hm.data_conclusao) AS ultima
             FROM historico_meditacoes hm
-            JOIN meditacoes m ON hm.meditacao_id = m.id
-            WHERE hm.usuario_id = %s
-            GROUP BY m.categoria
-            ORDER BY total DESC
-            LIMIT 1
-        """, (usuario_id,))
-        categoria_result = cursor.fetchone()
-        categoria_favorita = categoria_result[0] if categoria_result else None
-
-        # Sequência atual (dias consecutivos)
-        cursor.execute("""
-            SELECT COUNT(DISTINCT DATE(data_conclusao))
-            FROM historico_meditacoes
-            WHERE usuario_id = %s
-            AND data_conclusao >= CURRENT_DATE - INTERVAL '7 days'
-        """, (usuario_id,))
-        dias_consecutivos = cursor.fetchone()[0]
-
-        # Última meditação
-        cursor.execute("""
-            SELECT MAX(data_conclusao)
-            FROM historico_meditacoes
-            WHERE usuario_id = %s
-        """, (usuario_id,))
-        ultima_meditacao = cursor.fetchone()[0]
+            JOIN meditacoes m ON m.id = hm.meditacao_id {filtro}
+            GROUP BY 1, 2
+        ) AS c
+        GROUP BY usuario_id
+    )
+"""
+
+# Todos os usuários com histórico: (usuario_id, colunas do resumo)
+_SQL_RESUMO_TODOS = _CTE_RESUMO_MEDITACAO.format(filtro='') + """
+    SELECT c.usuario_id, c.total_sessoes, c.total_minutos, c.sessoes_por_categoria, c.ultima_sessao,
+           s.ultimo_dia, s.sequencia, s.maior_sequencia, COALESCE(r.dias_recentes, 0) AS dias_recentes
+    FROM categorias c
+    JOIN sequencias s ON s.usuario_id = c.usuario_id
+    LEFT JOIN recentes r ON r.usuario_id = c.usuario_id
+"""
+
+
+# Escrita incremental: cria a linha do usuário se faltar, trava e lê junto
+# com o dia da sessão no fuso do banco ($2 = data_conclusao), grava o novo resumo
+_SQL_CRIAR_RESUMO = """
+    INSERT INTO usuario_estatisticas_meditacao (usuario_id) VALUES ($1)
+    ON CONFLICT (usuario_id) DO NOTHING
+    RETURNING usuario_id
+"""
+_SQL_TRAVAR_RESUMO = f"""
+    SELECT {COLUNAS_RESUMO_MEDITACAO}, $2::timestamptz::date
+    FROM usuario_estatisticas_meditacao
+    WHERE usuario_id = $1 FOR UPDATE
+"""
+_SQL_ATUALIZAR_RESUMO = """
+    UPDATE usuario_estatisticas_meditacao
+    SET total_sessoes = $2, total_minutos = $3, sessoes_por_categoria = $4, ultima_sessao = $5,
+        ultimo_dia = $6, sequencia = $7, maior_sequencia = $8, dias_recentes = $9
+    WHERE usuario_id = $1
+"""
+
+# Resumo de um usuário ($1) recalculado e gravado (UPSERT); sem histórico, zerado
+_SQL_RECALCULAR_RESUMO = _CTE_RESUMO_MEDITACAO.format(filtro='WHERE hm.usuario_id = $1') + """
+    INSERT INTO usuario_estatisticas_meditacao (usuario_id, total_sessoes, total_minutos,
+        sessoes_por_categoria, ultima_sessao, ultimo_dia, sequencia, maior_sequencia, dias_recentes)
+    SELECT $1, COALESCE(c.total_sessoes, 0), COALESCE(c.total_minutos, 0),
+           COALESCE(c.sessoes_por_categoria, '{}'), c.ultima_sessao, s.ultimo_dia,
+           COALESCE(s.sequencia, 0), COALESCE(s.maior_sequencia, 0), COALESCE(r.dias_recentes, 0)
+    FROM (SELECT 1) AS um
+    LEFT JOIN categorias c ON true
+    LEFT JOIN sequencias s ON true
+    LEFT JOIN recentes r ON true
+    ON CONFLICT (usuario_id) DO UPDATE SET
+        total_sessoes = EXCLUDED.total_sessoes, total_minutos = EXCLUDED.total_minutos,
+        sessoes_por_categoria = EXCLUDED.sessoes_por_categoria, ultima_sessao = EXCLUDED.ultima_sessao,
+        ultimo_dia = EXCLUDED.ultimo_dia, sequencia = EXCLUDED.sequencia,
+        maior_sequencia = EXCLUDED.maior_sequencia, dias_recentes = EXCLUDED.dias_recentes
+"""
+
+
+def _resumo_vazio():
+    return {
+        'total_sessoes': 0, 'total_minutos': 0, 'sessoes_por_categoria': {}, 'ultima_sessao': None,
+        'ultimo_dia': None, 'sequencia': 0, 'maior_sequencia': 0, 'dias_recentes': 0,
+    }
+
+
+def _somar_sessao(resumo, categoria, minutos, data_conclusao, dia):
+    """
+    Resumo com mais uma sessão (`dia` = data_conclusao no fuso do banco), ou
+    None se ela é anterior ao último dia do resumo (a sequência muda no meio:
+    só recalculando).
+    """
+    ultimo_dia = resumo['ultimo_dia']
+    if ultimo_dia is not None and dia < ultimo_dia:
+        return None
 
-        return {
-            'total_meditacoes': total_meditacoes,
-            'total_minutos': int(total_minutos),
-            'categoria_favorita': categoria_favorita,
-            'dias_consecutivos_ultima_semana': dias_consecutivos,
-            'ultima_meditacao': ultima_meditacao.isoformat() if ultima_meditacao else None
-        }
+    novo = dict(resumo)
+    por_categoria = dict(resumo['sessoes_por_categoria'])
+    chave = categoria or ''
+    por_categoria[chave] = por_categoria.get(chave, 0) + 1
+    novo['sessoes_por_categoria'] = por_categoria
+    novo['total_sessoes'] = resumo['total_sessoes'] + 1
+    novo['total_minutos'] = resumo['total_minutos'] + (minutos or 0)
+    novo['ultima_sessao'] = max(filter(None, (resumo['ultima_sessao'], data_conclusao)))
+
+    if ultimo_dia is None:
+        novo.update(ultimo_dia=dia, sequencia=1, dias_recentes=1)
+    elif dia > ultimo_dia:
+        salto = (dia - ultimo_dia).days
+        novo['ultimo_dia'] = dia
+        novo['sequencia'] = resumo['sequencia'] + 1 if salto == 1 else 1
+        mascara = resumo['dias_recentes'] << salto if salto < DIAS_RECENTES else 0
+        novo['dias_recentes'] = (mascara | 1) & ((1 << DIAS_RECENTES) - 1)
+    novo['maior_sequencia'] = max(resumo['maior_sequencia'], novo['sequencia'])
+    return novo
+
+
+def _estatisticas_do_resumo(resumo, hoje):
+    """Resposta de GET /meditacoes/estatisticas a partir do resumo e da data de hoje."""
+    por_categoria = resumo['sessoes_por_categoria']
+    # Mais sessões primeiro; empate fica com a categoria de nome menor
+    favorita = min(por_categoria, key=lambda categoria: (-por_categoria[categoria], categoria), default=None)
+
+    ultimo_dia = resumo['ultimo_dia']
+    dias_na_semana = 0
+    sequencia_atual = 0
+    if ultimo_dia is not None:
+        # Mesma janela da consulta antiga: data_conclusao >= CURRENT_DATE - 7 dias
+        alcance = min((ultimo_dia - hoje).days + 7, DIAS_RECENTES - 1)
+        if alcance >= 0:
+            dias_na_semana = bin(resumo['dias_recentes'] & ((1 << (alcance + 1)) - 1)).count('1')
+        # A sequência só está "em curso" se o último dia foi hoje ou ontem
+        if (hoje - ultimo_dia).days <= 1:
+            sequencia_atual = resumo['sequencia']
+
+    return {
+        'total_meditacoes': resumo['total_sessoes'],
+        'total_minutos': int(resumo['total_minutos']),
+        'categoria_favorita': favorita or None,
+        'meditacoes_por_categoria': {categoria or None: total for categoria, total in por_categoria.items()},
+        'dias_ativos_ultima_semana': dias_na_semana,
+        # Nome antigo do mesmo número (dias distintos com sessão, não uma sequência)
+        'dias_consecutivos_ultima_semana': dias_na_semana,
+        'sequencia_atual_dias': sequencia_atual,
+        'maior_sequencia_dias': resumo['maior_sequencia'],
+        'ultima_meditacao': resumo['ultima_sessao'].isoformat() if resumo['ultima_sessao'] else None
+    }
+
+
+def _resumo_da_linha(linha):
+    return dict(zip(COLUNAS_RESUMO_MEDITACAO.split(', '), linha))
+
+
+def _registrar_sessao_no_resumo(cursor, usuario_id, meditacao_id, minutos, data_conclusao):
+    """Soma a sessão recém-inserida ao resumo do usuário (mesma transação do INSERT)."""
+    # Cria a linha se faltar e a trava: escritas do mesmo usuário passam uma de cada vez
+    executar_preparado(cursor, 'calmou_criar_resumo_meditacao', _SQL_CRIAR_RESUMO, (usuario_id,))
+    if cursor.fetchone() is not None:
+        # Linha nova: o histórico pode ser anterior a ela (ex.: carga sem resumo)
+        recalcular_estatisticas_usuario(cursor, usuario_id)
+        return
+
+    executar_preparado(cursor, 'calmou_travar_resumo_meditacao', _SQL_TRAVAR_RESUMO, (usuario_id, data_conclusao))
+    linha = cursor.fetchone()
+    meditacao = catalogo.buscar(meditacao_id)
+    novo = _somar_sessao(_resumo_da_linha(linha[:-1]), meditacao.categoria if meditacao else None,
+                         minutos, data_conclusao, linha[-1])
+    if novo is None:
+        recalcular_estatisticas_usuario(cursor, usuario_id)
+        return
+
+    executar_preparado(cursor, 'calmou_atualizar_resumo_meditacao', _SQL_ATUALIZAR_RESUMO, (
+        usuario_id, novo['total_sessoes'], novo['total_minutos'], psycopg2.extras.Json(novo['sessoes_por_categoria']),
+        novo['ultima_sessao'], novo['ultimo_dia'], novo['sequencia'], novo['maior_sequencia'], novo['dias_recentes']
+    ))
+
+
+def recalcular_estatisticas_usuario(cursor, usuario_id):
+    """Refaz o resumo de um usuário a partir do histórico dele (remoções e sessões fora de ordem)."""
+    executar_preparado(cursor, 'calmou_recalcular_resumo_meditacao', _SQL_RECALCULAR_RESUMO, (usuario_id,))
+
+
+def reconstruir_estatisticas_meditacao(cursor):
+    """
+    Refaz usuario_estatisticas_meditacao inteira a partir do histórico, na
+    transação de `cursor` (escritas no histórico esperam o commit). Devolve o
+    número de usuários com resumo.
+    """
+    cursor.execute("DELETE FROM usuario_estatisticas_meditacao")
+    cursor.execute(f"INSERT INTO usuario_estatisticas_meditacao (usuario_id, {COLUNAS_RESUMO_MEDITACAO}) "
+                   + _SQL_RESUMO_TODOS)
+    return cursor.rowcount
+
+
+def verificar_estatisticas_meditacao(cursor):
+    """
+    Confere o resumo com o histórico; devolve os ids dos usuários divergentes
+    (vazio = consistente). Usuário sem histórico pode não ter linha.
+    """
+    cursor.execute(f"""
+        WITH esperado AS ({_SQL_RESUMO_TODOS})
+        SELECT COALESCE(e.usuario_id, a.usuario_id) AS usuario_id
+        FROM esperado e
+        FULL JOIN usuario_estatisticas_meditacao a ON a.usuario_id = e.usuario_id
+        WHERE (e.usuario_id IS NULL AND a.total_sessoes <> 0)
+           OR (a.usuario_id IS NULL)
+           OR (e.usuario_id IS NOT NULL
+               AND (e.total_sessoes, e.total_minutos, e.sessoes_por_categoria, e.ultima_sessao,
+                    e.ultimo_dia, e.sequencia, e.maior_sequencia, e.dias_recentes)
+                   IS DISTINCT FROM
+                   (a.total_sessoes, a.total_minutos, a.sessoes_por_categoria, a.ultima_sessao,
+                    a.ultimo_dia, a.sequencia, a.maior_sequencia, a.dias_recentes))
+        ORDER BY 1
+    """)
+    return [linha[0] for linha in cursor.fetchall()]
+
+
+def obter_estatisticas_meditacoes(usuario_id):
+    """
+    Obtém estatísticas das meditações do usuário, pelo cache compartilhado.
+
+    A entrada guarda a versão do histórico e a data em que foi calculada; se
+    alguma das duas mudou ela é recusada, mesmo que a invalidação pós-commit
+    da escrita tenha se perdido ou a escrita tenha vindo de outro processo.
+    """
+    versao = obter_versao_dados(usuario_id, 'historico')
+    if versao is None or Config.ESTATISTICAS_CACHE_TTL <= 0:
+        # Sem histórico (ou sem cache): não há versão para validar a entrada
+        return _calcular_estatisticas_meditacoes(usuario_id)
+
+    marca = f"{versao[0]}:{versao[1].isoformat()}"
+
+    def calcular():
+        dados = _calcular_estatisticas_meditacoes(usuario_id)
+        return {'marca': marca, 'dados': dados} if dados is not None else None
+
+    entrada = cache_compartilhado.obter_ou_calcular(
+        f"estatisticas:{usuario_id}", calcular, Config.ESTATISTICAS_CACHE_TTL,
+        valido=lambda entrada: entrada['marca'] == marca,
+    )
+    return entrada['dados'] if entrada is not None else None
+
+
+def _calcular_estatisticas_meditacoes(usuario_id):
+    """Estatísticas das meditações do usuário (uma busca no resumo por chave primária)."""
+    try:
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cursor:
+            executar_preparado(cursor, 'calmou_resumo_meditacao', f"""
+                SELECT {COLUNAS_RESUMO_MEDITACAO}, current_date
+                FROM usuario_estatisticas_meditacao WHERE usuario_id = $1
+            """, (usuario_id,))
+            linha = cursor.fetchone()
+
+        if linha is None:
+            # Nunca meditou: sem linha no resumo (e sem datas a comparar com hoje)
+            return _estatisticas_do_resumo(_resumo_vazio(), None)
+        return _estatisticas_do_resumo(_resumo_da_linha(linha[:-1]), linha[-1])
 
     except Exception as error:
         print(f"❌ Erro ao obter estatísticas de meditações: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 
 def remover_historico_meditacao(historico_id, usuario_id):
     """Remove um registro específico do histórico (apenas do próprio usuário)."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-
-        cursor = conn.cursor()
-
-        # Verifica se o histórico pertence ao usuário antes de deletar
-        sql = """
-            DELETE FROM historico_meditacoes
-            WHERE id = %s AND usuario_id = %s
-            RETURNING id
-        """
-        cursor.execute(sql, (historico_id, usuario_id))
-        resultado = cursor.fetchone()
+        with obter_cursor(usuario_id=usuario_id) as cursor:
+            # Verifica se o histórico pertence ao usuário antes de deletar
+            sql = """
+                DELETE FROM historico_meditacoes
+                WHERE id = %s AND usuario_id = %s
+                RETURNING id
+            """
+            cursor.execute(sql, (historico_id, usuario_id))
+            resultado = cursor.fetchone()
 
-        if not resultado:
-            raise Exception("Histórico não encontrado ou não pertence ao usuário")
+            if not resultado:
+                raise Exception("Histórico não encontrado ou não pertence ao usuário")
+            recalcular_estatisticas_usuario(cursor, usuario_id)
+            _incrementar_versao(cursor, usuario_id, 'historico')
+        apos_commit(lambda: _invalidar_estatisticas(usuario_id))
 
-        conn.commit()
         print(f"✅ Histórico ID {historico_id} removido com sucesso")
         return True
 
     except Exception as error:
-        if conn:
-            conn.rollback()
         print(f"❌ Erro ao remover histórico de meditação: {error}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 
 # --- FUNÇÕES DE AVALIAÇÃO ---
 
 def inserir_resultado_avaliacao(resultado):
     """Insere o resultado de uma avaliação no banco de dados."""
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        
-        # O campo 'respostas' é JSONB, então podemos passar o dicionário diretamente
-        sql = """
-            INSERT INTO resultados_avaliacoes 
-            (usuario_id, tipo, respostas, resultado_score, resultado_texto) 
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        
-        cursor.execute(sql, (
-            resultado.usuario_id,
-            resultado.tipo,
-            psycopg2.extras.Json(resultado.respostas),  # Converte dict para JSONB
-            resultado.resultado_score,
-            resultado.resultado_texto
-        ))
-        conn.commit()
+        with obter_cursor(usuario_id=resultado.usuario_id) as cursor:
+            # O campo 'respostas' é JSONB, então podemos passar o dicionário diretamente
+            sql = """
+                INSERT INTO resultados_avaliacoes
+                (usuario_id, tipo, respostas, resultado_score, resultado_texto)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+
+            cursor.execute(sql, (
+                resultado.usuario_id,
+                resultado.tipo,
+                psycopg2.extras.Json(resultado.respostas),  # Converte dict para JSONB
+                resultado.resultado_score,
+                resultado.resultado_texto
+            ))
+            _incrementar_versao(cursor, resultado.usuario_id, 'avaliacoes')
         print(f"✅ Avaliação salva com sucesso para usuário {resultado.usuario_id}")
-        
+
     except Exception as error:
-        if conn: 
-            conn.rollback()
         print(f"❌ Erro ao inserir resultado da avaliação: {error}")
         raise  # ✅ Re-lança a exceção
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
-
-def buscar_avaliacoes_usuario(usuario_id, tipo=None):
-    """Busca todas as avaliações de um usuário, opcionalmente filtradas por tipo."""
-    conn = None
-    cursor = None
-    avaliacoes = []
-    try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        
-        if tipo:
+
+def buscar_ultima_avaliacao_usuario(usuario_id, tipo):
+    """Busca a última avaliação de um tipo específico para um usuário."""
+    try:
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cursor:
             sql = """
                 SELECT id, usuario_id, tipo, respostas, resultado_score, resultado_texto, data_avaliacao
                 FROM resultados_avaliacoes
                 WHERE usuario_id = %s AND tipo = %s
-                ORDER BY data_avaliacao DESC
+                ORDER BY COALESCE(data_avaliacao, '-infinity'::timestamptz) DESC, id DESC
+                LIMIT 1
             """
             cursor.execute(sql, (usuario_id, tipo))
-        else:
-            sql = """
-                SELECT id, usuario_id, tipo, respostas, resultado_score, resultado_texto, data_avaliacao
-                FROM resultados_avaliacoes
-                WHERE usuario_id = %s
-                ORDER BY data_avaliacao DESC
-            """
-            cursor.execute(sql, (usuario_id,))
-        
-        resultados = cursor.fetchall()
-        for linha in resultados:
-            avaliacoes.append({
-                'id': linha[0],
-                'usuario_id': linha[1],
-                'tipo': linha[2],
-                'respostas': linha[3],
-                'resultado_score': linha[4],
-                'resultado_texto': linha[5],
-                'data_avaliacao': linha[6].isoformat() if linha[6] else None
-            })
-        return avaliacoes
-        
-    except Exception as error:
-        print(f"❌ Erro ao buscar avaliações do usuário: {error}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+            linha = cursor.fetchone()
 
-def buscar_ultima_avaliacao_usuario(usuario_id, tipo):
-    """Busca a última avaliação de um tipo específico para um usuário."""
-    conn = None
-    cursor = None
-    try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
-        sql = """
-            SELECT id, usuario_id, tipo, respostas, resultado_score, resultado_texto, data_avaliacao
-            FROM resultados_avaliacoes
-            WHERE usuario_id = %s AND tipo = %s
-            ORDER BY data_avaliacao DESC
-            LIMIT 1
-        """
-        cursor.execute(sql, (usuario_id, tipo))
-        linha = cursor.fetchone()
-        
         if linha:
             return {
                 'id': linha[0],
@@ -809,93 +1301,245 @@ def buscar_ultima_avaliacao_usuario(usuario_id, tipo):
                 'respostas': linha[3],
                 'resultado_score': linha[4],
                 'resultado_texto': linha[5],
-                'data_avaliacao': linha[6].isoformat() if linha[6] else None
+                'data_avaliacao': linha[6]
             }
         return None
-        
+
     except Exception as error:
         print(f"❌ Erro ao buscar última avaliação: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+
+# --- AVALIAÇÕES FILTRADAS E PAGINADAS (keyset em (data_avaliacao, id), migração 009) ---
+
+PARAMETROS_AVALIACOES = ('page_size', 'cursor', 'tipo', 'de', 'ate', 'incluir_respostas')
+
+# Data NULL conta como -infinity (vem por último), igual à expressão dos índices da migração 009
+_CHAVE_AVALIACAO = "COALESCE(data_avaliacao, '-infinity'::timestamptz)"
+_COLUNAS_AVALIACAO = "id, tipo, resultado_score, resultado_texto, data_avaliacao"
+
+# Página decrescente por (data, id) dentro de [$4, $5); a chave vai como texto
+# ($n::text::timestamptz) para os dois drivers aceitarem 'infinity'. O índice
+# entrega a página já ordenada; só as linhas dela são lidas da tabela.
+_SQL_AVALIACOES_PAGINA = """
+    SELECT {colunas}
+    FROM resultados_avaliacoes
+    WHERE usuario_id = $1{filtro_tipo}
+      AND ({chave}, id) < ($2::text::timestamptz, $3)
+      AND {chave} >= $4::text::timestamptz AND {chave} < $5::text::timestamptz
+    ORDER BY {chave} DESC, id DESC
+    LIMIT $6
+"""
+
+# Último resultado de cada tipo: um DISTINCT ON sobre idx_resultados_avaliacoes_usuario_tipo_keyset
+_SQL_ULTIMAS_AVALIACOES = """
+    SELECT DISTINCT ON (tipo) {colunas}
+    FROM resultados_avaliacoes
+    WHERE usuario_id = $1
+    ORDER BY tipo, {chave} DESC, id DESC
+"""
+
+
+def _colunas_avaliacao(incluir_respostas):
+    return _COLUNAS_AVALIACAO + (", respostas" if incluir_respostas else "")
+
+
+def _sql_avaliacoes_pagina(com_tipo, incluir_respostas):
+    """(nome do comando preparado, SQL) da página: um comando por combinação de filtro e colunas."""
+    nome = 'calmou_avaliacoes_pagina' + ('_tipo' if com_tipo else '') + ('_respostas' if incluir_respostas else '')
+    return nome, _SQL_AVALIACOES_PAGINA.format(
+        colunas=_colunas_avaliacao(incluir_respostas), chave=_CHAVE_AVALIACAO,
+        filtro_tipo=' AND tipo = $7' if com_tipo else '')
+
+
+def _sql_ultimas_avaliacoes(incluir_respostas):
+    nome = 'calmou_avaliacoes_ultimas' + ('_respostas' if incluir_respostas else '')
+    return nome, _SQL_ULTIMAS_AVALIACOES.format(colunas=_colunas_avaliacao(incluir_respostas),
+                                                chave=_CHAVE_AVALIACAO)
+
+
+def parametros_avaliacoes(tamanho, tipo, de, ate, incluir_respostas, cursor=None):
+    """
+    (tamanho, tipo, de, ate, incluir_respostas) a partir dos query params de
+    GET /avaliacoes/historico (texto ou None). O tamanho vale
+    AVALIACOES_PAGINA_PADRAO se ausente e nunca passa de AVALIACOES_PAGINA_MAX;
+    `de` e `ate` (AAAA-MM-DD, inclusivos) viram `date`; `respostas` só vem com
+    incluir_respostas=true. ValueError com a mensagem para o cliente se algo
+    não vale, inclusive o `cursor`.
+    """
+    if cursor:
+        _decodificar_cursor_data(cursor)
+    tamanho = tamanho_pagina(tamanho, Config.AVALIACOES_PAGINA_PADRAO, Config.AVALIACOES_PAGINA_MAX)
+    if tipo and tipo not in TIPOS_AVALIACAO:
+        raise ValueError(f"tipo deve ser um de: {', '.join(TIPOS_AVALIACAO)}")
+    try:
+        de = date.fromisoformat(de) if de else None
+        ate = date.fromisoformat(ate) if ate else None
+    except ValueError:
+        raise ValueError("de e ate devem estar no formato AAAA-MM-DD")
+    if de and ate and de > ate:
+        raise ValueError("de deve ser anterior ou igual a ate")
+    incluir = incluir_respostas is not None and incluir_respostas.lower() not in VALORES_FALSOS
+    return tamanho, tipo or None, de, ate, incluir
+
+
+def parametros_sql_avaliacoes(usuario_id, tamanho, cursor, tipo, de, ate):
+    """Parâmetros ($1..$6, e $7 com tipo) de _SQL_AVALIACOES_PAGINA; ValueError se o cursor é inválido."""
+    inicio = de.isoformat() if de else '-infinity'
+    fim = (ate + timedelta(days=1)).isoformat() if ate else 'infinity'
+    chave, ultimo_id = _decodificar_cursor_data(cursor) if cursor else ('infinity', 0)
+    parametros = (usuario_id, chave, ultimo_id, inicio, fim, tamanho + 1)
+    return parametros + (tipo,) if tipo else parametros
+
+
+def _item_avaliacao(linha):
+    item = {
+        'id': linha[0],
+        'tipo': linha[1],
+        'resultado_score': linha[2],
+        'resultado_texto': linha[3],
+        'data_avaliacao': linha[4],
+    }
+    if len(linha) > 5:
+        item['respostas'] = linha[5]
+    return item
+
+
+def _pagina_avaliacoes(linhas, tamanho):
+    """{'itens', 'next_cursor'} a partir de até `tamanho` + 1 linhas (a extra só indica que há mais)."""
+    itens = [_item_avaliacao(linha) for linha in linhas[:tamanho]]
+    proximo = None
+    if len(linhas) > tamanho:
+        ultimo = linhas[tamanho - 1]
+        proximo = _codificar_cursor_data(ultimo[4], ultimo[0])
+    return {'itens': itens, 'next_cursor': proximo}
+
+
+def buscar_avaliacoes_usuario(usuario_id, tipo=None, de=None, ate=None, tamanho=None, cursor=None,
+                              incluir_respostas=False):
+    """
+    Uma página das avaliações do usuário, mais recente primeiro:
+    {'itens', 'next_cursor'} (None na última página). Filtra por `tipo` e pelo
+    intervalo de datas [de, ate] (`date`, inclusivos); `respostas` (JSONB) só
+    com incluir_respostas. `cursor` é o next_cursor da página anterior;
+    ValueError se inválido. None se o banco falhou.
+    """
+    tamanho = tamanho or Config.AVALIACOES_PAGINA_PADRAO
+    parametros = parametros_sql_avaliacoes(usuario_id, tamanho, cursor, tipo, de, ate)
+    try:
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cur:
+            executar_preparado(cur, *_sql_avaliacoes_pagina(bool(tipo), incluir_respostas), parametros)
+            linhas = cur.fetchall()
+        return _pagina_avaliacoes(linhas, tamanho)
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar avaliações do usuário: {error}")
+        return None
+
+
+def ultimas_avaliacoes_usuario(usuario_id, incluir_respostas=False):
+    """Último resultado de cada tipo de avaliação do usuário, em ordem de tipo. None se o banco falhou."""
+    try:
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cur:
+            executar_preparado(cur, *_sql_ultimas_avaliacoes(incluir_respostas), (usuario_id,))
+            linhas = cur.fetchall()
+        return [_item_avaliacao(linha) for linha in linhas]
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar últimas avaliações: {error}")
+        return None
 
 
 # --- FUNÇÕES DE ESTATÍSTICAS ---
 
-def get_database_stats():
-    """Busca a contagem de registros das principais tabelas."""
-    conn = None
-    cursor = None
-    stats = {}
+# Tabelas contadas em GET /stats (as mesmas dos triggers da migração 004)
+TABELAS_ESTATISTICAS = ('usuarios', 'meditacoes', 'classificacoes_humor', 'resultados_avaliacoes')
+MODOS_ESTATISTICAS = ('exato', 'estimado')
+
+# Contagem pelo catálogo, como o planejador estima: linhas por página da
+# última ANALYZE/VACUUM vezes as páginas de agora; sem ANALYZE ainda
+# (reltuples = -1), o contador de linhas vivas do coletor de estatísticas
+_SQL_CONTAGEM_ESTIMADA = """
+    SELECT c.relname,
+           CASE WHEN c.reltuples >= 0 AND c.relpages > 0
+                THEN round(c.reltuples / c.relpages
+                           * (pg_relation_size(c.oid) / current_setting('block_size')::int))::bigint
+                ELSE COALESCE(s.n_live_tup, 0)
+           END
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE n.nspname = 'public' AND c.relname = ANY($1::text[])
+"""
+
+# Contagem exata: soma das fatias dos contadores mantidos pelos triggers
+_SQL_CONTAGEM_EXATA = """
+    SELECT tabela, SUM(total)::bigint FROM contadores_tabelas
+    WHERE tabela = ANY($1::text[])
+    GROUP BY tabela
+"""
+
+# Contagens servidas da memória; passado STATS_CACHE_TTL, recalculadas em segundo plano
+estatisticas_sistema = CacheAtualizado(ttl=Config.STATS_CACHE_TTL, idade_maxima=Config.STATS_CACHE_IDADE_MAXIMA)
+
+
+def _contagens(linhas):
+    contagens = dict(linhas)
+    return {tabela: int(contagens.get(tabela, 0)) for tabela in TABELAS_ESTATISTICAS}
+
+
+def contar_registros(modo):
+    """Contagem de registros das tabelas de /stats direto no banco ('exato' ou 'estimado')."""
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-        
-        cursor = conn.cursor()
+        with obter_cursor(somente_leitura=True) as cursor:
+            if modo == 'estimado':
+                executar_preparado(cursor, 'calmou_contagem_estimada', _SQL_CONTAGEM_ESTIMADA,
+                                   (list(TABELAS_ESTATISTICAS),))
+            else:
+                executar_preparado(cursor, 'calmou_contagem_exata', _SQL_CONTAGEM_EXATA,
+                                   (list(TABELAS_ESTATISTICAS),))
+            return _contagens(cursor.fetchall())
 
-        # ✅ MELHORIA: Lista de tabelas validadas
-        TABELAS_VALIDAS = ['usuarios', 'meditacoes', 'classificacoes_humor', 'resultados_avaliacoes']
-        
-        for tabela in TABELAS_VALIDAS:
-            try:
-                # Ainda usando f-string mas com validação explícita
-                cursor.execute(f"SELECT COUNT(*) FROM {tabela}")
-                stats[tabela] = cursor.fetchone()[0]
-            except Exception as table_error:
-                print(f"⚠️  Aviso: Tabela {tabela} não encontrada - {table_error}")
-                stats[tabela] = 0
-
-        return stats
-        
     except Exception as error:
-        print(f"❌ Erro ao buscar estatísticas: {error}")
+        print(f"❌ Erro ao contar registros ({modo}): {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
+
+
+def get_database_stats(modo=None):
+    """
+    Busca a contagem de registros das principais tabelas, pelo cache do
+    processo. `modo` é 'exato' (contadores) ou 'estimado' (catálogo do
+    PostgreSQL); sem modo, Config.STATS_MODO.
+    """
+    modo = modo or Config.STATS_MODO
+    return estatisticas_sistema.obter(modo, lambda: contar_registros(modo))
 
 def listar_avaliacoes_por_usuario(usuario_id):
     """Busca todos os resultados de avaliações de um usuário, ordenados por data."""
-    conn = None
-    cursor = None
     resultados = []
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-
-        cursor = conn.cursor()
-        sql = """
-            SELECT tipo, resultado_score, resultado_texto, data_avaliacao
-            FROM resultados_avaliacoes
-            WHERE usuario_id = %s
-            ORDER BY data_avaliacao DESC
-        """
-        cursor.execute(sql, (usuario_id,))
+        with obter_cursor(somente_leitura=True, usuario_id=usuario_id) as cursor:
+            sql = """
+                SELECT tipo, resultado_score, resultado_texto, data_avaliacao
+                FROM resultados_avaliacoes
+                WHERE usuario_id = %s
+                ORDER BY data_avaliacao DESC
+            """
+            cursor.execute(sql, (usuario_id,))
+            linhas = cursor.fetchall()
 
-        for linha in cursor.fetchall():
+        for linha in linhas:
             resultados.append({
                 'tipo': linha[0],
                 'score': linha[1],
                 'resultado': linha[2],
-                'data': linha[3].strftime('%d/%m/%Y')  # Formata a data
+                'data': linha[3].strftime('%d/%m/%Y') if linha[3] else None  # Formata a data
             })
         return resultados
 
     except Exception as error:
         print(f"❌ Erro ao listar avaliações do usuário: {error}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
 
 
 def excluir_conta_completa(usuario_id):
@@ -907,44 +1551,35 @@ def excluir_conta_completa(usuario_id):
     - Resultados de avaliações
     - Registro do usuário
     """
-    conn = None
-    cursor = None
     try:
-        conn = conectar()
-        if not conn:
-            raise Exception("Falha ao conectar ao banco de dados")
-
-        cursor = conn.cursor()
+        # Uma única transação: ou tudo é removido, ou nada
+        with obter_cursor(usuario_id=usuario_id) as cursor:
+            print(f"🗑️  Iniciando exclusão completa da conta do usuário {usuario_id}")
 
-        # Inicia transação explícita
-        print(f"🗑️  Iniciando exclusão completa da conta do usuário {usuario_id}")
+            # 1. Deleta classificações de humor
+            cursor.execute("DELETE FROM classificacoes_humor WHERE usuario_id = %s", (usuario_id,))
+            humor_count = cursor.rowcount
+            print(f"  ✓ {humor_count} registro(s) de humor deletado(s)")
 
-        # 1. Deleta classificações de humor
-        cursor.execute("DELETE FROM classificacoes_humor WHERE usuario_id = %s", (usuario_id,))
-        humor_count = cursor.rowcount
-        print(f"  ✓ {humor_count} registro(s) de humor deletado(s)")
+            # 2. Deleta histórico de meditações
+            cursor.execute("DELETE FROM historico_meditacoes WHERE usuario_id = %s", (usuario_id,))
+            meditacao_count = cursor.rowcount
+            print(f"  ✓ {meditacao_count} registro(s) de meditação deletado(s)")
 
-        # 2. Deleta histórico de meditações
-        cursor.execute("DELETE FROM historico_meditacoes WHERE usuario_id = %s", (usuario_id,))
-        meditacao_count = cursor.rowcount
-        print(f"  ✓ {meditacao_count} registro(s) de meditação deletado(s)")
+            # 3. Deleta resultados de avaliações
+            cursor.execute("DELETE FROM resultados_avaliacoes WHERE usuario_id = %s", (usuario_id,))
+            avaliacao_count = cursor.rowcount
+            print(f"  ✓ {avaliacao_count} resultado(s) de avaliação deletado(s)")
 
-        # 3. Deleta resultados de avaliações
-        cursor.execute("DELETE FROM resultados_avaliacoes WHERE usuario_id = %s", (usuario_id,))
-        avaliacao_count = cursor.rowcount
-        print(f"  ✓ {avaliacao_count} resultado(s) de avaliação deletado(s)")
+            # 4. Deleta o usuário
+            cursor.execute("DELETE FROM usuarios WHERE id = %s RETURNING email", (usuario_id,))
+            usuario_deleted = cursor.fetchone()
 
-        # 4. Deleta o usuário
-        cursor.execute("DELETE FROM usuarios WHERE id = %s RETURNING email", (usuario_id,))
-        usuario_deleted = cursor.fetchone()
+            if not usuario_deleted:
+                raise Exception(f"Usuário {usuario_id} não encontrado")
 
-        if not usuario_deleted:
-            raise Exception(f"Usuário {usuario_id} não encontrado")
-
-        email_deletado = usuario_deleted[0]
-
-        # Commit da transação
-        conn.commit()
+            email_deletado = usuario_deleted[0]
+            _avisar_usuario_alterado(cursor, usuario_id)
 
         print(f"✅ Conta do usuário {email_deletado} (ID: {usuario_id}) excluída completamente!")
         print(f"📊 Total de dados removidos: {humor_count + meditacao_count + avaliacao_count + 1} registros")
@@ -961,12 +1596,46 @@ def excluir_conta_completa(usuario_id):
         }
 
     except Exception as error:
-        if conn:
-            conn.rollback()
         print(f"❌ Erro ao excluir conta completa: {error}")
         raise
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            liberar_conexao(conn)
\ No newline at end of file
+
+
+# --- EXPORTAÇÃO DOS DADOS DO USUÁRIO (portabilidade, LGPD) ---
+
+# (seção, tabela, coluna do usuário, colunas), na ordem do arquivo exportado.
+# password_hash fica de fora: não é dado do titular e não deve sair do banco.
+SECOES_EXPORTACAO = (
+    ('perfil', 'usuarios', 'id',
+     ('id', 'nome', 'email', 'config', 'data_cadastro', 'cpf', 'data_nascimento',
+      'tipo_sanguineo', 'alergias', 'foto_perfil')),
+    ('enderecos', 'enderecos', 'usuario_id',
+     ('id', 'pais', 'estado', 'cidade', 'rua', 'numero', 'complemento', 'cep')),
+    ('classificacoes_humor', 'classificacoes_humor', 'usuario_id',
+     ('id', 'nivel_humor', 'sentimento_principal', 'notas', 'data_classificacao')),
+    ('historico_meditacoes', 'historico_meditacoes', 'usuario_id',
+     ('id', 'meditacao_id', 'data_conclusao', 'duracao_real_minutos')),
+    ('resultados_avaliacoes', 'resultados_avaliacoes', 'usuario_id',
+     ('id', 'tipo', 'respostas', 'resultado_score', 'resultado_texto', 'data_avaliacao')),
+    ('notificacoes', 'notificacoes', 'usuario_id',
+     ('id', 'titulo', 'mensagem', 'data_envio', 'lida')),
+)
+
+
+def sql_exportacao(tabela, coluna_usuario, colunas, parametro):
+    """SELECT de uma seção; `parametro` é o marcador do driver ('%s' ou '$1')."""
+    return f"SELECT {', '.join(colunas)} FROM {tabela} WHERE {coluna_usuario} = {parametro} ORDER BY id"
+
+
+def exportar_dados_usuario(usuario_id, lote=None):
+    """
+    Gera (seção, colunas, linhas) de cada tabela com dados do usuário
+    (SECOES_EXPORTACAO), todas na mesma transação. `linhas` é um cursor nomeado
+    no servidor, lido `lote` linhas (EXPORTACAO_LOTE) por vez: consuma-o antes
+    de pedir a próxima seção. A conexão fica presa até o gerador terminar.
+    """
+    with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+        for secao, tabela, coluna_usuario, colunas in SECOES_EXPORTACAO:
+            with conn.cursor(name=f"calmou_exportar_{secao}") as cursor:
+                cursor.itersize = lote or Config.EXPORTACAO_LOTE
+                cursor.execute(sql_exportacao(tabela, coluna_usuario, colunas, '%s'), (usuario_id,))
+                yield secao, colunas, cursor
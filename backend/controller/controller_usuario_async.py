@@ -0,0 +1,617 @@
+"""
+Versão assíncrona (asyncpg) das funções de `controller_usuario` usadas pelas rotas.
+
+Mesmos nomes, mesmos retornos e mesmo tratamento de erro; muda só o acesso ao
+banco. O asyncpg já usa parâmetros `$n` e prepara cada consulta uma vez por
+conexão, então o SQL é o mesmo dos comandos preparados do controller síncrono.
+"""
+import asyncio
+from datetime import date
+
+from cache import CacheCatalogo
+from cache.usuarios import CANAL as CANAL_USUARIOS
+from conexao_async import transacao
+from config import Config
+from controller.controller_usuario import (
+    COLUNAS_USUARIO, COLUNAS_RESUMO_MEDITACAO, generate_hash, verify_password,
+    _SQL_CRIAR_RESUMO, _SQL_TRAVAR_RESUMO, _SQL_ATUALIZAR_RESUMO, _SQL_RECALCULAR_RESUMO,
+    _somar_sessao, _estatisticas_do_resumo, _resumo_vazio, _resumo_da_linha,
+    _item_historico, _SQL_INSERIR_HUMOR, _SQL_RELATORIO_HUMOR, _agregar_humor,
+    GRANULARIDADES_HUMOR, periodo_relatorio_humor,
+    _SQL_HISTORICO_PAGINA, _SQL_HISTORICO_PAGINA_SEM_MEDITACAO, HISTORICO_INICIO, _pagina_historico,
+    parametros_pagina_historico, decodificar_cursor_historico,
+    _SQL_USUARIOS_PAGINA, _SQL_USUARIOS_PAGINA_PREFIXO, _pagina_usuarios, _decodificar_cursor,
+    PARAMETROS_USUARIOS, _SQL_USUARIOS_TODOS, _item_usuario, parametros_pagina_usuarios, SECOES_EXPORTACAO, sql_exportacao,
+    PARAMETROS_AVALIACOES, VALORES_FALSOS, parametros_avaliacoes, parametros_sql_avaliacoes, _sql_avaliacoes_pagina,
+    _sql_ultimas_avaliacoes, _pagina_avaliacoes, _item_avaliacao,
+    TABELAS_ESTATISTICAS, MODOS_ESTATISTICAS, estatisticas_sistema, _SQL_CONTAGEM_ESTIMADA, _SQL_CONTAGEM_EXATA, _contagens,
+    _resumo_meditacao, _detalhe_meditacao,
+)
+from model.usuario import Usuario
+from model.meditacao import Meditacao
+
+
+# --- FUNÇÕES DE HASH DE SENHA ---
+# scrypt é CPU puro: roda em thread para não travar o loop de eventos
+
+async def gerar_hash(password):
+    return await asyncio.to_thread(generate_hash, password)
+
+async def verificar_senha(plain_password, stored_hash):
+    return await asyncio.to_thread(verify_password, plain_password, stored_hash)
+
+
+def _data(valor):
+    """O psycopg2 aceita a data como texto; o asyncpg exige um `date`."""
+    if isinstance(valor, str) and valor:
+        return date.fromisoformat(valor[:10])
+    return valor or None
+
+
+def _usuario(linha):
+    return Usuario(
+        id=linha[0],
+        nome=linha[1],
+        email=linha[2],
+        password_hash=linha[3],
+        config=linha[4],
+        data_cadastro=linha[5],
+        cpf=linha[6],
+        data_nascimento=linha[7],
+        tipo_sanguineo=linha[8],
+        alergias=linha[9],
+        foto_perfil=linha[10]
+    )
+
+
+def _meditacao(linha):
+    return Meditacao(
+        id=linha[0],
+        titulo=linha[1],
+        descricao=linha[2],
+        duracao_minutos=linha[3],
+        url_audio=linha[4],
+        tipo=linha[5],
+        categoria=linha[6],
+        imagem_capa=linha[7]
+    )
+
+
+# --- FUNÇÕES DE USUÁRIO ---
+
+async def inserir_usuario(usuario):
+    """Insere um novo usuário no banco de dados e retorna o ID gerado."""
+    try:
+        if not hasattr(usuario, 'password') or not usuario.password:
+            raise ValueError("Senha é obrigatória para criar usuário")
+
+        password_hash_str = await gerar_hash(usuario.password)
+
+        async with transacao() as conn:
+            usuario.id = await conn.fetchval(
+                "INSERT INTO usuarios (nome, email, password_hash, config) VALUES ($1, $2, $3, $4) RETURNING id",
+                usuario.nome, usuario.email, password_hash_str, usuario.config
+            )
+        print(f"✅ Usuário {usuario.nome} inserido com sucesso!")
+        return usuario.id
+
+    except Exception as error:
+        print(f"❌ Erro ao inserir usuário: {error}")
+        raise
+
+async def listar_usuarios():
+    """Todos os usuários, por id (mesmo SQL e formato do controller síncrono)."""
+    try:
+        async with transacao(somente_leitura=True) as conn:
+            linhas = await conn.fetch(_SQL_USUARIOS_TODOS)
+        return [_item_usuario(linha) for linha in linhas]
+
+    except Exception as error:
+        print(f"❌ Erro ao listar usuários: {error}")
+        return None
+
+async def listar_usuarios_pagina(tamanho, cursor=None, prefixo=None):
+    """Uma página de usuários por cursor (mesmo SQL e formato do controller síncrono)."""
+    chave, ultimo_id = _decodificar_cursor(cursor) if cursor else ('', 0)
+    try:
+        async with transacao(somente_leitura=True) as conn:
+            if prefixo:
+                linhas = await conn.fetch(_SQL_USUARIOS_PAGINA_PREFIXO, prefixo, chave or None,
+                                          ultimo_id, tamanho + 1)
+            else:
+                linhas = await conn.fetch(_SQL_USUARIOS_PAGINA, ultimo_id, tamanho + 1)
+        return _pagina_usuarios(linhas, tamanho, prefixo)
+
+    except Exception as error:
+        print(f"❌ Erro ao listar usuários: {error}")
+        return None
+
+async def buscar_usuario_por_email(email):
+    """Busca um usuário pelo email."""
+    try:
+        async with transacao() as conn:
+            linha = await conn.fetchrow(f"SELECT {COLUNAS_USUARIO} FROM usuarios WHERE email = $1", email)
+        return _usuario(linha) if linha else None
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar usuário por email: {error}")
+        return None
+
+async def buscar_usuario_por_id(id):
+    """Busca um usuário pelo ID."""
+    try:
+        async with transacao() as conn:
+            linha = await conn.fetchrow(f"SELECT {COLUNAS_USUARIO} FROM usuarios WHERE id = $1", id)
+        return _usuario(linha) if linha else None
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar usuário por id: {error}")
+        return None
+
+async def _avisar_usuario_alterado(conn, usuario_id):
+    """NOTIFY no commit: os workers do app Flask tiram o usuário do cache de usuários."""
+    await conn.execute("SELECT pg_notify($1, $2)", CANAL_USUARIOS, str(usuario_id))
+
+async def atualizar_usuario(usuario):
+    """Atualiza os dados de um usuário."""
+    try:
+        if hasattr(usuario, 'password') and usuario.password:
+            password_hash = await gerar_hash(usuario.password)
+            sql = "UPDATE usuarios SET nome = $1, email = $2, password_hash = $3, config = $4 WHERE id = $5"
+            params = (usuario.nome, usuario.email, password_hash, usuario.config, usuario.id)
+        else:
+            sql = "UPDATE usuarios SET nome = $1, email = $2, config = $3 WHERE id = $4"
+            params = (usuario.nome, usuario.email, usuario.config, usuario.id)
+
+        async with transacao(usuario_id=usuario.id) as conn:
+            await conn.execute(sql, *params)
+            await _avisar_usuario_alterado(conn, usuario.id)
+        print(f"✅ Usuário ID {usuario.id} atualizado com sucesso!")
+
+    except Exception as error:
+        print(f"❌ Erro ao atualizar usuário: {error}")
+        raise
+
+async def atualizar_perfil(usuario):
+    """Atualiza apenas os dados do perfil do usuário (não credenciais)."""
+    try:
+        sql = """
+            UPDATE usuarios
+            SET nome = $1, cpf = $2, data_nascimento = $3,
+                tipo_sanguineo = $4, alergias = $5, foto_perfil = $6
+            WHERE id = $7
+        """
+
+        async with transacao(usuario_id=usuario.id) as conn:
+            await conn.execute(
+                sql,
+                usuario.nome,
+                usuario.cpf,
+                _data(usuario.data_nascimento),
+                usuario.tipo_sanguineo,
+                usuario.alergias,
+                usuario.foto_perfil,
+                usuario.id
+            )
+            await _avisar_usuario_alterado(conn, usuario.id)
+
+        print(f"✅ Perfil atualizado com sucesso para usuário ID: {usuario.id}")
+        return True
+
+    except Exception as error:
+        print(f"❌ Erro ao atualizar perfil: {error}")
+        return False
+
+async def remover_usuario(id):
+    """Remove um usuário do banco de dados."""
+    try:
+        async with transacao(usuario_id=id) as conn:
+            await conn.execute("DELETE FROM usuarios WHERE id = $1", id)
+            await _avisar_usuario_alterado(conn, id)
+        print(f"✅ Usuário ID {id} removido com sucesso!")
+
+    except Exception as error:
+        print(f"❌ Erro ao remover usuário: {error}")
+        raise
+
+
+# --- VERSÕES DOS DADOS DO USUÁRIO (GET condicional) ---
+
+async def _incrementar_versao(conn, usuario_id, dominio):
+    """Nova versão dos dados de `dominio`, na transação da escrita (as ETags do app Flask dependem dela)."""
+    await conn.execute("""
+        INSERT INTO versoes_dados_usuario (usuario_id, dominio, versao)
+        VALUES ($1, $2, nextval('versoes_dados_usuario_seq'))
+        ON CONFLICT (usuario_id, dominio) DO UPDATE SET versao = EXCLUDED.versao
+    """, usuario_id, dominio)
+
+
+async def obter_versao_dados(usuario_id, dominio):
+    """(versão, data de hoje no banco) dos dados de `dominio` (ver controller síncrono); None se não há ou falhou."""
+    try:
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            return await conn.fetchrow(
+                "SELECT versao, current_date FROM versoes_dados_usuario WHERE usuario_id = $1 AND dominio = $2",
+                usuario_id, dominio
+            )
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar versão dos dados do usuário: {error}")
+        return None
+
+
+# --- FUNÇÕES DE HUMOR ---
+
+async def inserir_classificacao_humor(classificacao):
+    """Insere um novo registro de humor no banco de dados (e o soma ao resumo do dia)."""
+    try:
+        async with transacao(usuario_id=classificacao.usuario_id) as conn:
+            await conn.execute(
+                _SQL_INSERIR_HUMOR,
+                classificacao.usuario_id,
+                classificacao.nivel_humor,
+                classificacao.sentimento_principal,
+                classificacao.notas
+            )
+            await _incrementar_versao(conn, classificacao.usuario_id, 'humor')
+        print(f"✅ Classificação de humor inserida para usuário ID {classificacao.usuario_id}")
+
+    except Exception as error:
+        print(f"❌ Erro ao inserir classificação de humor: {error}")
+        raise
+
+async def relatorio_humor_semanal(usuario_id):
+    """Busca as classificações de humor dos últimos 7 dias para um usuário."""
+    try:
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            resultados = await conn.fetch("""
+                SELECT data_classificacao, nivel_humor
+                FROM classificacoes_humor
+                WHERE usuario_id = $1 AND data_classificacao >= current_date - interval '7 days'
+                ORDER BY data_classificacao ASC
+            """, usuario_id)
+
+        return [
+            {'data': linha[0].strftime('%d/%m'), 'nivel': linha[1]}
+            for linha in resultados
+        ]
+
+    except Exception as error:
+        print(f"❌ Erro ao gerar relatório de humor semanal: {error}")
+        return None
+
+
+async def hoje_no_banco():
+    """current_date do banco (ver controller síncrono). None se falhou."""
+    try:
+        async with transacao(somente_leitura=True) as conn:
+            return await conn.fetchval("SELECT current_date")
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar a data do banco: {error}")
+        return None
+
+
+async def relatorio_humor(usuario_id, de, ate, granularidade):
+    """Relatório de humor de `de` a `ate` agregado por `granularidade` (resumo diário)."""
+    try:
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            linhas = await conn.fetch(_SQL_RELATORIO_HUMOR, usuario_id, de, ate)
+
+        return {
+            'de': de.isoformat(),
+            'ate': ate.isoformat(),
+            'granularidade': granularidade,
+            'periodos': _agregar_humor([tuple(linha) for linha in linhas], granularidade),
+        }
+
+    except Exception as error:
+        print(f"❌ Erro ao gerar relatório de humor: {error}")
+        return None
+
+
+# --- FUNÇÕES DE MEDITAÇÃO ---
+
+_COLUNAS_MEDITACAO = "id, titulo, descricao, duracao_minutos, url_audio, tipo, categoria, imagem_capa"
+
+async def listar_meditacoes():
+    """Busca todas as meditações do catálogo."""
+    try:
+        async with transacao(somente_leitura=True) as conn:
+            resultados = await conn.fetch(f"SELECT {_COLUNAS_MEDITACAO} FROM meditacoes")
+        return [_meditacao(linha) for linha in resultados]
+
+    except Exception as error:
+        print(f"❌ Erro ao listar meditações: {error}")
+        return None
+
+async def buscar_meditacao_por_id(id):
+    """Busca os detalhes de uma única meditação pelo seu ID."""
+    try:
+        async with transacao(somente_leitura=True) as conn:
+            linha = await conn.fetchrow(f"SELECT {_COLUNAS_MEDITACAO} FROM meditacoes WHERE id = $1", id)
+        return _meditacao(linha) if linha else None
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar meditação: {error}")
+        return None
+
+
+# Catálogo em memória do processo ASGI: mesmos retratos e ETags do app Flask,
+# invalidado pelo NOTIFY do inserir_meditacao (controller síncrono)
+catalogo = CacheCatalogo(
+    listar_meditacoes, buscar_meditacao_por_id, _resumo_meditacao, _detalhe_meditacao,
+    ttl=Config.CATALOGO_CACHE_TTL, escutar=Config.CATALOGO_CACHE_LISTEN
+)
+
+
+# --- FUNÇÕES DE HISTÓRICO DE MEDITAÇÕES ---
+
+async def registrar_meditacao_concluida(historico):
+    """Registra uma meditação concluída pelo usuário."""
+    try:
+        async with transacao(usuario_id=historico.usuario_id) as conn:
+            resultado = await conn.fetchrow("""
+                INSERT INTO historico_meditacoes
+                (usuario_id, meditacao_id, duracao_real_minutos)
+                VALUES ($1, $2, $3)
+                RETURNING id, data_conclusao
+            """, historico.usuario_id, historico.meditacao_id, historico.duracao_real_minutos)
+            await _registrar_sessao_no_resumo(conn, historico.usuario_id, historico.meditacao_id,
+                                              historico.duracao_real_minutos, resultado[1])
+            await _incrementar_versao(conn, historico.usuario_id, 'historico')
+
+        print(f"✅ Meditação registrada no histórico para usuário {historico.usuario_id}")
+
+        return {
+            'id': resultado[0],
+            'data_conclusao': resultado[1].isoformat() if resultado[1] else None
+        }
+
+    except Exception as error:
+        print(f"❌ Erro ao registrar histórico de meditação: {error}")
+        raise
+
+async def listar_historico_meditacoes(usuario_id, limit=None):
+    """Lista o histórico de meditações de um usuário."""
+    try:
+        sql = """
+            SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
+                   hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
+                   m.categoria, m.tipo, m.imagem_capa
+            FROM historico_meditacoes hm
+            JOIN meditacoes m ON hm.meditacao_id = m.id
+            WHERE hm.usuario_id = $1
+            ORDER BY hm.data_conclusao DESC
+        """
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            if limit:
+                resultados = await conn.fetch(sql + " LIMIT $2", usuario_id, limit)
+            else:
+                resultados = await conn.fetch(sql, usuario_id)
+
+        return [_item_historico(linha) for linha in resultados]
+
+    except Exception as error:
+        print(f"❌ Erro ao listar histórico de meditações: {error}")
+        return None
+
+async def listar_historico_pagina(usuario_id, tamanho, cursor=None, incluir_meditacao=True):
+    """Uma página do histórico por cursor (mesmo SQL e formato do controller síncrono)."""
+    chave, ultimo_id = decodificar_cursor_historico(cursor) if cursor else (HISTORICO_INICIO, 0)
+    try:
+        sql = _SQL_HISTORICO_PAGINA if incluir_meditacao else _SQL_HISTORICO_PAGINA_SEM_MEDITACAO
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            linhas = await conn.fetch(sql, usuario_id, chave, ultimo_id, tamanho + 1)
+        return _pagina_historico(linhas, tamanho, incluir_meditacao)
+
+    except Exception as error:
+        print(f"❌ Erro ao listar página do histórico de meditações: {error}")
+        return None
+
+async def _registrar_sessao_no_resumo(conn, usuario_id, meditacao_id, minutos, data_conclusao):
+    """Soma a sessão recém-inserida ao resumo do usuário (mesma lógica e SQL do controller síncrono)."""
+    if await conn.fetchval(_SQL_CRIAR_RESUMO, usuario_id) is not None:
+        await conn.execute(_SQL_RECALCULAR_RESUMO, usuario_id)
+        return
+
+    linha = await conn.fetchrow(_SQL_TRAVAR_RESUMO, usuario_id, data_conclusao)
+    categoria = await conn.fetchval("SELECT categoria FROM meditacoes WHERE id = $1", meditacao_id)
+    novo = _somar_sessao(_resumo_da_linha(linha[:-1]), categoria, minutos, data_conclusao, linha[-1])
+    if novo is None:
+        await conn.execute(_SQL_RECALCULAR_RESUMO, usuario_id)
+        return
+
+    await conn.execute(
+        _SQL_ATUALIZAR_RESUMO,
+        usuario_id, novo['total_sessoes'], novo['total_minutos'], novo['sessoes_por_categoria'],
+        novo['ultima_sessao'], novo['ultimo_dia'], novo['sequencia'], novo['maior_sequencia'], novo['dias_recentes']
+    )
+
+async def obter_estatisticas_meditacoes(usuario_id):
+    """Obtém estatísticas das meditações do usuário (uma busca no resumo por chave primária)."""
+    try:
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            linha = await conn.fetchrow(f"""
+                SELECT {COLUNAS_RESUMO_MEDITACAO}, current_date
+                FROM usuario_estatisticas_meditacao WHERE usuario_id = $1
+            """, usuario_id)
+
+        if linha is None:
+            return _estatisticas_do_resumo(_resumo_vazio(), None)
+        return _estatisticas_do_resumo(_resumo_da_linha(linha[:-1]), linha[-1])
+
+    except Exception as error:
+        print(f"❌ Erro ao obter estatísticas de meditações: {error}")
+        return None
+
+async def remover_historico_meditacao(historico_id, usuario_id):
+    """Remove um registro específico do histórico (apenas do próprio usuário)."""
+    try:
+        async with transacao(usuario_id=usuario_id) as conn:
+            resultado = await conn.fetchval(
+                "DELETE FROM historico_meditacoes WHERE id = $1 AND usuario_id = $2 RETURNING id",
+                historico_id, usuario_id
+            )
+            if not resultado:
+                raise Exception("Histórico não encontrado ou não pertence ao usuário")
+            await conn.execute(_SQL_RECALCULAR_RESUMO, usuario_id)
+            await _incrementar_versao(conn, usuario_id, 'historico')
+
+        print(f"✅ Histórico ID {historico_id} removido com sucesso")
+        return True
+
+    except Exception as error:
+        print(f"❌ Erro ao remover histórico de meditação: {error}")
+        raise
+
+
+# --- FUNÇÕES DE AVALIAÇÃO ---
+
+async def inserir_resultado_avaliacao(resultado):
+    """Insere o resultado de uma avaliação no banco de dados."""
+    try:
+        async with transacao(usuario_id=resultado.usuario_id) as conn:
+            await conn.execute("""
+                INSERT INTO resultados_avaliacoes
+                (usuario_id, tipo, respostas, resultado_score, resultado_texto)
+                VALUES ($1, $2, $3, $4, $5)
+            """,
+                resultado.usuario_id,
+                resultado.tipo,
+                resultado.respostas,  # codec jsonb do pool converte o dict
+                resultado.resultado_score,
+                resultado.resultado_texto
+            )
+            await _incrementar_versao(conn, resultado.usuario_id, 'avaliacoes')
+        print(f"✅ Avaliação salva com sucesso para usuário {resultado.usuario_id}")
+
+    except Exception as error:
+        print(f"❌ Erro ao inserir resultado da avaliação: {error}")
+        raise
+
+async def buscar_avaliacoes_usuario(usuario_id, tipo=None, de=None, ate=None, tamanho=None, cursor=None,
+                                    incluir_respostas=False):
+    """Uma página das avaliações com filtros (mesmo SQL e formato do controller síncrono)."""
+    tamanho = tamanho or Config.AVALIACOES_PAGINA_PADRAO
+    parametros = parametros_sql_avaliacoes(usuario_id, tamanho, cursor, tipo, de, ate)
+    try:
+        _, sql = _sql_avaliacoes_pagina(bool(tipo), incluir_respostas)
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            linhas = await conn.fetch(sql, *parametros)
+        return _pagina_avaliacoes(linhas, tamanho)
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar avaliações do usuário: {error}")
+        return None
+
+async def ultimas_avaliacoes_usuario(usuario_id, incluir_respostas=False):
+    """Último resultado de cada tipo de avaliação (mesmo SQL do controller síncrono)."""
+    try:
+        _, sql = _sql_ultimas_avaliacoes(incluir_respostas)
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            linhas = await conn.fetch(sql, usuario_id)
+        return [_item_avaliacao(linha) for linha in linhas]
+
+    except Exception as error:
+        print(f"❌ Erro ao buscar últimas avaliações: {error}")
+        return None
+
+async def listar_avaliacoes_por_usuario(usuario_id):
+    """Busca todos os resultados de avaliações de um usuário, ordenados por data."""
+    try:
+        async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+            linhas = await conn.fetch("""
+                SELECT tipo, resultado_score, resultado_texto, data_avaliacao
+                FROM resultados_avaliacoes
+                WHERE usuario_id = $1
+                ORDER BY data_avaliacao DESC
+            """, usuario_id)
+
+        return [
+            {
+                'tipo': linha[0],
+                'score': linha[1],
+                'resultado': linha[2],
+                'data': linha[3].strftime('%d/%m/%Y') if linha[3] else None
+            }
+            for linha in linhas
+        ]
+
+    except Exception as error:
+        print(f"❌ Erro ao listar avaliações do usuário: {error}")
+        return None
+
+
+# --- FUNÇÕES DE ESTATÍSTICAS ---
+
+async def contar_registros(modo):
+    """Contagem de registros das tabelas de /stats direto no banco ('exato' ou 'estimado')."""
+    try:
+        sql = _SQL_CONTAGEM_ESTIMADA if modo == 'estimado' else _SQL_CONTAGEM_EXATA
+        async with transacao(somente_leitura=True) as conn:
+            linhas = await conn.fetch(sql, list(TABELAS_ESTATISTICAS))
+        return _contagens(linhas)
+
+    except Exception as error:
+        print(f"❌ Erro ao contar registros ({modo}): {error}")
+        return None
+
+
+async def get_database_stats(modo=None):
+    """Busca a contagem de registros das principais tabelas, pelo cache do processo."""
+    modo = modo or Config.STATS_MODO
+    return await estatisticas_sistema.obter_async(modo, lambda: contar_registros(modo))
+
+
+async def excluir_conta_completa(usuario_id):
+    """
+    Exclui completamente a conta de um usuário e todos os seus dados relacionados,
+    em uma única transação (ver `controller_usuario.excluir_conta_completa`).
+    """
+    try:
+        async with transacao(usuario_id=usuario_id) as conn:
+            print(f"🗑️  Iniciando exclusão completa da conta do usuário {usuario_id}")
+
+            humor_count = await conn.fetchval(
+                "WITH d AS (DELETE FROM classificacoes_humor WHERE usuario_id = $1 RETURNING 1) "
+                "SELECT COUNT(*) FROM d", usuario_id)
+            meditacao_count = await conn.fetchval(
+                "WITH d AS (DELETE FROM historico_meditacoes WHERE usuario_id = $1 RETURNING 1) "
+                "SELECT COUNT(*) FROM d", usuario_id)
+            avaliacao_count = await conn.fetchval(
+                "WITH d AS (DELETE FROM resultados_avaliacoes WHERE usuario_id = $1 RETURNING 1) "
+                "SELECT COUNT(*) FROM d", usuario_id)
+
+            email_deletado = await conn.fetchval(
+                "DELETE FROM usuarios WHERE id = $1 RETURNING email", usuario_id)
+            if not email_deletado:
+                raise Exception(f"Usuário {usuario_id} não encontrado")
+            await _avisar_usuario_alterado(conn, usuario_id)
+
+        print(f"✅ Conta do usuário {email_deletado} (ID: {usuario_id}) excluída completamente!")
+
+        return {
+            'success': True,
+            'email': email_deletado,
+            'registros_removidos': {
+                'humor': humor_count,
+                'meditacoes': meditacao_count,
+                'avaliacoes': avaliacao_count,
+                'usuario': 1
+            }
+        }
+
+    except Exception as error:
+        print(f"❌ Erro ao excluir conta completa: {error}")
+        raise
+
+
+# --- EXPORTAÇÃO DOS DADOS DO USUÁRIO ---
+
+async def exportar_dados_usuario(usuario_id, lote=None):
+    """(seção, colunas, linhas) como no controller síncrono; `linhas` é um cursor asyncpg no servidor."""
+    async with transacao(somente_leitura=True, usuario_id=usuario_id) as conn:
+        for secao, tabela, coluna_usuario, colunas in SECOES_EXPORTACAO:
+            yield secao, colunas, conn.cursor(sql_exportacao(tabela, coluna_usuario, colunas, '$1'), usuario_id,
+                                              prefetch=lote or Config.EXPORTACAO_LOTE)
@@ -0,0 +1,495 @@
+"""
+Gerador de dados sintéticos em escala de produção para o esquema do Calmou.
+
+Preenche usuarios, meditacoes, enderecos, historico_meditacoes,
+classificacoes_humor, resultados_avaliacoes e notificacoes com milhões de
+linhas, carregadas por COPY em fluxo (nada é montado inteiro em memória).
+
+- Atividade por usuário segue uma lei de potência (Pareto com `expoente`):
+  poucos usuários concentram boa parte dos registros, como em produção.
+  Expoentes menores concentram mais.
+- Os cadastros crescem ao longo do período e só usuários já cadastrados geram
+  eventos; o volume diário acompanha a base ativa e o dia da semana.
+- O horário dos eventos segue `perfil_horario` (24 pesos; padrão com picos de
+  manhã e à noite).
+- A mesma `semente` (e o mesmo `ate`) gera exatamente os mesmos dados.
+
+Todos os usuários têm a senha SENHA_PADRAO, para testes de carga com login.
+
+Uso (a partir de backend/):
+    python cli.py gerar-dados --usuarios 100000 --substituir
+"""
+import argparse
+import bisect
+import datetime
+import itertools
+import json
+import random
+import sys
+import time
+
+import psycopg2
+
+import conexao
+from controller import controller_usuario
+
+SENHA_PADRAO = 'calmou123'
+# Hash fixo (Werkzeug/scrypt) de SENHA_PADRAO: um salt aleatório quebraria o determinismo
+HASH_SENHA_PADRAO = (
+    'scrypt:32768:8:1$4wVkLI6jS9QfMsuR$71a3ada74a0c099b6d4cda60e7ccfd712658da6a1c34bfc910c20b77629d2c28'
+    '18fafa3bd8d713a93c46484c8c605185aa5646346593321432b6269babdf2a86'
+)
+
+PADROES = {
+    'usuarios': 100000,
+    'meditacoes': 300,
+    'dias': 365,
+    'ate': None,            # último dia (date); padrão: hoje
+    'semente': 42,
+    'expoente': 2.0,        # Pareto da atividade por usuário (menor = mais concentrada)
+    'historico': 40,        # média de registros por usuário em cada tabela
+    'humor': 30,
+    'avaliacoes': 4,
+    'notificacoes': 10,
+    'enderecos': 0.6,       # fração de usuários com endereço
+    'perfil_horario': None,  # 24 pesos; padrão: PERFIL_HORARIO
+}
+
+# Picos às 7h e entre 21h e 23h (meditação antes de dormir)
+PERFIL_HORARIO = [1, 1, 1, 1, 1, 2, 5, 9, 7, 4, 3, 3, 4, 3, 3, 3, 3, 4, 5, 6, 8, 10, 9, 4]
+# Segunda a domingo
+PESO_DIA_SEMANA = [1.0, 1.0, 0.95, 0.95, 0.85, 0.9, 1.05]
+
+TABELAS = ['usuarios', 'meditacoes', 'enderecos', 'historico_meditacoes',
+           'classificacoes_humor', 'resultados_avaliacoes', 'notificacoes']
+
+_NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+          'João', 'Larissa', 'Lucas', 'Mariana', 'Matheus', 'Natália', 'Pedro', 'Rafaela', 'Thiago',
+          'Vitória', 'Gustavo', 'Beatriz', 'Rodrigo', 'Camila', 'Leonardo', 'Juliana']
+_SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+               'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes']
+_TIPOS_SANGUINEOS = ['O+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-']
+_PESOS_SANGUINEOS = [36, 34, 8, 2.5, 9, 8, 2, 0.5]
+_ALERGIAS = ['Dipirona', 'Penicilina', 'Lactose', 'Amendoim', 'Frutos do mar', 'Pólen']
+
+_TIPOS_MEDITACAO = ['Guiada', 'Mindfulness', 'Respiração', 'Sono', 'Body Scan']
+_CATEGORIAS = ['Ansiedade', 'Sono', 'Foco', 'Estresse', 'Autoestima', 'Gratidão', 'Relaxamento', 'Manhã']
+
+_SENTIMENTOS = [  # por faixa de nível (0-10)
+    ['Triste', 'Ansioso', 'Irritado', 'Cansado'],
+    ['Cansado', 'Ansioso', 'Neutro', 'Entediado'],
+    ['Neutro', 'Calmo', 'Tranquilo'],
+    ['Calmo', 'Feliz', 'Grato', 'Animado'],
+]
+_NOTAS = ['Dormi mal', 'Dia corrido no trabalho', 'Meditei antes de dormir', 'Treino pela manhã',
+          'Conversa boa com a família', 'Muita coisa na cabeça', 'Dia produtivo']
+
+# tipo -> (peso, número de perguntas, valor máximo por pergunta), no formato dos questionários
+_QUESTIONARIOS = {
+    'ansiedade': (30, 7, 3),             # GAD-7
+    'depressao': (20, 9, 3),             # PHQ-9
+    'estresse': (25, 10, 4),             # PSS-10
+    'burnout': (15, 9, 6),
+    'Avaliação de Estresse': (6, 10, 4),
+    'Questionário de Burnout': (4, 9, 6),
+}
+_FAIXAS_RESULTADO = ['Mínimo', 'Leve', 'Moderado', 'Grave']
+
+_NOTIFICACOES = [
+    ('Hora de meditar', 'Que tal uma pausa de 5 minutos para respirar?'),
+    ('Nova meditação', 'Chegou uma meditação nova na sua categoria favorita.'),
+    ('Sequência em risco', 'Medite hoje para não perder sua sequência.'),
+    ('Como você está?', 'Registre seu humor de hoje.'),
+    ('Resumo semanal', 'Seu resumo da semana está pronto.'),
+]
+_ESTADOS = [('SP', 'São Paulo', 22), ('RJ', 'Rio de Janeiro', 9), ('MG', 'Belo Horizonte', 10),
+            ('BA', 'Salvador', 7), ('PR', 'Curitiba', 6), ('RS', 'Porto Alegre', 6),
+            ('PE', 'Recife', 5), ('CE', 'Fortaleza', 5), ('DF', 'Brasília', 3), ('SC', 'Florianópolis', 4)]
+_RUAS = ['Rua das Flores', 'Avenida Brasil', 'Rua XV de Novembro', 'Rua São João', 'Avenida Paulista',
+         'Rua Sete de Setembro', 'Rua da Paz', 'Avenida Atlântica']
+
+
+def email_usuario(usuario_id):
+    """Email do usuário sintético `usuario_id` (para login em benchmarks)."""
+    return f"usuario{usuario_id}@calmou.dev"
+
+
+def cpf_usuario(usuario_id):
+    """CPF válido e único derivado do id (9 dígitos base + 2 verificadores)."""
+    digitos = [int(d) for d in f"{usuario_id:09d}"]
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        digitos.append(0 if soma % 11 < 2 else 11 - soma % 11)
+    texto = ''.join(map(str, digitos))
+    return f"{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}"
+
+
+def _aleatorio(semente, tabela):
+    """Gerador independente por tabela: mudar uma tabela não altera as outras."""
+    return random.Random(f"{semente}:{tabela}")
+
+
+def _texto_json(valor):
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':')).replace('\\', '\\\\')
+
+
+class _Calendario:
+    """Dias do período, cadastros ao longo dele e pesos de atividade dos usuários."""
+
+    def __init__(self, opcoes):
+        self.usuarios = opcoes['usuarios']
+        self.dias = opcoes['dias']
+        fim = opcoes['ate'] or datetime.date.today()
+        self.inicio = fim - datetime.timedelta(days=self.dias - 1)
+        self.datas = [(self.inicio + datetime.timedelta(days=d)) for d in range(self.dias)]
+        self.textos = [data.isoformat() for data in self.datas]
+
+        rng = _aleatorio(opcoes['semente'], 'calendario')
+        # Cadastros acelerando: o dia do cadastro cresce com a raiz do id
+        self.dia_cadastro = [min(self.dias - 1, int(self.dias * (i / self.usuarios) ** 0.5))
+                             for i in range(self.usuarios)]
+        self.ativos = [0] * self.dias  # usuários já cadastrados ao fim de cada dia
+        for dia in self.dia_cadastro:
+            self.ativos[dia] += 1
+        self.ativos = list(itertools.accumulate(self.ativos))
+
+        # Peso de atividade de cada usuário, sorteado de uma Pareto
+        self.acumulado = list(itertools.accumulate(
+            rng.paretovariate(opcoes['expoente']) for _ in range(self.usuarios)
+        ))
+
+        perfil = opcoes['perfil_horario'] or PERFIL_HORARIO
+        if len(perfil) != 24:
+            raise ValueError("perfil_horario precisa de 24 pesos")
+        self.horas = list(itertools.accumulate(perfil))
+
+    def eventos_por_dia(self, total):
+        """Distribui `total` eventos pelos dias, proporcional à atividade da base ativa."""
+        pesos = [self.acumulado[self.ativos[d] - 1] * PESO_DIA_SEMANA[data.weekday()]
+                 for d, data in enumerate(self.datas)]
+        soma, acumulado, anterior, contagens = sum(pesos), 0.0, 0, []
+        for peso in pesos:
+            acumulado += peso
+            alvo = round(total * acumulado / soma)
+            contagens.append(alvo - anterior)
+            anterior = alvo
+        return contagens
+
+    def usuario(self, rng, dia):
+        """Sorteia um usuário (1-based) entre os cadastrados até `dia`, pelo peso de atividade."""
+        limite = self.ativos[dia]
+        return bisect.bisect_right(self.acumulado, rng.random() * self.acumulado[limite - 1], 0, limite) + 1
+
+    def instante(self, rng, dia):
+        hora = bisect.bisect_right(self.horas, rng.random() * self.horas[-1])
+        return f"{self.textos[dia]} {hora:02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}+00"
+
+
+# ==================== LINHAS POR TABELA ====================
+# Cada gerador produz blocos de linhas no formato texto do COPY
+
+def _em_blocos(linhas, tamanho=5000):
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield '\n'.join(bloco) + '\n'
+            bloco = []
+    if bloco:
+        yield '\n'.join(bloco) + '\n'
+
+
+def _usuarios(opcoes, calendario):
+    rng = _aleatorio(opcoes['semente'], 'usuarios')
+    fim = calendario.datas[-1]
+    for indice in range(calendario.usuarios):
+        usuario_id = indice + 1
+        nome = f"{rng.choice(_NOMES)} {rng.choice(_SOBRENOMES)} {rng.choice(_SOBRENOMES)}"
+        config = _texto_json({
+            'tema': rng.choice(['claro', 'escuro', 'sistema']),
+            'notificacoes': rng.random() < 0.8,
+            'lembrete': f"{rng.choice([7, 8, 12, 21, 22])}:00",
+        })
+        nascimento = fim - datetime.timedelta(days=int(365.25 * rng.triangular(16, 70, 28)))
+        alergias = rng.choice(_ALERGIAS) if rng.random() < 0.15 else '\\N'
+        tipo_sanguineo = rng.choices(_TIPOS_SANGUINEOS, _PESOS_SANGUINEOS)[0] if rng.random() < 0.7 else '\\N'
+        yield '\t'.join([
+            str(usuario_id), nome, email_usuario(usuario_id), HASH_SENHA_PADRAO, config,
+            calendario.instante(rng, calendario.dia_cadastro[indice]),
+            cpf_usuario(usuario_id), nascimento.isoformat(), tipo_sanguineo, alergias, '\\N',
+        ])
+
+
+def _duracoes_meditacoes(opcoes):
+    rng = _aleatorio(opcoes['semente'], 'meditacoes')
+    return [rng.choice([3, 5, 5, 10, 10, 10, 15, 20, 30]) for _ in range(opcoes['meditacoes'])]
+
+
+def _meditacoes(opcoes, calendario):
+    rng = _aleatorio(opcoes['semente'], 'meditacoes_textos')
+    for indice, duracao in enumerate(_duracoes_meditacoes(opcoes)):
+        meditacao_id = indice + 1
+        categoria = _CATEGORIAS[indice % len(_CATEGORIAS)]
+        yield '\t'.join([
+            str(meditacao_id), f"{categoria} {meditacao_id}",
+            f"Meditação de {duracao} minutos para {categoria.lower()}.", str(duracao),
+            f"https://cdn.calmou.dev/audio/{meditacao_id}.mp3", rng.choice(_TIPOS_MEDITACAO), categoria,
+            f"/static/images/meditacoes/{meditacao_id}.jpg",
+        ])
+
+
+def _enderecos(opcoes, calendario):
+    rng = _aleatorio(opcoes['semente'], 'enderecos')
+    pesos = [peso for _, _, peso in _ESTADOS]
+    endereco_id = 0
+    for usuario_id in range(1, calendario.usuarios + 1):
+        if rng.random() >= opcoes['enderecos']:
+            continue
+        endereco_id += 1
+        estado, cidade, _ = rng.choices(_ESTADOS, pesos)[0]
+        complemento = f"Apto {rng.randint(1, 30)}{rng.randint(1, 4):02d}" if rng.random() < 0.4 else '\\N'
+        yield '\t'.join([
+            str(endereco_id), str(usuario_id), 'Brasil', estado, cidade, rng.choice(_RUAS),
+            str(rng.randint(1, 3000)), complemento, f"{rng.randint(1000, 99999):05d}-{rng.randint(0, 999):03d}",
+        ])
+
+
+def _eventos(opcoes, calendario, tabela, media):
+    """(id, dia, usuario_id, instante) em ordem de dia, como o heap de produção."""
+    rng = _aleatorio(opcoes['semente'], tabela)
+    evento_id = 0
+    for dia, quantidade in enumerate(calendario.eventos_por_dia(media * calendario.usuarios)):
+        for _ in range(quantidade):
+            evento_id += 1
+            yield rng, evento_id, dia, calendario.usuario(rng, dia), calendario.instante(rng, dia)
+
+
+def _historico(opcoes, calendario):
+    duracoes = _duracoes_meditacoes(opcoes)
+    # Popularidade das meditações também concentrada em poucas
+    popularidade = list(itertools.accumulate(p ** -0.8 for p in range(1, len(duracoes) + 1)))
+    for rng, evento_id, _, usuario_id, instante in _eventos(opcoes, calendario, 'historico', opcoes['historico']):
+        indice = bisect.bisect_right(popularidade, rng.random() * popularidade[-1])
+        duracao = max(1, round(duracoes[indice] * rng.uniform(0.4, 1.0)))
+        yield f"{evento_id}\t{usuario_id}\t{indice + 1}\t{instante}\t{duracao}"
+
+
+def _humor(opcoes, calendario):
+    base = _aleatorio(opcoes['semente'], 'humor_base')
+    humor_base = [min(9.0, max(1.0, base.gauss(6, 1.5))) for _ in range(calendario.usuarios)]
+    for rng, evento_id, _, usuario_id, instante in _eventos(opcoes, calendario, 'humor', opcoes['humor']):
+        nivel = min(10, max(0, round(rng.gauss(humor_base[usuario_id - 1], 1.8))))
+        sentimento = rng.choice(_SENTIMENTOS[min(3, nivel * 4 // 11)])
+        notas = rng.choice(_NOTAS) if rng.random() < 0.2 else '\\N'
+        yield f"{evento_id}\t{usuario_id}\t{nivel}\t{sentimento}\t{notas}\t{instante}"
+
+
+def _avaliacoes(opcoes, calendario):
+    tipos = list(_QUESTIONARIOS)
+    pesos = [peso for peso, _, _ in _QUESTIONARIOS.values()]
+    for rng, evento_id, _, usuario_id, instante in _eventos(opcoes, calendario, 'avaliacoes', opcoes['avaliacoes']):
+        tipo = rng.choices(tipos, pesos)[0]
+        _, perguntas, maximo = _QUESTIONARIOS[tipo]
+        tendencia = rng.random()
+        respostas = {f"q{n}": min(maximo, int(rng.triangular(0, maximo + 1, tendencia * maximo)))
+                     for n in range(1, perguntas + 1)}
+        score = sum(respostas.values())
+        faixa = _FAIXAS_RESULTADO[min(3, score * 4 // (perguntas * maximo + 1))]
+        yield '\t'.join([
+            str(evento_id), str(usuario_id), tipo, _texto_json(respostas), str(score),
+            f"Nível {faixa.lower()} de {tipo.lower()}", instante,
+        ])
+
+
+def _notificacoes(opcoes, calendario):
+    ultimo_dia = calendario.dias - 1
+    for rng, evento_id, dia, usuario_id, instante in _eventos(opcoes, calendario, 'notificacoes',
+                                                              opcoes['notificacoes']):
+        titulo, mensagem = rng.choice(_NOTIFICACOES)
+        lida = rng.random() < (0.9 if ultimo_dia - dia > 7 else 0.4)
+        yield f"{evento_id}\t{usuario_id}\t{titulo}\t{mensagem}\t{instante}\t{'t' if lida else 'f'}"
+
+
+# tabela -> (colunas na ordem do COPY, gerador)
+_CARGAS = {
+    'usuarios': ('id, nome, email, password_hash, config, data_cadastro, cpf, data_nascimento, '
+                 'tipo_sanguineo, alergias, foto_perfil', _usuarios),
+    'meditacoes': ('id, titulo, descricao, duracao_minutos, url_audio, tipo, categoria, imagem_capa',
+                   _meditacoes),
+    'enderecos': ('id, usuario_id, pais, estado, cidade, rua, numero, complemento, cep', _enderecos),
+    'historico_meditacoes': ('id, usuario_id, meditacao_id, data_conclusao, duracao_real_minutos', _historico),
+    'classificacoes_humor': ('id, usuario_id, nivel_humor, sentimento_principal, notas, data_classificacao',
+                             _humor),
+    'resultados_avaliacoes': ('id, usuario_id, tipo, respostas, resultado_score, resultado_texto, '
+                              'data_avaliacao', _avaliacoes),
+    'notificacoes': ('id, usuario_id, titulo, mensagem, data_envio, lida', _notificacoes),
+}
+
+
+# ==================== CARGA ====================
+
+class _FluxoCopy:
+    """Arquivo só de leitura sobre um gerador de blocos, consumido pelo copy_expert."""
+
+    def __init__(self, blocos):
+        self._blocos = iter(blocos)
+        self.linhas = 0
+
+    def read(self, tamanho=-1):
+        # Um bloco por chamada: o copy_expert envia o que vier, de qualquer tamanho
+        bloco = next(self._blocos, '')
+        self.linhas += bloco.count('\n')
+        return bloco
+
+
+def _remover_restricoes(cursor):
+    """Remove FKs e índices secundários (recriados ao final): a carga fica bem mais rápida."""
+    cursor.execute("""
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE contype = 'f' AND conrelid = ANY(%s::regclass[])
+    """, (TABELAS,))
+    chaves = cursor.fetchall()
+    cursor.execute("""
+        SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+        FROM pg_index i
+        WHERE indrelid = ANY(%s::regclass[]) AND NOT indisprimary
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+    """, (TABELAS,))
+    indices = cursor.fetchall()
+
+    for tabela, nome, _ in chaves:
+        cursor.execute(f'ALTER TABLE {tabela} DROP CONSTRAINT "{nome}"')
+    for nome, _ in indices:
+        cursor.execute(f"DROP INDEX {nome}")
+    return chaves, indices
+
+
+def _recriar_restricoes(cursor, chaves, indices):
+    for _, definicao in indices:
+        cursor.execute(definicao)
+    for tabela, nome, definicao in chaves:
+        cursor.execute(f'ALTER TABLE {tabela} ADD CONSTRAINT "{nome}" {definicao}')
+
+
+def gerar(conn, progresso=print, substituir=False, **opcoes):
+    """
+    Apaga e recarrega as tabelas com dados sintéticos; devolve {tabela: linhas}.
+
+    Tudo roda em uma transação (TRUNCATE + COPY na mesma transação dispensa WAL
+    com wal_level=minimal). Recusa bancos com usuários, a menos que `substituir`.
+    """
+    desconhecidas = set(opcoes) - set(PADROES)
+    if desconhecidas:
+        raise TypeError(f"Opções desconhecidas: {', '.join(sorted(desconhecidas))}")
+    opcoes = dict(PADROES, **opcoes)
+    calendario = _Calendario(opcoes)
+    linhas = {}
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM usuarios)")
+        if cursor.fetchone()[0] and not substituir:
+            raise ValueError("O banco já tem usuários; use substituir=True (--substituir) para apagá-los")
+
+        cursor.execute("SET LOCAL maintenance_work_mem = '512MB'")
+        cursor.execute(f"TRUNCATE {', '.join(TABELAS)} RESTART IDENTITY CASCADE")
+        chaves, indices = _remover_restricoes(cursor)
+
+        for tabela, (colunas, gerador) in _CARGAS.items():
+            inicio = time.perf_counter()
+            fluxo = _FluxoCopy(_em_blocos(gerador(opcoes, calendario)))
+            cursor.copy_expert(f"COPY {tabela} ({colunas}) FROM STDIN", fluxo, size=1 << 16)
+            linhas[tabela] = fluxo.linhas
+            decorrido = time.perf_counter() - inicio
+            progresso(f"  ✓ {tabela}: {fluxo.linhas:,} linhas em {decorrido:.1f}s "
+                      f"({fluxo.linhas / max(decorrido, 1e-9):,.0f}/s)")
+
+        inicio = time.perf_counter()
+        _recriar_restricoes(cursor, chaves, indices)
+        progresso(f"  ✓ {len(indices)} índices e {len(chaves)} chaves estrangeiras recriados "
+                  f"em {time.perf_counter() - inicio:.1f}s")
+
+        for tabela in TABELAS:
+            cursor.execute(f"""
+                SELECT setval(pg_get_serial_sequence('{tabela}', 'id'),
+                              COALESCE(MAX(id), 0) + 1, false) FROM {tabela}
+            """)
+
+        # Mesma carga inicial da migração 002: sem versão, as leituras não têm ETag
+        cursor.execute("""
+            INSERT INTO versoes_dados_usuario (usuario_id, dominio, versao)
+            SELECT usuario_id, dominio, nextval('versoes_dados_usuario_seq')
+            FROM (
+                SELECT DISTINCT usuario_id, 'historico' AS dominio FROM historico_meditacoes
+                UNION ALL
+                SELECT DISTINCT usuario_id, 'humor' FROM classificacoes_humor
+                UNION ALL
+                SELECT DISTINCT usuario_id, 'avaliacoes' FROM resultados_avaliacoes
+            ) AS existentes
+        """)
+
+        # O COPY não passa pelo controller: os resumos (estatísticas de meditação e humor
+        # diário) saem dos dados carregados
+        inicio = time.perf_counter()
+        resumos = controller_usuario.reconstruir_estatisticas_meditacao(cursor)
+        progresso(f"  ✓ resumo de estatísticas de {resumos:,} usuários em {time.perf_counter() - inicio:.1f}s")
+        inicio = time.perf_counter()
+        dias_humor = controller_usuario.reconstruir_humor_diario(cursor)
+        progresso(f"  ✓ resumo diário de humor com {dias_humor:,} dias em {time.perf_counter() - inicio:.1f}s")
+    conn.commit()
+
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            for tabela in TABELAS + ['versoes_dados_usuario', 'usuario_estatisticas_meditacao', 'humor_diario']:
+                cursor.execute(f"VACUUM ANALYZE {tabela}")
+    finally:
+        conn.autocommit = False
+    return linhas
+
+
+def _data(texto):
+    return datetime.date.fromisoformat(texto)
+
+
+def _perfil(texto):
+    return [float(peso) for peso in texto.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='cli.py gerar-dados',
+                                     description="Gera dados sintéticos em escala de produção")
+    parser.add_argument('--usuarios', type=int, default=PADROES['usuarios'])
+    parser.add_argument('--meditacoes', type=int, default=PADROES['meditacoes'])
+    parser.add_argument('--dias', type=int, default=PADROES['dias'], help='período coberto pelos eventos')
+    parser.add_argument('--ate', type=_data, help='último dia (AAAA-MM-DD); padrão: hoje')
+    parser.add_argument('--semente', type=int, default=PADROES['semente'])
+    parser.add_argument('--expoente', type=float, default=PADROES['expoente'],
+                        help='expoente da Pareto de atividade por usuário (menor = mais concentrada)')
+    for tabela in ('historico', 'humor', 'avaliacoes', 'notificacoes'):
+        parser.add_argument(f'--{tabela}', type=float, default=PADROES[tabela],
+                            help=f'média de registros de {tabela} por usuário')
+    parser.add_argument('--enderecos', type=float, default=PADROES['enderecos'],
+                        help='fração de usuários com endereço')
+    parser.add_argument('--perfil-horario', type=_perfil, help='24 pesos separados por vírgula (0h a 23h)')
+    parser.add_argument('--substituir', action='store_true', help='apaga os dados existentes')
+    args = parser.parse_args(argv)
+
+    opcoes = {chave: valor for chave, valor in vars(args).items() if chave != 'substituir'}
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        print(f"🧪 Gerando dados sintéticos ({args.usuarios:,} usuários, semente {args.semente})...")
+        inicio = time.perf_counter()
+        linhas = gerar(conn, substituir=args.substituir, **opcoes)
+        total = sum(linhas.values())
+        print(f"✅ {total:,} linhas em {time.perf_counter() - inicio:.1f}s (senha de todos: {SENHA_PADRAO})")
+    except (Exception, psycopg2.Error) as error:
+        conn.rollback()
+        print(f"❌ Erro ao gerar dados: {error}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,72 +1,237 @@
-from conexao import conectar
+"""
+Relatórios do back-office em fluxo, gravados em arquivo.
 
-def relatorio_meditacoes_por_usuario():
-    """
-    Relatório de Sumarização: Conta quantas meditações cada usuário completou.
-    Usa GROUP BY e COUNT.
-    """
+Cada relatório é uma consulta lida por um cursor nomeado no servidor, em lotes
+de RELATORIOS_LOTE linhas, e cada lote é escrito no arquivo assim que chega:
+CSV, JSON Lines ou Parquet (pyarrow, opcional). A memória fica em um lote,
+qualquer que seja o tamanho do histórico. O arquivo é escrito com um nome
+temporário e só ganha o nome final quando o relatório termina, então um
+relatório interrompido não deixa arquivo pela metade.
+
+Relatórios independentes rodam em paralelo (gerar_relatorios), cada um em uma
+thread com a sua conexão do pool: o trabalho pesado é do PostgreSQL (junções,
+agregação, ordenação) e da escrita, que não seguram o GIL.
+
+Uso (a partir de backend/):
+    python cli.py relatorios --formato csv --saida relatorios
+    python cli.py relatorios --formato parquet historico_detalhado
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from conexao import dimensionar_pool, obter_cursor
+from config import Config
+from serializacao import para_json
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # opcional: sem ele, só CSV e JSON Lines
+    pyarrow = None
+
+
+# ==================== FORMATOS ====================
+
+class _Csv:
+    extensao = 'csv'
+
+    def __init__(self, caminho, colunas, tipos):
+        self._arquivo = open(caminho, 'w', newline='', encoding='utf-8')
+        self._csv = csv.writer(self._arquivo)
+        self._csv.writerow(colunas)
+
+    def escrever(self, linhas):
+        self._csv.writerows(linhas)
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class _JsonLinhas:
+    extensao = 'jsonl'
+
+    def __init__(self, caminho, colunas, tipos):
+        self._arquivo = open(caminho, 'wb')
+        self._colunas = colunas
+
+    def escrever(self, linhas):
+        self._arquivo.write(b''.join(para_json(dict(zip(self._colunas, linha))) + b'\n' for linha in linhas))
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+def _tipo_parquet(oid):
+    """Tipo da coluna no Parquet a partir do OID do tipo no PostgreSQL; o resto vai como texto."""
+    return {
+        16: pyarrow.bool_(),
+        20: pyarrow.int64(),
+        21: pyarrow.int16(),
+        23: pyarrow.int32(),
+        700: pyarrow.float32(),
+        701: pyarrow.float64(),
+        1082: pyarrow.date32(),
+        1114: pyarrow.timestamp('us'),
+        1184: pyarrow.timestamp('us', tz='UTC'),
+    }.get(oid, pyarrow.string())
+
+
+class _Parquet:
+    """Um row group por lote, com o esquema tirado das colunas do cursor."""
+    extensao = 'parquet'
+
+    def __init__(self, caminho, colunas, tipos):
+        if pyarrow is None:
+            raise RuntimeError("formato parquet requer o pacote pyarrow (pip install pyarrow)")
+        self._esquema = pyarrow.schema([(coluna, _tipo_parquet(tipo)) for coluna, tipo in zip(colunas, tipos)])
+        self._escritor = pyarrow.parquet.ParquetWriter(caminho, self._esquema, compression='zstd')
+
+    def escrever(self, linhas):
+        colunas = []
+        for campo, valores in zip(self._esquema, zip(*linhas)):
+            if campo.type == pyarrow.string():
+                valores = [valor if valor is None or isinstance(valor, str) else str(valor) for valor in valores]
+            colunas.append(pyarrow.array(valores, type=campo.type))
+        self._escritor.write_batch(pyarrow.RecordBatch.from_arrays(colunas, schema=self._esquema))
+
+    def fechar(self):
+        self._escritor.close()
+
+
+FORMATOS = {'csv': _Csv, 'jsonl': _JsonLinhas, 'parquet': _Parquet}
+
+
+def formatos_disponiveis():
+    """Formatos que podem ser gerados neste ambiente (parquet só com o pyarrow)."""
+    return tuple(formato for formato in FORMATOS if formato != 'parquet' or pyarrow is not None)
+
+
+def _gravar(cursor, formato, caminho, lote):
+    """Escreve as linhas do cursor em `caminho`, um lote por vez; devolve o número de linhas."""
+    temporario = f"{caminho}.parcial"
+    escritor, total = None, 0
     try:
-        conn = conectar()
-        cursor = conn.cursor()
+        while True:
+            linhas = cursor.fetchmany(lote)
+            if escritor is None:
+                # Cursor nomeado: a descrição das colunas só chega com o primeiro lote
+                escritor = FORMATOS[formato](temporario, [c.name for c in cursor.description],
+                                             [c.type_code for c in cursor.description])
+            if not linhas:
+                break
+            escritor.escrever(linhas)
+            total += len(linhas)
+        escritor.fechar()
+        os.replace(temporario, caminho)
+        return total
+    except BaseException:
+        if escritor is not None:
+            escritor.fechar()
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def _cursor_relatorio(nome):
+    # Relatórios só leem: podem ir para a réplica
+    return obter_cursor(somente_leitura=True, name=f"calmou_relatorio_{nome}")
+
+
+# ==================== RELATÓRIOS ====================
 
-        sql = """
-            SELECT u.nome, COUNT(h.id) as total_meditacoes
+def relatorio_meditacoes_por_usuario(formato, caminho, lote=None):
+    """
+    Relatório de Sumarização: quantas meditações cada usuário completou
+    (GROUP BY e COUNT, por usuário e não por nome). Devolve o número de linhas.
+    """
+    with _cursor_relatorio('meditacoes_por_usuario') as cursor:
+        cursor.execute("""
+            SELECT u.id AS usuario_id, u.nome, COUNT(h.id) AS total_meditacoes
             FROM usuarios u
             JOIN historico_meditacoes h ON u.id = h.usuario_id
-            GROUP BY u.nome
-            ORDER BY total_meditacoes DESC;
-        """
-        cursor.execute(sql)
-        resultados = cursor.fetchall()
-        
-        print("\n--- Relatório: Total de Meditações por Usuário ---")
-        if not resultados:
-            print("Nenhum histórico de meditação encontrado.")
-        else:
-            for linha in resultados:
-                print(f"Usuário: {linha[0]}, Meditações Concluídas: {linha[1]}")
-
-    except Exception as error:
-        print(f"Erro ao gerar relatório de meditações por usuário: {error}")
-    finally:
-        if conn:
-            cursor.close()
-            conn.close()
-
-def relatorio_historico_detalhado():
+            GROUP BY u.id
+            ORDER BY total_meditacoes DESC, u.id
+        """)
+        return _gravar(cursor, formato, caminho, lote or Config.RELATORIOS_LOTE)
+
+
+def relatorio_historico_detalhado(formato, caminho, lote=None):
     """
-    Relatório com Junção: Mostra o histórico detalhado de meditações.
-    Usa JOIN para buscar o nome do usuário e o título da meditação.
+    Relatório com Junção: o histórico de meditações com o nome do usuário e o
+    título da meditação, mais recente primeiro (sem data por último). Devolve
+    o número de linhas.
     """
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-
-        sql = """
-            SELECT u.nome, m.titulo, h.data_conclusao
+    with _cursor_relatorio('historico_detalhado') as cursor:
+        cursor.execute("""
+            SELECT u.nome AS usuario, m.titulo AS meditacao, h.data_conclusao
             FROM historico_meditacoes h
             JOIN usuarios u ON h.usuario_id = u.id
             JOIN meditacoes m ON h.meditacao_id = m.id
-            ORDER BY h.data_conclusao DESC;
-        """
-        cursor.execute(sql)
-        resultados = cursor.fetchall()
-
-        print("\n--- Relatório: Histórico Detalhado de Meditações ---")
-        if not resultados:
-            print("Nenhum histórico de meditação encontrado.")
-        else:
-            for linha in resultados:
-                data_formatada = linha[2].strftime("%d/%m/%Y %H:%M:%S")
-                print(f"Usuário: {linha[0]}, Meditação: '{linha[1]}', Concluído em: {data_formatada}")
-                
-    except Exception as error:
-        print(f"Erro ao gerar relatório de histórico detalhado: {error}")
-    finally:
-        if conn:
-            cursor.close()
-            conn.close()
+            ORDER BY h.data_conclusao DESC NULLS LAST, h.id DESC
+        """)
+        return _gravar(cursor, formato, caminho, lote or Config.RELATORIOS_LOTE)
+
+
+RELATORIOS = {
+    'meditacoes_por_usuario': relatorio_meditacoes_por_usuario,
+    'historico_detalhado': relatorio_historico_detalhado,
+}
+
+
+def _gerar(nome, formato, caminho, lote):
+    inicio = time.perf_counter()
+    linhas = RELATORIOS[nome](formato, caminho, lote)
+    return nome, caminho, linhas, time.perf_counter() - inicio
+
+
+def gerar_relatorios(nomes=None, formato='csv', saida=None, paralelo=None, lote=None):
+    """
+    Gera os relatórios `nomes` (todos, se None) em `saida`/<nome>.<extensão>,
+    até `paralelo` ao mesmo tempo, cada um com a sua conexão (limitado ao
+    tamanho do pool). Devolve [(nome, caminho, linhas, segundos)] na ordem de
+    `nomes`; se algum falhar, o erro é relançado depois que os outros terminam.
+    ValueError para relatório ou formato desconhecido.
+    """
+    nomes = list(nomes or RELATORIOS)
+    desconhecidos = [nome for nome in nomes if nome not in RELATORIOS]
+    if desconhecidos:
+        raise ValueError(f"relatório desconhecido: {', '.join(desconhecidos)} (use: {', '.join(RELATORIOS)})")
+    if formato not in formatos_disponiveis():
+        raise ValueError(f"formato deve ser um de: {', '.join(formatos_disponiveis())}")
+    saida = saida or Config.RELATORIOS_DIR
+    os.makedirs(saida, exist_ok=True)
+
+    paralelo = max(1, min(paralelo or Config.RELATORIOS_PARALELO, len(nomes), dimensionar_pool()[1]))
+    extensao = FORMATOS[formato].extensao
+    with ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix='relatorio') as executor:
+        futuros = [executor.submit(_gerar, nome, formato, os.path.join(saida, f"{nome}.{extensao}"), lote)
+                   for nome in nomes]
+    return [futuro.result() for futuro in futuros]
+
+
+def main(argv=None):
+    """python cli.py relatorios [--formato csv] [--saida relatorios] [--paralelo 2] [nomes...]"""
+    parser = argparse.ArgumentParser(prog='cli.py relatorios', description="Gera os relatórios em arquivos")
+    parser.add_argument('nomes', nargs='*', metavar='relatorio',
+                        help=f"relatórios a gerar (padrão: todos): {', '.join(RELATORIOS)}")
+    parser.add_argument('--formato', default='csv', choices=FORMATOS)
+    parser.add_argument('--saida', default=Config.RELATORIOS_DIR, help='diretório dos arquivos')
+    parser.add_argument('--paralelo', type=int, default=Config.RELATORIOS_PARALELO,
+                        help='relatórios gerados ao mesmo tempo')
+    parser.add_argument('--lote', type=int, default=Config.RELATORIOS_LOTE, help='linhas por ida ao banco')
+    args = parser.parse_args(argv)
+
+    try:
+        resultados = gerar_relatorios(args.nomes, args.formato, args.saida, args.paralelo, args.lote)
+    except ValueError as error:
+        parser.error(str(error))
+    for nome, caminho, linhas, segundos in resultados:
+        print(f"✅ {nome}: {linhas:,} linhas em {segundos:.2f} s -> {caminho}")
+    return resultados
+
 
 if __name__ == '__main__':
-    relatorio_meditacoes_por_usuario()
-    relatorio_historico_detalhado()
\ No newline at end of file
+    main()
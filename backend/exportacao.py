@@ -0,0 +1,173 @@
+"""
+Exportação dos dados de um usuário (portabilidade, LGPD) em fluxo.
+
+Recebe as seções de `controller_usuario.exportar_dados_usuario` (ou da versão
+assíncrona): (seção, colunas, linhas), uma por tabela, com as linhas lidas do
+banco em lotes por um cursor no servidor. Cada linha é codificada assim que
+chega e sai em blocos de até BLOCO bytes; nada acumula além de um bloco, então
+a memória é a mesma para um usuário com dez linhas ou com anos de dados.
+
+Formatos:
+- `ndjson`: uma linha JSON por registro, `{"secao": ..., "dados": {...}}`,
+  datas em ISO 8601 (serializacao.para_json);
+- `csv`: um .zip com um CSV por seção (`perfil.csv`, `historico_meditacoes.csv`,
+  ...), com cabeçalho mesmo quando a seção está vazia. O zip é escrito em fluxo
+  (sem posicionar o arquivo: tamanhos e CRC vão nos descritores de dados),
+  comprimido com deflate.
+"""
+import csv
+import io
+import json
+import logging
+import zipfile
+from datetime import date, datetime, time
+
+from serializacao import para_json
+
+logger = logging.getLogger(__name__)
+
+BLOCO = 64 * 1024  # bytes acumulados antes de entregar um pedaço da resposta
+
+
+class _Ndjson:
+    tipo = 'application/x-ndjson'
+    extensao = 'ndjson'
+
+    def iniciar_secao(self, secao, colunas):
+        self._secao, self._colunas = secao, colunas
+        return b''
+
+    def linha(self, linha):
+        return para_json({'secao': self._secao, 'dados': dict(zip(self._colunas, linha))}) + b'\n'
+
+    def finalizar(self):
+        return b''
+
+
+class _Saida(io.RawIOBase):
+    """Destino do zip sem seek: guarda o que foi escrito até o gerador entregar."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def esvaziar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _celula(valor):
+    """Valor de uma coluna no CSV: datas em ISO 8601, JSON em texto, None vazio."""
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+class _CsvZip:
+    tipo = 'application/zip'
+    extensao = 'zip'
+
+    def __init__(self):
+        self._saida = _Saida()
+        self._zip = zipfile.ZipFile(self._saida, 'w', zipfile.ZIP_DEFLATED)
+        self._arquivo = None
+        self._texto = io.StringIO()
+        self._csv = csv.writer(self._texto)
+
+    def _descarregar(self):
+        """Passa o texto acumulado ao deflate (por bloco: uma chamada por linha custa caro)."""
+        self._arquivo.write(self._texto.getvalue().encode('utf-8'))
+        self._texto.seek(0)
+        self._texto.truncate()
+
+    def _fechar_arquivo(self):
+        if self._arquivo is not None:
+            self._descarregar()
+            self._arquivo.close()
+            self._arquivo = None
+
+    def iniciar_secao(self, secao, colunas):
+        self._fechar_arquivo()
+        self._arquivo = self._zip.open(f"{secao}.csv", 'w')
+        self._csv.writerow(colunas)
+        return self._saida.esvaziar()
+
+    def linha(self, linha):
+        self._csv.writerow([_celula(valor) for valor in linha])
+        if self._texto.tell() < BLOCO:
+            return b''
+        self._descarregar()
+        return self._saida.esvaziar()
+
+    def finalizar(self):
+        self._fechar_arquivo()
+        self._zip.close()
+        return self._saida.esvaziar()
+
+
+FORMATOS = {'ndjson': _Ndjson, 'csv': _CsvZip}
+
+
+def tipo_e_extensao(formato):
+    """(Content-Type, extensão do arquivo) de `formato`; ValueError se desconhecido."""
+    if formato not in FORMATOS:
+        raise ValueError(f"formato deve ser um de: {', '.join(FORMATOS)}")
+    return FORMATOS[formato].tipo, FORMATOS[formato].extensao
+
+
+def nome_arquivo(usuario_id, formato, dia):
+    """Nome sugerido no Content-Disposition: calmou-dados-<id>-<AAAA-MM-DD>.<ext>"""
+    return f"calmou-dados-{usuario_id}-{dia.isoformat()}.{tipo_e_extensao(formato)[1]}"
+
+
+def gerar(formato, secoes):
+    """Bytes da exportação em `formato`, em blocos, a partir das seções (iterável síncrono)."""
+    codificador = FORMATOS[formato]()
+    bloco = bytearray()
+    try:
+        for secao, colunas, linhas in secoes:
+            bloco += codificador.iniciar_secao(secao, colunas)
+            for linha in linhas:
+                bloco += codificador.linha(linha)
+                if len(bloco) >= BLOCO:
+                    yield bytes(bloco)
+                    bloco.clear()
+        bloco += codificador.finalizar()
+    except Exception as error:
+        logger.error(f"❌ Exportação interrompida: {error}")
+        raise
+    if bloco:
+        yield bytes(bloco)
+
+
+async def gerar_async(formato, secoes):
+    """Mesmo que `gerar`, com as seções e as linhas de iteradores assíncronos (asyncpg)."""
+    codificador = FORMATOS[formato]()
+    bloco = bytearray()
+    try:
+        async for secao, colunas, linhas in secoes:
+            bloco += codificador.iniciar_secao(secao, colunas)
+            async for linha in linhas:
+                bloco += codificador.linha(linha)
+                if len(bloco) >= BLOCO:
+                    yield bytes(bloco)
+                    bloco.clear()
+        bloco += codificador.finalizar()
+    except Exception as error:
+        logger.error(f"❌ Exportação interrompida: {error}")
+        raise
+    if bloco:
+        yield bytes(bloco)
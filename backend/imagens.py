@@ -0,0 +1,324 @@
+"""
+Variantes otimizadas das imagens de static/images.
+
+As capas das meditações são PNGs de ~3 MB e 1024 px de largura; a tela do
+catálogo as mostra com 150-300 px. Para cada imagem original são gerados
+arquivos redimensionados (`larguras`, sem ampliar) em AVIF e WebP (quando o
+Pillow os suporta) e em JPEG (PNG, se a imagem tem transparência) para
+clientes que não aceitam nenhum dos dois. Cada arquivo leva no nome um hash do
+conteúdo original e dos parâmetros de codificação
+(`relaxamento_profundo.640w.0b5e1c9a2f47.avif`), então nunca muda: é servido
+com `Cache-Control: immutable`. O `manifest.json` do diretório das variantes
+lista o que existe.
+
+Servindo (`resolver`):
+- pelo nome com hash: o arquivo da variante, imutável;
+- pelo nome original: a variante do melhor formato que o `Accept` lista
+  explicitamente (`*/*` não conta: muitos clientes que o enviam não decodificam
+  AVIF) na menor largura >= `?w=` (sem `w`, a maior), com `Vary: Accept`,
+  `max_age` curto e `Content-Location` apontando para o nome com hash;
+- sem variante (imagem nova ainda não processada): None, e a rota serve o
+  original como antes.
+
+As variantes são geradas por `python cli.py imagens` (no build/deploy) e, com
+`gerar=True`, numa thread ao subir o processo, só as que faltam. Entre workers,
+um lock de arquivo deixa um só gerar; os arquivos são gravados com
+rename atômico. Servir não precisa do Pillow, só gerar.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+try:
+    from PIL import Image, features
+except ImportError:  # opcional: sem o Pillow, só serve variantes já geradas
+    Image = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LARGURAS_PADRAO = (320, 640, 1024)
+EXTENSOES_ORIGINAIS = ('.png', '.jpg', '.jpeg', '.webp')
+MANIFESTO = 'manifest.json'
+
+# Formatos na ordem de preferência do servidor; jpeg/png são o fallback
+TIPOS = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+EXTENSOES = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+OPCOES = {
+    'avif': {'quality': 60, 'speed': 6},
+    'webp': {'quality': 80, 'method': 6},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+}
+# Muda o hash (e os nomes) de todas as variantes quando a codificação muda
+VERSAO = 1
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+
+def formatos_disponiveis():
+    """Formatos modernos que o Pillow instalado sabe gravar."""
+    if Image is None:
+        return ()
+    return tuple(formato for formato in ('avif', 'webp') if features.check(formato))
+
+
+def largura_pedida(valor):
+    """`?w=` em int (None se ausente); ValueError se não for um inteiro positivo."""
+    if valor in (None, ''):
+        return None
+    largura = int(valor)
+    if largura <= 0:
+        raise ValueError(f"largura inválida: {valor}")
+    return largura
+
+
+def _aceitos(accept):
+    """Tipos listados explicitamente no cabeçalho Accept (sem curingas, q > 0)."""
+    if not accept:
+        return frozenset()
+    return frozenset(valor for valor, qualidade in parse_accept_header(accept, MIMEAccept) if qualidade > 0)
+
+
+def _hash(caminho, formatos, larguras):
+    h = hashlib.blake2b(digest_size=6)
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            h.update(bloco)
+    h.update(repr((VERSAO, formatos, larguras, [OPCOES[f] for f in formatos])).encode())
+    return h.hexdigest()
+
+
+def _gravar_atomico(caminho, gravar):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        gravar(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _processar_imagem(caminho, nome, destino, larguras, formatos):
+    """Gera as variantes que faltam de uma imagem; devolve a entrada do manifesto."""
+    base = os.path.splitext(nome)[0]
+    with Image.open(caminho) as original:
+        original.load()
+        transparente = original.mode in ('RGBA', 'LA', 'PA') or 'transparency' in original.info
+        imagem = original.convert('RGBA' if transparente else 'RGB')
+
+    todos = formatos + ('png' if transparente else 'jpeg',)
+    digest = _hash(caminho, todos, larguras)
+    variantes = []
+    for largura in sorted({min(largura, imagem.width) for largura in larguras}):
+        altura = max(1, round(imagem.height * largura / imagem.width))
+        reduzida = None
+        for formato in todos:
+            arquivo = f"{base}.{largura}w.{digest}.{EXTENSOES[formato]}"
+            destino_arquivo = os.path.join(destino, arquivo)
+            if not os.path.exists(destino_arquivo):
+                if reduzida is None:
+                    reduzida = imagem if largura == imagem.width else \
+                        imagem.resize((largura, altura), Image.Resampling.LANCZOS)
+                _gravar_atomico(destino_arquivo, lambda tmp: reduzida.save(tmp, formato.upper(), **OPCOES[formato]))
+            variantes.append({
+                'arquivo': arquivo, 'formato': formato, 'largura': largura, 'altura': altura,
+                'bytes': os.path.getsize(destino_arquivo),
+            })
+    return {
+        'hash': digest, 'largura': imagem.width, 'altura': imagem.height,
+        'bytes': os.path.getsize(caminho), 'variantes': variantes,
+    }
+
+
+def gerar_variantes(origem, destino, larguras=LARGURAS_PADRAO, limpar=False):
+    """
+    Gera as variantes que faltam de cada imagem de `origem` em `destino` e
+    grava o manifesto; com `limpar`, apaga as variantes que não estão nele.
+    Devolve o manifesto ({nome original: entrada}).
+    """
+    if Image is None:
+        raise RuntimeError("Pillow não instalado: pip install pillow")
+    os.makedirs(destino, exist_ok=True)
+    formatos = formatos_disponiveis()
+    larguras = tuple(sorted(set(larguras)))
+
+    with open(os.path.join(destino, '.lock'), 'w') as trava:
+        if fcntl is not None:
+            fcntl.flock(trava, fcntl.LOCK_EX)  # outro worker gerando: espera e reaproveita os arquivos
+        manifesto = {}
+        for nome in sorted(os.listdir(origem)):
+            caminho = os.path.join(origem, nome)
+            if not (os.path.isfile(caminho) and nome.lower().endswith(EXTENSOES_ORIGINAIS)):
+                continue
+            try:
+                manifesto[nome] = _processar_imagem(caminho, nome, destino, larguras, formatos)
+            except OSError as e:  # arquivo corrompido ou formato que o Pillow não lê
+                logger.warning(f"⚠️ Imagem {nome} ignorada: {e}")
+        _gravar_atomico(os.path.join(destino, MANIFESTO), lambda tmp: _salvar_json(tmp, manifesto))
+
+        if limpar:
+            em_uso = {v['arquivo'] for entrada in manifesto.values() for v in entrada['variantes']}
+            for arquivo in os.listdir(destino):
+                if arquivo not in em_uso and arquivo not in (MANIFESTO, '.lock'):
+                    os.remove(os.path.join(destino, arquivo))
+    return manifesto
+
+
+def _salvar_json(caminho, dados):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, indent=2, sort_keys=True)
+
+
+class ImagensEstaticas:
+    """
+    Variantes das imagens de `origem`, guardadas em `destino`.
+    `resolver(nome, accept, largura)` escolhe o arquivo a servir.
+    """
+
+    def __init__(self, origem, destino, larguras=LARGURAS_PADRAO, max_age=86400):
+        self.origem = origem
+        self.destino = destino
+        self.larguras = tuple(larguras)
+        self.max_age = max_age
+        self._por_original = {}   # nome original -> {formato: [variantes por largura]}
+        self._por_arquivo = {}    # nome com hash -> caminho absoluto
+        self._gerando = False
+        self._lock = threading.Lock()  # contadores, tocados pelas threads dos workers
+        self._contadores = {'imutaveis': 0, 'negociadas': {}, 'originais': 0}
+
+    def carregar(self):
+        """Lê o manifesto; variantes cujo arquivo sumiu ficam de fora."""
+        try:
+            with open(os.path.join(self.destino, MANIFESTO), encoding='utf-8') as arquivo:
+                manifesto = json.load(arquivo)
+        except (OSError, ValueError):
+            manifesto = {}
+        por_original, por_arquivo = {}, {}
+        for nome, entrada in manifesto.items():
+            formatos = {}
+            for variante in entrada['variantes']:
+                caminho = os.path.join(self.destino, variante['arquivo'])
+                if os.path.isfile(caminho):
+                    formatos.setdefault(variante['formato'], []).append(variante)
+                    por_arquivo[variante['arquivo']] = caminho
+            for lista in formatos.values():
+                lista.sort(key=lambda v: v['largura'])
+            if formatos:
+                por_original[nome] = formatos
+        # Troca de uma vez: as requisições em andamento veem o índice velho ou o novo
+        self._por_original, self._por_arquivo = por_original, por_arquivo
+
+    def preparar(self, gerar=True):
+        """Carrega o manifesto e, com `gerar`, gera as variantes que faltam numa thread."""
+        self.carregar()
+        if gerar and Image is not None:
+            self._gerando = True
+            threading.Thread(target=self._gerar, name='imagens-variantes', daemon=True).start()
+        elif gerar:
+            logger.warning("⚠️ Pillow não instalado: variantes das imagens não serão geradas")
+
+    def _gerar(self):
+        try:
+            gerar_variantes(self.origem, self.destino, self.larguras)
+            self.carregar()
+            logger.info(f"🖼️ Variantes de {len(self._por_original)} imagens prontas em {self.destino}")
+        except Exception as e:
+            logger.error(f"Erro ao gerar variantes das imagens: {e}")
+        finally:
+            self._gerando = False
+
+    def resolver(self, nome, accept=None, largura=None):
+        """
+        (caminho, cabeçalhos) do arquivo a servir para `nome`, ou None se não
+        há variante (a rota serve o original).
+        """
+        caminho = self._por_arquivo.get(nome)
+        if caminho is not None:
+            self._somar('imutaveis')
+            return caminho, {'Cache-Control': CACHE_IMUTAVEL}
+
+        formatos = self._por_original.get(nome)
+        if formatos is None:
+            self._somar('originais')
+            return None
+        aceitos = _aceitos(accept)
+        formato = next((f for f in ('avif', 'webp') if f in formatos and TIPOS[f] in aceitos), None)
+        if formato is None:
+            formato = 'png' if 'png' in formatos else 'jpeg'
+        variantes = formatos[formato]
+        variante = variantes[-1]
+        if largura is not None:
+            variante = next((v for v in variantes if v['largura'] >= largura), variante)
+
+        with self._lock:
+            negociadas = self._contadores['negociadas']
+            negociadas[formato] = negociadas.get(formato, 0) + 1
+        return self._por_arquivo[variante['arquivo']], {
+            'Cache-Control': f"public, max-age={int(self.max_age)}",
+            'Vary': 'Accept',
+            'Content-Location': variante['arquivo'],
+        }
+
+    def _somar(self, contador):
+        with self._lock:
+            self._contadores[contador] += 1
+
+    def estatisticas(self):
+        """Imagens com variantes, geração em andamento e respostas por tipo."""
+        with self._lock:
+            contadores = dict(self._contadores, negociadas=dict(self._contadores['negociadas']))
+        return dict(
+            contadores,
+            imagens=len(self._por_original),
+            variantes=len(self._por_arquivo),
+            gerando=self._gerando,
+        )
+
+
+def criar_imagens(config, origem):
+    """ImagensEstaticas de `origem` conforme IMAGENS_* da configuração, já preparada."""
+    imagens = ImagensEstaticas(
+        origem,
+        config.IMAGENS_VARIANTES_DIR or os.path.join(os.path.dirname(origem), 'variantes'),
+        larguras=config.IMAGENS_LARGURAS,
+        max_age=config.IMAGENS_MAX_AGE,
+    )
+    imagens.preparar(gerar=config.IMAGENS_GERAR_NA_INICIALIZACAO)
+    return imagens
+
+
+def main(argv=None):
+    """python cli.py imagens [--larguras 320,640,1024] [--limpar]"""
+    from config import Config
+
+    origem = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+    destino = Config.IMAGENS_VARIANTES_DIR or os.path.join(os.path.dirname(origem), 'variantes')
+    parser = argparse.ArgumentParser(prog='cli.py imagens', description="Gera as variantes das imagens estáticas")
+    parser.add_argument('--larguras', default=','.join(map(str, Config.IMAGENS_LARGURAS)),
+                        help='larguras em px, separadas por vírgula')
+    parser.add_argument('--destino', default=destino, help='diretório das variantes e do manifesto')
+    parser.add_argument('--limpar', action='store_true', help='apaga variantes que não estão no manifesto')
+    args = parser.parse_args(argv)
+
+    larguras = [int(largura) for largura in args.larguras.split(',')]
+    print(f"🖼️ Gerando variantes ({', '.join(formatos_disponiveis() + ('jpeg/png',))}; "
+          f"larguras {larguras}) em {args.destino}...")
+    manifesto = gerar_variantes(origem, args.destino, larguras, limpar=args.limpar)
+
+    for nome, entrada in manifesto.items():
+        print(f"\n{nome}: {entrada['largura']}x{entrada['altura']}, {entrada['bytes']:,} bytes")
+        for variante in entrada['variantes']:
+            print(f"   {variante['arquivo']:<52} {variante['bytes']:>10,} bytes "
+                  f"({variante['bytes'] / entrada['bytes']:.1%})")
+    print(f"\n✅ {len(manifesto)} imagens, {sum(len(e['variantes']) for e in manifesto.values())} variantes")
@@ -0,0 +1,92 @@
+"""
+Autenticação JWT para a aplicação ASGI (asgi.py).
+
+Gera e valida tokens compatíveis com os do Flask-JWT-Extended (mesmas claims,
+mesmo segredo e algoritmo): um token emitido por um app vale no outro, e as
+respostas de erro têm o mesmo corpo dos callbacks registrados em app.py.
+"""
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+import jwt
+from starlette.responses import JSONResponse
+
+from config import get_config
+
+config = get_config()
+
+
+def _criar_token(identity, tipo, expira_em):
+    agora = datetime.now(timezone.utc)
+    dados = {
+        'fresh': False,
+        'iat': agora,
+        'jti': str(uuid.uuid4()),
+        'type': tipo,
+        'sub': identity,
+        'nbf': agora,
+        'exp': agora + expira_em,
+    }
+    return jwt.encode(dados, config.JWT_SECRET_KEY, algorithm=config.JWT_ALGORITHM)
+
+
+def create_access_token(identity):
+    """Equivalente a flask_jwt_extended.create_access_token"""
+    return _criar_token(identity, 'access', config.JWT_ACCESS_TOKEN_EXPIRES)
+
+
+def create_refresh_token(identity):
+    """Equivalente a flask_jwt_extended.create_refresh_token"""
+    return _criar_token(identity, 'refresh', config.JWT_REFRESH_TOKEN_EXPIRES)
+
+
+def _token_invalido():
+    return JSONResponse({'mensagem': 'Token inválido', 'error': 'invalid_token'}, status_code=401)
+
+
+def decode_token(token):
+    """Decodifica e valida assinatura, exp e nbf (levanta jwt.PyJWTError)."""
+    return jwt.decode(token, config.JWT_SECRET_KEY, algorithms=[config.JWT_ALGORITHM])
+
+
+def jwt_required(refresh=False):
+    """
+    Decorator para endpoints Starlette, equivalente ao @jwt_required() do Flask.
+
+    Guarda a identidade em `request.state.jwt_identity` (ver get_jwt_identity).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(request):
+            cabecalho = request.headers.get('Authorization')
+            if not cabecalho:
+                return JSONResponse({
+                    'mensagem': 'Token de autenticação não fornecido',
+                    'error': 'authorization_required'
+                }, status_code=401)
+
+            partes = cabecalho.split()
+            if len(partes) != 2 or partes[0] != 'Bearer':
+                return _token_invalido()
+
+            try:
+                dados = decode_token(partes[1])
+            except jwt.ExpiredSignatureError:
+                return JSONResponse({'mensagem': 'Token expirado', 'error': 'token_expired'}, status_code=401)
+            except jwt.PyJWTError:
+                return _token_invalido()
+
+            if dados.get('type') != ('refresh' if refresh else 'access'):
+                return _token_invalido()
+
+            request.state.jwt_identity = dados.get('sub')
+            return await fn(request)
+
+        return wrapper
+    return decorator
+
+
+def get_jwt_identity(request):
+    """Identidade (sub) do token validado por @jwt_required"""
+    return request.state.jwt_identity
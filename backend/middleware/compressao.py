@@ -0,0 +1,301 @@
+"""
+Compressão das respostas do app Flask, negociada pelo Accept-Encoding.
+
+Listas como o histórico sem `limit`, `/usuarios` e `/avaliacoes/historico`
+devolvem JSON grande e repetitivo para clientes em rede móvel. Depois de cada
+requisição, a resposta é comprimida com brotli (`br`, se o pacote `brotli`
+estiver instalado) ou gzip, o que o cliente preferir:
+
+- corpos menores que `minimo` bytes e tipos que não são texto (imagens)
+  saem como estão: o cabeçalho e a CPU custariam mais que a economia;
+- corpos a partir de `stream_min` bytes e respostas em stream (geradores) são
+  comprimidos em blocos enquanto são enviados, sem Content-Length;
+- respostas públicas (sem `private`/`no-store`, com `public` ou ETag forte,
+  como o catálogo) têm os bytes comprimidos guardados num LRU de até
+  `cache_max_bytes`, comprimidos no nível máximo, e são reaproveitados nas
+  requisições seguintes com o mesmo conteúdo.
+
+Toda resposta comprimível leva `Vary: Accept-Encoding`. Bytes diferentes
+pedem validadores diferentes: uma ETag forte ganha o sufixo da codificação
+(`"abc"` vira `"abc-br"` ou `"abc-gzip"`), e as rotas comparam o
+If-None-Match com `etag_correspondente`, que aceita qualquer uma das formas.
+"""
+import gzip
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote, só gzip
+    brotli = None
+
+from flask import request
+
+from cache import etag_forte
+
+TIPOS_COMPRIMIVEIS = frozenset({
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'text/plain', 'text/html', 'text/css', 'text/csv', 'image/svg+xml',
+})
+
+# Tamanho de cada bloco dos corpos em memória comprimidos durante o envio
+BLOCO_STREAM = 64 * 1024
+
+# Nível dos bytes guardados no cache: comprimidos uma vez, enviados muitas
+NIVEL_CACHE = {'br': 11, 'gzip': 9}
+
+
+def etag_codificada(etag, codificacao):
+    """ETag forte da representação de `etag` comprimida em `codificacao`."""
+    return f"{etag}-{codificacao}"
+
+
+def etag_correspondente(if_none_match, etag):
+    """
+    A forma de `etag` presente no If-None-Match (`request.if_none_match`): a
+    própria ou a de uma representação comprimida; None se nenhuma. O 304 deve
+    levar a forma devolvida, a mesma ETag da resposta que o cliente guardou.
+    """
+    for candidata in (etag, *(etag_codificada(etag, codificacao) for codificacao in NIVEL_CACHE)):
+        if if_none_match.contains_weak(candidata):
+            return candidata
+    return None
+
+
+def codificacoes_disponiveis():
+    """Codificações suportadas, na ordem de preferência do servidor."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def comprimir(dados, codificacao, nivel):
+    """`dados` (bytes) comprimidos de uma vez em `codificacao` ('br' ou 'gzip')."""
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=nivel)
+    return gzip.compress(dados, nivel, mtime=0)
+
+
+class CompressorIncremental:
+    """Compressão aos poucos: cada `processar(parte)` já devolve os bytes descarregados (flush)."""
+
+    def __init__(self, codificacao, nivel):
+        if codificacao == 'br':
+            self._compressor = brotli.Compressor(quality=nivel)
+            self._processar = self._compressor.process
+            self._descarregar = self._compressor.flush
+            self.finalizar = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # 31: cabeçalho gzip
+            self._processar = self._compressor.compress
+            self._descarregar = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finalizar = self._compressor.flush
+
+    def processar(self, parte):
+        return self._processar(parte) + self._descarregar()
+
+
+def _blocos(dados):
+    for inicio in range(0, len(dados), BLOCO_STREAM):
+        yield dados[inicio:inicio + BLOCO_STREAM]
+
+
+class Compressao:
+    """
+    `processar(response, accept_encodings)` comprime a resposta (ou a devolve
+    como está); `accept_encodings` é o `request.accept_encodings` do Werkzeug.
+    """
+
+    def __init__(self, minimo=1024, nivel_gzip=6, qualidade_br=4, stream_min=256 * 1024,
+                 cache_max_bytes=4 * 1024 * 1024):
+        self.minimo = minimo
+        self.niveis = {'gzip': nivel_gzip, 'br': qualidade_br}
+        self.stream_min = stream_min
+        self.cache_max_bytes = cache_max_bytes
+        self.codificacoes = codificacoes_disponiveis()
+        self._cache = OrderedDict()  # (codificação, chave do conteúdo) -> bytes comprimidos
+        self._cache_bytes = 0
+        self._lock = threading.Lock()  # cache e contadores, tocados pelas threads dos workers
+        self._contadores = {
+            'comprimidas': {codificacao: 0 for codificacao in self.codificacoes},
+            'em_stream': 0,
+            'pequenas': 0,
+            'sem_suporte': 0,
+            'acertos_cache': 0,
+            'bytes_originais': 0,
+            'bytes_enviados': 0,
+            'cpu_ms': 0.0,
+        }
+
+    # --- Decisão ---
+
+    def _comprimivel(self, response):
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        if response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return False
+        return response.mimetype in TIPOS_COMPRIMIVEIS
+
+    @staticmethod
+    def _chave_cache(response, dados):
+        """Chave do conteúdo se a resposta pode ser reaproveitada entre clientes, senão None."""
+        controle = response.cache_control
+        if controle.private or controle.no_store or 'Set-Cookie' in response.headers:
+            return None
+        etag, fraca = response.get_etag()
+        if etag and not fraca:
+            return etag
+        if controle.public:
+            return etag_forte(dados)
+        return None
+
+    # --- Compressão ---
+
+    def processar(self, response, accept_encodings):
+        if not self._comprimivel(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        codificacao = accept_encodings.best_match(self.codificacoes)
+        if codificacao is None:
+            self._somar('sem_suporte')
+            return response
+
+        if response.is_streamed:
+            return self._em_stream(response, response.response, codificacao)
+
+        dados = response.get_data()
+        if len(dados) < self.minimo:
+            self._somar('pequenas')
+            return response
+        if len(dados) >= self.stream_min:
+            return self._em_stream(response, _blocos(dados), codificacao)
+
+        chave = self._chave_cache(response, dados)
+        comprimido = self._do_cache(codificacao, chave) if chave else None
+        if comprimido is None:
+            nivel = NIVEL_CACHE[codificacao] if chave else self.niveis[codificacao]
+            inicio = time.thread_time()
+            comprimido = comprimir(dados, codificacao, nivel)
+            self._somar('cpu_ms', (time.thread_time() - inicio) * 1000)
+            if chave:
+                self._guardar(codificacao, chave, comprimido)
+
+        self._contar(codificacao, len(dados), len(comprimido))
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = codificacao
+        self._marcar_etag(response, codificacao)
+        return response
+
+    def _em_stream(self, response, partes, codificacao):
+        response.response = self._medir_stream(partes, codificacao)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = codificacao
+        self._marcar_etag(response, codificacao)
+        self._somar('em_stream')
+        return response
+
+    @staticmethod
+    def _marcar_etag(response, codificacao):
+        """ETag forte ganha o sufixo da codificação; a fraca já admite bytes diferentes."""
+        etag, fraca = response.get_etag()
+        if etag and not fraca:
+            response.set_etag(etag_codificada(etag, codificacao))
+
+    def _medir_stream(self, partes, codificacao):
+        compressor = CompressorIncremental(codificacao, self.niveis[codificacao])
+        originais = enviados = 0
+        cpu = 0.0
+        try:
+            for parte in partes:
+                if isinstance(parte, str):
+                    parte = parte.encode('utf-8')
+                if not parte:
+                    continue
+                inicio = time.thread_time()
+                bloco = compressor.processar(parte)
+                cpu += time.thread_time() - inicio
+                originais += len(parte)
+                enviados += len(bloco)
+                if bloco:
+                    yield bloco
+            bloco = compressor.finalizar()
+            enviados += len(bloco)
+            yield bloco
+        finally:
+            # Cliente desconectou no meio: encerra também o gerador da rota
+            if hasattr(partes, 'close'):
+                partes.close()
+            self._somar('cpu_ms', cpu * 1000)
+            self._contar(codificacao, originais, enviados)
+
+    def _somar(self, contador, valor=1):
+        with self._lock:
+            self._contadores[contador] += valor
+
+    def _contar(self, codificacao, originais, enviados):
+        with self._lock:
+            self._contadores['comprimidas'][codificacao] += 1
+            self._contadores['bytes_originais'] += originais
+            self._contadores['bytes_enviados'] += enviados
+
+    # --- Cache dos bytes comprimidos ---
+
+    def _do_cache(self, codificacao, chave):
+        with self._lock:
+            comprimido = self._cache.get((codificacao, chave))
+            if comprimido is not None:
+                self._cache.move_to_end((codificacao, chave))
+                self._contadores['acertos_cache'] += 1
+            return comprimido
+
+    def _guardar(self, codificacao, chave, comprimido):
+        if len(comprimido) > self.cache_max_bytes:
+            return
+        with self._lock:
+            anterior = self._cache.pop((codificacao, chave), None)
+            if anterior is not None:
+                self._cache_bytes -= len(anterior)
+            self._cache[(codificacao, chave)] = comprimido
+            self._cache_bytes += len(comprimido)
+            while self._cache_bytes > self.cache_max_bytes:
+                _, antigo = self._cache.popitem(last=False)
+                self._cache_bytes -= len(antigo)
+
+    def estatisticas(self):
+        """Respostas comprimidas, bytes antes/depois, CPU gasta e uso do cache."""
+        with self._lock:
+            contadores = dict(self._contadores, comprimidas=dict(self._contadores['comprimidas']))
+            itens_cache, bytes_cache = len(self._cache), self._cache_bytes
+        originais = contadores['bytes_originais']
+        return dict(
+            contadores,
+            cpu_ms=round(contadores['cpu_ms'], 1),
+            reducao=round(1 - contadores['bytes_enviados'] / originais, 3) if originais else None,
+            codificacoes=list(self.codificacoes),
+            itens_cache=itens_cache,
+            bytes_cache=bytes_cache,
+        )
+
+
+def registrar_compressao(app):
+    """
+    Comprime as respostas do `app` conforme COMPRESSAO_* da configuração;
+    devolve a instância (contadores em GET /health), ou None se desligada.
+    """
+    if not app.config.get('COMPRESSAO_ATIVA', True):
+        return None
+    compressao = Compressao(
+        minimo=app.config.get('COMPRESSAO_MINIMO', 1024),
+        nivel_gzip=app.config.get('COMPRESSAO_NIVEL_GZIP', 6),
+        qualidade_br=app.config.get('COMPRESSAO_QUALIDADE_BROTLI', 4),
+        stream_min=app.config.get('COMPRESSAO_STREAM_MIN', 256 * 1024),
+        cache_max_bytes=app.config.get('COMPRESSAO_CACHE_MAX_BYTES', 4 * 1024 * 1024),
+    )
+
+    @app.after_request
+    def _comprimir_resposta(response):
+        if request.method == 'HEAD':
+            return response
+        return compressao.processar(response, request.accept_encodings)
+
+    return compressao
@@ -0,0 +1,30 @@
+-- ==========================================
+-- MIGRATION 001: Índices dos caminhos de acesso por usuário
+-- Data: 2026-10-18
+-- Descrição: Toda consulta por usuário filtra por usuario_id e ordena por
+-- data; sem estes índices cada requisição faz seq scan da tabela inteira.
+-- ==========================================
+-- sem-transacao
+-- CREATE INDEX CONCURRENTLY não roda dentro de BEGIN/COMMIT e não bloqueia
+-- escritas durante a construção. O runner executa um comando por vez e
+-- remove antes um índice INVALID deixado por uma tentativa interrompida.
+
+-- Histórico: listar_historico_meditacoes, obter_estatisticas_meditacoes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_historico_meditacoes_usuario_data
+    ON public.historico_meditacoes (usuario_id, data_conclusao DESC);
+
+-- FK historico_meditacoes -> meditacoes (JOINs e verificação da FK ao remover meditações)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_historico_meditacoes_meditacao
+    ON public.historico_meditacoes (meditacao_id);
+
+-- Humor: relatorio_humor_semanal
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_classificacoes_humor_usuario_data
+    ON public.classificacoes_humor (usuario_id, data_classificacao);
+
+-- Avaliações: buscar_avaliacoes_usuario, buscar_ultima_avaliacao_usuario
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resultados_avaliacoes_usuario_tipo_data
+    ON public.resultados_avaliacoes (usuario_id, tipo, data_avaliacao DESC);
+
+ANALYZE public.historico_meditacoes;
+ANALYZE public.classificacoes_humor;
+ANALYZE public.resultados_avaliacoes;
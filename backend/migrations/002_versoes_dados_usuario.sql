@@ -0,0 +1,31 @@
+-- ==========================================
+-- MIGRATION 002: Versões dos dados de cada usuário (GET condicional)
+-- Data: 2026-10-18
+-- Descrição: Uma linha por usuário e domínio (historico, humor, avaliacoes),
+-- atualizada na mesma transação de cada escrita. As rotas de leitura montam a
+-- ETag com a versão e respondem 304 sem rodar a consulta de leitura.
+-- ==========================================
+
+-- Sequência global e fora de qualquer coluna: uma versão nunca se repete,
+-- nem depois de TRUNCATE ... RESTART IDENTITY (a ETag antiga não volta a valer)
+CREATE SEQUENCE IF NOT EXISTS public.versoes_dados_usuario_seq;
+
+CREATE TABLE IF NOT EXISTS public.versoes_dados_usuario (
+    usuario_id integer NOT NULL REFERENCES public.usuarios(id) ON DELETE CASCADE,
+    dominio text NOT NULL CHECK (dominio IN ('historico', 'humor', 'avaliacoes')),
+    versao bigint NOT NULL,
+    PRIMARY KEY (usuario_id, dominio)
+);
+
+-- Usuários que já têm dados começam com uma versão; os demais ganham a
+-- linha na primeira escrita (sem linha, a leitura só não leva ETag)
+INSERT INTO public.versoes_dados_usuario (usuario_id, dominio, versao)
+SELECT usuario_id, dominio, nextval('public.versoes_dados_usuario_seq')
+FROM (
+    SELECT DISTINCT usuario_id, 'historico' AS dominio FROM public.historico_meditacoes
+    UNION ALL
+    SELECT DISTINCT usuario_id, 'humor' FROM public.classificacoes_humor
+    UNION ALL
+    SELECT DISTINCT usuario_id, 'avaliacoes' FROM public.resultados_avaliacoes
+) AS existentes
+ON CONFLICT (usuario_id, dominio) DO NOTHING;
@@ -0,0 +1,69 @@
+-- ==========================================
+-- MIGRATION 003: Resumo das estatísticas de meditação por usuário
+-- Data: 2026-10-18
+-- Descrição: Uma linha por usuário com totais, sessões por categoria, última
+-- sessão e sequências de dias, mantida pelo controller na mesma transação de
+-- cada INSERT/DELETE em historico_meditacoes. GET /meditacoes/estatisticas
+-- passa a ser uma busca por chave primária.
+-- Reconstrução e conferência: python -m migrations.estatisticas_meditacao
+-- ==========================================
+
+CREATE TABLE IF NOT EXISTS public.usuario_estatisticas_meditacao (
+    usuario_id integer PRIMARY KEY REFERENCES public.usuarios(id) ON DELETE CASCADE,
+    total_sessoes integer NOT NULL DEFAULT 0,
+    total_minutos bigint NOT NULL DEFAULT 0,
+    -- {"categoria": sessões}; meditações sem categoria ficam na chave ""
+    sessoes_por_categoria jsonb NOT NULL DEFAULT '{}',
+    ultima_sessao timestamp with time zone,
+    -- Último dia com sessão e a sequência de dias seguidos que termina nele
+    ultimo_dia date,
+    sequencia integer NOT NULL DEFAULT 0,
+    maior_sequencia integer NOT NULL DEFAULT 0,
+    -- Bit i ligado = houve sessão em ultimo_dia - i (últimos 31 dias)
+    dias_recentes integer NOT NULL DEFAULT 0
+);
+
+-- Carga inicial: mesma consulta de reconstruir_estatisticas_meditacao()
+INSERT INTO public.usuario_estatisticas_meditacao (
+    usuario_id, total_sessoes, total_minutos, sessoes_por_categoria, ultima_sessao,
+    ultimo_dia, sequencia, maior_sequencia, dias_recentes
+)
+WITH dias AS (
+    SELECT hm.usuario_id, hm.data_conclusao::date AS dia
+    FROM public.historico_meditacoes hm
+    GROUP BY 1, 2
+), ilhas AS (
+    SELECT usuario_id, COUNT(*) AS tamanho, MAX(dia) AS fim
+    FROM (
+        SELECT usuario_id, dia, dia - (ROW_NUMBER() OVER (PARTITION BY usuario_id ORDER BY dia))::int AS ilha
+        FROM dias
+    ) AS d
+    GROUP BY usuario_id, ilha
+), sequencias AS (
+    SELECT usuario_id, MAX(fim) AS ultimo_dia, MAX(tamanho) AS maior_sequencia,
+           (ARRAY_AGG(tamanho ORDER BY fim DESC))[1] AS sequencia
+    FROM ilhas
+    GROUP BY usuario_id
+), recentes AS (
+    SELECT d.usuario_id, SUM(1 << (s.ultimo_dia - d.dia))::int AS dias_recentes
+    FROM dias d JOIN sequencias s ON s.usuario_id = d.usuario_id
+    WHERE s.ultimo_dia - d.dia < 31
+    GROUP BY d.usuario_id
+), categorias AS (
+    SELECT usuario_id, SUM(sessoes)::int AS total_sessoes, SUM(minutos)::bigint AS total_minutos,
+           jsonb_object_agg(categoria, sessoes) AS sessoes_por_categoria, MAX(ultima) AS ultima_sessao
+    FROM (
+        SELECT hm.usuario_id, COALESCE(m.categoria, '') AS categoria, COUNT(*) AS sessoes,
+               COALESCE(SUM(hm.duracao_real_minutos), 0) AS minutos, MAX(hm.data_conclusao) AS ultima
+        FROM public.historico_meditacoes hm
+        JOIN public.meditacoes m ON m.id = hm.meditacao_id
+        GROUP BY 1, 2
+    ) AS c
+    GROUP BY usuario_id
+)
+SELECT c.usuario_id, c.total_sessoes, c.total_minutos, c.sessoes_por_categoria, c.ultima_sessao,
+       s.ultimo_dia, s.sequencia, s.maior_sequencia, COALESCE(r.dias_recentes, 0)
+FROM categorias c
+JOIN sequencias s ON s.usuario_id = c.usuario_id
+LEFT JOIN recentes r ON r.usuario_id = c.usuario_id
+ON CONFLICT (usuario_id) DO NOTHING;
@@ -0,0 +1,66 @@
+-- ==========================================
+-- MIGRATION 004: Contadores exatos de linhas para GET /stats
+-- Data: 2026-10-18
+-- Descrição: Triggers por comando (com tabelas de transição) somam as linhas
+-- inseridas e subtraem as removidas de cada tabela de /stats, inclusive por
+-- COPY, DELETE em cascata e TRUNCATE. O total de uma tabela é a soma das suas
+-- fatias: cada conexão escreve na fatia pg_backend_pid() % 8, então escritas
+-- concorrentes não disputam a mesma linha do contador.
+-- ==========================================
+
+CREATE TABLE IF NOT EXISTS public.contadores_tabelas (
+    tabela text NOT NULL,
+    fatia smallint NOT NULL,
+    total bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (tabela, fatia)
+);
+
+CREATE OR REPLACE FUNCTION public.contar_linhas() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    delta bigint;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM public.contadores_tabelas WHERE tabela = TG_TABLE_NAME;
+        INSERT INTO public.contadores_tabelas (tabela, fatia, total) VALUES (TG_TABLE_NAME, 0, 0);
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO delta FROM novas;
+    ELSE
+        SELECT -COUNT(*) INTO delta FROM removidas;
+    END IF;
+
+    IF delta <> 0 THEN
+        INSERT INTO public.contadores_tabelas (tabela, fatia, total)
+        VALUES (TG_TABLE_NAME, pg_backend_pid() % 8, delta)
+        ON CONFLICT (tabela, fatia) DO UPDATE SET total = contadores_tabelas.total + EXCLUDED.total;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Trava as tabelas contra escrita enquanto conta e instala os triggers:
+-- nenhuma linha fica fora do valor inicial nem é contada duas vezes
+DO $$
+DECLARE
+    nome text;
+BEGIN
+    FOREACH nome IN ARRAY ARRAY['usuarios', 'meditacoes', 'classificacoes_humor', 'resultados_avaliacoes'] LOOP
+        EXECUTE format('LOCK TABLE public.%I IN SHARE MODE', nome);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS contar_insercoes ON public.%I', nome);
+        EXECUTE format('DROP TRIGGER IF EXISTS contar_remocoes ON public.%I', nome);
+        EXECUTE format('DROP TRIGGER IF EXISTS contar_truncate ON public.%I', nome);
+        EXECUTE format('CREATE TRIGGER contar_insercoes AFTER INSERT ON public.%I '
+                       'REFERENCING NEW TABLE AS novas FOR EACH STATEMENT EXECUTE FUNCTION public.contar_linhas()', nome);
+        EXECUTE format('CREATE TRIGGER contar_remocoes AFTER DELETE ON public.%I '
+                       'REFERENCING OLD TABLE AS removidas FOR EACH STATEMENT EXECUTE FUNCTION public.contar_linhas()', nome);
+        EXECUTE format('CREATE TRIGGER contar_truncate AFTER TRUNCATE ON public.%I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION public.contar_linhas()', nome);
+
+        DELETE FROM public.contadores_tabelas WHERE tabela = nome;
+        EXECUTE format('INSERT INTO public.contadores_tabelas (tabela, fatia, total) '
+                       'SELECT %L, 0, COUNT(*) FROM public.%I', nome, nome);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,44 @@
+-- ==========================================
+-- MIGRATION 005: Resumo diário do humor por usuário
+-- Data: 2026-10-18
+-- Descrição: Uma linha por usuário e dia com contagem, soma, mínimo e máximo
+-- de nivel_humor e as contagens de cada sentimento_principal, atualizada pelo
+-- controller no mesmo comando do INSERT em classificacoes_humor.
+-- GET /humor/relatorio agrega dias, semanas ou meses a partir dela: um ano
+-- de gráfico lê no máximo 366 linhas pequenas.
+-- ==========================================
+
+CREATE TABLE IF NOT EXISTS public.humor_diario (
+    usuario_id integer NOT NULL REFERENCES public.usuarios(id) ON DELETE CASCADE,
+    dia date NOT NULL,
+    registros integer NOT NULL DEFAULT 0,
+    -- Registros com nivel_humor (a coluna aceita NULL); base da média
+    niveis integer NOT NULL DEFAULT 0,
+    soma bigint NOT NULL DEFAULT 0,
+    minimo integer,
+    maximo integer,
+    -- {"sentimento": registros}; registros sem sentimento ficam de fora
+    sentimentos jsonb NOT NULL DEFAULT '{}',
+    PRIMARY KEY (usuario_id, dia)
+);
+
+-- Carga inicial: mesma consulta de reconstruir_humor_diario()
+INSERT INTO public.humor_diario (usuario_id, dia, registros, niveis, soma, minimo, maximo, sentimentos)
+SELECT d.usuario_id, d.dia, d.registros, d.niveis, d.soma, d.minimo, d.maximo, COALESCE(s.sentimentos, '{}')
+FROM (
+    SELECT usuario_id, data_classificacao::date AS dia, COUNT(*) AS registros, COUNT(nivel_humor) AS niveis,
+           COALESCE(SUM(nivel_humor), 0) AS soma, MIN(nivel_humor) AS minimo, MAX(nivel_humor) AS maximo
+    FROM public.classificacoes_humor
+    GROUP BY 1, 2
+) AS d
+LEFT JOIN (
+    SELECT usuario_id, dia, jsonb_object_agg(sentimento_principal, total) AS sentimentos
+    FROM (
+        SELECT usuario_id, data_classificacao::date AS dia, sentimento_principal, COUNT(*) AS total
+        FROM public.classificacoes_humor
+        WHERE sentimento_principal IS NOT NULL
+        GROUP BY 1, 2, 3
+    ) AS c
+    GROUP BY 1, 2
+) AS s ON s.usuario_id = d.usuario_id AND s.dia = d.dia
+ON CONFLICT (usuario_id, dia) DO NOTHING;
@@ -0,0 +1,21 @@
+-- ==========================================
+-- MIGRATION 006: Índice da paginação por cursor do histórico
+-- Data: 2026-10-18
+-- Descrição: GET /meditacoes/historico?page_size=N pagina por
+-- (data_conclusao, id) em ordem decrescente: cada página é um trecho
+-- contíguo deste índice, sem OFFSET nem ordenação, com o mesmo custo na
+-- primeira página e na página 500 de um usuário com 10 mil sessões.
+-- data_conclusao aceita NULL; essas sessões vêm por último (-infinity),
+-- ordenadas por id. O INCLUDE permite index-only scan na página sem os
+-- campos do catálogo (incluir_meditacao=false).
+-- ==========================================
+-- sem-transacao
+-- idx_historico_meditacoes_usuario_data (migração 001) continua servindo a
+-- listagem sem paginação (ORDER BY data_conclusao DESC, NULLs primeiro) e as
+-- estatísticas.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_historico_meditacoes_usuario_keyset
+    ON public.historico_meditacoes (usuario_id, (COALESCE(data_conclusao, '-infinity'::timestamptz)) DESC, id DESC)
+    INCLUDE (meditacao_id, data_conclusao, duracao_real_minutos);
+
+ANALYZE public.historico_meditacoes;
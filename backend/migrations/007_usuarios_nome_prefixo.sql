@@ -0,0 +1,18 @@
+-- ==========================================
+-- MIGRATION 007: Índice da listagem paginada de usuários por nome
+-- Data: 2026-10-18
+-- Descrição: GET /usuarios?nome=<prefixo> filtra por prefixo do nome, sem
+-- diferenciar maiúsculas, e pagina por (lower(nome), id). Com COLLATE "C" a
+-- ordem do índice é a dos bytes, então o prefixo vira um intervalo
+-- [prefixo, prefixo || U+10FFFF) e cada página é um trecho contíguo do
+-- índice, também em comandos preparados (plano genérico). O INCLUDE traz as
+-- colunas da resposta: index-only scan, sem ler password_hash, config nem
+-- foto_perfil. A listagem sem filtro pagina pela chave primária.
+-- ==========================================
+-- sem-transacao
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_usuarios_nome_prefixo
+    ON public.usuarios ((lower(nome) COLLATE "C"), id)
+    INCLUDE (nome, data_cadastro);
+
+ANALYZE public.usuarios;
@@ -0,0 +1,19 @@
+-- ==========================================
+-- MIGRATION 008: Índices por usuário de enderecos e notificacoes
+-- Data: 2026-10-18
+-- Descrição: GET /usuarios/<id>/exportar lê todas as linhas do usuário em
+-- cada tabela, em ordem de id. enderecos e notificacoes eram as únicas
+-- tabelas por usuário sem índice em usuario_id: cada exportação faria seq scan
+-- delas (e o ON DELETE CASCADE da exclusão de conta também). Com (usuario_id,
+-- id) a leitura já sai na ordem do id, sem ordenação.
+-- ==========================================
+-- sem-transacao
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enderecos_usuario
+    ON public.enderecos (usuario_id, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notificacoes_usuario
+    ON public.notificacoes (usuario_id, id);
+
+ANALYZE public.enderecos;
+ANALYZE public.notificacoes;
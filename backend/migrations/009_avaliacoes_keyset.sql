@@ -0,0 +1,30 @@
+-- ==========================================
+-- MIGRATION 009: Índices da paginação por cursor das avaliações
+-- Data: 2026-10-18
+-- Descrição: GET /avaliacoes/historico com filtros pagina por
+-- (data_avaliacao, id) em ordem decrescente, com ou sem ?tipo=, e
+-- GET /avaliacoes/ultimas pega o último resultado de cada tipo com
+-- DISTINCT ON (tipo). Cada página (e o intervalo ?de=/?ate=) é um trecho
+-- contíguo de um destes índices, sem OFFSET nem ordenação. data_avaliacao
+-- aceita NULL; essas avaliações vêm por último (-infinity), ordenadas por id,
+-- como no histórico (migração 006). O INCLUDE leva só colunas de tamanho fixo:
+-- resultado_texto (text sem limite) passaria do limite da linha do btree e
+-- faria o INSERT falhar; a página busca o resto na tabela.
+-- ==========================================
+-- sem-transacao
+-- buscar_ultima_avaliacao_usuario passa a ordenar pela mesma chave e usa
+-- idx_resultados_avaliacoes_usuario_tipo_keyset, então
+-- idx_resultados_avaliacoes_usuario_tipo_data (migração 001) sai: seria o
+-- terceiro índice por usuário pago a cada INSERT.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resultados_avaliacoes_usuario_keyset
+    ON public.resultados_avaliacoes (usuario_id, (COALESCE(data_avaliacao, '-infinity'::timestamptz)) DESC, id DESC)
+    INCLUDE (tipo, resultado_score, data_avaliacao);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resultados_avaliacoes_usuario_tipo_keyset
+    ON public.resultados_avaliacoes (usuario_id, tipo, (COALESCE(data_avaliacao, '-infinity'::timestamptz)) DESC, id DESC)
+    INCLUDE (resultado_score, data_avaliacao);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_resultados_avaliacoes_usuario_tipo_data;
+
+ANALYZE public.resultados_avaliacoes;
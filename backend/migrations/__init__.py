@@ -0,0 +1 @@
+"""Migrações versionadas do banco (NNN_descricao.sql), aplicadas por migrar.py."""
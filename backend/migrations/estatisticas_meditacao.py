@@ -0,0 +1,67 @@
+"""
+Reconstrói e confere o resumo usuario_estatisticas_meditacao (migração 003).
+
+O controller mantém o resumo a cada sessão registrada ou removida; escritas
+feitas por fora dele (SQL manual, COPY, mudança de categoria de uma meditação)
+o deixam defasado. A conferência recalcula tudo a partir do histórico e lista
+os usuários divergentes, sem gravar nada.
+
+Uso (a partir de backend/, com as migrações aplicadas):
+    python -m migrations.estatisticas_meditacao               # confere
+    python -m migrations.estatisticas_meditacao --corrigir    # confere e recalcula os divergentes
+    python -m migrations.estatisticas_meditacao --reconstruir # refaz a tabela inteira
+    python cli.py estatisticas [...]                          # o mesmo, pelo cli.py
+"""
+import argparse
+import sys
+import time
+
+import psycopg2
+
+import conexao
+from controller import controller_usuario
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='cli.py estatisticas',
+                                     description="Confere e reconstrói o resumo das estatísticas de meditação")
+    acao = parser.add_mutually_exclusive_group()
+    acao.add_argument('--corrigir', action='store_true', help='recalcula os usuários divergentes')
+    acao.add_argument('--reconstruir', action='store_true', help='refaz a tabela inteira a partir do histórico')
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        inicio = time.perf_counter()
+        with conn.cursor() as cursor:
+            if args.reconstruir:
+                usuarios = controller_usuario.reconstruir_estatisticas_meditacao(cursor)
+                conn.commit()
+                print(f"✅ Resumo reconstruído para {usuarios:,} usuários em {time.perf_counter() - inicio:.1f}s")
+                return
+
+            divergentes = controller_usuario.verificar_estatisticas_meditacao(cursor)
+            if not divergentes:
+                print(f"✅ Resumo consistente com o histórico ({time.perf_counter() - inicio:.1f}s)")
+                return
+
+            amostra = ', '.join(str(usuario_id) for usuario_id in divergentes[:20])
+            print(f"⚠️  {len(divergentes):,} usuário(s) com resumo divergente: {amostra}"
+                  f"{' ...' if len(divergentes) > 20 else ''}")
+            if not args.corrigir:
+                sys.exit(1)
+
+            for usuario_id in divergentes:
+                controller_usuario.recalcular_estatisticas_usuario(cursor, usuario_id)
+            conn.commit()
+            print(f"✅ {len(divergentes):,} resumo(s) recalculado(s)")
+    except (Exception, psycopg2.Error) as error:
+        conn.rollback()
+        print(f"❌ Erro no resumo das estatísticas: {error}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Aplica as migrações de migrations/ em ordem, registrando cada versão em
+`schema_migrations`.
+
+Arquivos com a linha `-- sem-transacao` (ex.: CREATE INDEX CONCURRENTLY) rodam
+em autocommit, um comando por vez; os demais rodam inteiros em uma transação.
+
+Uso (a partir de backend/):
+    python -m migrations.migrar            # aplica as pendentes
+    python -m migrations.migrar --status   # lista aplicadas/pendentes
+"""
+import argparse
+import os
+import re
+import sys
+
+import psycopg2
+
+import conexao
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+_PADRAO_ARQUIVO = re.compile(r'^(\d{3})_[\w-]+\.sql$')
+_PADRAO_INDICE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE
+)
+
+
+def listar_migracoes():
+    """[(versao, caminho)] em ordem de versão."""
+    migracoes = []
+    for nome in sorted(os.listdir(DIRETORIO)):
+        encontrado = _PADRAO_ARQUIVO.match(nome)
+        if encontrado:
+            migracoes.append((encontrado.group(1), os.path.join(DIRETORIO, nome)))
+    return migracoes
+
+
+def _comandos(sql):
+    """Divide o arquivo em comandos (sem suporte a ; dentro de strings/funções)."""
+    sem_comentarios = re.sub(r'--[^\n]*', '', sql)
+    return [comando.strip() for comando in sem_comentarios.split(';') if comando.strip()]
+
+
+def _remover_indice_invalido(cursor, comando):
+    """Um CONCURRENTLY interrompido deixa o índice INVALID e o IF NOT EXISTS o pularia."""
+    encontrado = _PADRAO_INDICE.search(comando)
+    if not encontrado:
+        return
+    cursor.execute("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    """, (encontrado.group(1),))
+    if cursor.fetchone():
+        print(f"  ⚠️  Removendo índice inválido {encontrado.group(1)}")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {encontrado.group(1)}")
+
+
+def _garantir_tabela(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                versao varchar(10) PRIMARY KEY,
+                arquivo text NOT NULL,
+                aplicada_em timestamp with time zone DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT versao FROM schema_migrations")
+        return {linha[0] for linha in cursor.fetchall()}
+
+
+def aplicar(conn, versao, caminho):
+    """Aplica uma migração e registra a versão."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        sql = arquivo.read()
+    nome = os.path.basename(caminho)
+
+    if re.search(r'^--\s*sem-transacao\s*$', sql, re.MULTILINE):
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                for comando in _comandos(sql):
+                    _remover_indice_invalido(cursor, comando)
+                    cursor.execute(comando)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (versao, arquivo) VALUES (%s, %s)", (versao, nome)
+                )
+        finally:
+            conn.autocommit = False
+    else:
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.execute(
+                "INSERT INTO schema_migrations (versao, arquivo) VALUES (%s, %s)", (versao, nome)
+            )
+        conn.commit()
+
+
+def migrar(conn):
+    """Aplica as migrações pendentes; devolve as versões aplicadas."""
+    aplicadas = _garantir_tabela(conn)
+    conn.commit()
+
+    novas = []
+    for versao, caminho in listar_migracoes():
+        if versao in aplicadas:
+            continue
+        print(f"▶️  Aplicando {os.path.basename(caminho)}")
+        aplicar(conn, versao, caminho)
+        novas.append(versao)
+    return novas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica as migrações pendentes")
+    parser.add_argument('--status', action='store_true', help='só lista aplicadas/pendentes')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        if args.status:
+            aplicadas = _garantir_tabela(conn)
+            conn.commit()
+            for versao, caminho in listar_migracoes():
+                marca = '✅' if versao in aplicadas else '⏳'
+                print(f"{marca} {os.path.basename(caminho)}")
+            return
+
+        novas = migrar(conn)
+        print(f"✅ {len(novas)} migração(ões) aplicada(s)" if novas else "✅ Banco já está atualizado")
+    except (Exception, psycopg2.Error) as error:
+        conn.rollback()
+        print(f"❌ Erro ao aplicar migrações: {error}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Verifica que as consultas por usuário usam os índices das migrações.
+
+Cria cópias temporárias (TEMP, com os mesmos índices) das tabelas por usuário,
+preenche com dados sintéticos em volume realista e roda EXPLAIN ANALYZE das
+consultas do controller. Falha se alguma fizer seq scan nas tabelas grandes
+ou não usar o índice esperado. Nada é gravado nas tabelas reais: as tabelas
+temporárias têm prioridade no search_path e somem ao final da sessão.
+
+Uso (a partir de backend/, com as migrações aplicadas):
+    python -m migrations.verificar_indices --usuarios 20000 --por-usuario 50
+    python -m migrations.verificar_indices --comparar   # mede também sem os índices
+"""
+import argparse
+import re
+import sys
+
+import psycopg2
+
+import conexao
+from controller.controller_usuario import COLUNAS_RESUMO_MEDITACAO, _SQL_RECALCULAR_RESUMO
+
+TABELAS = ['meditacoes', 'historico_meditacoes', 'classificacoes_humor', 'resultados_avaliacoes',
+           'usuario_estatisticas_meditacao']
+TABELAS_GRANDES = {'historico_meditacoes', 'classificacoes_humor', 'resultados_avaliacoes'}
+
+# (descrição, SQL do controller, índice esperado da migração ou tupla de aceitos)
+CONSULTAS = [
+    ('listar_historico_meditacoes (limit)', """
+        SELECT hm.id, hm.usuario_id, hm.meditacao_id, hm.data_conclusao,
+               hm.duracao_real_minutos, m.titulo, m.descricao, m.duracao_minutos,
+               m.categoria, m.tipo, m.imagem_capa
+        FROM historico_meditacoes hm
+        JOIN meditacoes m ON hm.meditacao_id = m.id
+        WHERE hm.usuario_id = %(usuario_id)s
+        ORDER BY hm.data_conclusao DESC
+        LIMIT 20
+    """, 'idx_historico_meditacoes_usuario_data'),
+    ('obter_estatisticas_meditacoes', f"""
+        SELECT {COLUNAS_RESUMO_MEDITACAO}, current_date
+        FROM usuario_estatisticas_meditacao WHERE usuario_id = %(usuario_id)s
+    """, 'usuario_estatisticas_meditacao_pkey'),
+    # Remoções e sessões fora de ordem refazem o resumo a partir do histórico do usuário
+    ('recalcular_estatisticas_usuario', _SQL_RECALCULAR_RESUMO.replace('$1', '%(usuario_id)s'),
+     ('idx_historico_meditacoes_usuario_data', 'idx_historico_meditacoes_usuario_keyset')),
+    ('verificação da FK meditacao_id', """
+        SELECT 1 FROM historico_meditacoes WHERE meditacao_id = %(meditacao_id)s LIMIT 1
+    """, 'idx_historico_meditacoes_meditacao'),
+    ('relatorio_humor_semanal', """
+        SELECT data_classificacao, nivel_humor
+        FROM classificacoes_humor
+        WHERE usuario_id = %(usuario_id)s AND data_classificacao >= current_date - interval '7 days'
+        ORDER BY data_classificacao ASC
+    """, 'idx_classificacoes_humor_usuario_data'),
+    ('buscar_ultima_avaliacao_usuario', """
+        SELECT id, usuario_id, tipo, respostas, resultado_score, resultado_texto, data_avaliacao
+        FROM resultados_avaliacoes
+        WHERE usuario_id = %(usuario_id)s AND tipo = %(tipo)s
+        ORDER BY COALESCE(data_avaliacao, '-infinity'::timestamptz) DESC, id DESC
+        LIMIT 1
+    """, 'idx_resultados_avaliacoes_usuario_tipo_keyset'),
+    ('listar_avaliacoes_por_usuario', """
+        SELECT tipo, resultado_score, resultado_texto, data_avaliacao
+        FROM resultados_avaliacoes
+        WHERE usuario_id = %(usuario_id)s
+        ORDER BY data_avaliacao DESC
+    """, ('idx_resultados_avaliacoes_usuario_keyset', 'idx_resultados_avaliacoes_usuario_tipo_keyset')),
+]
+
+
+def _colunas_indice(definicao):
+    """'CREATE INDEX x ON t USING btree (a, b DESC)' -> 'a, b DESC'"""
+    return re.search(r'USING \w+ \((.*)\)', definicao).group(1)
+
+
+def _criar_tabelas(cursor, usuarios, por_usuario, meditacoes):
+    for tabela in TABELAS:
+        cursor.execute(f"CREATE TEMP TABLE {tabela} (LIKE public.{tabela} INCLUDING ALL)")
+
+    total = usuarios * por_usuario
+    cursor.execute("""
+        INSERT INTO meditacoes (id, titulo, categoria)
+        SELECT g, 'Meditação ' || g, 'Categoria ' || (g %% 8) FROM generate_series(1, %s) g
+    """, (meditacoes,))
+    cursor.execute("""
+        INSERT INTO historico_meditacoes (id, usuario_id, meditacao_id, data_conclusao, duracao_real_minutos)
+        SELECT g, 1 + (g %% %s), 1 + (g %% %s), now() - random() * interval '365 days', 5 + g %% 30
+        FROM generate_series(1, %s) g
+    """, (usuarios, meditacoes, total))
+    cursor.execute("""
+        INSERT INTO classificacoes_humor (id, usuario_id, nivel_humor, data_classificacao)
+        SELECT g, 1 + (g %% %s), 1 + g %% 5, now() - random() * interval '365 days'
+        FROM generate_series(1, %s) g
+    """, (usuarios, total))
+    cursor.execute("""
+        INSERT INTO resultados_avaliacoes (id, usuario_id, tipo, respostas, resultado_score, data_avaliacao)
+        SELECT g, 1 + (g %% %s),
+               (enum_range(NULL::tipo_avaliacao))[1 + g %% array_length(enum_range(NULL::tipo_avaliacao), 1)],
+               jsonb_build_object('q1', g %% 4, 'q2', g %% 3), g %% 27,
+               now() - random() * interval '365 days'
+        FROM generate_series(1, %s) g
+    """, (usuarios, total))
+    cursor.execute("""
+        INSERT INTO usuario_estatisticas_meditacao (usuario_id, total_sessoes, total_minutos)
+        SELECT g, %s, %s * 20 FROM generate_series(1, %s) g
+    """, (por_usuario, por_usuario, usuarios))
+    for tabela in TABELAS:
+        cursor.execute(f"ANALYZE {tabela}")
+
+
+def _mapear_indices(cursor):
+    """Índice da migração (public) -> índice equivalente na tabela temporária."""
+    cursor.execute("""
+        SELECT schemaname LIKE 'pg_temp%%', tablename, indexname, indexdef
+        FROM pg_indexes
+        WHERE tablename = ANY(%s) AND (schemaname = 'public' OR schemaname LIKE 'pg_temp%%')
+    """, (TABELAS,))
+    temporarios, publicos = {}, {}
+    for temporario, tabela, nome, definicao in cursor.fetchall():
+        chave = (tabela, _colunas_indice(definicao))
+        (temporarios if temporario else publicos)[nome] = chave
+    por_chave = {chave: nome for nome, chave in temporarios.items()}
+    return {nome: por_chave.get(chave) for nome, chave in publicos.items()}
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get('Plans', []):
+        yield from _nos(filho)
+
+
+def _explicar(cursor, sql, params):
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+    resultado = cursor.fetchone()[0][0]
+    return resultado['Plan'], resultado['Execution Time']
+
+
+def _parametros(cursor, usuarios):
+    cursor.execute("SELECT (enum_range(NULL::tipo_avaliacao))[1]")
+    return {'usuario_id': usuarios // 2, 'meditacao_id': 1, 'tipo': cursor.fetchone()[0]}
+
+
+def _aceitos(esperado):
+    return (esperado,) if isinstance(esperado, str) else esperado
+
+
+def verificar(conn, usuarios, por_usuario, meditacoes=200, comparar=False):
+    """Devolve (resultados, ok)."""
+    cursor = conn.cursor()
+    _criar_tabelas(cursor, usuarios, por_usuario, meditacoes)
+    mapa = _mapear_indices(cursor)
+    params = _parametros(cursor, usuarios)
+
+    faltando = [nome for _, _, esperado in CONSULTAS for nome in _aceitos(esperado) if not mapa.get(nome)]
+    if faltando:
+        raise SystemExit(
+            f"❌ Índices ausentes: {', '.join(sorted(set(faltando)))}. Rode: python -m migrations.migrar"
+        )
+
+    resultados, ok = [], True
+    for descricao, sql, esperado in CONSULTAS:
+        plano, tempo = _explicar(cursor, sql, params)
+        nos = list(_nos(plano))
+        seq_scans = sorted({n['Relation Name'] for n in nos
+                            if n['Node Type'] == 'Seq Scan' and n.get('Relation Name') in TABELAS_GRANDES})
+        indices = {n.get('Index Name') for n in nos if 'Index Name' in n}
+        usou = any(mapa[nome] in indices for nome in _aceitos(esperado))
+        passou = not seq_scans and usou
+        ok = ok and passou
+        resultados.append({
+            'consulta': descricao,
+            'indice_esperado': ' ou '.join(_aceitos(esperado)),
+            'usou_indice': usou,
+            'seq_scans': seq_scans,
+            'no_raiz': plano['Node Type'],
+            'tempo_ms': round(tempo, 3),
+            'ok': passou,
+        })
+
+    if comparar:
+        # Mesmo dado, sem os índices da migração (só nas tabelas temporárias); as
+        # chaves primárias ficam (o UPSERT do resumo depende da dele)
+        migracao = {nome for _, _, esperado in CONSULTAS for nome in _aceitos(esperado) if nome.startswith('idx_')}
+        for nome in migracao:
+            cursor.execute(f'DROP INDEX pg_temp."{mapa[nome]}"')
+        for resultado, (_, sql, _) in zip(resultados, CONSULTAS):
+            _, tempo = _explicar(cursor, sql, params)
+            resultado['tempo_sem_indice_ms'] = round(tempo, 3)
+
+    conn.rollback()
+    cursor.close()
+    return resultados, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o uso dos índices por usuário")
+    parser.add_argument('--usuarios', type=int, default=20000)
+    parser.add_argument('--por-usuario', type=int, default=50, help='linhas por usuário em cada tabela')
+    parser.add_argument('--comparar', action='store_true', help='mede também sem os índices')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        total = args.usuarios * args.por_usuario
+        print(f"🧪 Gerando {total:,} linhas por tabela ({args.usuarios:,} usuários)...")
+        resultados, ok = verificar(conn, args.usuarios, args.por_usuario, comparar=args.comparar)
+    finally:
+        conn.close()
+
+    for r in resultados:
+        marca = '✅' if r['ok'] else '❌'
+        comparacao = f"  (sem índice: {r['tempo_sem_indice_ms']:.3f} ms)" if 'tempo_sem_indice_ms' in r else ''
+        detalhe = f"seq scan em {', '.join(r['seq_scans'])}" if r['seq_scans'] else r['indice_esperado']
+        print(f"{marca} {r['consulta']:<40} {r['tempo_ms']:>9.3f} ms  {detalhe}{comparacao}")
+
+    if not ok:
+        print("\n❌ Há consultas sem o índice esperado")
+        sys.exit(1)
+    print("\n✅ Todas as consultas usam os índices da migração")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,3 +6,14 @@ class ClassificacaoHumor:
         self.sentimento_principal = sentimento_principal
         self.notas = notas
         self.data_classificacao = data_classificacao
+
+    def to_dict(self):
+        """Converte o objeto para um dicionário"""
+        return {
+            'id': self.id,
+            'usuario_id': self.usuario_id,
+            'nivel_humor': self.nivel_humor,
+            'sentimento_principal': self.sentimento_principal,
+            'notas': self.notas,
+            'data_classificacao': self.data_classificacao.isoformat() if self.data_classificacao else None
+        }
@@ -8,3 +8,16 @@ class Meditacao:
         self.tipo = tipo
         self.categoria = categoria
         self.imagem_capa = imagem_capa
+
+    def to_dict(self):
+        """Converte o objeto para um dicionário"""
+        return {
+            'id': self.id,
+            'titulo': self.titulo,
+            'descricao': self.descricao,
+            'duracao_minutos': self.duracao_minutos,
+            'url_audio': self.url_audio,
+            'tipo': self.tipo,
+            'categoria': self.categoria,
+            'imagem_capa': self.imagem_capa
+        }
@@ -1,6 +1,16 @@
 """Schemas de validação para avaliações"""
 from marshmallow import Schema, fields, validate
 
+# Valores do enum tipo_avaliacao (calmousql.sql)
+TIPOS_AVALIACAO = (
+    'ansiedade',
+    'depressao',
+    'estresse',
+    'burnout',
+    'Avaliação de Estresse',
+    'Questionário de Burnout'
+)
+
 
 class ResultadoAvaliacaoSchema(Schema):
     """Schema para resultado de avaliação"""
@@ -10,14 +20,7 @@ class ResultadoAvaliacaoSchema(Schema):
 
     tipo = fields.Str(
         required=True,
-        validate=validate.OneOf([
-            'ansiedade',
-            'depressao',
-            'estresse',
-            'burnout',
-            'Avaliação de Estresse',
-            'Questionário de Burnout'
-        ]),
+        validate=validate.OneOf(TIPOS_AVALIACAO),
         error_messages={
             'required': 'Tipo de avaliação é obrigatório'
         }
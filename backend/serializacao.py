@@ -0,0 +1,97 @@
+"""
+Serialização JSON das respostas (app Flask e ASGI) com orjson.
+
+O orjson escreve `datetime`, `date`, `time` e `UUID` direto em ISO 8601 (o
+mesmo texto do `.isoformat()`), então o controller pode devolver as linhas do
+banco sem converter campo por campo. O que ele não conhece passa por
+`_padrao`: `Decimal` vira texto (como no provedor padrão do Flask) e os models
+viram o dicionário de `to_dict()`. Chaves que não são texto (como a categoria
+None em meditacoes_por_categoria) saem como texto ("null"), também com as
+chaves ordenadas.
+
+Sem o pacote `orjson`, tudo cai no `json` da biblioteca padrão (mais lento).
+"""
+import dataclasses
+import datetime
+import decimal
+import json
+import uuid
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele, json da biblioteca padrão
+    orjson = None
+
+
+def _padrao(obj):
+    """Tipos que o serializador não conhece sozinho."""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    to_dict = getattr(obj, 'to_dict', None)
+    if callable(to_dict):
+        return to_dict()
+    # Só chegam aqui sem o orjson
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def para_json(obj, ordenar=False, indentar=False):
+    """`obj` em JSON (bytes UTF-8)."""
+    if orjson is not None:
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if ordenar:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opcoes |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_padrao, option=opcoes)
+    return json.dumps(obj, default=_padrao, ensure_ascii=False, sort_keys=ordenar,
+                      indent=2 if indentar else None,
+                      separators=None if indentar else (',', ':')).encode('utf-8')
+
+
+def de_json(dados):
+    """JSON (bytes ou str) em objetos Python."""
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+class ProvedorJson(JSONProvider):
+    """
+    Provedor JSON do Flask (`app.json`) sobre `para_json`. Como o provedor
+    padrão, ordena as chaves (`sort_keys`) e indenta em modo debug
+    (`compact=None`); `compact=True` nunca indenta.
+    """
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Opções do json da biblioteca padrão (ex.: filtro tojson do Jinja)
+            kwargs.setdefault('default', _padrao)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return para_json(obj, self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs or orjson is None:
+            return json.loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity e inteiros enormes: o json da biblioteca padrão aceita
+            return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(para_json(obj, self.sort_keys, indentar), mimetype=self.mimetype)
@@ -2,11 +2,16 @@
 import pytest
 import os
 import sys
+import uuid
 
 # Adiciona o diretório pai ao path para imports funcionarem
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# As variantes das imagens são geradas só nos testes que as usam (test_imagens.py)
+os.environ.setdefault('IMAGENS_GERAR_NA_INICIALIZACAO', 'False')
+
 from app import app as flask_app
+import conexao
 
 
 @pytest.fixture
@@ -53,3 +58,58 @@ def auth_headers(client):
     return {
         'Authorization': f"Bearer {data['access_token']}"
     }
+
+
+@pytest.fixture
+def novo_usuario(client):
+    """
+    Registra usuários de teste com email único ("<prefixo>-xxxxxxxx@test.com")
+    e os remove no fim do teste (o resto dos dados vai junto, em cascata).
+
+    `novo_usuario(prefixo, nome)` devolve (id, headers de autenticação);
+    `cliente` troca o app (ex.: o TestClient do ASGI), `email` fixa o email e
+    `registro=True` devolve o JSON inteiro do /register.
+    """
+    criados = []
+
+    def criar(prefixo='teste', nome='Usuário Teste', cliente=None, email=None, registro=False):
+        email = email or f"{prefixo}-{uuid.uuid4().hex[:8]}@test.com"
+        response = (cliente or client).post('/register', json={
+            'nome': nome, 'email': email, 'password': 'senha12345'
+        })
+        assert response.status_code == 201
+        dados = _corpo(response)
+        criados.append(dados['usuario']['id'])
+        if registro:
+            return dados
+        return dados['usuario']['id'], {'Authorization': f"Bearer {dados['access_token']}"}
+
+    yield criar
+    if criados:
+        with conexao.obter_cursor() as cursor:
+            cursor.execute("DELETE FROM usuarios WHERE id = ANY(%s)", (criados,))
+
+
+def _corpo(response):
+    """JSON da resposta do cliente do Flask ou do TestClient do ASGI"""
+    return response.get_json() if hasattr(response, 'get_json') else response.json()
+
+
+def _percorrer_paginas(cliente, cabecalho, caminho, consulta):
+    """Segue o next_cursor de `caminho` até a última página; serve ao Flask e ao TestClient do ASGI"""
+    paginas, cursor = [], None
+    while True:
+        url = f"{caminho}?{consulta}" + (f"&cursor={cursor}" if cursor else '')
+        response = cliente.get(url, headers=cabecalho)
+        assert response.status_code == 200
+        corpo = _corpo(response)
+        paginas.append(corpo['itens'])
+        cursor = corpo['next_cursor']
+        if cursor is None:
+            return paginas
+
+
+@pytest.fixture
+def todas_as_paginas():
+    """Percorre uma rota paginada por cursor e devolve os itens de cada página"""
+    return _percorrer_paginas
@@ -0,0 +1,224 @@
+"""Testes da aplicação ASGI (mesmas rotas e respostas do app Flask)"""
+import psycopg2
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import asgi
+import conexao
+from controller import controller_usuario
+from middleware import auth_asgi
+
+
+@pytest.fixture
+def asgi_client(app, monkeypatch):
+    """Cliente ASGI com o mesmo segredo JWT do app Flask de teste"""
+    monkeypatch.setattr(auth_asgi.config, 'JWT_SECRET_KEY', app.config['JWT_SECRET_KEY'])
+    monkeypatch.setattr(asgi.config, 'RATELIMIT_ENABLED', False)
+    with TestClient(asgi.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def registrar(asgi_client, novo_usuario):
+    """Registro pelo ASGI: JSON inteiro do /register (o usuário some no fim do teste)"""
+    return lambda: novo_usuario('asgi', 'Teste ASGI', cliente=asgi_client, registro=True)
+
+
+class TestAsgi:
+    """Testes para asgi.py"""
+
+    def test_registro_e_login(self, asgi_client, registrar):
+        """Registro e login devolvem o mesmo formato do app Flask"""
+        dados = registrar()
+        assert set(dados) == {'mensagem', 'access_token', 'refresh_token', 'usuario'}
+
+        response = asgi_client.post('/login', json={
+            'email': dados['usuario']['email'], 'password': 'senha12345'
+        })
+        assert response.status_code == 200
+        assert response.json()['usuario']['id'] == dados['usuario']['id']
+
+    def test_token_vale_nos_dois_apps(self, asgi_client, client, registrar):
+        """Token emitido pelo ASGI é aceito pelo Flask e vice-versa"""
+        dados = registrar()
+        usuario_id = dados['usuario']['id']
+
+        cabecalho = {'Authorization': f"Bearer {dados['access_token']}"}
+        assert client.get(f'/usuarios/{usuario_id}', headers=cabecalho).status_code == 200
+
+        token_flask = client.post('/login', json={
+            'email': dados['usuario']['email'], 'password': 'senha12345'
+        }).get_json()['access_token']
+        cabecalho = {'Authorization': f'Bearer {token_flask}'}
+        assert asgi_client.get(f'/usuarios/{usuario_id}', headers=cabecalho).status_code == 200
+
+    def test_erros_jwt_iguais(self, asgi_client, client, registrar):
+        """Sem token, token inválido ou refresh no lugar de access: mesmas respostas 401"""
+        dados = registrar()
+        casos = [
+            {},
+            {'Authorization': 'Bearer nao-e-um-jwt'},
+            {'Authorization': f"Bearer {dados['refresh_token']}"},
+        ]
+        for cabecalho in casos:
+            esperado = client.get('/meditacoes/estatisticas', headers=cabecalho)
+            obtido = asgi_client.get('/meditacoes/estatisticas', headers=cabecalho)
+            assert obtido.status_code == esperado.status_code == 401
+            assert obtido.json() == esperado.get_json()
+
+    def test_mesmos_dados_que_o_flask(self, asgi_client, client, registrar):
+        """Rotas de leitura devolvem o mesmo JSON nos dois apps"""
+        dados = registrar()
+        usuario_id = dados['usuario']['id']
+        cabecalho = {'Authorization': f"Bearer {dados['access_token']}"}
+
+        asgi_client.post('/humor', headers=cabecalho, json={'usuario_id': usuario_id, 'nivel_humor': 4})
+
+        for rota in ['/meditacoes', '/humor/relatorio-semanal', '/humor/relatorio?granularidade=semana',
+                     '/meditacoes/estatisticas',
+                     '/meditacoes/historico', f'/usuarios/{usuario_id}']:
+            esperado = client.get(rota, headers=cabecalho)
+            obtido = asgi_client.get(rota, headers=cabecalho)
+            assert obtido.status_code == esperado.status_code == 200, rota
+            assert obtido.json() == esperado.get_json(), rota
+
+    def test_escrita_no_asgi_troca_a_etag_do_flask(self, asgi_client, client, registrar):
+        """As escritas do ASGI também trocam a versão dos dados usada nas ETags do Flask"""
+        dados = registrar()
+        usuario_id = dados['usuario']['id']
+        cabecalho = {'Authorization': f"Bearer {dados['access_token']}"}
+
+        asgi_client.post('/humor', headers=cabecalho, json={'usuario_id': usuario_id, 'nivel_humor': 4})
+        etag = client.get('/humor/relatorio-semanal', headers=cabecalho).headers['ETag']
+
+        asgi_client.post('/humor', headers=cabecalho, json={'usuario_id': usuario_id, 'nivel_humor': 7})
+        response = client.get('/humor/relatorio-semanal', headers={**cabecalho, 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert len(response.get_json()) == 2
+
+    def test_get_condicional_igual_ao_flask(self, asgi_client, client, registrar):
+        """Leituras do usuário no ASGI: mesma ETag do Flask, 304 sem ler, e a escrita troca a versão"""
+        dados = registrar()
+        usuario_id = dados['usuario']['id']
+        cabecalho = {'Authorization': f"Bearer {dados['access_token']}"}
+        asgi_client.post('/humor', headers=cabecalho, json={'usuario_id': usuario_id, 'nivel_humor': 4})
+
+        for rota in ['/humor/relatorio-semanal', '/humor/relatorio?granularidade=semana']:
+            response = asgi_client.get(rota, headers=cabecalho)
+            etag = response.headers['ETag']
+            assert etag == client.get(rota, headers=cabecalho).headers['ETag'], rota
+            assert response.headers['Cache-Control'] == 'private, no-cache'
+            assert 'Authorization' in response.headers['Vary']
+
+            response = asgi_client.get(rota, headers={**cabecalho, 'If-None-Match': etag})
+            assert response.status_code == 304 and response.headers['ETag'] == etag, rota
+
+        etag = asgi_client.get('/humor/relatorio-semanal', headers=cabecalho).headers['ETag']
+        client.post('/humor', headers=cabecalho, json={'usuario_id': usuario_id, 'nivel_humor': 7})
+        response = asgi_client.get('/humor/relatorio-semanal', headers={**cabecalho, 'If-None-Match': etag})
+        assert response.status_code == 200 and len(response.json()) == 2
+
+        # Sem escrita ainda: sem versão, sem ETag
+        assert 'ETag' not in asgi_client.get('/avaliacoes/historico', headers=cabecalho).headers
+
+    def test_catalogo_com_as_etags_do_flask(self, asgi_client, client):
+        """Catálogo do cache em memória: mesma ETag dos dois apps, e 304 no ASGI"""
+        response = asgi_client.get('/meditacoes')
+        etag = response.headers['ETag']
+        assert etag == client.get('/meditacoes').headers['ETag']
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+        response = asgi_client.get('/meditacoes', headers={'If-None-Match': etag})
+        assert response.status_code == 304 and response.content == b''
+        assert response.headers['ETag'] == etag
+
+        meditacao_id = asgi_client.get('/meditacoes').json()[0]['id']
+        detalhe = asgi_client.get(f'/meditacoes/{meditacao_id}')
+        assert detalhe.headers['ETag'] == client.get(f'/meditacoes/{meditacao_id}').headers['ETag']
+        assert asgi_client.get(f'/meditacoes/{meditacao_id}',
+                               headers={'If-None-Match': detalhe.headers['ETag']}).status_code == 304
+        assert asgi_client.get('/meditacoes/999999999').status_code == 404
+
+    def test_historico_mantem_o_resumo(self, asgi_client, registrar):
+        """Registrar e remover sessões pelo ASGI mantém usuario_estatisticas_meditacao em dia"""
+        dados = registrar()
+        usuario_id = dados['usuario']['id']
+        cabecalho = {'Authorization': f"Bearer {dados['access_token']}"}
+
+        conn = psycopg2.connect(**conexao._parametros_conexao())
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("INSERT INTO meditacoes (titulo, categoria) VALUES ('Resumo ASGI', 'foco') RETURNING id")
+                meditacao_id = cursor.fetchone()[0]
+            conn.commit()
+
+            ids = []
+            for _ in range(2):
+                response = asgi_client.post('/meditacoes/historico', headers=cabecalho, json={
+                    'usuario_id': usuario_id, 'meditacao_id': meditacao_id, 'duracao_real_minutos': 5})
+                assert response.status_code == 201
+                ids.append(response.json()['historico']['id'])
+            asgi_client.delete(f"/meditacoes/historico/{ids[0]}", headers=cabecalho)
+
+            estatisticas = asgi_client.get('/meditacoes/estatisticas', headers=cabecalho).json()
+            assert estatisticas['total_meditacoes'] == 1 and estatisticas['categoria_favorita'] == 'foco'
+            with conn.cursor() as cursor:
+                assert usuario_id not in controller_usuario.verificar_estatisticas_meditacao(cursor)
+        finally:
+            conn.rollback()
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM historico_meditacoes WHERE usuario_id = %s", (usuario_id,))
+                cursor.execute("DELETE FROM meditacoes WHERE titulo = 'Resumo ASGI'")
+            conn.commit()
+            conn.close()
+
+
+class TestLimiteAsgi:
+    """Rate limit do ASGI: mesmo formato e mesmo padrão do Flask-Limiter"""
+
+    def test_ler_limites(self):
+        assert asgi._ler_limites('100 per minute') == [(100, 60)]
+        assert asgi._ler_limites('5/second; 1000 per 2 hours') == [(5, 1), (1000, 7200)]
+        with pytest.raises(ValueError):
+            asgi._ler_limites('muitas por dia')
+
+    def test_rota_sem_limit_recebe_o_padrao(self, monkeypatch):
+        monkeypatch.setattr(asgi.config, 'RATELIMIT_ENABLED', True)
+        monkeypatch.setattr(asgi, '_janelas', {})
+        padrao = asgi._ler_limites(asgi.config.RATELIMIT_DEFAULT)[0][0]
+        with TestClient(asgi.app) as cliente:
+            assert all(cliente.get('/').status_code == 200 for _ in range(padrao))
+            assert cliente.get('/').status_code == 429
+
+    def test_janelas_vencidas_saem(self, monkeypatch):
+        monkeypatch.setattr(asgi, '_janelas', {('index', 60, '10.0.0.1'): [0.0, 5],
+                                               ('index', 60, '10.0.0.2'): [100.0, 1]})
+        monkeypatch.setattr(asgi, '_proxima_limpeza', 0.0)
+        asgi._limpar_janelas(120.0)
+        assert list(asgi._janelas) == [('index', 60, '10.0.0.2')]
+
+
+class TestEtagAsgi:
+    """ETag da resposta comprimida pelo GZipMiddleware"""
+
+    def test_sufixo_da_codificacao(self):
+        async def rota(request):
+            return Response(b'{"a":1}' * 500, media_type='application/json', headers={'ETag': '"abc"'})
+
+        app = Starlette(routes=[Route('/', rota)],
+                        middleware=[Middleware(asgi.EtagDaCodificacao), Middleware(GZipMiddleware)])
+        with TestClient(app) as cliente:
+            assert cliente.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag'] == '"abc-gzip"'
+            assert cliente.get('/', headers={'Accept-Encoding': 'identity'}).headers['ETag'] == '"abc"'
+
+    def test_if_none_match_com_as_duas_formas(self):
+        pedido = lambda valor: type('Pedido', (), {'headers': {'if-none-match': valor}})()
+        assert asgi._etag_pedida(pedido('"abc-gzip"'), 'abc') == 'abc-gzip'
+        assert asgi._etag_pedida(pedido('W/"abc"'), 'abc') == 'abc'
+        assert asgi._etag_pedida(pedido('"outra"'), 'abc') is None
+        assert asgi._etag_pedida(type('Pedido', (), {'headers': {}})(), 'abc') is None
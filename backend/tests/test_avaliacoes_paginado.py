@@ -0,0 +1,116 @@
+"""Testes de GET /avaliacoes/historico com filtros e cursor e de GET /avaliacoes/ultimas (migração 009)"""
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg2
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import conexao
+from controller import controller_usuario as c
+from middleware import auth_asgi
+
+INICIO = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class TestParametros:
+    """Testes das funções puras dos filtros"""
+
+    def test_validos(self, monkeypatch):
+        monkeypatch.setattr(c.Config, 'AVALIACOES_PAGINA_PADRAO', 50)
+        monkeypatch.setattr(c.Config, 'AVALIACOES_PAGINA_MAX', 200)
+        assert c.parametros_avaliacoes(None, None, None, None, None) == (50, None, None, None, False)
+        assert c.parametros_avaliacoes('5000', 'estresse', '2026-01-01', '2026-01-31', 'true') == \
+            (200, 'estresse', date(2026, 1, 1), date(2026, 1, 31), True)
+
+    def test_invalidos(self):
+        for argumentos in [('0', None, None, None, None), (None, 'xadrez', None, None, None),
+                           (None, None, '01/02/2026', None, None), (None, None, '2026-02-01', '2026-01-01', None),
+                           (None, None, None, None, None, 'nao-e-cursor')]:
+            with pytest.raises(ValueError):
+                c.parametros_avaliacoes(*argumentos)
+
+
+@pytest.fixture
+def usuario(client, novo_usuario):
+    """Usuário com 24 avaliações de 3 tipos, uma por dia; 2 no mesmo instante e 1 sem data."""
+    usuario_id, cabecalho = novo_usuario('avaliacoes', 'Avaliações')
+    # Conexão própria: commit visível para o ASGI
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    with conn.cursor() as cursor:
+        for i in range(21):
+            cursor.execute("INSERT INTO resultados_avaliacoes (usuario_id, tipo, respostas, resultado_score, data_avaliacao)"
+                           " VALUES (%s, %s, %s, %s, %s)", (usuario_id, ('ansiedade', 'depressao', 'estresse')[i % 3],
+                                                            f'{{"q1": {i}}}', i, INICIO + timedelta(days=i)))
+        for data in (INICIO + timedelta(days=3), None):
+            cursor.execute("INSERT INTO resultados_avaliacoes (usuario_id, tipo, respostas, resultado_score, data_avaliacao)"
+                           " VALUES (%s, 'estresse', '{}', 0, %s)", (usuario_id, data))
+    conn.commit()
+    conn.close()
+    # Uma pela API: cria a versão dos dados do usuário (ETag) e é a mais recente
+    client.post('/avaliacoes', headers=cabecalho, json={'usuario_id': usuario_id, 'tipo': 'depressao',
+                                                        'respostas': {'q1': 2}, 'resultado_score': 2})
+    return usuario_id, cabecalho
+
+
+class TestAvaliacoesPaginadas:
+    """GET /avaliacoes/historico?tipo=&de=&ate=&page_size=&cursor=&incluir_respostas="""
+
+    def test_percorre_tudo_na_ordem(self, client, usuario, todas_as_paginas):
+        _, cabecalho = usuario
+        assert len(client.get('/avaliacoes/historico', headers=cabecalho).get_json()) == 24
+
+        paginas = todas_as_paginas(client, cabecalho, '/avaliacoes/historico', 'page_size=7')
+        assert [len(p) for p in paginas] == [7, 7, 7, 3]
+        itens = [item for pagina in paginas for item in pagina]
+        assert len({item['id'] for item in itens}) == 24
+        assert set(itens[0]) == {'id', 'tipo', 'resultado_score', 'resultado_texto', 'data_avaliacao'}
+
+        # Decrescente por (data_avaliacao, id); sem data por último
+        chaves = [(datetime.fromisoformat(item['data_avaliacao']), item['id']) for item in itens[:-1]]
+        assert chaves == sorted(chaves, reverse=True)
+        assert itens[-1]['data_avaliacao'] is None
+
+    def test_filtros(self, client, usuario, todas_as_paginas):
+        _, cabecalho = usuario
+        itens = sum(todas_as_paginas(client, cabecalho, '/avaliacoes/historico', 'tipo=estresse&page_size=3'), [])
+        assert len(itens) == 9 and {item['tipo'] for item in itens} == {'estresse'}
+
+        # de/ate inclusivos, em dias; a avaliação sem data fica de fora
+        corpo = client.get('/avaliacoes/historico?de=2026-03-02&ate=2026-03-04', headers=cabecalho).get_json()
+        assert [item['resultado_score'] for item in corpo['itens']] == [0, 3, 2, 1]  # empate: maior id antes
+        corpo = client.get('/avaliacoes/historico?tipo=depressao&ate=2026-03-10&incluir_respostas=true',
+                           headers=cabecalho).get_json()
+        assert [item['respostas'] for item in corpo['itens']] == [{'q1': 7}, {'q1': 4}, {'q1': 1}]
+
+    def test_etag_e_erros(self, client, usuario):
+        _, cabecalho = usuario
+        response = client.get('/avaliacoes/historico?tipo=ansiedade', headers=cabecalho)
+        etag = response.headers['ETag']
+        assert client.get('/avaliacoes/historico?tipo=ansiedade',
+                          headers={**cabecalho, 'If-None-Match': etag}).status_code == 304
+        assert client.get('/avaliacoes/historico?tipo=estresse', headers=cabecalho).headers['ETag'] != etag
+
+        for consulta in ('page_size=0', 'tipo=xadrez', 'de=ontem', 'de=2026-02-01&ate=2026-01-01', 'cursor=xyz'):
+            response = client.get(f'/avaliacoes/historico?{consulta}', headers=cabecalho)
+            assert response.status_code == 400 and response.get_json()['mensagem']
+
+    def test_ultimas(self, client, usuario):
+        _, cabecalho = usuario
+        ultimas = client.get('/avaliacoes/ultimas', headers=cabecalho).get_json()
+        assert [(item['tipo'], item['resultado_score']) for item in ultimas] == \
+            [('ansiedade', 18), ('depressao', 2), ('estresse', 20)]
+        assert 'respostas' not in ultimas[0]
+        ultimas = client.get('/avaliacoes/ultimas?incluir_respostas=true', headers=cabecalho).get_json()
+        assert ultimas[1]['respostas'] == {'q1': 2}
+
+    def test_asgi_igual_ao_flask(self, app, client, usuario, monkeypatch, todas_as_paginas):
+        _, cabecalho = usuario
+        monkeypatch.setattr(auth_asgi.config, 'JWT_SECRET_KEY', app.config['JWT_SECRET_KEY'])
+        with TestClient(asgi.app) as asgi_client:
+            for consulta in ('page_size=5', 'tipo=estresse&de=2026-03-05&incluir_respostas=true&page_size=2'):
+                assert todas_as_paginas(asgi_client, cabecalho, '/avaliacoes/historico', consulta) == \
+                    todas_as_paginas(client, cabecalho, '/avaliacoes/historico', consulta)
+            assert asgi_client.get('/avaliacoes/ultimas', headers=cabecalho).json() == \
+                client.get('/avaliacoes/ultimas', headers=cabecalho).get_json()
+            assert asgi_client.get('/avaliacoes/historico?tipo=xadrez', headers=cabecalho).status_code == 400
@@ -0,0 +1,25 @@
+"""Testes do benchmark de rotas (sem banco)"""
+from benchmarks import bench_rotas
+
+
+class TestBenchRotas:
+    """Testes para benchmarks/bench_rotas.py"""
+
+    def test_todas_as_rotas_do_app_tem_cenario(self, app):
+        """Rota nova no app.py precisa de cenário no benchmark"""
+        assert bench_rotas.rotas_sem_cobertura(app) == []
+
+    def test_rota_nova_aparece_como_faltando(self, app):
+        rotas = [rota for rota in bench_rotas.ROTAS if rota.regra != '/stats']
+        assert bench_rotas.rotas_sem_cobertura(app, rotas) == [('GET', '/stats')]
+
+    def test_comparar(self):
+        def linha(rps, p95, consultas):
+            return {'rps': rps, 'p95_ms': p95, 'consultas_por_requisicao': consultas}
+
+        linhas = bench_rotas.comparar(
+            {'GET /stats': linha(200, 10.0, 1), 'GET /novo': linha(10, 1.0, 1)},
+            {'GET /stats': linha(100, 20.0, 4)},
+        )
+        assert linhas[1].split()[2:] == ['+100.0%', '-50.0%', '-3.00']
+        assert linhas[2].endswith('(nova)')
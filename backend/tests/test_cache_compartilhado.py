@@ -0,0 +1,166 @@
+"""Testes do cache compartilhado das estatísticas por usuário"""
+import threading
+import time
+import uuid
+
+import pytest
+from fakeredis import TcpFakeServer
+
+from cache import CacheCompartilhado, CacheMemoria, CacheRedis, criar_backend
+from controller import controller_usuario
+from model.historico_meditacao import HistoricoMeditacao
+from model.meditacao import Meditacao
+
+
+@pytest.fixture(scope='module')
+def servidor_redis():
+    """Servidor local que fala o protocolo do Redis (fakeredis), numa porta livre"""
+    servidor = TcpFakeServer(('127.0.0.1', 0), server_type='redis')
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield 'redis://%s:%d/0' % servidor.server_address
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture(params=['memoria', 'redis'])
+def cache(request):
+    if request.param == 'memoria':
+        backend = CacheMemoria()
+    else:
+        backend = criar_backend(request.getfixturevalue('servidor_redis'))
+        backend.prefixo = f"teste-{uuid.uuid4().hex[:8]}:"
+    return CacheCompartilhado(backend, espera=1)
+
+
+class _Contador:
+    def __init__(self, valor, demora=0):
+        self.valor = valor
+        self.demora = demora
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        time.sleep(self.demora)
+        return self.valor
+
+
+class TestCacheCompartilhado:
+    """Testes para cache/compartilhado.py (nos dois backends)"""
+
+    def test_acerto_e_invalidacao(self, cache):
+        calcular = _Contador({'total': 3, 'categoria': 'sono'})
+        assert cache.obter_ou_calcular('u:1', calcular, 60) == {'total': 3, 'categoria': 'sono'}
+        assert cache.obter_ou_calcular('u:1', calcular, 60) == {'total': 3, 'categoria': 'sono'}
+        assert calcular.chamadas == 1
+
+        cache.invalidar('u:1')
+        cache.obter_ou_calcular('u:1', calcular, 60)
+        assert calcular.chamadas == 2
+        assert cache.estatisticas()['taxa_acerto'] == pytest.approx(1 / 3, abs=0.001)
+
+    def test_entrada_velha_e_recusada(self, cache):
+        cache.obter_ou_calcular('u:1', _Contador({'marca': 'v1'}), 60)
+        calcular = _Contador({'marca': 'v2'})
+        valor = cache.obter_ou_calcular('u:1', calcular, 60, valido=lambda v: v['marca'] == 'v2')
+        assert valor == {'marca': 'v2'} and calcular.chamadas == 1
+        assert cache.estatisticas()['recusados'] == 1
+
+    def test_none_nao_e_gravado(self, cache):
+        calcular = _Contador(None)
+        cache.obter_ou_calcular('u:1', calcular, 60)
+        cache.obter_ou_calcular('u:1', calcular, 60)
+        assert calcular.chamadas == 2
+
+    def test_expira(self, cache):
+        calcular = _Contador({'total': 1})
+        cache.obter_ou_calcular('u:1', calcular, 0.05)
+        time.sleep(0.1)
+        cache.obter_ou_calcular('u:1', calcular, 0.05)
+        assert calcular.chamadas == 2
+
+    def test_um_calculo_por_estouro(self, cache):
+        """Várias threads com a mesma chave vazia: só uma vai ao banco"""
+        calcular = _Contador({'total': 1}, demora=0.2)
+        resultados = []
+        threads = [threading.Thread(target=lambda: resultados.append(cache.obter_ou_calcular('u:1', calcular, 60)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calcular.chamadas == 1
+        assert resultados == [{'total': 1}] * 8
+        assert cache.estatisticas()['esperas'] == 7
+
+    def test_jitter(self):
+        cache = CacheCompartilhado(CacheMemoria(), jitter=0.1)
+        ttls = {cache._ttl(100) for _ in range(50)}
+        assert len(ttls) > 1
+        assert all(90 <= ttl <= 110 for ttl in ttls)
+
+    def test_redis_fora_do_ar_vai_ao_banco(self):
+        cache = CacheCompartilhado(CacheRedis('redis://127.0.0.1:1/0', timeout=0.1))
+        calcular = _Contador({'total': 1})
+        assert cache.obter_ou_calcular('u:1', calcular, 60) == {'total': 1}
+        cache.invalidar('u:1')
+        assert cache.estatisticas()['falhas'] >= 2
+
+    def test_memoria_limita_itens(self):
+        backend = CacheMemoria(max_itens=2)
+        for chave in 'abc':
+            backend.gravar(chave, b'1', 60)
+        assert backend.obter('a') is None
+        assert backend.itens() == 2
+
+
+class TestEstatisticasNaApi:
+    """Estatísticas servidas do cache e invalidadas pelas escritas do histórico"""
+
+    @pytest.fixture
+    def usuario(self, novo_usuario):
+        return novo_usuario('cache', 'Usuário Cache')
+
+    @pytest.fixture
+    def meditacao_id(self):
+        controller_usuario.inserir_meditacao(Meditacao(None, 'Meditação do cache', 'desc', 10, None, 'guiada', 'sono', None))
+        meditacao = next(m for m in controller_usuario.listar_meditacoes() if m.titulo == 'Meditação do cache')
+        yield meditacao.id
+        with controller_usuario.obter_cursor() as cursor:
+            cursor.execute("DELETE FROM meditacoes WHERE id = %s", (meditacao.id,))
+
+    def test_escrita_invalida(self, client, meditacao_id, usuario, monkeypatch):
+        monkeypatch.setattr(controller_usuario, 'cache_compartilhado', CacheCompartilhado(CacheMemoria()))
+        uid, headers = usuario
+
+        def registrar():
+            response = client.post('/meditacoes/historico', headers=headers, json={
+                'usuario_id': uid, 'meditacao_id': meditacao_id, 'duracao_real_minutos': 10})
+            assert response.status_code == 201
+            return response.get_json()['historico']['id']
+
+        registrar()
+        assert client.get('/meditacoes/estatisticas', headers=headers).get_json()['total_meditacoes'] == 1
+        assert client.get('/meditacoes/estatisticas', headers=headers).get_json()['total_meditacoes'] == 1
+        assert controller_usuario.cache_compartilhado.estatisticas()['acertos'] == 1
+
+        historico_id = registrar()
+        assert client.get('/meditacoes/estatisticas', headers=headers).get_json()['total_meditacoes'] == 2
+
+        client.delete(f"/meditacoes/historico/{historico_id}", headers=headers)
+        assert client.get('/meditacoes/estatisticas', headers=headers).get_json()['total_meditacoes'] == 1
+        assert controller_usuario.cache_compartilhado.estatisticas()['invalidacoes'] == 3
+
+    def test_versao_nova_recusa_a_entrada(self, meditacao_id, usuario, monkeypatch):
+        """Escrita sem invalidação (outro processo, app ASGI): a versão do histórico recusa a entrada"""
+        monkeypatch.setattr(controller_usuario, 'cache_compartilhado', CacheCompartilhado(CacheMemoria()))
+        monkeypatch.setattr(controller_usuario, '_invalidar_estatisticas', lambda usuario_id: None)
+        uid, _ = usuario
+        historico = HistoricoMeditacao(usuario_id=uid, meditacao_id=meditacao_id, duracao_real_minutos=10)
+
+        controller_usuario.registrar_meditacao_concluida(historico)
+        assert controller_usuario.obter_estatisticas_meditacoes(uid)['total_meditacoes'] == 1
+        controller_usuario.registrar_meditacao_concluida(historico)
+        assert controller_usuario.obter_estatisticas_meditacoes(uid)['total_meditacoes'] == 2
+        assert controller_usuario.cache_compartilhado.estatisticas()['recusados'] == 1
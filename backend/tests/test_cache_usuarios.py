@@ -0,0 +1,188 @@
+"""Testes do cache de registros de usuário"""
+import time
+
+import pytest
+
+import conexao
+from cache import CacheUsuarios
+from cache.usuarios import CANAL
+from controller import controller_usuario
+
+
+def _projecao(id, email, nome='Fulano'):
+    return (id, nome, email)
+
+
+def _cache(**extras):
+    return CacheUsuarios(lambda p: (p[0], p[2]), escutar=False, **extras)
+
+
+class _Banco:
+    def __init__(self, *projecoes):
+        self.projecoes = {p[0]: p for p in projecoes}
+        self.leituras = 0
+
+    def por_id(self, id):
+        def carregar():
+            self.leituras += 1
+            return self.projecoes.get(id)
+        return carregar
+
+    def por_email(self, email):
+        def carregar():
+            self.leituras += 1
+            return next((p for p in self.projecoes.values() if p[2] == email), None)
+        return carregar
+
+
+class TestCacheUsuarios:
+    """Testes para cache/usuarios.py"""
+
+    def test_id_e_email_dividem_o_item(self):
+        banco = _Banco(_projecao(1, 'a@x.com'))
+        cache = _cache()
+        assert cache.por_email('a@x.com', banco.por_email('a@x.com'))[0] == 1
+        assert cache.por_id(1, banco.por_id(1))[2] == 'a@x.com'
+        assert cache.por_email('a@x.com', banco.por_email('a@x.com'))[0] == 1
+        assert banco.leituras == 1
+
+        stats = cache.estatisticas()
+        assert (stats['acertos_id'], stats['acertos_email'], stats['faltas']) == (1, 1, 1)
+        assert stats['taxa_acerto'] == pytest.approx(2 / 3, abs=0.001)
+        assert stats['itens'] == 1 and stats['bytes'] > 0
+
+    def test_invalidar_tira_os_dois_indices(self):
+        banco = _Banco(_projecao(1, 'a@x.com'))
+        cache = _cache()
+        cache.por_id(1, banco.por_id(1))
+        banco.projecoes[1] = _projecao(1, 'b@x.com')
+        cache.invalidar(1)
+
+        assert cache.por_email('a@x.com', banco.por_email('a@x.com')) is None
+        assert cache.por_email('b@x.com', banco.por_email('b@x.com'))[2] == 'b@x.com'
+
+    def test_inexistente_nao_fica_em_cache(self):
+        banco = _Banco()
+        cache = _cache()
+        cache.por_id(1, banco.por_id(1))
+        cache.por_id(1, banco.por_id(1))
+        assert banco.leituras == 2
+
+    def test_limite_de_memoria_despeja_o_menos_usado(self):
+        banco = _Banco(*[_projecao(i, f"{i}@x.com") for i in range(1, 4)])
+        item = CacheUsuarios(lambda p: (p[0], p[2]), escutar=False)
+        item.por_id(1, banco.por_id(1))
+        cache = _cache(max_bytes=item.estatisticas()['bytes'] * 2 + 10)
+
+        cache.por_id(1, banco.por_id(1))
+        cache.por_id(2, banco.por_id(2))
+        cache.por_id(1, banco.por_id(1))  # 1 passa a ser o mais recente
+        cache.por_id(3, banco.por_id(3))
+
+        stats = cache.estatisticas()
+        assert stats['itens'] == 2 and stats['despejados'] == 1
+        assert stats['bytes'] <= stats['max_bytes']
+        leituras = banco.leituras
+        cache.por_id(1, banco.por_id(1))
+        assert banco.leituras == leituras
+        cache.por_id(2, banco.por_id(2))
+        assert banco.leituras == leituras + 1
+
+    def test_ttl(self):
+        banco = _Banco(_projecao(1, 'a@x.com'))
+        cache = _cache(ttl=0.02)
+        cache.por_id(1, banco.por_id(1))
+        time.sleep(0.03)
+        cache.por_id(1, banco.por_id(1))
+        assert banco.leituras == 2 and cache.estatisticas()['expirados'] == 1
+
+    def test_invalidacao_durante_a_carga(self):
+        """Escrita confirmada enquanto a leitura estava no banco: o valor lido não fica"""
+        cache = _cache()
+
+        def carregar():
+            cache.invalidar(1)
+            return _projecao(1, 'a@x.com', 'Antigo')
+
+        assert cache.por_id(1, carregar)[1] == 'Antigo'
+        assert cache.estatisticas()['itens'] == 0
+
+    def test_pode_guardar(self):
+        """Projeção recusada por pode_guardar é devolvida, mas a próxima leitura vai ao banco"""
+        banco = _Banco(_projecao(1, 'a@x.com'), _projecao(2, 'b@x.com'))
+        cache = _cache(pode_guardar=lambda p: p[0] != 2)
+        for _ in range(2):
+            assert cache.por_id(1, banco.por_id(1))[2] == 'a@x.com'
+            assert cache.por_id(2, banco.por_id(2))[2] == 'b@x.com'
+        assert banco.leituras == 3 and cache.estatisticas()['itens'] == 1
+
+
+@pytest.fixture
+def usuario(novo_usuario):
+    dados = novo_usuario('cache', 'Cache', registro=True)
+    return dados['usuario']['id'], dados['usuario']['email'], {'Authorization': f"Bearer {dados['access_token']}"}
+
+
+def _aguardar(condicao, limite=5):
+    fim = time.monotonic() + limite
+    while not condicao():
+        if time.monotonic() > fim:
+            pytest.fail("condição não atingida a tempo")
+        time.sleep(0.02)
+
+
+class TestCacheUsuariosNaApi:
+    """Cache usado por buscar_usuario_por_id/por_email e invalidado pelas escritas"""
+
+    def test_perfil_atualizado_e_lido_de_novo(self, client, usuario):
+        uid, _, headers = usuario
+        assert client.get(f"/usuarios/{uid}", headers=headers).get_json()['nome'] == 'Cache'
+        antes = controller_usuario.usuarios_cache.estatisticas()
+        client.get(f"/usuarios/{uid}", headers=headers)
+        assert controller_usuario.usuarios_cache.estatisticas()['acertos_id'] == antes['acertos_id'] + 1
+
+        client.put('/perfil', headers=headers, json={'nome': 'Cache Novo', 'foto_perfil': 'x' * 5000})
+        perfil = client.get(f"/usuarios/{uid}", headers=headers).get_json()
+        assert perfil['nome'] == 'Cache Novo'
+        assert perfil['foto_perfil'] == 'x' * 5000  # grande demais para o cache: lida à parte
+
+        usuario_sem_foto = controller_usuario.buscar_usuario_por_id(uid, com_foto=False)
+        assert usuario_sem_foto.foto_perfil is None and usuario_sem_foto.config is None
+
+    def test_escrita_desfeita_nao_fica_em_cache(self, usuario):
+        """A unidade de trabalho lê a própria alteração sem guardá-la; depois do rollback vale a linha antiga"""
+        uid, _, _ = usuario
+        with pytest.raises(ZeroDivisionError):
+            with conexao.unidade_de_trabalho():
+                alterado = controller_usuario.buscar_usuario_por_id(uid)
+                alterado.nome = 'Desfeito'
+                assert controller_usuario.atualizar_perfil(alterado)
+                assert controller_usuario.buscar_usuario_por_id(uid).nome == 'Desfeito'
+                1 / 0
+        assert controller_usuario.buscar_usuario_por_id(uid).nome == 'Cache'
+
+    def test_exclusao_da_conta(self, client, usuario):
+        uid, email, headers = usuario
+        assert controller_usuario.buscar_usuario_por_email(email).id == uid
+        response = client.delete(f"/usuarios/{uid}/excluir-conta", headers=headers, json={'password': 'senha12345'})
+        assert response.status_code == 200
+        assert controller_usuario.buscar_usuario_por_email(email) is None
+        assert controller_usuario.buscar_usuario_por_id(uid) is None
+
+    def test_notify_invalida_outro_processo(self, client, usuario):
+        """Escrita de outro worker chega pelo NOTIFY e tira o usuário do cache"""
+        uid, _, _ = usuario
+        client.get('/')  # confirma o cadastro
+        outro = CacheUsuarios(lambda p: (p[0], p[2]))
+        try:
+            outro.por_id(uid, lambda: _projecao(uid, 'x@x.com'))
+            _aguardar(lambda: outro.estatisticas()['escuta_ativa'])
+            outro.por_id(uid, lambda: _projecao(uid, 'x@x.com'))
+            assert outro.estatisticas()['itens'] == 1
+
+            with conexao.obter_cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (CANAL, str(uid)))
+            client.get('/')  # o aviso sai no commit da unidade de teste
+            _aguardar(lambda: outro.estatisticas()['itens'] == 0)
+        finally:
+            outro.parar()
@@ -0,0 +1,205 @@
+"""Testes do cache do catálogo de meditações"""
+import asyncio
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import conexao
+from cache import CacheCatalogo, escuta as modulo_escuta
+from cache.catalogo import CANAL
+from controller import controller_usuario
+from model.meditacao import Meditacao
+
+
+def _meditacao(id, titulo):
+    return Meditacao(id, titulo, 'desc', 10, None, 'guiada', 'sono', None)
+
+
+class _Banco:
+    """Catálogo falso que conta quantas vezes foi lido."""
+
+    def __init__(self, *meditacoes):
+        self.meditacoes = list(meditacoes)
+        self.cargas = 0
+        self.fora_do_ar = False
+
+    def carregar(self):
+        self.cargas += 1
+        return None if self.fora_do_ar else list(self.meditacoes)
+
+    def buscar(self, id):
+        return next((m for m in self.meditacoes if m.id == id), None)
+
+
+def _cache(banco, **extras):
+    return CacheCatalogo(banco.carregar, banco.buscar, lambda m: {'id': m.id, 'titulo': m.titulo},
+                         lambda m: {'id': m.id, 'titulo': m.titulo, 'duracao': m.duracao_minutos},
+                         escutar=False, **extras)
+
+
+class TestCacheCatalogo:
+    """Testes para cache/catalogo.py"""
+
+    def test_carrega_uma_vez(self):
+        banco = _Banco(_meditacao(1, 'Respirar'), _meditacao(2, 'Dormir'))
+        cache = _cache(banco)
+
+        corpo, etag = cache.lista()
+        assert corpo == '[{"id":1,"titulo":"Respirar"},{"id":2,"titulo":"Dormir"}]'.encode()
+        assert cache.detalhe(2)[0] == b'{"duracao":10,"id":2,"titulo":"Dormir"}'
+        assert cache.buscar(1).titulo == 'Respirar'
+        assert cache.lista() == (corpo, etag)
+        assert banco.cargas == 1
+
+    def test_etag_muda_so_com_o_conteudo(self):
+        banco = _Banco(_meditacao(1, 'Respirar'))
+        cache = _cache(banco)
+        _, etag = cache.lista()
+
+        cache.invalidar()
+        assert cache.lista()[1] == etag  # mesmo conteúdo, mesma ETag (em qualquer worker)
+
+        banco.meditacoes.append(_meditacao(2, 'Dormir'))
+        cache.invalidar()
+        assert cache.lista()[1] != etag
+        assert banco.cargas == 3
+
+    def test_id_fora_do_retrato_vai_ao_banco_e_invalida(self):
+        """Meditação nova cujo aviso ainda não chegou: busca direto e recarrega o retrato"""
+        banco = _Banco(_meditacao(1, 'Respirar'))
+        cache = _cache(banco)
+        cache.lista()
+        banco.meditacoes.append(_meditacao(2, 'Dormir'))
+
+        assert cache.buscar(2).titulo == 'Dormir'
+        assert b'Dormir' in cache.lista()[0]
+        assert cache.detalhe(99) is None
+
+    def test_ttl(self):
+        banco = _Banco(_meditacao(1, 'Respirar'))
+        cache = _cache(banco, ttl=0)
+        cache.lista()
+        cache.lista()
+        assert banco.cargas == 2
+
+    def test_falha_do_banco_nao_fica_em_cache(self):
+        banco = _Banco(_meditacao(1, 'Respirar'))
+        banco.fora_do_ar = True
+        cache = _cache(banco)
+        assert cache.lista() is None
+        banco.fora_do_ar = False
+        assert cache.lista() is not None
+
+    def test_async_uma_carga_para_leituras_simultaneas(self):
+        """Métodos *_async (app ASGI): leituras juntas esperam a mesma carga; mesmas ETags do síncrono"""
+        banco = _Banco(_meditacao(1, 'Respirar'), _meditacao(2, 'Dormir'))
+
+        async def carregar():
+            await asyncio.sleep(0.01)
+            return banco.carregar()
+
+        async def buscar(id):
+            return banco.buscar(id)
+
+        cache = CacheCatalogo(carregar, buscar, lambda m: {'id': m.id, 'titulo': m.titulo},
+                              lambda m: {'id': m.id, 'titulo': m.titulo, 'duracao': m.duracao_minutos},
+                              escutar=False)
+
+        async def cenario():
+            listas = await asyncio.gather(*(cache.lista_async() for _ in range(5)))
+            assert banco.cargas == 1 and len(set(listas)) == 1
+            assert (await cache.buscar_async(2)).titulo == 'Dormir'
+            banco.meditacoes.append(_meditacao(3, 'Acordar'))
+            assert await cache.detalhe_async(3) is not None  # fora do retrato: busca e invalida
+            assert b'Acordar' in (await cache.lista_async())[0]
+
+        asyncio.run(cenario())
+        assert banco.cargas == 2
+        assert _cache(banco).lista() == cache._retrato.lista
+
+
+class TestCatalogoNaApi:
+    """ETag e invalidação do catálogo nas rotas e entre processos"""
+
+    def test_etag_e_304(self, client):
+        response = client.get('/meditacoes')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert etag.startswith('"')
+
+        response = client.get('/meditacoes', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_invalida_so_depois_do_commit(self, monkeypatch):
+        invalidacoes = []
+        monkeypatch.setattr(controller_usuario.catalogo, 'invalidar', lambda: invalidacoes.append(True))
+        try:
+            with pytest.raises(ZeroDivisionError):
+                with conexao.unidade_de_trabalho():
+                    assert controller_usuario.inserir_meditacao(_meditacao(None, 'Meditação do commit'))
+                    1 / 0
+            assert invalidacoes == []
+
+            with conexao.unidade_de_trabalho():
+                assert controller_usuario.inserir_meditacao(_meditacao(None, 'Meditação do commit'))
+                assert invalidacoes == []
+            assert invalidacoes  # (o NOTIFY, se a escuta estiver ativa, também invalida)
+        finally:
+            with conexao.obter_cursor() as cursor:
+                cursor.execute("DELETE FROM meditacoes WHERE titulo = 'Meditação do commit'")
+
+    def test_notify_invalida_outro_processo(self):
+        """Um INSERT feito por outro processo chega pelo NOTIFY do inserir_meditacao"""
+        outro = CacheCatalogo(controller_usuario.listar_meditacoes, controller_usuario.buscar_meditacao_por_id,
+                              controller_usuario._resumo_meditacao, controller_usuario._detalhe_meditacao)
+        try:
+            antes = outro.lista()
+            _aguardar(lambda: outro.estatisticas()['escuta_ativa'])
+            outro.lista()
+
+            assert controller_usuario.inserir_meditacao(_meditacao(None, 'Meditação do NOTIFY'))
+            _aguardar(lambda: outro.estatisticas()['notificacoes'] > 0)
+            assert 'Meditação do NOTIFY'.encode() in outro.lista()[0]
+            assert outro.lista()[1] != antes[1]
+        finally:
+            outro.parar()
+            with conexao.obter_cursor() as cursor:
+                cursor.execute("DELETE FROM meditacoes WHERE titulo = 'Meditação do NOTIFY'")
+                cursor.execute("SELECT pg_notify(%s, '')", (CANAL,))
+
+
+class TestEscuta:
+    """Testes para cache/escuta.py"""
+
+    def test_thread_antiga_nao_volta_a_escutar(self, monkeypatch):
+        """parar() que desistiu de esperar (thread presa no connect) e garantir(): só uma thread fica"""
+        liberar = threading.Event()
+
+        def conectar(**_):
+            liberar.wait()
+            raise psycopg2.OperationalError('fora do ar')
+
+        monkeypatch.setattr(modulo_escuta.psycopg2, 'connect', conectar)
+        escuta = modulo_escuta.Escuta('calmou_teste', lambda payloads: None, lambda: None)
+        escuta.garantir()
+        antiga = escuta._thread
+        escuta._thread = None  # como se o join do parar() tivesse esgotado o tempo
+        escuta.parar()
+        escuta.garantir()
+        liberar.set()
+        antiga.join(timeout=3)
+        try:
+            assert not antiga.is_alive() and escuta._thread.is_alive()
+        finally:
+            escuta.parar()
+
+
+def _aguardar(condicao, limite=5):
+    fim = time.monotonic() + limite
+    while not condicao():
+        if time.monotonic() > fim:
+            pytest.fail("condição não atingida a tempo")
+        time.sleep(0.02)
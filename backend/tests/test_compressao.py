@@ -0,0 +1,148 @@
+"""Testes da compressão das respostas (middleware/compressao.py)"""
+import gzip
+import json
+
+import brotli
+import pytest
+from flask import Response
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_etags
+
+import app as modulo_app
+from middleware.compressao import Compressao, etag_correspondente
+
+CORPO = json.dumps([{'id': i, 'titulo': 'Respiração guiada', 'categoria': 'Foco'} for i in range(200)]).encode()
+
+
+def _aceita(*codificacoes):
+    return Accept([(codificacao, 1) for codificacao in codificacoes])
+
+
+def _resposta(corpo=CORPO, **cabecalhos):
+    return Response(corpo, mimetype='application/json', headers=cabecalhos)
+
+
+def _corpo(response):
+    return b''.join(response.response) if response.is_streamed else response.get_data()
+
+
+class TestCompressao:
+    """Testes para a classe Compressao"""
+
+    def test_negociacao(self):
+        compressao = Compressao()
+        response = compressao.processar(_resposta(), _aceita('gzip', 'br'))
+        assert response.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.get_data()) == CORPO
+        assert int(response.headers['Content-Length']) == len(response.get_data()) < len(CORPO)
+        assert 'Accept-Encoding' in response.vary
+
+        response = compressao.processar(_resposta(), Accept([('br', 0), ('gzip', 1)]))
+        assert gzip.decompress(response.get_data()) == CORPO
+
+        response = compressao.processar(_resposta(), _aceita())
+        assert 'Content-Encoding' not in response.headers and response.get_data() == CORPO
+        assert 'Accept-Encoding' in response.vary
+
+    def test_o_que_nao_e_comprimido(self):
+        compressao = Compressao(minimo=1024)
+        assert 'Content-Encoding' not in compressao.processar(_resposta(b'{"a": 1}'), _aceita('gzip')).headers
+        imagem = Response(CORPO, mimetype='image/png')
+        assert 'Content-Encoding' not in compressao.processar(imagem, _aceita('gzip')).headers
+        vazia = Response(status=304)
+        assert 'Content-Encoding' not in compressao.processar(vazia, _aceita('gzip')).headers
+        assert compressao.estatisticas()['pequenas'] == 1
+
+    def test_corpo_grande_em_blocos(self):
+        compressao = Compressao(stream_min=4096)
+        response = compressao.processar(_resposta(CORPO * 20), _aceita('gzip'))
+        assert response.is_streamed and 'Content-Length' not in response.headers
+        assert gzip.decompress(_corpo(response)) == CORPO * 20
+        assert compressao.estatisticas()['em_stream'] == 1
+
+    def test_gerador_da_rota(self):
+        compressao = Compressao()
+        partes = [json.dumps({'n': n}) + '\n' for n in range(1000)]
+        response = Response((parte for parte in partes), mimetype='application/x-ndjson')
+        response = compressao.processar(response, _aceita('br'))
+        assert brotli.decompress(_corpo(response)).decode() == ''.join(partes)
+        stats = compressao.estatisticas()
+        assert stats['bytes_originais'] == len(''.join(partes)) and stats['bytes_enviados'] > 0
+
+    def test_cache_de_respostas_publicas(self):
+        compressao = Compressao(cache_max_bytes=1024 * 1024)
+        for _ in range(3):
+            response = _resposta()
+            response.set_etag('abc')
+            compressao.processar(response, _aceita('gzip'))
+        publica = _resposta(**{'Cache-Control': 'public, max-age=60'})
+        compressao.processar(publica, _aceita('gzip'))
+        compressao.processar(_resposta(**{'Cache-Control': 'public, max-age=60'}), _aceita('gzip'))
+        privada = _resposta(**{'Cache-Control': 'private, no-cache', 'ETag': '"xyz"'})
+        assert gzip.decompress(compressao.processar(privada, _aceita('gzip')).get_data()) == CORPO
+
+        stats = compressao.estatisticas()
+        assert stats['acertos_cache'] == 3
+        assert stats['itens_cache'] == 2
+
+    def test_etag_por_codificacao(self):
+        compressao = Compressao()
+        etags = {}
+        for codificacao in ('br', 'gzip', None):
+            response = _resposta()
+            response.set_etag('abc')
+            compressao.processar(response, _aceita(codificacao) if codificacao else _aceita())
+            etags[codificacao] = response.headers['ETag']
+        assert etags == {'br': '"abc-br"', 'gzip': '"abc-gzip"', None: '"abc"'}
+
+        # Em stream também; a fraca fica como está
+        response = compressao.processar(_resposta(CORPO * 2000, ETag='"abc"'), _aceita('gzip'))
+        assert response.is_streamed and response.headers['ETag'] == '"abc-gzip"'
+        response = compressao.processar(_resposta(ETag='W/"abc"'), _aceita('gzip'))
+        assert response.headers['ETag'] == 'W/"abc"'
+
+        assert etag_correspondente(parse_etags('"abc-br"'), 'abc') == 'abc-br'
+        assert etag_correspondente(parse_etags('"x", W/"abc"'), 'abc') == 'abc'
+        assert etag_correspondente(parse_etags('"abc-zstd", "abcd"'), 'abc') is None
+
+    def test_limite_do_cache(self):
+        compressao = Compressao()
+        tamanho = len(gzip.compress(CORPO, 9, mtime=0))
+        compressao.cache_max_bytes = tamanho * 2
+        for etag in ('a', 'b', 'c'):
+            response = _resposta()
+            response.set_etag(etag)
+            compressao.processar(response, _aceita('gzip'))
+        assert compressao.estatisticas()['itens_cache'] == 2
+
+
+@pytest.fixture
+def sem_minimo():
+    compressao = modulo_app.compressao
+    minimo = compressao.minimo
+    compressao.minimo = 1
+    yield compressao
+    compressao.minimo = minimo
+
+
+class TestCompressaoNoApp:
+    """Middleware registrado no app Flask"""
+
+    def test_rotas(self, client, sem_minimo):
+        esperado = client.get('/meditacoes').get_json()
+        response = client.get('/meditacoes', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.data)) == esperado
+
+        acertos = sem_minimo.estatisticas()['acertos_cache']
+        response = client.get('/meditacoes', headers={'Accept-Encoding': 'gzip'})
+        assert json.loads(gzip.decompress(response.data)) == esperado
+        assert sem_minimo.estatisticas()['acertos_cache'] == acertos + 1
+
+        etag = response.headers['ETag']
+        assert etag.endswith('-gzip"') and etag != client.get('/meditacoes').headers['ETag']
+        response = client.get('/meditacoes', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304 and 'Content-Encoding' not in response.headers
+        assert response.headers['ETag'] == etag
+
+        assert 'compressao' in client.get('/health').get_json()
@@ -0,0 +1,295 @@
+"""Testes do pool de conexões"""
+import threading
+import time
+
+import pytest
+from psycopg2 import errors, extensions
+
+import conexao
+from conexao import PoolConexoes, PoolEsgotadoError
+
+
+@pytest.fixture
+def pool():
+    """Pool pequeno para exercitar saturação"""
+    p = PoolConexoes(
+        1, 2,
+        timeout=0.2,
+        vida_maxima=60,
+        ociosidade_maxima=60,
+        intervalo_verificacao=0,
+        **conexao._parametros_conexao()
+    )
+    yield p
+    p.fechar()
+
+
+class TestPoolConexoes:
+    """Testes para o PoolConexoes"""
+
+    def test_dimensionar_desconta_as_escutas(self, monkeypatch):
+        """Cada worker tem suas conexões LISTEN fora do pool: saem da fatia dele"""
+        for chave, valor in [('DB_POOL_MAX', 0), ('DB_MAX_CONNECTIONS', 30), ('DB_RESERVED_CONNECTIONS', 10),
+                             ('WEB_CONCURRENCY', 4), ('GUNICORN_THREADS', 8),
+                             ('CATALOGO_CACHE_LISTEN', True), ('USUARIO_CACHE_LISTEN', True)]:
+            monkeypatch.setattr(conexao.Config, chave, valor)
+        assert conexao.conexoes_escuta() == 2
+        assert conexao.dimensionar_pool()[1] == 3  # 20 // 4 - 2
+        monkeypatch.setattr(conexao.Config, 'CATALOGO_CACHE_LISTEN', False)
+        monkeypatch.setattr(conexao.Config, 'USUARIO_CACHE_LISTEN', False)
+        assert conexao.dimensionar_pool()[1] == 5
+
+    def test_reutiliza_conexao(self, pool):
+        """Conexão devolvida é entregue de novo"""
+        conn = pool.obter()
+        pool.devolver(conn)
+        assert pool.obter() is conn
+
+    def test_esgotado_levanta_erro_e_conta(self, pool):
+        """Sem vagas, espera até o timeout e registra o esgotamento"""
+        pool.obter()
+        pool.obter()
+
+        with pytest.raises(PoolEsgotadoError):
+            pool.obter()
+
+        stats = pool.estatisticas()
+        assert stats['esgotamentos'] == 1
+        assert stats['esperas'] == 1
+        assert stats['saturado'] is True
+
+    def test_espera_conexao_devolvida(self, pool):
+        """Uma thread esperando recebe a conexão devolvida por outra"""
+        a = pool.obter()
+        pool.obter()
+        threading.Timer(0.05, pool.devolver, args=(a,)).start()
+
+        assert pool.obter() is a
+        assert pool.estatisticas()['tempo_espera_total_ms'] > 0
+
+    def test_recupera_conexao_fechada_fora_do_pool(self, pool):
+        """Conexão fechada sem liberar_conexao não vaza a vaga"""
+        conn = pool.obter()
+        pool.obter()
+        conn.close()
+
+        nova = pool.obter()
+        assert not nova.closed
+        assert pool.estatisticas()['vazamentos_recuperados'] == 1
+
+    def test_devolver_desfaz_transacao_aberta(self, pool):
+        """Transação esquecida é revertida na devolução"""
+        conn = pool.obter()
+        conn.cursor().execute("SELECT 1")
+        assert conn.info.transaction_status == extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.devolver(conn)
+        assert conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+
+    def test_descarta_conexao_quebrada(self, pool):
+        """Conexão que falha na verificação é trocada por uma nova"""
+        conn = pool.obter()
+        pool.devolver(conn)
+        conn.close()
+
+        nova = pool.obter()
+        assert nova is not conn
+        assert pool.estatisticas()['conexoes_descartadas'] == 1
+
+    def test_poda_fecha_fora_do_lock(self, monkeypatch):
+        """Conexões ociosas demais saem do pool com o lock e são fechadas depois de soltá-lo"""
+        class _ConexaoFalsa:
+            closed = False
+
+            def __init__(self, devolvida_em):
+                self.criada_em = self.devolvida_em = devolvida_em
+                self.vida_maxima = 600
+
+        p = PoolConexoes(0, 3, timeout=0.2, vida_maxima=600, ociosidade_maxima=30, intervalo_verificacao=60)
+        agora = time.monotonic()
+        velha, quente = _ConexaoFalsa(agora - 60), _ConexaoFalsa(agora)
+        p._livres, p._total = [velha, quente], 2
+
+        fechadas = []
+
+        def fechar(conn):
+            livre = p._cond.acquire(blocking=False)
+            if livre:
+                p._cond.release()
+            fechadas.append((conn, livre))
+
+        monkeypatch.setattr(p, '_fechar_silenciosamente', fechar)
+        assert p.obter() is quente
+        assert fechadas == [(velha, True)]
+        assert p.estatisticas()['conexoes_descartadas'] == 1
+
+
+class TestUnidadeDeTrabalho:
+    """Testes para unidade_de_trabalho/transacao"""
+
+    def test_chamadas_compartilham_conexao(self):
+        """Dentro da unidade, todas as transações usam a mesma conexão"""
+        with conexao.unidade_de_trabalho():
+            with conexao.transacao() as primeira:
+                pass
+            with conexao.transacao() as segunda:
+                pass
+        assert primeira is segunda
+
+    def test_rollback_quando_falha(self):
+        """Exceção dentro da unidade desfaz tudo o que foi escrito"""
+        with pytest.raises(RuntimeError):
+            with conexao.unidade_de_trabalho():
+                with conexao.obter_cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO meditacoes (titulo) VALUES ('uow-rollback') RETURNING id"
+                    )
+                raise RuntimeError("falha simulada")
+
+        with conexao.obter_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM meditacoes WHERE titulo = 'uow-rollback'")
+            assert cursor.fetchone()[0] == 0
+
+    def test_apos_commit(self):
+        """Ações pós-commit esperam o fim da unidade e somem no rollback"""
+        chamadas = []
+        with conexao.unidade_de_trabalho():
+            with conexao.obter_cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conexao.apos_commit(lambda: chamadas.append('confirmada'))
+            assert chamadas == []
+        assert chamadas == ['confirmada']
+
+        with pytest.raises(RuntimeError):
+            with conexao.unidade_de_trabalho():
+                with conexao.obter_cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conexao.apos_commit(lambda: chamadas.append('desfeita'))
+                raise RuntimeError("falha simulada")
+        assert chamadas == ['confirmada']
+
+        conexao.apos_commit(lambda: chamadas.append('sem unidade'))
+        assert chamadas == ['confirmada', 'sem unidade']
+
+    def test_requisicao_usa_uma_conexao(self, app):
+        """Uma requisição Flask retira no máximo uma conexão do pool"""
+        with app.test_request_context('/'):
+            with conexao.transacao() as primeira:
+                pass
+            with conexao.transacao() as segunda:
+                pass
+            assert primeira is segunda
+
+
+class TestComandosPreparados:
+    """Testes para executar_preparado"""
+
+    def test_prepara_uma_vez_por_conexao(self, pool):
+        """Segunda execução na mesma conexão só faz EXECUTE"""
+        conn = pool.obter()
+        cursor = conn.cursor()
+        antes = conexao.estatisticas_preparados().get('teste_soma', {'preparos': 0, 'reusos': 0})
+
+        conexao.executar_preparado(cursor, 'teste_soma', "SELECT $1::int + $2::int", (1, 2))
+        assert cursor.fetchone()[0] == 3
+        conexao.executar_preparado(cursor, 'teste_soma', "SELECT $1::int + $2::int", (5, 5))
+        assert cursor.fetchone()[0] == 10
+
+        depois = conexao.estatisticas_preparados()['teste_soma']
+        assert depois['preparos'] - antes['preparos'] == 1
+        assert depois['reusos'] - antes['reusos'] == 1
+        assert 'teste_soma' in conn.preparados
+
+    def test_prepara_de_novo_apos_mudanca_de_esquema(self, pool):
+        """Plano incompatível após ALTER TABLE é refeito de forma transparente"""
+        conn = pool.obter()
+        cursor = conn.cursor()
+        cursor.execute("CREATE TABLE IF NOT EXISTS teste_preparado (id int)")
+        conn.commit()
+        try:
+            conexao.executar_preparado(cursor, 'teste_esquema', "SELECT * FROM teste_preparado", ())
+            conn.commit()
+            cursor.execute("ALTER TABLE teste_preparado ADD COLUMN nome text")
+            conn.commit()
+
+            conexao.executar_preparado(cursor, 'teste_esquema', "SELECT * FROM teste_preparado", ())
+            assert [col.name for col in cursor.description] == ['id', 'nome']
+        finally:
+            conn.rollback()
+            cursor.execute("DROP TABLE teste_preparado")
+            conn.commit()
+
+    def test_plano_obsoleto_dentro_da_transacao_nao_estraga_a_conexao(self, pool):
+        """0A000 com a transação em curso sobe, e a próxima chamada na conexão funciona"""
+        conn = pool.obter()
+        cursor = conn.cursor()
+        cursor.execute("CREATE TABLE IF NOT EXISTS teste_preparado (id int)")
+        conn.commit()
+        try:
+            conexao.executar_preparado(cursor, 'teste_esquema', "SELECT * FROM teste_preparado", ())
+            conexao.executar_preparado(cursor, 'teste_outro', "SELECT $1::int", (1,))
+            conn.commit()
+            cursor.execute("ALTER TABLE teste_preparado ADD COLUMN nome text")
+            conn.commit()
+
+            cursor.execute("SELECT 1")  # como uma unidade de trabalho que já consultou antes
+            with pytest.raises(errors.FeatureNotSupported):
+                conexao.executar_preparado(cursor, 'teste_esquema', "SELECT * FROM teste_preparado", ())
+            conn.rollback()
+
+            conexao.executar_preparado(cursor, 'teste_esquema', "SELECT * FROM teste_preparado", ())
+            assert [col.name for col in cursor.description] == ['id', 'nome']
+            conexao.executar_preparado(cursor, 'teste_outro', "SELECT $1::int", (2,))
+            assert cursor.fetchone()[0] == 2
+        finally:
+            conn.rollback()
+            cursor.execute("DROP TABLE teste_preparado")
+            conn.commit()
+
+    def test_invalidar_preparados(self, pool):
+        """invalidar_preparados força um novo PREPARE"""
+        conn = pool.obter()
+        cursor = conn.cursor()
+        conexao.executar_preparado(cursor, 'teste_invalidar', "SELECT 1", ())
+        conexao.invalidar_preparados()
+        conexao.executar_preparado(cursor, 'teste_invalidar', "SELECT 1", ())
+
+        assert conexao.estatisticas_preparados()['teste_invalidar']['preparos'] >= 2
+
+
+class TestMedicaoSql:
+    """Testes para a medição de SQL por requisição"""
+
+    def test_conta_tempo_e_repeticoes(self):
+        medicao = conexao.MedicaoSql()
+        medicao.registrar("SELECT 1", 2.0)
+        medicao.registrar("SELECT 1", 1.0)
+        medicao.registrar("SELECT 2", 5.0)
+
+        assert medicao.consultas == 3
+        assert medicao.tempo_ms == 8.0
+        assert (medicao.mais_lenta_ms, medicao.mais_lenta_sql) == (5.0, "SELECT 2")
+        assert medicao.mais_repetida() == ("SELECT 1", 2)
+        assert medicao.server_timing() == 'db;dur=8.00;desc="3 consultas", db-lenta;dur=5.00'
+
+    def test_fora_de_requisicao_nao_mede(self):
+        with conexao.obter_cursor() as cursor:
+            cursor.execute("SELECT 1")
+            assert isinstance(cursor, conexao.CursorMedido)
+        assert conexao.medicao_atual() is None
+
+    def test_server_timing_na_resposta(self, client):
+        response = client.get('/meditacoes')
+        cabecalho = response.headers['Server-Timing']
+        assert 'consultas"' in cabecalho and 'db-lenta;dur=' in cabecalho and 'total;dur=' in cabecalho
+        assert conexao.medicao_atual() is None
+
+    def test_aviso_acima_do_orcamento(self, app, client, caplog, monkeypatch):
+        """/register faz mais de uma consulta: com orçamento 1 gera aviso com o comando mais lento"""
+        monkeypatch.setitem(app.config, 'DB_QUERY_BUDGET', 1)
+        email = f"orcamento-{threading.get_ident()}@calmou.dev"
+        client.post('/register', json={'nome': 'Orçamento', 'email': email, 'password': 'senha12345'})
+
+        avisos = [r.getMessage() for r in caplog.records if 'orçamento 1' in r.getMessage()]
+        assert len(avisos) == 1
+        assert avisos[0].startswith('⚠️  POST /register: ') and 'mais lenta' in avisos[0]
@@ -0,0 +1,62 @@
+"""Testes do gerador de dados sintéticos (sem banco: só as linhas do COPY)"""
+import datetime
+import json
+
+import dados_sinteticos as ds
+
+ATE = datetime.date(2026, 1, 31)
+
+
+def _opcoes(**extras):
+    return dict(ds.PADROES, usuarios=2000, dias=60, ate=ATE, **extras)
+
+
+def _linhas(gerador, **extras):
+    opcoes = _opcoes(**extras)
+    return [linha.split('\t') for linha in gerador(opcoes, ds._Calendario(opcoes))]
+
+
+class TestDadosSinteticos:
+    """Testes para dados_sinteticos.py"""
+
+    def test_cpf_valido_e_unico(self):
+        assert ds.cpf_usuario(1) == '000.000.001-91'
+        assert ds.cpf_usuario(123456789) == '123.456.789-09'
+        assert len({ds.cpf_usuario(i) for i in range(1, 5000)}) == 4999
+
+    def test_mesma_semente_mesmos_dados(self):
+        assert _linhas(ds._historico) == _linhas(ds._historico)
+        assert _linhas(ds._historico) != _linhas(ds._historico, semente=7)
+
+    def test_volume_e_periodo(self):
+        """Total = média x usuários; eventos só no período e depois do cadastro"""
+        historico = _linhas(ds._historico)
+        assert len(historico) == 2000 * ds.PADROES['historico']
+
+        cadastros = {int(u[0]): u[5][:10] for u in _linhas(ds._usuarios)}
+        inicio = (ATE - datetime.timedelta(days=59)).isoformat()
+        for _, usuario_id, _, instante, _ in historico:
+            assert inicio <= instante[:10] <= ATE.isoformat()
+            assert instante[:10] >= cadastros[int(usuario_id)]
+
+    def test_atividade_concentrada(self):
+        """Lei de potência: os 10% mais ativos fazem bem mais que 10% dos registros"""
+        contagem = {}
+        for linha in _linhas(ds._historico):
+            contagem[linha[1]] = contagem.get(linha[1], 0) + 1
+        ordenado = sorted(contagem.values(), reverse=True)
+        assert sum(ordenado[:200]) > 0.25 * sum(ordenado)
+
+    def test_sazonalidade_diaria(self):
+        perfil = [0] * 24
+        perfil[21] = 1
+        horas = {linha[5][11:13] for linha in _linhas(ds._humor, perfil_horario=perfil)}
+        assert horas == {'21'}
+
+    def test_respostas_jsonb(self):
+        """Respostas no formato do questionário e score = soma"""
+        for linha in _linhas(ds._avaliacoes)[:200]:
+            respostas = json.loads(linha[3])
+            assert linha[2] in ds._QUESTIONARIOS
+            assert len(respostas) == ds._QUESTIONARIOS[linha[2]][1]
+            assert int(linha[4]) == sum(respostas.values())
@@ -0,0 +1,152 @@
+"""Testes do resumo das estatísticas de meditação (usuario_estatisticas_meditacao)"""
+import datetime
+
+import psycopg2
+import pytest
+
+import conexao
+from controller import controller_usuario as c
+from migrations import estatisticas_meditacao
+from model.meditacao import Meditacao
+
+HOJE = datetime.date(2026, 10, 18)
+
+
+def _sessao(dia, hora=12):
+    return datetime.datetime.combine(dia, datetime.time(hora), tzinfo=datetime.timezone.utc)
+
+
+def _somar(*sessoes):
+    resumo = c._resumo_vazio()
+    for dia, categoria in sessoes:
+        resumo = c._somar_sessao(resumo, categoria, 10, _sessao(dia), dia)
+    return resumo
+
+
+class TestResumoIncremental:
+    """Testes de _somar_sessao e _estatisticas_do_resumo (sem banco)"""
+
+    def test_sequencias(self):
+        dias = [HOJE - datetime.timedelta(days=n) for n in (9, 8, 7, 3, 2, 2, 1, 0)]
+        resumo = _somar(*[(dia, 'sono') for dia in dias])
+
+        assert resumo['total_sessoes'] == 8 and resumo['total_minutos'] == 80
+        assert resumo['sequencia'] == 4  # de HOJE-3 até HOJE
+        assert resumo['maior_sequencia'] == 4
+        assert resumo['dias_recentes'] == 0b1110001111
+
+    def test_sessao_fora_de_ordem_pede_recalculo(self):
+        resumo = _somar((HOJE, 'sono'))
+        ontem = HOJE - datetime.timedelta(days=1)
+        assert c._somar_sessao(resumo, 'sono', 10, _sessao(ontem), ontem) is None
+
+    def test_resposta(self):
+        resumo = _somar((HOJE - datetime.timedelta(days=10), 'foco'), (HOJE - datetime.timedelta(days=7), 'sono'),
+                        (HOJE - datetime.timedelta(days=2), 'foco'), (HOJE - datetime.timedelta(days=1), 'sono'),
+                        (HOJE - datetime.timedelta(days=1), None))
+
+        estatisticas = c._estatisticas_do_resumo(resumo, HOJE)
+        assert estatisticas['total_meditacoes'] == 5
+        assert estatisticas['categoria_favorita'] == 'foco'  # empate com 'sono': nome menor
+        assert estatisticas['meditacoes_por_categoria'] == {'foco': 2, 'sono': 2, None: 1}
+        # Mesma janela da consulta antiga: HOJE-7 até HOJE
+        assert estatisticas['dias_ativos_ultima_semana'] == 3
+        assert estatisticas['dias_consecutivos_ultima_semana'] == 3
+        assert estatisticas['sequencia_atual_dias'] == 2
+        assert estatisticas['maior_sequencia_dias'] == 2
+
+        # Dois dias depois a sequência acabou e a semana perdeu os dias antigos
+        depois = c._estatisticas_do_resumo(resumo, HOJE + datetime.timedelta(days=2))
+        assert depois['sequencia_atual_dias'] == 0
+        assert depois['dias_ativos_ultima_semana'] == 2
+
+    def test_sem_sessoes(self):
+        estatisticas = c._estatisticas_do_resumo(c._resumo_vazio(), None)
+        assert estatisticas['total_meditacoes'] == 0
+        assert estatisticas['categoria_favorita'] is None
+        assert estatisticas['ultima_meditacao'] is None
+
+
+@pytest.fixture
+def meditacao_id():
+    c.inserir_meditacao(Meditacao(None, 'Meditação do resumo', 'desc', 10, None, 'guiada', 'sono', None))
+    meditacao = next(m for m in c.listar_meditacoes() if m.titulo == 'Meditação do resumo')
+    yield meditacao.id
+    with conexao.obter_cursor() as cursor:
+        cursor.execute("DELETE FROM historico_meditacoes WHERE meditacao_id = %s", (meditacao.id,))
+        cursor.execute("DELETE FROM meditacoes WHERE id = %s", (meditacao.id,))
+
+
+@pytest.fixture
+def usuario(novo_usuario):
+    return novo_usuario('resumo', 'Usuário Resumo')
+
+
+def _executar(sql, params=()):
+    """SQL em outra conexão, confirmado na hora (o contexto de teste só confirma no fim de cada requisição)"""
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            resultado = cursor.fetchall() if cursor.description else None
+        conn.commit()
+        return resultado
+    finally:
+        conn.close()
+
+
+def _divergentes():
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        with conn.cursor() as cursor:
+            return c.verificar_estatisticas_meditacao(cursor)
+    finally:
+        conn.close()
+
+
+class TestResumoNoBanco:
+    """Manutenção do resumo pelas escritas do histórico"""
+
+    def test_escritas_mantem_o_resumo(self, client, meditacao_id, usuario):
+        uid, headers = usuario
+        # Histórico antigo, gravado por fora do controller
+        _executar("""
+            INSERT INTO historico_meditacoes (usuario_id, meditacao_id, data_conclusao, duracao_real_minutos)
+            SELECT %s, %s, CURRENT_DATE - n, 15 FROM generate_series(1, 3) AS n
+        """, (uid, meditacao_id))
+        assert uid in _divergentes()
+
+        ids = []
+        for _ in range(2):
+            response = client.post('/meditacoes/historico', headers=headers, json={
+                'usuario_id': uid, 'meditacao_id': meditacao_id, 'duracao_real_minutos': 10})
+            assert response.status_code == 201
+            ids.append(response.get_json()['historico']['id'])
+        assert uid not in _divergentes()
+
+        estatisticas = client.get('/meditacoes/estatisticas', headers=headers).get_json()
+        assert estatisticas['total_meditacoes'] == 5
+        assert estatisticas['total_minutos'] == 65
+        assert estatisticas['categoria_favorita'] == 'sono'
+        assert estatisticas['sequencia_atual_dias'] == 4
+        assert estatisticas['dias_ativos_ultima_semana'] == 4
+
+        assert client.delete(f"/meditacoes/historico/{ids[0]}", headers=headers).status_code == 200
+        assert uid not in _divergentes()
+        assert client.get('/meditacoes/estatisticas', headers=headers).get_json()['total_meditacoes'] == 4
+
+    def test_comando_corrige_e_reconstroi(self, meditacao_id, usuario, capsys):
+        uid, _ = usuario
+        _executar("INSERT INTO historico_meditacoes (usuario_id, meditacao_id, duracao_real_minutos) "
+                  "VALUES (%s, %s, 10)", (uid, meditacao_id))
+
+        with pytest.raises(SystemExit):
+            estatisticas_meditacao.main([])
+        assert str(uid) in capsys.readouterr().out
+
+        estatisticas_meditacao.main(['--corrigir'])
+        assert _divergentes() == []
+        assert c.obter_estatisticas_meditacoes(uid)['total_meditacoes'] == 1
+
+        estatisticas_meditacao.main(['--reconstruir'])
+        assert _divergentes() == []
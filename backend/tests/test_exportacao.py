@@ -0,0 +1,155 @@
+"""Testes de GET /usuarios/<id>/exportar e do exportacao.py"""
+import csv
+import io
+import json
+import zipfile
+from datetime import datetime, timezone
+
+import psycopg2
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import conexao
+import exportacao
+from controller import controller_usuario as c
+from middleware import auth_asgi
+
+
+@pytest.fixture
+def usuario(novo_usuario):
+    """Usuário com 3 humores, 2 sessões, 1 avaliação, 4 notificações e nenhum endereço."""
+    usuario_id, cabecalho = novo_usuario('exporta', 'Exporta')
+    # Conexão própria: commit visível para o gerador (que lê fora da requisição) e para o ASGI
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO meditacoes (titulo, categoria) VALUES ('Exportação', 'foco') RETURNING id")
+            meditacao_id = cursor.fetchone()[0]
+            for nivel in (2, 4, 5):
+                cursor.execute("INSERT INTO classificacoes_humor (usuario_id, nivel_humor, sentimento_principal, notas)"
+                               " VALUES (%s, %s, 'Calmo', 'linha 1\nlinha, 2')", (usuario_id, nivel))
+            for minutos in (5, 10):
+                cursor.execute("INSERT INTO historico_meditacoes (usuario_id, meditacao_id, duracao_real_minutos)"
+                               " VALUES (%s, %s, %s)", (usuario_id, meditacao_id, minutos))
+            cursor.execute("INSERT INTO resultados_avaliacoes (usuario_id, tipo, respostas, resultado_score)"
+                           " VALUES (%s, (enum_range(NULL::tipo_avaliacao))[1], '{\"q1\": 3}', 9)", (usuario_id,))
+            for i in range(4):
+                cursor.execute("INSERT INTO notificacoes (usuario_id, titulo, lida) VALUES (%s, %s, %s)",
+                               (usuario_id, f"Aviso {i}", i % 2 == 0))
+        conn.commit()
+        yield usuario_id, cabecalho
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            # O usuário sai depois (novo_usuario); as sessões dele prendem a meditação
+            cursor.execute("DELETE FROM historico_meditacoes WHERE usuario_id = %s", (usuario_id,))
+            cursor.execute("DELETE FROM meditacoes WHERE titulo = 'Exportação'")
+        conn.commit()
+        conn.close()
+
+
+def _ndjson(corpo):
+    linhas = [json.loads(linha) for linha in corpo.decode('utf-8').splitlines()]
+    secoes = {}
+    for linha in linhas:
+        secoes.setdefault(linha['secao'], []).append(linha['dados'])
+    return linhas, secoes
+
+
+class TestExportacao:
+    """GET /usuarios/<id>/exportar"""
+
+    def test_ndjson(self, client, usuario):
+        usuario_id, cabecalho = usuario
+        response = client.get(f'/usuarios/{usuario_id}/exportar', headers=cabecalho)
+        assert response.status_code == 200 and response.is_streamed
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.headers['Cache-Control'] == 'no-store'
+        assert f'calmou-dados-{usuario_id}-' in response.headers['Content-Disposition']
+
+        linhas, secoes = _ndjson(response.get_data())
+        assert [linha['secao'] for linha in linhas][:1] == ['perfil']
+        assert {secao: len(itens) for secao, itens in secoes.items()} == {
+            'perfil': 1, 'classificacoes_humor': 3, 'historico_meditacoes': 2,
+            'resultados_avaliacoes': 1, 'notificacoes': 4}
+        perfil = secoes['perfil'][0]
+        assert perfil['id'] == usuario_id and 'password_hash' not in perfil
+        assert datetime.fromisoformat(secoes['historico_meditacoes'][0]['data_conclusao'])
+        assert secoes['resultados_avaliacoes'][0]['respostas'] == {'q1': 3}
+        assert [n['id'] for n in secoes['notificacoes']] == sorted(n['id'] for n in secoes['notificacoes'])
+
+    def test_csv_zip(self, client, usuario):
+        usuario_id, cabecalho = usuario
+        response = client.get(f'/usuarios/{usuario_id}/exportar?formato=csv', headers=cabecalho)
+        assert response.status_code == 200 and response.mimetype == 'application/zip'
+        assert response.headers['Content-Disposition'].endswith('.zip"')
+
+        with zipfile.ZipFile(io.BytesIO(response.get_data())) as arquivo:
+            assert arquivo.testzip() is None
+            assert arquivo.namelist() == [f"{secao}.csv" for secao, *_ in c.SECOES_EXPORTACAO]
+            tabelas = {nome: list(csv.reader(io.StringIO(arquivo.read(nome).decode('utf-8'))))
+                       for nome in arquivo.namelist()}
+        assert tabelas['enderecos.csv'] == [list(c.SECOES_EXPORTACAO[1][3])]  # só o cabeçalho
+        humor = tabelas['classificacoes_humor.csv']
+        assert len(humor) == 4 and humor[1][3] == 'linha 1\nlinha, 2'
+        notificacoes = tabelas['notificacoes.csv']
+        assert [linha[4] for linha in notificacoes[1:]] == ['true', 'false', 'true', 'false']
+        assert json.loads(tabelas['resultados_avaliacoes.csv'][1][2]) == {'q1': 3}
+
+    def test_acesso_e_formato(self, client, usuario):
+        usuario_id, cabecalho = usuario
+        assert client.get(f'/usuarios/{usuario_id}/exportar').status_code == 401
+        assert client.get(f'/usuarios/{usuario_id + 1}/exportar', headers=cabecalho).status_code == 403
+        response = client.get(f'/usuarios/{usuario_id}/exportar?formato=xml', headers=cabecalho)
+        assert response.status_code == 400 and 'ndjson' in response.get_json()['mensagem']
+
+    def test_asgi_igual_ao_flask(self, app, client, usuario, monkeypatch):
+        usuario_id, cabecalho = usuario
+        monkeypatch.setattr(auth_asgi.config, 'JWT_SECRET_KEY', app.config['JWT_SECRET_KEY'])
+        with TestClient(asgi.app) as asgi_client:
+            obtido = asgi_client.get(f'/usuarios/{usuario_id}/exportar', headers=cabecalho)
+            esperado = client.get(f'/usuarios/{usuario_id}/exportar', headers=cabecalho)
+            assert obtido.headers['content-type'].startswith('application/x-ndjson')
+            assert _ndjson(obtido.content)[0] == _ndjson(esperado.get_data())[0]
+
+            obtido = asgi_client.get(f'/usuarios/{usuario_id}/exportar?formato=csv', headers=cabecalho)
+            with zipfile.ZipFile(io.BytesIO(obtido.content)) as arquivo:
+                assert len(arquivo.read('notificacoes.csv').splitlines()) == 5
+            assert asgi_client.get(f'/usuarios/{usuario_id}/exportar?formato=xml',
+                                   headers=cabecalho).status_code == 400
+
+
+class TestGerar:
+    """Testes para exportacao.gerar (sem banco)"""
+
+    def _secoes(self, lidas, total):
+        def linhas():
+            for i in range(total):
+                lidas.append(i)
+                yield (i, f"nome {i}", datetime(2026, 1, 1, tzinfo=timezone.utc), None)
+        yield 'grande', ('id', 'nome', 'data', 'vazio'), linhas()
+        yield 'vazia', ('id',), iter(())
+
+    @pytest.mark.parametrize('formato', ['ndjson', 'csv'])
+    def test_em_blocos_sob_demanda(self, formato):
+        lidas = []
+        blocos = exportacao.gerar(formato, self._secoes(lidas, 50000))
+        primeiro = next(blocos)
+        # O primeiro bloco sai antes de as linhas acabarem de ser lidas
+        assert exportacao.BLOCO <= len(primeiro) < 2 * exportacao.BLOCO and len(lidas) < 50000
+        resto = list(blocos)
+        assert len(lidas) == 50000 and all(len(bloco) < 2 * exportacao.BLOCO for bloco in resto)
+
+        corpo = primeiro + b''.join(resto)
+        if formato == 'csv':
+            with zipfile.ZipFile(io.BytesIO(corpo)) as arquivo:
+                assert len(arquivo.read('grande.csv').splitlines()) == 50001
+                assert arquivo.read('vazia.csv') == b'id\r\n'
+        else:
+            assert corpo.count(b'\n') == 50000
+
+    def test_nome_arquivo(self):
+        assert exportacao.nome_arquivo(7, 'csv', datetime(2026, 10, 18).date()) == 'calmou-dados-7-2026-10-18.zip'
+        with pytest.raises(ValueError):
+            exportacao.tipo_e_extensao('xml')
@@ -0,0 +1,118 @@
+"""Testes de GET /meditacoes/historico paginado por cursor (migração 006)"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import conexao
+from controller import controller_usuario as c
+from middleware import auth_asgi
+from model.meditacao import Meditacao
+
+INICIO = datetime(2026, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+
+class TestCursor:
+    """Testes das funções puras da paginação"""
+
+    def test_ida_e_volta(self):
+        data = datetime(2026, 10, 18, 9, 30, 5, 123, tzinfo=timezone(timedelta(hours=-3)))
+        cursor = c.codificar_cursor_historico(data, 42)
+        assert '|' not in cursor and '=' not in cursor
+        assert c.decodificar_cursor_historico(cursor) == (data.isoformat(), 42)
+        assert c.decodificar_cursor_historico(c.codificar_cursor_historico(None, 7)) == ('-infinity', 7)
+
+    def test_invalidos(self):
+        for cursor in ['nao-e-cursor', c.codificar_cursor_historico(INICIO, 1)[:-3], '////']:
+            with pytest.raises(ValueError):
+                c.decodificar_cursor_historico(cursor)
+
+    def test_parametros(self, monkeypatch):
+        monkeypatch.setattr(c.Config, 'HISTORICO_PAGINA_PADRAO', 50)
+        monkeypatch.setattr(c.Config, 'HISTORICO_PAGINA_MAX', 200)
+        assert c.parametros_pagina_historico(None, None) == (50, True)
+        assert c.parametros_pagina_historico('10', 'false') == (10, False)
+        assert c.parametros_pagina_historico('5000', 'true') == (200, True)
+        for tamanho in ('0', '-3', 'dez'):
+            with pytest.raises(ValueError):
+                c.parametros_pagina_historico(tamanho, None)
+
+
+@pytest.fixture
+def meditacao_id():
+    c.inserir_meditacao(Meditacao(None, 'Meditação paginada', 'desc', 10, None, 'guiada', 'Foco', None))
+    meditacao = next(m for m in c.listar_meditacoes() if m.titulo == 'Meditação paginada')
+    yield meditacao.id
+    with conexao.obter_cursor() as cursor:
+        cursor.execute("DELETE FROM historico_meditacoes WHERE meditacao_id = %s", (meditacao.id,))
+        cursor.execute("DELETE FROM meditacoes WHERE id = %s", (meditacao.id,))
+
+
+@pytest.fixture
+def usuario(client, novo_usuario, meditacao_id):
+    """Usuário com 26 sessões: 2 no mesmo instante, 2 sem data_conclusao."""
+    usuario_id, cabecalho = novo_usuario('keyset', 'Keyset')
+    with conexao.obter_cursor() as cursor:
+        datas = [INICIO + timedelta(hours=i) for i in range(21)] + [INICIO + timedelta(hours=5), None, None]
+        for data in datas + [INICIO + timedelta(days=30)]:
+            cursor.execute(
+                "INSERT INTO historico_meditacoes (usuario_id, meditacao_id, data_conclusao, duracao_real_minutos)"
+                " VALUES (%s, %s, %s, 10)", (usuario_id, meditacao_id, data))
+    # Uma pela API: cria a versão dos dados do usuário (ETag)
+    client.post('/meditacoes/historico', headers=cabecalho,
+                json={'usuario_id': usuario_id, 'meditacao_id': meditacao_id, 'duracao_real_minutos': 5})
+    return usuario_id, cabecalho
+
+
+class TestHistoricoPaginado:
+    """GET /meditacoes/historico?page_size=&cursor="""
+
+    def test_percorre_tudo_na_ordem(self, client, usuario, todas_as_paginas):
+        usuario_id, cabecalho = usuario
+        completo = client.get('/meditacoes/historico', headers=cabecalho).get_json()
+        assert len(completo) == 26
+
+        paginas = todas_as_paginas(client, cabecalho, '/meditacoes/historico', 'page_size=7')
+        assert [len(p) for p in paginas] == [7, 7, 7, 5]
+        itens = [item for pagina in paginas for item in pagina]
+        assert len({item['id'] for item in itens}) == 26
+
+        # Decrescente por (data_conclusao, id); sem data por último
+        chaves = [(item['data_conclusao'] or '', item['id']) for item in itens]
+        datadas = [chave for chave in chaves if chave[0]]
+        assert datadas == sorted(datadas, reverse=True)
+        assert [chave[0] for chave in chaves[-2:]] == ['', ''] and chaves[-2][1] > chaves[-1][1]
+        assert itens[0]['meditacao']['titulo']
+
+    def test_sem_meditacao_e_tamanho_maximo(self, client, usuario, monkeypatch):
+        _, cabecalho = usuario
+        monkeypatch.setattr(c.Config, 'HISTORICO_PAGINA_MAX', 10)
+        corpo = client.get('/meditacoes/historico?page_size=1000&incluir_meditacao=false',
+                           headers=cabecalho).get_json()
+        assert len(corpo['itens']) == 10 and corpo['next_cursor']
+        assert set(corpo['itens'][0]) == {'id', 'usuario_id', 'meditacao_id', 'data_conclusao',
+                                         'duracao_real_minutos'}
+
+    def test_etag_e_erros(self, client, usuario):
+        _, cabecalho = usuario
+        response = client.get('/meditacoes/historico?page_size=5', headers=cabecalho)
+        etag = response.headers['ETag']
+        assert client.get('/meditacoes/historico?page_size=5',
+                          headers={**cabecalho, 'If-None-Match': etag}).status_code == 304
+        cursor = response.get_json()['next_cursor']
+        assert client.get(f'/meditacoes/historico?page_size=5&cursor={cursor}',
+                          headers=cabecalho).headers['ETag'] != etag
+
+        for consulta in ('page_size=0', 'page_size=abc', 'cursor=xyz'):
+            response = client.get(f'/meditacoes/historico?{consulta}', headers=cabecalho)
+            assert response.status_code == 400 and response.get_json()['mensagem']
+
+    def test_asgi_igual_ao_flask(self, app, client, usuario, monkeypatch, todas_as_paginas):
+        _, cabecalho = usuario
+        monkeypatch.setattr(auth_asgi.config, 'JWT_SECRET_KEY', app.config['JWT_SECRET_KEY'])
+        with TestClient(asgi.app) as asgi_client:
+            for consulta in ('page_size=9', 'page_size=9&incluir_meditacao=false'):
+                assert todas_as_paginas(asgi_client, cabecalho, '/meditacoes/historico', consulta) == \
+                    todas_as_paginas(client, cabecalho, '/meditacoes/historico', consulta)
+            assert asgi_client.get('/meditacoes/historico?cursor=xyz', headers=cabecalho).status_code == 400
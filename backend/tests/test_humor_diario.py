@@ -0,0 +1,120 @@
+"""Testes do resumo diário de humor (migração 005) e de GET /humor/relatorio"""
+from datetime import date, timedelta
+
+import pytest
+
+import app as modulo_app
+import conexao
+from controller import controller_usuario as c
+
+
+def _linha(dia, registros, niveis, soma, minimo, maximo, sentimentos):
+    return (date.fromisoformat(dia), registros, niveis, soma, minimo, maximo, sentimentos)
+
+
+class TestAgregacao:
+    """Testes das funções puras do relatório"""
+
+    LINHAS = [
+        _linha('2026-03-30', 2, 2, 9, 4, 5, {'Calmo': 1, 'Ansioso': 1}),   # segunda
+        _linha('2026-04-01', 1, 1, 8, 8, 8, {'Ansioso': 1}),
+        _linha('2026-04-06', 1, 0, 0, None, None, {}),                     # sem nível
+    ]
+
+    def test_por_dia(self):
+        periodos = c._agregar_humor(self.LINHAS, 'dia')
+        assert [p['periodo'] for p in periodos] == ['2026-03-30', '2026-04-01', '2026-04-06']
+        assert periodos[0] == {'periodo': '2026-03-30', 'registros': 2, 'media': 4.5, 'minimo': 4,
+                               'maximo': 5, 'sentimento_dominante': 'Ansioso'}  # empate: nome menor
+        assert periodos[2]['media'] is None and periodos[2]['sentimento_dominante'] is None
+
+    def test_por_semana_e_mes(self):
+        semanas = c._agregar_humor(self.LINHAS, 'semana')
+        assert [(p['periodo'], p['registros']) for p in semanas] == [('2026-03-30', 3), ('2026-04-06', 1)]
+        assert semanas[0]['media'] == round(17 / 3, 2)
+        assert (semanas[0]['minimo'], semanas[0]['maximo']) == (4, 8)
+        assert semanas[0]['sentimento_dominante'] == 'Ansioso'
+
+        meses = c._agregar_humor(self.LINHAS, 'mes')
+        assert [(p['periodo'], p['registros']) for p in meses] == [('2026-03-01', 2), ('2026-04-01', 2)]
+
+    def test_periodo(self):
+        hoje = date(2026, 10, 18)
+        assert c.periodo_relatorio_humor(None, None, None, hoje) == (date(2026, 9, 19), hoje, 'dia')
+        assert c.periodo_relatorio_humor('2021-01-01', '2025-12-31', 'mes', hoje)[2] == 'mes'
+        for de, ate, granularidade in [(None, None, 'ano'), ('ontem', None, 'dia'),
+                                       ('2026-10-02', '2026-10-01', 'dia'), ('2025-01-01', '2026-10-01', 'dia')]:
+            with pytest.raises(ValueError):
+                c.periodo_relatorio_humor(de, ate, granularidade, hoje)
+
+
+@pytest.fixture
+def usuario(novo_usuario):
+    return novo_usuario('humor', 'Humor')
+
+
+class TestRelatorioHumor:
+    """Resumo mantido pelo INSERT e rota /humor/relatorio"""
+
+    def test_resumo_igual_ao_recalculado(self, client, usuario):
+        uid, headers = usuario
+        for nivel, sentimento in [(3, 'Ansioso'), (7, 'Calmo'), (8, 'Calmo'), (5, None)]:
+            corpo = {'usuario_id': uid, 'nivel_humor': nivel}
+            if sentimento:
+                corpo['sentimento_principal'] = sentimento
+            assert client.post('/humor', headers=headers, json=corpo).status_code == 201
+
+        with conexao.obter_cursor() as cursor:
+            cursor.execute("SELECT dia, registros, niveis, soma, minimo, maximo, sentimentos "
+                           "FROM humor_diario WHERE usuario_id = %s", (uid,))
+            mantido = cursor.fetchall()
+            cursor.execute(f"SELECT dia, registros, niveis, soma, minimo, maximo, sentimentos "
+                           f"FROM ({c._SQL_HUMOR_DIARIO_TODOS}) AS t "
+                           f"WHERE usuario_id = %s", (uid,))
+            recalculado = cursor.fetchall()
+        assert mantido == recalculado
+        assert mantido[0][1:6] == (4, 4, 23, 3, 8)
+        assert mantido[0][6] == {'Ansioso': 1, 'Calmo': 2}
+
+        response = client.get('/humor/relatorio?granularidade=mes', headers=headers)
+        assert response.status_code == 200
+        relatorio = response.get_json()
+        assert relatorio['granularidade'] == 'mes'
+        assert len(relatorio['periodos']) == 1
+        periodo = relatorio['periodos'][0]
+        assert (periodo['registros'], periodo['media'], periodo['sentimento_dominante']) == (4, 5.75, 'Calmo')
+
+    def test_parametros_e_etag(self, client, usuario):
+        uid, headers = usuario
+        client.post('/humor', headers=headers, json={'usuario_id': uid, 'nivel_humor': 4})
+
+        assert client.get('/humor/relatorio?granularidade=ano', headers=headers).status_code == 400
+        assert client.get('/humor/relatorio?de=2020-01-01&ate=2026-01-01', headers=headers).status_code == 400
+        assert client.get('/humor/relatorio').status_code == 401
+
+        rota = '/humor/relatorio?de=2020-01-01&ate=2020-12-31&granularidade=semana'
+        response = client.get(rota, headers=headers)
+        assert response.get_json() == {'de': '2020-01-01', 'ate': '2020-12-31',
+                                       'granularidade': 'semana', 'periodos': []}
+        etag = response.headers['ETag']
+        assert client.get(rota, headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+        client.post('/humor', headers=headers, json={'usuario_id': uid, 'nivel_humor': 6})
+        assert client.get(rota, headers={**headers, 'If-None-Match': etag}).status_code == 200
+
+    def test_hoje_vem_do_banco(self, client, usuario, monkeypatch):
+        """Sem `ate`, a janela termina no current_date do banco, não na data do servidor da API"""
+        _, headers = usuario
+
+        class _OutroFuso(date):
+            @classmethod
+            def today(cls):
+                return date.today() + timedelta(days=3)
+
+        monkeypatch.setattr(modulo_app, 'date', _OutroFuso)
+        with conexao.obter_cursor() as cursor:
+            cursor.execute("SELECT current_date")
+            hoje = cursor.fetchone()[0]
+        relatorio = client.get('/humor/relatorio', headers=headers).get_json()
+        assert relatorio['ate'] == hoje.isoformat()
+        assert relatorio['de'] == (hoje - timedelta(days=c.DIAS_PADRAO_RELATORIO_HUMOR - 1)).isoformat()
@@ -0,0 +1,151 @@
+"""Testes das variantes das imagens estáticas (imagens.py)"""
+import os
+
+import pytest
+from PIL import Image
+from starlette.testclient import TestClient
+
+import app as modulo_app
+import asgi
+import imagens
+from imagens import CACHE_IMUTAVEL, ImagensEstaticas, gerar_variantes
+
+TODOS = 'image/avif,image/webp,image/png,*/*'
+
+
+@pytest.fixture
+def pastas(tmp_path):
+    origem, destino = tmp_path / 'images', tmp_path / 'variantes'
+    origem.mkdir()
+    Image.new('RGB', (800, 400), (40, 90, 160)).save(origem / 'capa.png')
+    Image.new('RGBA', (200, 200), (0, 0, 0, 0)).save(origem / 'icone.png')
+    (origem / 'leia-me.txt').write_text('não é imagem')
+    return str(origem), str(destino)
+
+
+@pytest.fixture
+def preparadas(pastas):
+    origem, destino = pastas
+    gerar_variantes(origem, destino, (320, 640, 1024))
+    instancia = ImagensEstaticas(origem, destino, (320, 640, 1024), max_age=600)
+    instancia.carregar()
+    return instancia
+
+
+def _formatos(*extras):
+    return set(imagens.formatos_disponiveis()) | set(extras)
+
+
+class TestGeracao:
+    """Testes para gerar_variantes"""
+
+    def test_variantes(self, pastas):
+        origem, destino = pastas
+        manifesto = gerar_variantes(origem, destino, (320, 640, 1024))
+        assert set(manifesto) == {'capa.png', 'icone.png'}
+
+        capa = manifesto['capa.png']
+        assert {v['largura'] for v in capa['variantes']} == {320, 640, 800}  # sem ampliar
+        assert {v['formato'] for v in capa['variantes']} == _formatos('jpeg')
+        assert {v['formato'] for v in manifesto['icone.png']['variantes']} == _formatos('png')
+        for variante in capa['variantes']:
+            assert capa['hash'] in variante['arquivo']
+            with Image.open(os.path.join(destino, variante['arquivo'])) as gerada:
+                assert gerada.size == (variante['largura'], variante['altura'])
+
+    def test_so_gera_o_que_falta(self, pastas):
+        origem, destino = pastas
+        primeiro = gerar_variantes(origem, destino, (320,))
+        arquivo = os.path.join(destino, primeiro['capa.png']['variantes'][0]['arquivo'])
+        modificado = os.path.getmtime(arquivo)
+        assert gerar_variantes(origem, destino, (320,)) == primeiro
+        assert os.path.getmtime(arquivo) == modificado
+
+        # Original alterado: novo hash, novos arquivos; --limpar apaga os antigos
+        Image.new('RGB', (800, 400), (200, 30, 30)).save(os.path.join(origem, 'capa.png'))
+        segundo = gerar_variantes(origem, destino, (320,), limpar=True)
+        assert segundo['capa.png']['hash'] != primeiro['capa.png']['hash']
+        assert not os.path.exists(arquivo)
+
+
+class TestResolver:
+    """Testes para ImagensEstaticas.resolver"""
+
+    def test_negociacao_por_accept(self, preparadas):
+        caminho, cabecalhos = preparadas.resolver('capa.png', TODOS)
+        assert caminho.endswith('.800w.' + caminho.split('.')[-2] + '.avif')
+        assert cabecalhos['Vary'] == 'Accept' and cabecalhos['Cache-Control'] == 'public, max-age=600'
+        assert cabecalhos['Content-Location'] == os.path.basename(caminho)
+
+        assert preparadas.resolver('capa.png', 'image/webp,*/*')[0].endswith('.webp')
+        # */* sozinho não garante AVIF/WebP: vai o JPEG; transparência: PNG
+        assert preparadas.resolver('capa.png', '*/*')[0].endswith('.jpg')
+        assert preparadas.resolver('capa.png', 'image/avif;q=0, image/webp')[0].endswith('.webp')
+        assert preparadas.resolver('icone.png', None)[0].endswith('.png')
+
+    def test_largura(self, preparadas):
+        assert '.320w.' in preparadas.resolver('capa.png', TODOS, 100)[0]
+        assert '.640w.' in preparadas.resolver('capa.png', TODOS, 321)[0]
+        assert '.800w.' in preparadas.resolver('capa.png', TODOS, 5000)[0]
+        with pytest.raises(ValueError):
+            imagens.largura_pedida('0')
+        assert imagens.largura_pedida('') is None
+
+    def test_nome_com_hash_e_sem_variante(self, preparadas):
+        caminho, _ = preparadas.resolver('capa.png', TODOS, 320)
+        assert preparadas.resolver(os.path.basename(caminho)) == (caminho, {'Cache-Control': CACHE_IMUTAVEL})
+        assert preparadas.resolver('leia-me.txt') is None
+        assert preparadas.resolver('nova.png', TODOS) is None
+
+        stats = preparadas.estatisticas()
+        assert stats['imagens'] == 2 and stats['imutaveis'] == 1 and stats['originais'] == 2
+
+
+@pytest.fixture
+def nos_apps(preparadas, monkeypatch):
+    monkeypatch.setattr(modulo_app, 'imagens', preparadas)
+    monkeypatch.setattr(asgi, 'imagens', preparadas)
+    return preparadas
+
+
+class TestRotaImagens:
+    """GET /static/images/<nome> nos apps Flask e ASGI"""
+
+    def test_flask(self, client, nos_apps):
+        response = client.get('/static/images/capa.png?w=300', headers={'Accept': 'image/webp'})
+        assert response.status_code == 200 and response.mimetype == 'image/webp'
+        assert response.headers['Vary'] == 'Accept'
+        assert response.headers['Last-Modified'] and response.headers['ETag']
+
+        imutavel = client.get(f"/static/images/{response.headers['Content-Location']}")
+        assert imutavel.headers['Cache-Control'] == CACHE_IMUTAVEL
+        assert imutavel.data == response.data
+
+        condicional = client.get(f"/static/images/{response.headers['Content-Location']}",
+                                 headers={'If-None-Match': imutavel.headers['ETag']})
+        assert condicional.status_code == 304
+
+        assert client.get('/static/images/capa.png?w=abc').status_code == 400
+        # Sem variante no manifesto: o original de static/images, como antes
+        original = client.get('/static/images/relaxamento_profundo.png')
+        assert original.status_code == 200 and original.mimetype == 'image/png'
+        assert client.get('/static/images/nao-existe.png').status_code == 404
+
+    def test_asgi_igual_ao_flask(self, client, nos_apps):
+        with TestClient(asgi.app) as asgi_client:
+            for caminho, accept in [('capa.png?w=300', 'image/avif,image/webp'), ('capa.png', '*/*')]:
+                esperado = client.get(f'/static/images/{caminho}', headers={'Accept': accept})
+                obtido = asgi_client.get(f'/static/images/{caminho}', headers={'Accept': accept})
+                assert obtido.status_code == 200 and obtido.content == esperado.data
+                assert obtido.headers['content-type'] == esperado.headers['Content-Type']
+                for cabecalho in ('Cache-Control', 'Content-Location'):
+                    assert obtido.headers[cabecalho] == esperado.headers[cabecalho]
+                assert 'Accept' in obtido.headers['Vary']  # o CORS do Starlette acrescenta Origin
+
+            nome = esperado.headers['Content-Location']
+            obtido = asgi_client.get(f'/static/images/{nome}')
+            assert obtido.headers['cache-control'] == CACHE_IMUTAVEL
+            assert asgi_client.get(f'/static/images/{nome}',
+                                   headers={'If-None-Match': obtido.headers['etag']}).status_code == 304
+            assert asgi_client.get('/static/images/capa.png?w=-1').status_code == 400
+            assert asgi_client.get('/static/images/nao-existe.png').status_code == 404
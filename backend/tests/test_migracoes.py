@@ -0,0 +1,50 @@
+"""Testes do runner de migrações"""
+import psycopg2
+import pytest
+
+import conexao
+from migrations import migrar
+
+
+@pytest.fixture
+def conn():
+    c = psycopg2.connect(**conexao._parametros_conexao())
+    yield c
+    c.close()
+
+
+def _indices(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname LIKE 'idx_%%'
+        """)
+        return dict(cursor.fetchall())
+
+
+class TestMigracoes:
+    """Testes para migrations/migrar.py"""
+
+    def test_aplica_uma_vez(self, conn):
+        """Segunda execução não reaplica nada e os índices ficam válidos"""
+        migrar.migrar(conn)
+        assert migrar.migrar(conn) == []
+
+        indices = _indices(conn)
+        assert indices.get('idx_historico_meditacoes_usuario_data') is True
+        assert indices.get('idx_resultados_avaliacoes_usuario_tipo_keyset') is True
+        assert 'idx_resultados_avaliacoes_usuario_tipo_data' not in indices  # substituído na 009
+
+    def test_recria_indice_invalido(self, conn):
+        """Índice INVALID de um CONCURRENTLY interrompido é removido e recriado"""
+        migrar.migrar(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE pg_index SET indisvalid = false
+                WHERE indexrelid = 'idx_classificacoes_humor_usuario_data'::regclass
+            """)
+            cursor.execute("DELETE FROM schema_migrations WHERE versao = '001'")
+        conn.commit()
+
+        assert migrar.migrar(conn) == ['001']
+        assert _indices(conn)['idx_classificacoes_humor_usuario_data'] is True
@@ -0,0 +1,62 @@
+"""Testes das regras do harness de regressão de planos (sem subir PostgreSQL)"""
+from benchmarks import regressao_planos as rp
+
+
+def _consulta(plano, tempo_ms, seq_scans=()):
+    return {'plano': plano, 'tempo_ms': tempo_ms, 'seq_scans': list(seq_scans)}
+
+
+def _avaliar(consultas, baseline=None, locais=None):
+    locais = locais or {'controller_usuario.py': {}}
+    return rp.avaliar(consultas, locais, {'historico_meditacoes': 1_000_000, 'meditacoes': 200},
+                      baseline, linhas_grandes=10000, limite=0.5, piso_ms=1.0)
+
+
+class TestRegressaoPlanos:
+    """Testes para benchmarks/regressao_planos.py"""
+
+    def test_inventario_cobre_controller(self):
+        """Toda função com SQL aparece no inventário, com uma entrada por chamada"""
+        locais = rp.inventario()
+        assert len(locais['controller_usuario.py']['_registrar_sessao_no_resumo']) == 3
+        assert len(locais['controller_usuario.py']['reconstruir_estatisticas_meditacao']) == 2
+        assert len(locais['controller_usuario.py']['listar_historico_meditacoes']) == 2
+        assert 'relatorio_historico_detalhado' in locais['relatorios.py']
+        assert 'generate_hash' not in locais['controller_usuario.py']
+
+    def test_forma_do_plano(self):
+        plano = {'Node Type': 'Limit', 'Plans': [{
+            'Node Type': 'Index Scan', 'Index Name': 'idx_x', 'Relation Name': 'historico_meditacoes',
+        }]}
+        assert rp.forma_do_plano(plano) == 'Limit(Index Scan using idx_x on historico_meditacoes)'
+
+    def test_seq_scan_em_tabela_grande_falha(self):
+        """Seq Scan só é aceito em tabela pequena ou em função liberada"""
+        falhas, _ = _avaliar({
+            'controller_usuario.py:listar_historico_meditacoes#1':
+                _consulta('Seq Scan on historico_meditacoes', 1.0, ['historico_meditacoes']),
+            'controller_usuario.py:listar_meditacoes#1':
+                _consulta('Seq Scan on meditacoes', 0.1, ['meditacoes']),
+            'relatorios.py:relatorio_historico_detalhado#1':
+                _consulta('Seq Scan on historico_meditacoes', 900.0, ['historico_meditacoes']),
+        })
+        assert len(falhas) == 1
+        assert 'listar_historico_meditacoes' in falhas[0]
+
+    def test_lentidao_precisa_passar_limite_e_piso(self):
+        baseline = {
+            'controller_usuario.py:a#1': _consulta('X', 0.1),
+            'controller_usuario.py:b#1': _consulta('X', 10.0),
+            'controller_usuario.py:c#1': _consulta('X', 10.0),
+        }
+        falhas, avisos = _avaliar({
+            'controller_usuario.py:a#1': _consulta('X', 0.5),   # 5x, mas só +0.4 ms
+            'controller_usuario.py:b#1': _consulta('Y', 12.0),  # +20%: plano mudou, só aviso
+            'controller_usuario.py:c#1': _consulta('X', 20.0),  # +100% e +10 ms
+        }, baseline)
+        assert falhas == ['controller_usuario.py:c#1: 10.000 ms -> 20.000 ms (+10.000 ms)']
+        assert any('b#1: plano mudou' in aviso for aviso in avisos)
+
+    def test_sql_nao_exercitado_falha(self):
+        falhas, _ = _avaliar({}, locais={'controller_usuario.py': {'remover_usuario': [(1, 187, 188)]}})
+        assert falhas == ['controller_usuario.py:remover_usuario#1 (linha 187): SQL não exercitado pelo roteiro']
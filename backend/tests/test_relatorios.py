@@ -0,0 +1,129 @@
+"""Testes do motor de relatórios (eports/relatorios.py)"""
+import csv
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+import pytest
+
+import conexao
+from eports import relatorios
+
+INICIO = datetime(2026, 5, 1, 8, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def nome():
+    """Dois usuários com o mesmo nome: 3 sessões (uma sem data) e 1 sessão."""
+    nome = f"Relatório {uuid.uuid4().hex[:8]}"
+    # Conexão própria: commit visível para as threads dos relatórios
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO meditacoes (titulo, categoria) VALUES (%s, 'foco') RETURNING id", (nome,))
+        meditacao_id = cursor.fetchone()[0]
+        usuarios = []
+        for sufixo in ('a', 'b'):
+            cursor.execute("INSERT INTO usuarios (nome, email, password_hash) VALUES (%s, %s, 'x') RETURNING id",
+                           (nome, f"{uuid.uuid4().hex[:8]}-{sufixo}@test.com"))
+            usuarios.append(cursor.fetchone()[0])
+        for usuario_id, data in [(usuarios[0], INICIO), (usuarios[0], INICIO + timedelta(days=2)),
+                                 (usuarios[0], None), (usuarios[1], INICIO + timedelta(days=1))]:
+            cursor.execute("INSERT INTO historico_meditacoes (usuario_id, meditacao_id, data_conclusao)"
+                           " VALUES (%s, %s, %s)", (usuario_id, meditacao_id, data))
+    conn.commit()
+    yield nome
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM usuarios WHERE nome = %s", (nome,))
+        cursor.execute("DELETE FROM meditacoes WHERE titulo = %s", (nome,))
+    conn.commit()
+    conn.close()
+
+
+def _csv(caminho, nome):
+    with open(caminho, newline='', encoding='utf-8') as arquivo:
+        linhas = list(csv.reader(arquivo))
+    return linhas[0], [linha for linha in linhas[1:] if nome in linha]
+
+
+class TestRelatorios:
+    """Testes para gerar_relatorios e os formatos"""
+
+    def test_csv_em_lotes(self, nome, tmp_path):
+        resultados = relatorios.gerar_relatorios(formato='csv', saida=str(tmp_path), lote=2)
+        assert [r[0] for r in resultados] == list(relatorios.RELATORIOS)
+        assert sorted(os.listdir(tmp_path)) == ['historico_detalhado.csv', 'meditacoes_por_usuario.csv']
+
+        cabecalho, linhas = _csv(tmp_path / 'meditacoes_por_usuario.csv', nome)
+        assert cabecalho == ['usuario_id', 'nome', 'total_meditacoes']
+        # Por usuário, não por nome: os dois homônimos separados
+        assert [linha[2] for linha in linhas] == ['3', '1']
+
+        cabecalho, linhas = _csv(tmp_path / 'historico_detalhado.csv', nome)
+        assert cabecalho == ['usuario', 'meditacao', 'data_conclusao']
+        assert [linha[2][:10] for linha in linhas] == ['2026-05-03', '2026-05-02', '2026-05-01', '']
+        total = resultados[1][2]
+        assert total == sum(1 for _ in open(tmp_path / 'historico_detalhado.csv', encoding='utf-8')) - 1
+
+    def test_jsonl(self, nome, tmp_path):
+        relatorios.gerar_relatorios(['historico_detalhado'], 'jsonl', str(tmp_path))
+        with open(tmp_path / 'historico_detalhado.jsonl', encoding='utf-8') as arquivo:
+            linhas = [json.loads(linha) for linha in arquivo]
+        minhas = [linha for linha in linhas if linha['usuario'] == nome]
+        assert minhas[0] == {'usuario': nome, 'meditacao': nome, 'data_conclusao': minhas[0]['data_conclusao']}
+        assert datetime.fromisoformat(minhas[0]['data_conclusao']) == INICIO + timedelta(days=2)
+
+    def test_parquet(self, nome, tmp_path):
+        parquet = pytest.importorskip('pyarrow.parquet')
+        relatorios.gerar_relatorios(formato='parquet', saida=str(tmp_path), lote=2)
+        tabela = parquet.read_table(tmp_path / 'historico_detalhado.parquet')
+        assert str(tabela.schema.field('data_conclusao').type) == 'timestamp[us, tz=UTC]'
+        assert parquet.ParquetFile(tmp_path / 'historico_detalhado.parquet').num_row_groups > 1
+        minhas = [linha for linha in tabela.to_pylist() if linha['usuario'] == nome]
+        assert [linha['data_conclusao'] for linha in minhas] == \
+            [INICIO + timedelta(days=2), INICIO + timedelta(days=1), INICIO, None]
+        contagens = parquet.read_table(tmp_path / 'meditacoes_por_usuario.parquet').to_pylist()
+        assert [linha['total_meditacoes'] for linha in contagens if linha['nome'] == nome] == [3, 1]
+
+    def test_paralelo(self, tmp_path, monkeypatch):
+        """Os relatórios rodam ao mesmo tempo: cada um espera o outro começar"""
+        barreira = threading.Barrier(2, timeout=5)
+
+        def falso(formato, caminho, lote):
+            barreira.wait()
+            return threading.current_thread().name
+
+        monkeypatch.setattr(relatorios, 'RELATORIOS', {'um': falso, 'dois': falso})
+        resultados = relatorios.gerar_relatorios(formato='csv', saida=str(tmp_path), paralelo=2)
+        assert [r[0] for r in resultados] == ['um', 'dois'] and resultados[0][2] != resultados[1][2]
+
+    def test_falha_nao_deixa_arquivo(self, nome, tmp_path, monkeypatch):
+        (tmp_path / 'historico_detalhado.csv').write_text('anterior')
+
+        def falha(self, linhas):
+            raise RuntimeError('disco cheio')
+
+        monkeypatch.setattr(relatorios._Csv, 'escrever', falha)
+        with pytest.raises(RuntimeError):
+            relatorios.gerar_relatorios(['historico_detalhado'], 'csv', str(tmp_path))
+        assert os.listdir(tmp_path) == ['historico_detalhado.csv']
+        assert (tmp_path / 'historico_detalhado.csv').read_text() == 'anterior'
+
+    def test_invalidos(self, tmp_path, monkeypatch):
+        with pytest.raises(ValueError):
+            relatorios.gerar_relatorios(['nada'], 'csv', str(tmp_path))
+        with pytest.raises(ValueError):
+            relatorios.gerar_relatorios(None, 'xml', str(tmp_path))
+        monkeypatch.setattr(relatorios, 'pyarrow', None)
+        assert relatorios.formatos_disponiveis() == ('csv', 'jsonl')
+        with pytest.raises(ValueError):
+            relatorios.gerar_relatorios(None, 'parquet', str(tmp_path))
+
+    def test_main(self, nome, tmp_path, capsys):
+        relatorios.main(['--formato', 'jsonl', '--saida', str(tmp_path), 'meditacoes_por_usuario'])
+        assert '✅ meditacoes_por_usuario' in capsys.readouterr().out
+        assert os.listdir(tmp_path) == ['meditacoes_por_usuario.jsonl']
+        with pytest.raises(SystemExit):
+            relatorios.main(['--saida', str(tmp_path), 'nada'])
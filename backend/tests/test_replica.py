@@ -0,0 +1,73 @@
+"""Testes do roteamento de leituras para a réplica"""
+import pytest
+from psycopg2 import extensions
+
+import conexao
+from config import Config
+
+
+@pytest.fixture
+def com_replica(monkeypatch):
+    """
+    "Réplica" apontando para o mesmo servidor, mas com sessão somente leitura:
+    basta para saber em qual pool cada consulta caiu.
+    """
+    parametros = conexao._parametros_conexao()
+    dsn = parametros.get('dsn') or extensions.make_dsn(
+        **{('dbname' if chave == 'database' else chave): valor
+           for chave, valor in parametros.items() if valor}
+    )
+    monkeypatch.setattr(Config, 'POSTGRES_REPLICA_DSN', dsn)
+    monkeypatch.setattr(Config, 'REPLICA_LAG_CHECK_INTERVAL', 0)
+    monkeypatch.setattr(conexao, '_escritas_recentes', {})
+    conexao.fechar_pool()
+    conexao.inicializar_pool()
+    yield
+    conexao.fechar_pool()
+
+
+def _somente_leitura(cursor):
+    cursor.execute("SHOW transaction_read_only")
+    return cursor.fetchone()[0] == 'on'
+
+
+class TestRoteamentoReplica:
+    """Testes para obter_cursor(somente_leitura=..., usuario_id=...)"""
+
+    def test_leitura_vai_para_replica(self, com_replica):
+        """Leituras usam o pool da réplica"""
+        with conexao.obter_cursor(somente_leitura=True) as cursor:
+            assert _somente_leitura(cursor)
+        assert conexao.estatisticas_replica()['leituras_replica'] >= 1
+
+    def test_escrita_vai_para_primaria(self, com_replica):
+        """Escritas nunca usam a réplica"""
+        with conexao.obter_cursor(usuario_id=-1) as cursor:
+            assert not _somente_leitura(cursor)
+
+    def test_le_as_proprias_escritas(self, com_replica):
+        """Quem acabou de escrever lê da primária; os demais, da réplica"""
+        with conexao.obter_cursor(usuario_id=-1):
+            pass
+
+        with conexao.obter_cursor(somente_leitura=True, usuario_id=-1) as cursor:
+            assert not _somente_leitura(cursor)
+        with conexao.obter_cursor(somente_leitura=True, usuario_id=-2) as cursor:
+            assert _somente_leitura(cursor)
+
+    def test_replica_atrasada_volta_para_primaria(self, com_replica, monkeypatch):
+        """Atraso acima de REPLICA_MAX_LAG manda as leituras para a primária"""
+        monkeypatch.setattr(conexao, 'atraso_replica', lambda: Config.REPLICA_MAX_LAG + 1)
+
+        with conexao.obter_cursor(somente_leitura=True) as cursor:
+            assert not _somente_leitura(cursor)
+        assert conexao.estatisticas_replica()['leituras_primaria_atraso'] >= 1
+
+    def test_unidade_fica_na_primaria_depois_de_escrever(self, com_replica):
+        """Na mesma unidade de trabalho, leituras após uma escrita enxergam a escrita"""
+        with conexao.unidade_de_trabalho():
+            with conexao.transacao() as primaria:
+                pass
+            with conexao.transacao(somente_leitura=True) as leitura:
+                pass
+        assert leitura is primaria
@@ -0,0 +1,68 @@
+"""Testes do provedor JSON (serializacao.py)"""
+import datetime
+import decimal
+import json
+import math
+
+import pytest
+
+import serializacao
+from model.meditacao import Meditacao
+from model.usuario import Usuario
+
+FUSO = datetime.timezone(datetime.timedelta(hours=-3))
+DADOS = {
+    'quando': datetime.datetime(2026, 10, 18, 9, 30, 5, 123, tzinfo=FUSO),
+    'dia': datetime.date(2026, 10, 18),
+    'sem_fuso': datetime.datetime(2026, 10, 18, 9, 30),
+    'valor': decimal.Decimal('7.50'),
+    'meditacao': Meditacao(1, 'Respiração', None, 10, None, 'guiada', 'Foco', None),
+    'texto': 'ação',
+}
+ESPERADO = {
+    'quando': '2026-10-18T09:30:05.000123-03:00',
+    'dia': '2026-10-18',
+    'sem_fuso': '2026-10-18T09:30:00',
+    'valor': '7.50',
+    'meditacao': {'id': 1, 'titulo': 'Respiração', 'descricao': None, 'duracao_minutos': 10,
+                  'url_audio': None, 'tipo': 'guiada', 'categoria': 'Foco', 'imagem_capa': None},
+    'texto': 'ação',
+}
+
+
+class TestSerializacao:
+    """Testes para serializacao.py"""
+
+    def test_tipos_nativos_e_models(self):
+        assert json.loads(serializacao.para_json(DADOS)) == ESPERADO
+
+    def test_sem_orjson_da_o_mesmo_texto(self, monkeypatch):
+        com_orjson = serializacao.para_json(DADOS, ordenar=True)
+        monkeypatch.setattr(serializacao, 'orjson', None)
+        assert serializacao.para_json(DADOS, ordenar=True) == com_orjson
+        assert serializacao.de_json(com_orjson) == ESPERADO
+
+    def test_chave_none_e_senha_fora(self):
+        usuario = Usuario(id=1, nome='Ana', email='ana@x.com', password_hash='segredo')
+        texto = serializacao.para_json({None: 1, 'a': usuario}, ordenar=True).decode()
+        assert texto.startswith('{"a":') and texto.endswith('"null":1}')
+        assert 'segredo' not in texto
+
+    def test_tipo_desconhecido(self):
+        with pytest.raises(TypeError):
+            serializacao.para_json({'x': object()})
+
+
+class TestProvedorNoApp:
+    """ProvedorJson registrado como app.json"""
+
+    def test_jsonify(self, app):
+        with app.app_context():
+            from flask import jsonify
+            response = jsonify(DADOS)
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == ESPERADO
+
+    def test_corpo_da_requisicao(self, app):
+        assert app.json.loads(b'{"a": [1, 2.5, null]}') == {'a': [1, 2.5, None]}
+        assert math.isnan(app.json.loads('{"a": NaN}')['a'])  # o orjson recusa; cai no json padrão
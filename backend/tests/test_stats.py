@@ -0,0 +1,129 @@
+"""Testes de GET /stats (contadores, estimativa e cache atualizado em segundo plano)"""
+import asyncio
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import conexao
+from cache import CacheAtualizado
+from controller import controller_usuario as c
+
+
+class _Contador:
+    def __init__(self, *valores):
+        self.valores = list(valores)
+        self.chamadas = 0
+        self.chamou = threading.Event()
+
+    def __call__(self):
+        self.chamadas += 1
+        self.chamou.set()
+        return self.valores.pop(0)
+
+
+class TestCacheAtualizado:
+    """Testes para cache/atualizado.py"""
+
+    def test_velho_e_servido_e_atualizado_em_segundo_plano(self):
+        cache = CacheAtualizado(ttl=0.05, idade_maxima=60)
+        calcular = _Contador({'v': 1}, {'v': 2})
+        assert cache.obter('k', calcular) == {'v': 1}
+        assert cache.obter('k', calcular) == {'v': 1}
+        assert calcular.chamadas == 1
+
+        time.sleep(0.06)
+        calcular.chamou.clear()
+        assert cache.obter('k', calcular) == {'v': 1}  # não espera o recálculo
+        assert calcular.chamou.wait(1)
+        fim = time.monotonic() + 1
+        while cache.obter('k', calcular) != {'v': 2} and time.monotonic() < fim:
+            time.sleep(0.01)
+        assert cache.obter('k', calcular) == {'v': 2}
+        assert cache.estatisticas()['atualizacoes'] == 1
+
+    def test_velho_demais_calcula_na_hora(self):
+        cache = CacheAtualizado(ttl=0.01, idade_maxima=0.02)
+        calcular = _Contador({'v': 1}, {'v': 2})
+        cache.obter('k', calcular)
+        time.sleep(0.03)
+        assert cache.obter('k', calcular) == {'v': 2}
+        assert cache.estatisticas()['calculos'] == 2
+
+    def test_falha_nao_apaga_o_valor(self):
+        cache = CacheAtualizado(ttl=0, idade_maxima=60)
+        calcular = _Contador({'v': 1}, None)
+        cache.obter('k', calcular)
+        calcular.chamou.clear()
+        assert cache.obter('k', calcular) == {'v': 1}
+        assert calcular.chamou.wait(1)
+        time.sleep(0.05)
+        assert cache.obter('k', _Contador({'v': 3})) == {'v': 1}
+        assert cache.estatisticas()['falhas'] == 1
+
+    def test_async(self):
+        cache = CacheAtualizado(ttl=0, idade_maxima=60)
+        valores = iter([{'v': 1}, {'v': 2}])
+
+        async def calcular():
+            return next(valores)
+
+        async def cenario():
+            primeiro = await cache.obter_async('k', calcular)
+            velho = await cache.obter_async('k', calcular)
+            await asyncio.sleep(0.01)
+            return primeiro, velho, await cache.obter_async('k', calcular)
+
+        assert asyncio.run(cenario()) == ({'v': 1}, {'v': 1}, {'v': 2})
+
+
+def _executar(sql, params=()):
+    """SQL em outra conexão, confirmado na hora"""
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            resultado = cursor.fetchall() if cursor.description else None
+        conn.commit()
+        return resultado
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def sem_cache():
+    c.estatisticas_sistema.invalidar()
+    yield
+    c.estatisticas_sistema.invalidar()
+
+
+class TestContagens:
+    """Contadores da migração 004 e rota /stats"""
+
+    def test_contadores_exatos(self, sem_cache):
+        antes = c.contar_registros('exato')
+        _executar("INSERT INTO meditacoes (titulo) SELECT 'stats-' || n FROM generate_series(1, 3) AS n")
+        assert c.contar_registros('exato')['meditacoes'] == antes['meditacoes'] + 3
+
+        _executar("DELETE FROM meditacoes WHERE titulo LIKE 'stats-%%'")
+        depois = c.contar_registros('exato')
+        assert depois == antes
+        contagem_real = _executar("SELECT COUNT(*) FROM meditacoes")[0][0]
+        assert depois['meditacoes'] == contagem_real
+
+    def test_estimado(self, sem_cache):
+        _executar("ANALYZE meditacoes")
+        estimado = c.contar_registros('estimado')
+        assert set(estimado) == set(c.TABELAS_ESTATISTICAS)
+        assert estimado['meditacoes'] == _executar("SELECT COUNT(*) FROM meditacoes")[0][0]
+
+    def test_rota(self, client, sem_cache):
+        response = client.get('/stats')
+        assert response.status_code == 200
+        assert set(response.get_json()) == set(c.TABELAS_ESTATISTICAS)
+        assert response.headers['Cache-Control'].startswith('public, max-age=')
+
+        assert client.get('/stats?modo=estimado').status_code == 200
+        assert client.get('/stats?modo=tudo').status_code == 400
+        assert set(client.get('/health').get_json()['stats']['idade_s']) == {'exato', 'estimado'}
@@ -0,0 +1,112 @@
+"""Testes de GET /usuarios paginado por cursor e da listagem da CLI (migração 007)"""
+import uuid
+
+import psycopg2
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+import conexao
+from controller import controller_usuario as c
+from middleware import auth_asgi
+
+
+@pytest.fixture
+def prefixo():
+    """12 usuários com um prefixo único, em maiúsculas e minúsculas misturadas."""
+    prefixo = f"kz{uuid.uuid4().hex[:6]}"
+    nomes = [f"{prefixo} {i:02d}" for i in range(8)] + [f"{prefixo.upper()} {i:02d}" for i in range(4)]
+    # Conexão própria: commit visível também para o pool do ASGI
+    conn = psycopg2.connect(**conexao._parametros_conexao())
+    try:
+        with conn.cursor() as cursor:
+            for nome in nomes:
+                cursor.execute("INSERT INTO usuarios (nome, email, password_hash) VALUES (%s, %s, 'x')",
+                               (nome, f"{uuid.uuid4().hex[:10]}@test.com"))
+        conn.commit()
+        yield prefixo
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM usuarios WHERE lower(nome) LIKE %s", (prefixo + '%',))
+        conn.commit()
+        conn.close()
+
+
+@pytest.fixture
+def cabecalho(novo_usuario):
+    return novo_usuario('lista', 'Lista')[1]
+
+
+class TestParametros:
+    """Testes das funções puras da paginação"""
+
+    def test_parametros(self, monkeypatch):
+        monkeypatch.setattr(c.Config, 'USUARIOS_PAGINA_PADRAO', 50)
+        monkeypatch.setattr(c.Config, 'USUARIOS_PAGINA_MAX', 200)
+        assert c.parametros_pagina_usuarios(None, None) == (50, None)
+        assert c.parametros_pagina_usuarios('1000', '  Ana ') == (200, 'Ana')
+        assert c.parametros_pagina_usuarios('10', '   ') == (10, None)
+        with pytest.raises(ValueError):
+            c.parametros_pagina_usuarios('0', None)
+
+    def test_cursor(self):
+        assert c._decodificar_cursor(c._codificar_cursor('ana|maria', 7)) == ('ana|maria', 7)
+        with pytest.raises(ValueError):
+            c._decodificar_cursor('nao-e-cursor')
+
+
+class TestUsuariosPaginado:
+    """GET /usuarios?page_size=&cursor=&nome="""
+
+    def test_prefixo_sem_diferenciar_maiusculas(self, client, cabecalho, prefixo, todas_as_paginas):
+        paginas = todas_as_paginas(client, cabecalho, '/usuarios', f"page_size=5&nome={prefixo.upper()}")
+        assert [len(p) for p in paginas] == [5, 5, 2]
+        itens = [item for pagina in paginas for item in pagina]
+        assert set(itens[0]) == {'id', 'nome', 'data_cadastro'}
+        chaves = [(item['nome'].lower(), item['id']) for item in itens]
+        assert chaves == sorted(chaves) and len(set(chaves)) == 12
+
+    def test_sem_filtro_por_id(self, client, cabecalho, prefixo, todas_as_paginas):
+        itens = [item for pagina in todas_as_paginas(client, cabecalho, '/usuarios', 'page_size=7') for item in pagina]
+        ids = [item['id'] for item in itens]
+        assert ids == sorted(set(ids))
+        assert sum(item['nome'].lower().startswith(prefixo) for item in itens) == 12
+
+    def test_sem_parametros_a_lista_inteira(self, app, client, cabecalho, prefixo, monkeypatch):
+        lista = client.get('/usuarios', headers=cabecalho).get_json()
+        assert isinstance(lista, list) and set(lista[0]) == {'id', 'nome', 'data_cadastro'}
+        assert [item['id'] for item in lista] == sorted(item['id'] for item in lista)
+        assert sum(item['nome'].lower().startswith(prefixo) for item in lista) == 12
+        assert isinstance(client.get(f'/usuarios?nome={prefixo}', headers=cabecalho).get_json(), dict)
+
+        monkeypatch.setattr(auth_asgi.config, 'JWT_SECRET_KEY', app.config['JWT_SECRET_KEY'])
+        with TestClient(asgi.app) as asgi_client:
+            assert asgi_client.get('/usuarios', headers=cabecalho).json() == \
+                client.get('/usuarios', headers=cabecalho).get_json()
+
+    def test_erros(self, client, cabecalho):
+        for consulta in ('page_size=0', 'page_size=abc', 'cursor=xyz'):
+            response = client.get(f'/usuarios?{consulta}', headers=cabecalho)
+            assert response.status_code == 400 and response.get_json()['mensagem']
+
+    def test_asgi_igual_ao_flask(self, app, client, cabecalho, prefixo, monkeypatch, todas_as_paginas):
+        monkeypatch.setattr(auth_asgi.config, 'JWT_SECRET_KEY', app.config['JWT_SECRET_KEY'])
+        with TestClient(asgi.app) as asgi_client:
+            for consulta in (f'page_size=5&nome={prefixo}', 'page_size=9'):
+                assert todas_as_paginas(asgi_client, cabecalho, '/usuarios', consulta) == \
+                    todas_as_paginas(client, cabecalho, '/usuarios', consulta)
+            assert asgi_client.get('/usuarios?cursor=xyz', headers=cabecalho).status_code == 400
+
+
+class TestIterarUsuarios:
+    """Testes para iterar_usuarios (cursor nomeado da CLI)"""
+
+    def test_mesma_ordem_das_paginas(self, prefixo):
+        linhas = list(c.iterar_usuarios(prefixo.upper(), lote=3))
+        assert len(linhas) == 12 and all('@' in email for _, _, email, _ in linhas)
+        pagina = c.listar_usuarios_pagina(50, prefixo=prefixo)
+        assert [linha[0] for linha in linhas] == [item['id'] for item in pagina['itens']]
+
+        ids = [linha[0] for linha in c.iterar_usuarios(lote=2)]
+        assert ids == sorted(ids) and {linha[0] for linha in linhas} <= set(ids)
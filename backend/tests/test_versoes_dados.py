@@ -0,0 +1,92 @@
+"""Testes do GET condicional pelas versões dos dados do usuário"""
+import pytest
+
+import conexao
+from controller import controller_usuario
+from model.meditacao import Meditacao
+
+
+@pytest.fixture
+def usuario(novo_usuario):
+    """Usuário novo: (id, headers de autenticação)"""
+    return novo_usuario('versoes', 'Usuário Versões')
+
+
+@pytest.fixture
+def meditacao_id():
+    controller_usuario.inserir_meditacao(Meditacao(None, 'Meditação das versões', 'desc', 10, None, 'guiada', 'sono', None))
+    with conexao.obter_cursor() as cursor:
+        cursor.execute("SELECT id FROM meditacoes WHERE titulo = 'Meditação das versões'")
+        id = cursor.fetchone()[0]
+    yield id
+    with conexao.obter_cursor() as cursor:
+        cursor.execute("DELETE FROM meditacoes WHERE titulo = 'Meditação das versões'")
+
+
+def _avaliar(client, uid, headers):
+    response = client.post('/avaliacoes', headers=headers, json={
+        'usuario_id': uid, 'tipo': 'ansiedade', 'respostas': {'q1': 1}, 'resultado_score': 1})
+    assert response.status_code == 201
+
+
+class TestGetCondicional:
+    """ETag das leituras por usuário e 304 sem rodar a consulta"""
+
+    def test_sem_escritas_nao_ha_etag(self, client, usuario):
+        _, headers = usuario
+        response = client.get('/avaliacoes/historico', headers=headers)
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+
+    def test_304_sem_consultar(self, client, usuario, monkeypatch):
+        uid, headers = usuario
+        _avaliar(client, uid, headers)
+
+        response = client.get('/avaliacoes/historico', headers=headers)
+        etag = response.headers['ETag']
+        assert 'private' in response.headers['Cache-Control']
+        assert 'Authorization' in response.headers['Vary']
+
+        def nao_deveria_consultar(*args):
+            raise AssertionError("a leitura não deveria rodar num 304")
+        monkeypatch.setattr(controller_usuario, 'listar_avaliacoes_por_usuario', nao_deveria_consultar)
+
+        response = client.get('/avaliacoes/historico', headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+    def test_escrita_troca_a_versao(self, client, usuario):
+        uid, headers = usuario
+        _avaliar(client, uid, headers)
+        etag = client.get('/avaliacoes/historico', headers=headers).headers['ETag']
+
+        _avaliar(client, uid, headers)
+        response = client.get('/avaliacoes/historico', headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+        assert len(response.get_json()) == 2
+        assert response.headers['ETag'] != etag
+
+    def test_historico_remocao_e_variantes(self, client, usuario, meditacao_id):
+        """O mesmo domínio serve histórico (com e sem limit) e estatísticas, com ETags distintas"""
+        uid, headers = usuario
+        response = client.post('/meditacoes/historico', headers=headers, json={
+            'usuario_id': uid, 'meditacao_id': meditacao_id, 'duracao_real_minutos': 10})
+        assert response.status_code == 201
+
+        etags = {caminho: client.get(caminho, headers=headers).headers['ETag'] for caminho in (
+            '/meditacoes/historico', '/meditacoes/historico?limit=5', '/meditacoes/estatisticas')}
+        assert len(set(etags.values())) == 3
+
+        historico_id = client.get('/meditacoes/historico', headers=headers).get_json()[0]['id']
+        assert client.delete(f"/meditacoes/historico/{historico_id}", headers=headers).status_code == 200
+        for caminho, etag in etags.items():
+            response = client.get(caminho, headers={**headers, 'If-None-Match': etag})
+            assert response.status_code == 200, caminho
+
+    def test_versao_por_dominio(self, client, usuario):
+        """Cada domínio tem sua versão; os que nunca foram escritos não têm"""
+        uid, headers = usuario
+        _avaliar(client, uid, headers)
+        versao, _ = controller_usuario.obter_versao_dados(uid, 'avaliacoes')
+        assert controller_usuario.obter_versao_dados(uid, 'humor') is None
+        assert versao > 0